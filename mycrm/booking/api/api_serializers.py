@@ -46,6 +46,7 @@ class ReservationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reservation
         fields = "__all__"
+        read_only_fields = Reservation.PAYMENT_TOTAL_FIELDS
 
 
 class ReservationStatusTypeSerializer(serializers.ModelSerializer):
@@ -73,7 +74,9 @@ class ClientSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Client
-        fields = "__all__"
+        # phone_normalized — служебный ключ поиска (booking.phones), в API не
+        # отдаётся: он вычисляется из phone при сохранении.
+        exclude = ("phone_normalized",)
 
 
 class SpecialistSerializer(serializers.ModelSerializer):
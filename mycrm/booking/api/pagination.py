@@ -0,0 +1,128 @@
+"""Keyset-пагинация списков API.
+
+Страница выбирается условием «строго после последней строки предыдущей
+страницы» по упорядоченному уникальному ключу, а не смещением (OFFSET): стоимость
+страницы не зависит ни от её номера, ни от размера таблицы, а строки,
+добавленные или изменённые между запросами, не сдвигают страницы.
+
+Курсор непрозрачный: base64 от JSON со значениями ключа последней строки.
+Клиент только передаёт его обратно из поля `next`.
+"""
+
+import base64
+import json
+from datetime import datetime
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_MAX_PAGE_SIZE = 1000
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по ключу (`datetime_field`, pk), только вперёд.
+
+    Ответ: {"next": <url следующей страницы или null>, "results": [...]}.
+    Размер страницы — параметр `page_size` (по умолчанию API_PAGE_SIZE, не больше
+    API_MAX_PAGE_SIZE).
+    """
+
+    datetime_field = None
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Некорректный курсор"
+
+    def get_page_size(self, request):
+        default = getattr(settings, "API_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+        maximum = getattr(settings, "API_MAX_PAGE_SIZE", DEFAULT_MAX_PAGE_SIZE)
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, default))
+        except (TypeError, ValueError):
+            size = default
+        return max(1, min(size, maximum))
+
+    def encode_cursor(self, row):
+        value = getattr(row, self.datetime_field)
+        payload = json.dumps([value.isoformat(), row.pk], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            value = datetime.fromisoformat(value)
+            if timezone.is_naive(value) or not isinstance(pk, int):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(self.datetime_field, "pk")
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            value, pk = self.decode_cursor(cursor)
+            # Условие `>=` по первому полю отдаёт индексу диапазон, остальное
+            # отсекает строки с тем же значением и меньшим pk.
+            queryset = queryset.filter(
+                Q(**{f"{self.datetime_field}__gt": value}) | Q(pk__gt=pk),
+                **{f"{self.datetime_field}__gte": value},
+            )
+
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = self.next_cursor
+        url = self.request.build_absolute_uri(self.request.path)
+        return f"{url}?{urlencode(params, doseq=True)}"
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["next", "results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Курсор страницы (из поля next предыдущего ответа)",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Размер страницы",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class ReservationPagination(KeysetPagination):
+    datetime_field = "datetimestart"
@@ -1,12 +1,81 @@
-from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample, extend_schema_view
+from datetime import datetime, time, timedelta
+
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiParameter,
+    OpenApiResponse,
+    OpenApiExample,
+    extend_schema_view,
+)
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
 
 from .api_serializers import ReservationSerializer
+from .pagination import ReservationPagination
 from .schema_helpers import UniversalSchemas
 from .settings import BaseViewSet
+from .. import outbox
 from ..models import Reservation
 
+# Фильтры списка: параметр запроса -> поле. Значение — id или несколько id
+# через запятую.
+ID_FILTERS = {
+    "room": "room_id",
+    "area": "room__area_id",
+    "scenario": "scenario_id",
+    "specialist": "specialist_id",
+    "client": "client_id",
+    "status": "status_id",
+}
+
+
+def _ids(name, value):
+    try:
+        return [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise ValidationError({name: "Ожидается id или список id через запятую"})
+
+
+def _local_midnight(name, value):
+    day = parse_date(value) if value else None
+    if day is None:
+        raise ValidationError({name: "Ожидается дата в формате YYYY-MM-DD"})
+    return timezone.make_aware(datetime.combine(day, time()))
+
+
+def _moment(name, value):
+    try:
+        moment = parse_datetime(value)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({name: "Ожидается дата и время в формате ISO 8601"})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+LIST_PARAMETERS = [
+    OpenApiParameter(
+        "date_from", str, description="Начало брони не раньше даты (YYYY-MM-DD)"
+    ),
+    OpenApiParameter(
+        "date_to", str, description="Начало брони не позже даты (YYYY-MM-DD)"
+    ),
+    *(
+        OpenApiParameter(name, str, description="id или список id через запятую")
+        for name in ID_FILTERS
+    ),
+    OpenApiParameter(
+        "updated_since",
+        str,
+        description="Только брони, изменённые начиная с момента (ISO 8601)",
+    ),
+]
+
 
 @extend_schema(tags=['Бронирование'])
 @extend_schema_view(destroy=extend_schema(exclude=True))
@@ -14,10 +83,44 @@ class ReservationViewSet(BaseViewSet):
     """CRUD для бронирований"""
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
+    pagination_class = ReservationPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != "list":
+            return queryset
+
+        params = self.request.query_params
+        for name, field in ID_FILTERS.items():
+            if params.get(name):
+                queryset = queryset.filter(
+                    **{f"{field}__in": _ids(name, params[name])}
+                )
+        if "date_from" in params:
+            queryset = queryset.filter(
+                datetimestart__gte=_local_midnight("date_from", params["date_from"])
+            )
+        if "date_to" in params:
+            end = _local_midnight("date_to", params["date_to"]) + timedelta(days=1)
+            queryset = queryset.filter(datetimestart__lt=end)
+        if "updated_since" in params:
+            # Изменённые брони выбираются по индексу updated_at, и страница
+            # сортирует только их: иначе при редких изменениях план обходит весь
+            # индекс (datetimestart, id) в поисках совпадений.
+            changed = Reservation.objects.filter(
+                updated_at__gte=_moment("updated_since", params["updated_since"])
+            )
+            queryset = queryset.filter(id__in=changed.values("id"))
+        return queryset
 
     @extend_schema(
         summary="Получить список бронирований",
-        description="Возвращает список всех существующих бронирований.",
+        description=(
+            "Возвращает брони постранично в порядке начала (datetimestart, id). "
+            "Следующая страница — по ссылке из поля next; null — страниц больше "
+            "нет. Фильтры комбинируются через AND."
+        ),
+        parameters=LIST_PARAMETERS,
         responses=UniversalSchemas.list_schema(ReservationSerializer),
     )
     def list(self, request, *args, **kwargs):
@@ -30,26 +133,14 @@ class ReservationViewSet(BaseViewSet):
         responses=UniversalSchemas.create_schema(ReservationSerializer),
     )
     def create(self, request, *args, **kwargs):
-        response = super().create(request, *args, **kwargs)
-        # После успешного создания бронирования отправляем POST-запрос на внешний сервис
-        try:
-            from .booking_integration_logging import logger
-            import requests
-            from requests.auth import HTTPBasicAuth
-            booking_id = response.data.get('id')
-            if booking_id:
-                url = "https://repa.plavno.io:8443/~api/json/catalog.crm/approveBooking"
-                payload = {"id": str(booking_id)}
-                auth = HTTPBasicAuth("x4", "x4")
-                headers = {"Content-Type": "application/json"}
-                logger.info(f"Отправляю approveBooking: url={url}, payload={payload}")
-                r = requests.post(url, json=payload, auth=auth, headers=headers, timeout=5)
-                logger.info(f"Ответ approveBooking: status={r.status_code}, text={r.text}")
-        except Exception as e:
-            logger.error(f"Ошибка отправки approveBooking: {e}")
-        except Exception as e:
-            print(f"[BookingAPI] Ошибка отправки approveBooking: {e}")
-        return response
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        # Подтверждение во внешнем каталоге (approveBooking) ставится в outbox в
+        # той же транзакции, что и бронь; доставляет его `dispatch_outbox`.
+        with transaction.atomic():
+            reservation = serializer.save()
+            outbox.approve_booking(reservation.id)
 
     @extend_schema(
         summary="Получить детали бронирования",
@@ -1,8 +1,232 @@
-from rest_framework import viewsets, permissions
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from drf_spectacular.openapi import AutoSchema
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import viewsets, permissions, serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from . import api_serializers
+from .. import conditional
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def _names(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def _related_model(serializer, field):
+    """Модель, на которую ссылается поле-связь сериализатора (или None)."""
+    try:
+        model_field = serializer.Meta.model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+    return model_field.related_model if model_field.is_relation else None
+
+
+def _nested_serializer_class(model):
+    """Сериализатор связанной модели для expand: из api_serializers, иначе общий."""
+    for candidate in vars(api_serializers).values():
+        if (
+            isinstance(candidate, type)
+            and issubclass(candidate, serializers.ModelSerializer)
+            and getattr(getattr(candidate, "Meta", None), "model", None) is model
+        ):
+            return candidate
+    meta = type("Meta", (), {"model": model, "fields": "__all__"})
+    return type(
+        f"{model.__name__}Serializer", (serializers.ModelSerializer,), {"Meta": meta}
+    )
+
+
+def _m2m_prefetches(serializer):
+    """Prefetch id для полей many=True: сериализатор не ходит в БД по строкам."""
+    prefetches = []
+    for field in serializer.fields.values():
+        if not isinstance(field, serializers.ManyRelatedField):
+            continue
+        model = _related_model(serializer, field)
+        if model is not None:
+            prefetches.append(
+                Prefetch(
+                    field.source,
+                    queryset=model._default_manager.only(model._meta.pk.name),
+                )
+            )
+    return prefetches
+
+
+class FieldsAutoSchema(AutoSchema):
+    """Схема OpenAPI: параметры fields и expand у GET-запросов."""
+
+    def get_override_parameters(self):
+        parameters = super().get_override_parameters()
+        if self.method != "GET":
+            return parameters
+        return [
+            *parameters,
+            OpenApiParameter(
+                FIELDS_PARAM, str, description="Вернуть только эти поля (через запятую)"
+            ),
+            OpenApiParameter(
+                EXPAND_PARAM,
+                str,
+                description=(
+                    "Встроить связанные объекты вместо id (через запятую), "
+                    "например client,room,specialist"
+                ),
+            ),
+        ]
+
 
 class BaseViewSet(viewsets.ModelViewSet):
-    """Базовый ViewSet с настройками аутентификации и разрешений"""
+    """Базовый ViewSet с настройками аутентификации и разрешений.
+
+    GET-запросы принимают:
+      - `fields=a,b` — в ответе только эти поля, выборка сужается через `.only()`;
+      - `expand=client,room` — связанные объекты целиком вместо id.
+
+    Связи many=True и развёрнутые связи подгружаются через prefetch_related:
+    число запросов на страницу не зависит от числа строк.
+
+    list и retrieve отвечают с ETag/Last-Modified по таблицам модели и
+    развёрнутых связей (retrieve — по `updated_at` самой строки, если оно
+    есть); на совпавший If-None-Match — 304 без выборки и сериализации (см.
+    `booking.conditional`).
+    """
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    schema = FieldsAutoSchema()
+
+    def get_shape(self):
+        """Разобранные (fields, expand) GET-запроса; None — для остальных методов.
+
+        fields=None означает «все поля».
+        """
+        if hasattr(self, "_shape"):
+            return self._shape
+        request = getattr(self, "request", None)
+        self._shape = None
+        if (
+            request is None
+            or request.method not in SAFE_METHODS
+            or getattr(self, "swagger_fake_view", False)
+        ):
+            return None
+
+        serializer = self.get_serializer_class()()
+        params = request.query_params
+        fields = _names(params[FIELDS_PARAM]) if FIELDS_PARAM in params else None
+        expand = _names(params.get(EXPAND_PARAM, ""))
+
+        unknown = [name for name in fields or () if name not in serializer.fields]
+        if unknown:
+            raise ValidationError(
+                {FIELDS_PARAM: f"Неизвестные поля: {', '.join(unknown)}"}
+            )
+        for name in expand:
+            field = serializer.fields.get(name)
+            if not isinstance(
+                field, (serializers.RelatedField, serializers.ManyRelatedField)
+            ) or _related_model(serializer, field) is None:
+                raise ValidationError({EXPAND_PARAM: f"Поле {name} нельзя развернуть"})
+            if fields is not None and name not in fields:
+                fields.append(name)
+
+        self._shape = (fields, expand)
+        return self._shape
+
+    def shape_serializer(self, serializer):
+        """Оставляет поля из fields и заменяет связи из expand вложенными объектами."""
+        fields, expand = self.get_shape()
+        if fields is not None:
+            for name in list(serializer.fields):
+                if name not in fields:
+                    serializer.fields.pop(name)
+        for name in expand:
+            field = serializer.fields[name]
+            nested = _nested_serializer_class(_related_model(serializer, field))
+            options = {"source": field.source} if field.source != name else {}
+            serializer.fields[name] = nested(
+                many=isinstance(field, serializers.ManyRelatedField),
+                read_only=True,
+                **options,
+            )
+        return serializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.get_shape() is None:
+            return queryset
+        fields, expand = self.get_shape()
+        serializer = self.shape_serializer(self.get_serializer_class()())
+
+        prefetches = _m2m_prefetches(serializer)
+        for name in expand:
+            field = serializer.fields[name]
+            nested = getattr(field, "child", field)
+            model = nested.Meta.model
+            prefetches.append(
+                Prefetch(
+                    field.source,
+                    queryset=model._default_manager.prefetch_related(
+                        *_m2m_prefetches(nested)
+                    ),
+                )
+            )
+        queryset = queryset.prefetch_related(*prefetches)
+
+        if fields is not None:
+            model_fields = {f.name: f for f in queryset.model._meta.get_fields()}
+            sources = [field.source for field in serializer.fields.values()]
+            # Поле не из колонки модели (метод, source="*") может читать любые
+            # колонки — тогда выборка не сужается.
+            if all(source in model_fields for source in sources):
+                loaded = [queryset.model._meta.pk.name]
+                # Ключ keyset-пагинации нужен для курсора следующей страницы.
+                key = getattr(self.paginator, "datetime_field", None)
+                if key:
+                    loaded.append(key)
+                loaded += [
+                    source
+                    for source in sources
+                    if model_fields[source].concrete
+                    and not model_fields[source].many_to_many
+                ]
+                queryset = queryset.only(*loaded)
+        return queryset
+
+    def conditional_models(self):
+        """Модели, из таблиц которых собирается ответ GET-запроса."""
+        serializer = self.get_serializer_class()()
+        return [
+            self.queryset.model,
+            *(
+                _related_model(serializer, serializer.fields[name])
+                for name in self.get_shape()[1]
+            ),
+        ]
+
+    def list(self, request, *args, **kwargs):
+        return conditional.conditional_response(
+            request,
+            self.conditional_models(),
+            lambda: super(BaseViewSet, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional.conditional_response(
+            request,
+            self.conditional_models(),
+            lambda: super(BaseViewSet, self).retrieve(request, *args, **kwargs),
+            pk=kwargs.get(self.lookup_url_kwarg or self.lookup_field),
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.get_shape() is not None:
+            self.shape_serializer(getattr(serializer, "child", serializer))
+        return serializer
@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _ensure_client_search_index(sender, using, **kwargs):
+    from .client_search import ensure_index
+
+    ensure_index(using=using)
 
 
 class BookingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'booking'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # Индекс поиска клиентов — не модель: его создаёт и заполняет не
+        # миграция, а обработчик после каждой миграции (booking.client_search).
+        post_migrate.connect(
+            _ensure_client_search_index,
+            sender=self,
+            dispatch_uid="booking_client_search_index",
+        )
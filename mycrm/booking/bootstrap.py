@@ -0,0 +1,106 @@
+"""Bootstrap-документ главной страницы: справочники для фронтенда.
+
+Раньше `user_index_view` на каждой загрузке страницы сериализовал клиентов,
+комнаты, сценарии, тарифы и прочие справочники в полтора десятка JSON-блоков.
+Теперь они собираются в один документ, который кэшируется по версии набора
+`data_versions.BOOTSTRAP`. Страница встраивает только номер версии, а документ
+отдаётся отдельным запросом `/bootstrap/<version>.json` с долгим HTTP-кэшем.
+
+Клиентов в документе нет: модальные окна ищут их по мере ввода
+(`booking.client_search`), поэтому изменения клиентов версию не меняют.
+"""
+
+import json
+
+from django.core.cache import cache
+from django.core.serializers import serialize
+from django.core.serializers.json import DjangoJSONEncoder
+from . import data_versions
+from .models import (
+    Area,
+    ClientGroup,
+    PaymentType,
+    Room,
+    Scenario,
+    Specialist,
+    Tariff,
+    TariffUnit,
+    TariffWeeklyInterval,
+)
+
+CACHE_KEY = "booking:bootstrap:{version}"
+# Документ неизменен для своей версии, поэтому срок жизни ограничен только
+# вытеснением: неделя, чтобы старые версии не копились в кэше.
+CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+
+def _serialize(queryset, **options):
+    """Формат `django.core.serializers` ({model, pk, fields}), как в шаблонах раньше."""
+    return serialize("python", queryset, **options)
+
+
+def _specialist_service_to_specialists():
+    """Маппинг услуги преподавателя → список ID специалистов, которые её оказывают.
+
+    Используется для фильтрации услуг по доступным специалистам на фронтенде.
+    """
+    links = Specialist.specialist_services.through.objects.filter(
+        specialist__active=True, specialistservice__active=True
+    ).order_by("specialist_id")
+    mapping = {}
+    for specialist_id, service_id in links.values_list(
+        "specialist_id", "specialistservice_id"
+    ):
+        mapping.setdefault(service_id, []).append(specialist_id)
+    return mapping
+
+
+def build_bootstrap_payload() -> dict:
+    """Собирает справочники главной страницы (без кэша)."""
+    return {
+        "rooms": _serialize(
+            Room.objects.prefetch_related("scenario"), use_natural_primary_keys=True
+        ),
+        "areas": _serialize(
+            Area.objects.prefetch_related("scenario").order_by("id"),
+            use_natural_primary_keys=True,
+        ),
+        "scenarios": _serialize(
+            Scenario.objects.order_by("id"), use_natural_primary_keys=True
+        ),
+        "specialists": _serialize(
+            Specialist.objects.prefetch_related("directions"),
+            use_natural_primary_keys=True,
+        ),
+        "payment_types": [
+            {"id": payment_type.id, "name": payment_type.name}
+            for payment_type in PaymentType.objects.order_by("id")
+        ],
+        "tariff_units": _serialize(TariffUnit.objects.all()),
+        "tariffs": _serialize(
+            Tariff.objects.filter(active=True).prefetch_related("scenarios", "rooms")
+        ),
+        "tariff_weekly_intervals": _serialize(
+            TariffWeeklyInterval.objects.filter(tariff__active=True)
+        ),
+        "client_groups": [
+            {"id": cg.id, "name": cg.name} for cg in ClientGroup.objects.all()
+        ],
+        "specialist_service_to_specialists": _specialist_service_to_specialists(),
+    }
+
+
+def get_bootstrap_json(version: int) -> str:
+    """JSON bootstrap-документа для версии `version` (из кэша или собранный заново)."""
+    key = CACHE_KEY.format(version=version)
+    payload = cache.get(key)
+    if payload is None:
+        payload = json.dumps(
+            build_bootstrap_payload(), cls=DjangoJSONEncoder, ensure_ascii=False
+        )
+        cache.set(key, payload, CACHE_TIMEOUT)
+    return payload
+
+
+def get_bootstrap_version() -> int:
+    return data_versions.get_version(data_versions.BOOTSTRAP)
@@ -0,0 +1,93 @@
+"""Кэш разметки дней календарной сетки.
+
+Разметка дня (`booking/user/_calendar_day.html`) одинакова у всех
+администраторов и при каждой перезагрузке: она зависит только от даты,
+помещения, сетки времени сценария и списка комнат. Поэтому она кэшируется
+по ключу (версия набора `data_versions.CALENDAR_GRID`, сетка времени,
+помещение, дата), и повторный показ месяца собирается из кэша без запроса
+комнат и рендеринга шаблона.
+
+Изменения комнат, помещений и сценариев меняют версию (сигналы
+`booking.signals`) — старые фрагменты просто перестают читаться. Брони в
+разметку дня не входят (их рисует фронтенд поверх сетки), поэтому
+изменения броней фрагменты не сбрасывают.
+
+Подходит любой бэкенд кэша Django, в том числе локальная память и файлы.
+"""
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.template.loader import get_template
+
+from . import data_versions
+
+CACHE_KEY = "booking:calendar-day:{version}:{grid}:{area}:{day}"
+# Фрагмент неизменен для своей версии; срок жизни нужен только для того,
+# чтобы прошедшие дни и старые версии не копились в кэше.
+CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+TEMPLATE = "booking/user/_calendar_day.html"
+# Номер дня в диапазоне (id таблицы) зависит от запроса, а не от дня:
+# в кэше вместо него эта метка, номер подставляется при выдаче.
+_DAY_NUMBER = "__calendar_day_number__"
+
+
+class DayFragments:
+    """Разметка дней сетки для одного набора (помещение, сетка времени, комнаты).
+
+    `rooms` — queryset комнат: он выполняется только при промахе кэша.
+    """
+
+    def __init__(self, request, rooms, time_cells, time_blocks, area_id=None):
+        self.request = request
+        self.rooms = rooms
+        self.time_cells = time_cells
+        self.time_blocks = time_blocks
+        # Версию читаем до комнат: правка комнаты между чтениями не оставит
+        # в кэше старую разметку под новой версией.
+        self.version = data_versions.get_version(data_versions.CALENDAR_GRID)
+        self.grid = hashlib.sha1(
+            json.dumps([time_cells, time_blocks], sort_keys=True).encode()
+        ).hexdigest()
+        self.area = "all" if area_id is None else area_id
+
+    def _key(self, day) -> str:
+        return CACHE_KEY.format(
+            version=self.version,
+            grid=self.grid,
+            area=self.area,
+            day=day["date"].date().isoformat(),
+        )
+
+    def _render(self, day) -> str:
+        return get_template(TEMPLATE).render(
+            {
+                "day": day,
+                "day_number": _DAY_NUMBER,
+                "rooms": self.rooms,
+                "time_cells": self.time_cells,
+                "time_blocks": self.time_blocks,
+            },
+            request=self.request,
+        )
+
+    def render(self, days, first_number: int = 1) -> list[str]:
+        """HTML дней `days`, пронумерованных с `first_number`."""
+        keys = [self._key(day) for day in days]
+        cached = cache.get_many(keys)
+        missing = {}
+        for key, day in zip(keys, days):
+            if key not in cached:
+                missing[key] = cached[key] = self._render(day)
+        if missing:
+            cache.set_many(missing, CACHE_TIMEOUT)
+        return [
+            cached[key].replace(_DAY_NUMBER, str(number))
+            for number, key in enumerate(keys, start=first_number)
+        ]
+
+    def render_grid(self, days) -> str:
+        """HTML всей сетки: дни `days` подряд, с 1."""
+        return "\n".join(self.render(days))
@@ -0,0 +1,259 @@
+"""Поиск клиентов по имени и телефону для выпадающих списков.
+
+Раньше главная страница отдавала всю клиентскую базу, а модальное окно
+фильтровало её в браузере. Теперь список запрашивается по мере ввода и
+возвращает одну страницу лучших совпадений (`search`).
+
+* Телефон ищется по `Client.phone_normalized` — ключу из
+  `booking.phones.phone_key` с индексом. Номер, набранный с кодом страны
+  (375… или 80…), — диапазонный запрос по индексу; остальные цифры —
+  подстрока номера.
+* Имя ищется по полнотекстовому индексу SQLite FTS5 с токенизатором
+  trigram (таблица `clients_fts`): подстрока от трёх символов находится без
+  просмотра таблицы, совпадения упорядочены по релевантности (bm25), затем
+  по имени. Индекс создаёт и заполняет `ensure_index` после каждой миграции,
+  строки обновляют сигналы `booking.signals` в транзакции сохранения
+  клиента. Не триггеры: запись в FTS5 из триггера внутри отложенной
+  транзакции SQLite сразу падает с «database is locked» при параллельных
+  вставках вместо ожидания блокировки.
+* Запрос из одной-двух букв ищет начало имени по индексу (name, id). Слова
+  короче трёх символов в длинном запросе, а также любая СУБД или сборка
+  SQLite без FTS5 trigram обслуживаются через LIKE.
+
+Отдаётся не больше `MAX_RESULTS` совпадений: это подсказки по мере ввода, а
+не выгрузка базы — дальше нужно уточнить запрос.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.db.models import Q
+
+from .models import Client
+
+FTS_TABLE = "clients_fts"
+
+# Столько клиентов на страницу по умолчанию и не больше MAX_LIMIT за запрос.
+DEFAULT_LIMIT = getattr(settings, "CLIENT_SEARCH_LIMIT", 20)
+MAX_LIMIT = getattr(settings, "CLIENT_SEARCH_MAX_LIMIT", 50)
+# Глубже первых MAX_RESULTS совпадений листать нельзя.
+MAX_RESULTS = getattr(settings, "CLIENT_SEARCH_MAX_RESULTS", 200)
+
+# Триграммы: более короткие слова индекс не находит.
+MIN_FTS_TOKEN = 3
+# Запрос или слово из этих символов — номер телефона.
+_PHONE_CHARS = r"[+(]*\d[\d()+\-.]*"
+
+_CREATE_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(name, phone_normalized, tokenize='trigram')"
+)
+
+# Есть ли индекс в базе: {алиас БД: bool}; заполняется при первом поиске.
+_available = {}
+
+
+def ensure_index(using: str = DEFAULT_DB_ALIAS) -> bool:
+    """Создаёт индекс FTS5, если его нет, и заполняет его заново. True — индекс есть.
+
+    Вызывается после каждой миграции: перезаполнение подбирает и клиентов,
+    записанных в обход сигналов (bulk_create, QuerySet.update).
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        _available[using] = False
+        return False
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(_CREATE_TABLE)
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, name, phone_normalized) "
+                f"SELECT id, name, phone_normalized FROM {Client._meta.db_table}"
+            )
+    except DatabaseError:
+        # Сборка SQLite без FTS5/trigram или таблица клиентов ещё без
+        # phone_normalized (миграции применены не до конца).
+        _available[using] = False
+        return False
+    _available[using] = True
+    return True
+
+
+def index_client(client, using: str = DEFAULT_DB_ALIAS) -> None:
+    """Обновляет строку клиента в индексе (сигнал post_save)."""
+    if not fts_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [client.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, name, phone_normalized) "
+            "VALUES (%s, %s, %s)",
+            [client.pk, client.name, client.phone_normalized],
+        )
+
+
+def unindex_client(client_id, using: str = DEFAULT_DB_ALIAS) -> None:
+    """Убирает клиента из индекса (сигнал post_delete)."""
+    if fts_available(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [client_id])
+
+
+def fts_available(using: str = DEFAULT_DB_ALIAS) -> bool:
+    if using not in _available:
+        connection = connections[using]
+        available = False
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                    [FTS_TABLE],
+                )
+                available = cursor.fetchone() is not None
+        _available[using] = available
+    return _available[using]
+
+
+def _phone_prefix(digits: str):
+    """Начало ключа телефона, если номер набран с кодом страны, иначе None."""
+    if digits.startswith("375"):
+        return "+" + digits
+    if digits.startswith("80") and len(digits) > 2:
+        return "+375" + digits[2:]
+    return None
+
+
+def _case_variants(token: str):
+    # LIKE в SQLite не различает регистр только для латиницы: имена на
+    # кириллице ищутся в типичных написаниях.
+    return {token, token.lower(), token.capitalize(), token.upper()}
+
+
+def _fts_phrase(column: str, token: str) -> str:
+    return '%s : "%s"' % (column, token.replace('"', '""'))
+
+
+def _like(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _rows(queryset):
+    return list(queryset.values("id", "name", "phone"))
+
+
+def _search_fts(tokens, count, offset, using):
+    match = []
+    conditions = []
+    params = []
+    for token, is_phone in tokens:
+        column = "phone_normalized" if is_phone else "name"
+        if len(token) >= MIN_FTS_TOKEN:
+            match.append(_fts_phrase(column, token))
+            continue
+        variants = [token] if is_phone else sorted(_case_variants(token))
+        conditions.append(
+            "(%s)"
+            % " OR ".join([f"c.{column} LIKE %s ESCAPE '\\'"] * len(variants))
+        )
+        params += [_like(variant) for variant in variants]
+
+    sql = (
+        f"SELECT c.id, c.name, c.phone FROM {FTS_TABLE} "
+        f"JOIN clients c ON c.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s "
+        f"{''.join(' AND ' + condition for condition in conditions)} "
+        f"ORDER BY {FTS_TABLE}.rank, c.name, c.id LIMIT %s OFFSET %s"
+    )
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [" AND ".join(match), *params, count, offset])
+        return [
+            {"id": pk, "name": name, "phone": phone}
+            for pk, name, phone in cursor.fetchall()
+        ]
+
+
+def _search_like(tokens, count, offset, using):
+    condition = Q()
+    for token, is_phone in tokens:
+        if is_phone:
+            condition &= Q(phone_normalized__contains=token)
+        else:
+            token_condition = Q()
+            for variant in _case_variants(token):
+                token_condition |= Q(name__contains=variant)
+            condition &= token_condition
+    queryset = Client.objects.using(using).filter(condition).order_by("name", "id")
+    return _rows(queryset[offset : offset + count])
+
+
+def _search_name_prefix(token, count, offset, using):
+    # Одна-две буквы — начало имени: диапазон по индексу (name, id), а не
+    # просмотр всей таблицы подстрокой.
+    condition = Q()
+    for variant in _case_variants(token):
+        condition |= Q(name__gte=variant, name__lt=variant + "\uffff")
+    queryset = Client.objects.using(using).filter(condition).order_by("name", "id")
+    return _rows(queryset[offset : offset + count])
+
+
+def search(
+    query: str,
+    limit: int = DEFAULT_LIMIT,
+    offset: int = 0,
+    using: str = DEFAULT_DB_ALIAS,
+):
+    """Страница клиентов, подходящих под `query`: ([{id, name, phone}], has_more).
+
+    Пустой запрос — первые клиенты по имени, одна-две буквы — начало имени.
+    Иначе слова запроса должны совпасть все: буквенные — с подстрокой имени,
+    цифровые — с подстрокой телефона.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    offset = max(0, offset)
+    count = min(limit, MAX_RESULTS - offset)
+    if count <= 0:
+        return [], False
+    # Лишняя строка показывает, есть ли следующая страница.
+    fetch = count + 1
+
+    query = (query or "").strip()
+    if not query:
+        rows = _rows(
+            Client.objects.using(using).order_by("name", "id")[offset : offset + fetch]
+        )
+    elif re.fullmatch(_PHONE_CHARS, query.replace(" ", "")):
+        digits = re.sub(r"\D", "", query)
+        prefix = _phone_prefix(digits)
+        if prefix:
+            # Символ после «9» завершает диапазон всех ключей с этим началом.
+            queryset = Client.objects.using(using).filter(
+                phone_normalized__gte=prefix, phone_normalized__lt=prefix + ":"
+            )
+            rows = _rows(
+                queryset.order_by("phone_normalized", "id")[offset : offset + fetch]
+            )
+        elif fts_available(using):
+            rows = _search_fts([(digits, True)], fetch, offset, using)
+        else:
+            rows = _search_like([(digits, True)], fetch, offset, using)
+    else:
+        tokens = []
+        for token in query.split():
+            if re.fullmatch(_PHONE_CHARS, token):
+                tokens.append((re.sub(r"\D", "", token), True))
+            else:
+                tokens.append((token, False))
+        if len(tokens) == 1 and not tokens[0][1] and len(query) < MIN_FTS_TOKEN:
+            rows = _search_name_prefix(query, fetch, offset, using)
+        elif fts_available(using) and any(
+            len(token) >= MIN_FTS_TOKEN for token, _ in tokens
+        ):
+            rows = _search_fts(tokens, fetch, offset, using)
+        else:
+            rows = _search_like(tokens, fetch, offset, using)
+
+    has_more = len(rows) > count and offset + count < MAX_RESULTS
+    return rows[:count], has_more
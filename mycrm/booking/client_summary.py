@@ -0,0 +1,193 @@
+"""Сводки по клиентам (`ClientSummary`).
+
+Списки клиентов показывают среднюю оценку, число оценок, балансы абонементов
+и группы клиента. Считать их на лету — агрегат по оценкам и выборки
+абонементов и групп на каждого клиента; сводка хранит готовые значения, и
+список любого размера читается одним запросом (`client_rows`).
+
+Сводка пересчитывается из исходных таблиц при изменении оценок, абонементов и
+состава групп клиента (сигналы, `connect_signals`), в той же транзакции, что
+и само изменение. Пересчёт идёт по набору клиентов за фиксированное число
+запросов, поэтому им же выполняется полная пересборка
+(`rebuild_client_summaries`).
+"""
+
+from django.db.models import Avg, Count
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+
+from . import model_state
+from .models import Client, ClientGroup, ClientRating, ClientSummary, Subscription
+
+SUMMARY_FIELDS = ("rating_avg", "rating_count", "balances", "group_ids")
+CLIENT_FIELDS = ("id", "name", "comment", "phone")
+
+
+def build_summaries(client_ids, using: str = "default") -> list[ClientSummary]:
+    """Сводки для клиентов `client_ids`, посчитанные по исходным таблицам."""
+    client_ids = set(client_ids)
+    summaries = {
+        client_id: ClientSummary(client_id=client_id, balances={}, group_ids=[])
+        for client_id in Client.objects.using(using)
+        .filter(id__in=client_ids)
+        .values_list("id", flat=True)
+    }
+    if not summaries:
+        return []
+
+    ratings = (
+        ClientRating.objects.using(using)
+        .filter(client_id__in=summaries)
+        .values("client_id")
+        .annotate(avg=Avg("rating"), count=Count("id"))
+        .order_by()
+    )
+    for row in ratings:
+        summary = summaries[row["client_id"]]
+        summary.rating_avg = row["avg"]
+        summary.rating_count = row["count"]
+
+    subscriptions = (
+        Subscription.objects.using(using)
+        .filter(client_id__in=summaries)
+        .values_list("client_id", "scenario_id", "balance")
+        .order_by("client_id", "scenario_id")
+    )
+    for client_id, scenario_id, balance in subscriptions:
+        summaries[client_id].balances[str(scenario_id)] = balance
+
+    memberships = (
+        Client.groups.through.objects.using(using)
+        .filter(client_id__in=summaries)
+        .values_list("client_id", "clientgroup_id")
+        .order_by("client_id", "clientgroup_id")
+    )
+    for client_id, group_id in memberships:
+        summaries[client_id].group_ids.append(group_id)
+
+    return list(summaries.values())
+
+
+def refresh(client_ids, using: str = "default") -> int:
+    """Пересчитывает сводки клиентов `client_ids`; возвращает их количество."""
+    client_ids = {client_id for client_id in client_ids if client_id is not None}
+    if not client_ids:
+        return 0
+    summaries = build_summaries(client_ids, using=using)
+    ClientSummary.objects.using(using).bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=["client"],
+        update_fields=[*SUMMARY_FIELDS, "updated_at"],
+    )
+    return len(summaries)
+
+
+def rebuild(batch_size: int = 2000, using: str = "default") -> int:
+    """Пересобирает сводки всех клиентов пачками по `batch_size`."""
+    client_ids = list(
+        Client.objects.using(using).order_by("id").values_list("id", flat=True)
+    )
+    total = 0
+    for start in range(0, len(client_ids), batch_size):
+        total += refresh(client_ids[start : start + batch_size], using=using)
+    return total
+
+
+def client_rows(queryset=None):
+    """Клиенты со сводкой в виде словарей для JSON-ответов.
+
+    Один запрос с JOIN на сводку, без создания объектов моделей. Клиент без
+    сводки (она ещё не построена) получает пустые значения.
+    """
+    if queryset is None:
+        queryset = Client.objects.all()
+    rows = queryset.values(
+        *CLIENT_FIELDS, *(f"summary__{field}" for field in SUMMARY_FIELDS)
+    )
+    for row in rows:
+        yield {
+            **{field: row[field] for field in CLIENT_FIELDS},
+            "rating": row["summary__rating_avg"],
+            "rating_count": row["summary__rating_count"] or 0,
+            "balances": row["summary__balances"] or {},
+            "group_ids": row["summary__group_ids"] or [],
+        }
+
+
+def _refresh_on_save(sender, instance, using, **kwargs):
+    # Перенос оценки или абонемента на другого клиента меняет обе сводки.
+    previous = model_state.previous(instance) or {}
+    refresh({previous.get("client_id"), instance.client_id}, using=using)
+
+
+def _refresh_on_delete(sender, instance, using, **kwargs):
+    refresh({instance.client_id}, using=using)
+
+
+def _create_for_client(sender, instance, created, using, raw=False, **kwargs):
+    if created and not raw:
+        refresh({instance.pk}, using=using)
+
+
+def _refresh_on_groups_change(
+    sender, instance, action, reverse, pk_set, using, **kwargs
+):
+    if not reverse:
+        # client.groups.add(...) и т.п.: меняется состав групп одного клиента.
+        if action in ("post_add", "post_remove", "post_clear"):
+            refresh({instance.pk}, using=using)
+        return
+    # group.clients.add(...): меняются сводки перечисленных клиентов.
+    if action == "pre_clear":
+        instance._summary_client_ids = set(
+            instance.clients.using(using).values_list("id", flat=True)
+        )
+    elif action == "post_clear":
+        refresh(getattr(instance, "_summary_client_ids", ()), using=using)
+    elif action in ("post_add", "post_remove"):
+        refresh(pk_set or (), using=using)
+
+
+def _remember_group_clients(sender, instance, using, **kwargs):
+    # Связи с клиентами удаляются вместе с группой без m2m_changed.
+    instance._summary_client_ids = set(
+        instance.clients.using(using).values_list("id", flat=True)
+    )
+
+
+def _refresh_on_group_delete(sender, instance, using, **kwargs):
+    refresh(getattr(instance, "_summary_client_ids", ()), using=using)
+
+
+def connect_signals() -> None:
+    """Подключает пересчёт сводок к сигналам моделей (из `booking.signals`)."""
+    for model in (ClientRating, Subscription):
+        model_state.track(model, "client_id")
+        post_save.connect(
+            _refresh_on_save,
+            sender=model,
+            dispatch_uid=f"client_summary_save_{model.__name__}",
+        )
+        post_delete.connect(
+            _refresh_on_delete,
+            sender=model,
+            dispatch_uid=f"client_summary_delete_{model.__name__}",
+        )
+    post_save.connect(
+        _create_for_client, sender=Client, dispatch_uid="client_summary_client"
+    )
+    m2m_changed.connect(
+        _refresh_on_groups_change,
+        sender=Client.groups.through,
+        dispatch_uid="client_summary_groups",
+    )
+    pre_delete.connect(
+        _remember_group_clients,
+        sender=ClientGroup,
+        dispatch_uid="client_summary_group_pre_delete",
+    )
+    post_delete.connect(
+        _refresh_on_group_delete,
+        sender=ClientGroup,
+        dispatch_uid="client_summary_group_delete",
+    )
@@ -0,0 +1,102 @@
+"""Сжатие ответов с выбором кодировки по Accept-Encoding.
+
+Brotli используется, если установлен пакет `brotli` и клиент его принимает,
+иначе — gzip. Сжимаются только тела заметного размера и только если результат
+действительно меньше исходного. Потоковые ответы сжимаются по частям: после
+каждой части сжатый поток сбрасывается (Z_SYNC_FLUSH у gzip, flush у brotli),
+так что клиент может распаковать её сразу, не дожидаясь следующих.
+"""
+
+import re
+import zlib
+from functools import wraps
+
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # brotli — необязательная зависимость
+    brotli = None
+
+MIN_COMPRESS_LENGTH = 200
+
+_accepts_br = re.compile(r"\bbr\b(?!\s*;\s*q=0(?:\.0*)?\b)")
+_accepts_gzip = re.compile(r"\bgzip\b(?!\s*;\s*q=0(?:\.0*)?\b)")
+
+
+def _negotiate(accept_encoding: str) -> str | None:
+    if brotli is not None and _accepts_br.search(accept_encoding):
+        return "br"
+    if _accepts_gzip.search(accept_encoding):
+        return "gzip"
+    return None
+
+
+def _compress_stream(chunks, encoding: str):
+    if encoding == "gzip":
+        # wbits=31 — формат gzip (заголовок и CRC), а не «сырой» zlib.
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+        return
+    compressor = brotli.Compressor(quality=5)
+    for chunk in chunks:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def _compress_streaming_response(response, request):
+    patch_vary_headers(response, ("Accept-Encoding",))
+    encoding = _negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    if encoding is None:
+        return response
+    response.streaming_content = _compress_stream(response.streaming_content, encoding)
+    if response.has_header("Content-Length"):
+        del response.headers["Content-Length"]
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def compress_response(response, request):
+    """Сжимает тело ответа в кодировке, которую принимает клиент."""
+    if response.has_header("Content-Encoding"):
+        return response
+    if response.streaming:
+        return _compress_streaming_response(response, request)
+    if len(response.content) < MIN_COMPRESS_LENGTH:
+        return response
+
+    patch_vary_headers(response, ("Accept-Encoding",))
+    encoding = _negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(response.content, quality=5)
+    else:
+        compressed = compress_string(response.content)
+    if len(compressed) >= len(response.content):
+        return response
+
+    response.content = compressed
+    response.headers["Content-Length"] = str(len(compressed))
+    response.headers["Content-Encoding"] = encoding
+    # Сжатое тело отличается побайтно, поэтому сильный ETag становится слабым.
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response.headers["ETag"] = "W/" + etag
+    return response
+
+
+def compressed(view_func):
+    """Декоратор представления: сжимает ответ через `compress_response`."""
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        return compress_response(view_func(request, *args, **kwargs), request)
+
+    return wrapper
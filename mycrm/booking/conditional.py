@@ -0,0 +1,310 @@
+"""Условные GET-ответы (ETag / Last-Modified) без построения тела.
+
+Валидаторы ответа считаются по таблицам, из которых он собирается, и не
+зависят от числа строк: счётчики всех таблиц ответа читаются одним запросом,
+плюс по запросу на таблицу с `updated_at`:
+
+* модели с полем `updated_at` (брони, платежи, клиенты, абонементы — часто
+  изменяемые таблицы) — максимум `updated_at` (по индексу). Сохранение строки
+  не пишет ничего, кроме самой строки; массовые UPDATE, которые ставят
+  `updated_at` сами (например, суммы платежей в `booking.payment_totals`), и
+  `bulk_create` тоже учитываются. Удаление строки максимум не сдвигает —
+  его учитывает счётчик `table:<db_table>` в `booking.data_versions`,
+  который увеличивается только при удалении (post_delete). Изменение связей
+  many-to-many обновляет `updated_at` строк-владельцев (`touch_m2m_owners`);
+* справочники без `updated_at` (меняются редко) — счётчик
+  `table:<db_table>`, который сигналы (`connect_signals`) увеличивают при
+  сохранении и удалении строк и изменении связей. `bulk_create` сигналов не
+  отправляет: код, вставляющий так строки справочника, вызывает `bump_table`.
+
+Ответ об одной строке (`pk` у `validators`, retrieve в API) у модели с
+`updated_at` ключуется `updated_at` самой строки, а не всей таблицы.
+
+ETag — хэш валидаторов и полного пути запроса (тело зависит от параметров).
+Last-Modified — время последнего изменения счётчиков справочников; у ответов
+с таблицами по `updated_at` его нет: транзакции фиксируются не в порядке
+`updated_at`, и проверка по If-Modified-Since с точностью до секунды
+пропустила бы изменение, записанное с более ранним временем.
+
+Если запрос совпал с валидаторами, сразу отдаётся 304, и тело (выборка и
+сериализация) не строится. Таблицы моделей не из `TRACKED_MODELS` не
+отслеживаются — такие ответы отдаются без валидаторов.
+"""
+
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import Max
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import data_versions
+from .models import (
+    Area,
+    CancellationPolicy,
+    CancellationReason,
+    Client,
+    ClientGroup,
+    ClientRating,
+    DataVersion,
+    Payment,
+    PaymentType,
+    Reservation,
+    ReservationStatusType,
+    Room,
+    Scenario,
+    Service,
+    ServiceGroup,
+    Specialist,
+    SpecialistColor,
+    Subscription,
+    Tariff,
+    TariffUnit,
+    TariffWeeklyInterval,
+)
+
+# Модели, ответы по которым отдаются с ETag/Last-Modified: всё, что отдаёт API,
+# и справочники функций-представлений.
+TRACKED_MODELS = (
+    Area,
+    CancellationPolicy,
+    CancellationReason,
+    Client,
+    ClientGroup,
+    ClientRating,
+    Payment,
+    PaymentType,
+    Reservation,
+    ReservationStatusType,
+    Room,
+    Scenario,
+    Service,
+    ServiceGroup,
+    Specialist,
+    SpecialistColor,
+    Subscription,
+    Tariff,
+    TariffUnit,
+    TariffWeeklyInterval,
+)
+
+
+def has_updated_at(model) -> bool:
+    """Валидаторы таблицы считаются по `updated_at`, без счётчика версии."""
+    return any(field.name == "updated_at" for field in model._meta.concrete_fields)
+
+
+def table_version_name(model) -> str:
+    return f"table:{model._meta.db_table}"
+
+
+def bump_table(model) -> None:
+    data_versions.bump_version(table_version_name(model))
+
+
+def touch_m2m_owners(owner, field, instance, action, reverse, pk_set, using):
+    """Обновляет `updated_at` строк `owner`, у которых изменилась связь `field`.
+
+    Вызывается сигналом m2m_changed таблицы связи; при очистке связи со
+    стороны второй модели строки-владельцы запоминаются на pre_clear.
+    """
+    through = field.remote_field.through
+    if reverse and action == "pre_clear":
+        instance._m2m_owner_ids = set(
+            through.objects.using(using)
+            .filter(**{field.m2m_reverse_field_name(): instance.pk})
+            .values_list(field.m2m_field_name(), flat=True)
+        )
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        ids = {instance.pk}
+    elif action == "post_clear":
+        ids = getattr(instance, "_m2m_owner_ids", set())
+    else:
+        ids = pk_set or set()
+    if ids:
+        owner._default_manager.using(using).filter(pk__in=ids).update(
+            updated_at=timezone.now()
+        )
+
+
+class Validators:
+    """ETag и Last-Modified ответа."""
+
+    def __init__(self, etag: str, last_modified):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def not_modified(self, request):
+        """Ответ 304/412, если клиент прислал совпадающие валидаторы, иначе None."""
+        # Last-Modified точен до секунды: изменение в ту же секунду, что и
+        # ответ, по If-Modified-Since не отличить — проверяется только ETag.
+        last_modified = self.last_modified
+        if last_modified and timezone.now() - last_modified < timedelta(seconds=1):
+            last_modified = None
+        response = get_conditional_response(
+            request,
+            etag=self.etag,
+            last_modified=last_modified and int(last_modified.timestamp()),
+        )
+        return response and self.apply(response)
+
+    def apply(self, response):
+        if response.status_code in (200, 304):
+            response["ETag"] = self.etag
+            if self.last_modified:
+                response["Last-Modified"] = http_date(self.last_modified.timestamp())
+            # Клиент хранит ответ, но перепроверяет его при каждом обращении.
+            response.setdefault("Cache-Control", "private, no-cache")
+        return response
+
+
+def validators(models, request, pk=None) -> Validators | None:
+    """Валидаторы ответа, собранного из таблиц `models`, или None.
+
+    `pk` — ответ об одной строке первой модели: у модели с `updated_at` вместо
+    таблицы берётся `updated_at` этой строки; нет строки — None (ответ 404
+    строится как обычно).
+    """
+    models = list(dict.fromkeys(models))
+    if not models or any(model not in TRACKED_MODELS for model in models):
+        return None
+
+    parts = [request.get_full_path()]
+    row = models[0] if pk is not None and has_updated_at(models[0]) else None
+    if row is not None:
+        try:
+            updated_at = (
+                row._default_manager.filter(pk=pk)
+                .values_list("updated_at", flat=True)
+                .first()
+            )
+        except (TypeError, ValueError, ValidationError):
+            # Некорректный ключ: 404 отдаст само представление.
+            return None
+        if updated_at is None:
+            return None
+        parts.append(f"{row._meta.db_table}[{pk}]={updated_at.isoformat()}")
+        models = models[1:]
+
+    names = {model: table_version_name(model) for model in models}
+    versions = {}
+    if names:
+        versions = {
+            name: (version, updated_at)
+            for name, version, updated_at in DataVersion.objects.filter(
+                name__in=names.values()
+            ).values_list("name", "version", "updated_at")
+        }
+    for model in models:
+        name = names[model]
+        version = versions.get(name, (0, None))[0]
+        if not has_updated_at(model):
+            parts.append(f"{name}={version}")
+            continue
+        latest = model._default_manager.aggregate(latest=Max("updated_at"))["latest"]
+        latest = latest.isoformat() if latest else "-"
+        parts.append(f"{name}={latest}:{version}")
+
+    digest = hashlib.sha1("|".join(parts).encode()).hexdigest()[:32]
+    last_modified = None
+    if row is None and not any(has_updated_at(model) for model in models):
+        changed = [updated_at for _, updated_at in versions.values() if updated_at]
+        last_modified = max(changed) if changed else None
+    return Validators(f'"{digest}"', last_modified)
+
+
+def conditional_response(request, models, build, pk=None):
+    """Ответ `build()` с валидаторами; 304 — без вызова `build`."""
+    if request.method not in ("GET", "HEAD"):
+        return build()
+    state = validators(models, request, pk)
+    if state is None:
+        return build()
+    return state.not_modified(request) or state.apply(build())
+
+
+def conditional_view(*models):
+    """Декоратор функции-представления: условный GET по таблицам `models`."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return conditional_response(
+                request, models, lambda: view(request, *args, **kwargs)
+            )
+
+        return wrapper
+
+    return decorator
+
+
+# Таблица связи many-to-many -> модель, в сериализаторе которой видна связь:
+# у справочников — для счётчика версии, у моделей с updated_at — (модель, поле)
+# для обновления updated_at владельцев.
+_M2M_OWNERS = {}
+_M2M_TOUCHED = {}
+
+
+def _bump_deleted(sender, **kwargs):
+    bump_table(sender)
+
+
+def _bump_table(sender, **kwargs):
+    bump_table(_M2M_OWNERS.get(sender, sender))
+
+
+def _bump_table_m2m(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_table(_M2M_OWNERS[sender])
+
+
+def _touch_owners(sender, instance, action, reverse, pk_set, using, **kwargs):
+    owner, field = _M2M_TOUCHED[sender]
+    touch_m2m_owners(owner, field, instance, action, reverse, pk_set, using)
+
+
+def connect_signals() -> None:
+    """Подключает счётчики таблиц и updated_at связей (из `booking.signals`)."""
+    counted = [model for model in TRACKED_MODELS if not has_updated_at(model)]
+    for model in TRACKED_MODELS:
+        if has_updated_at(model):
+            post_delete.connect(
+                _bump_deleted,
+                sender=model,
+                dispatch_uid=f"conditional_deleted_{model.__name__}",
+            )
+    for model in TRACKED_MODELS:
+        for field in model._meta.local_many_to_many:
+            through = field.remote_field.through
+            if has_updated_at(model):
+                _M2M_TOUCHED[through] = (model, field)
+            else:
+                _M2M_OWNERS[through] = model
+
+    for sender in (*counted, *_M2M_OWNERS):
+        # Для связей post_delete — при каскадном удалении второй стороны.
+        for signal in (post_save, post_delete):
+            signal.connect(
+                _bump_table,
+                sender=sender,
+                dispatch_uid=f"conditional_{signal is post_save}_{sender.__name__}",
+            )
+    for through in _M2M_OWNERS:
+        m2m_changed.connect(
+            _bump_table_m2m,
+            sender=through,
+            dispatch_uid=f"conditional_m2m_{through.__name__}",
+        )
+    for through in _M2M_TOUCHED:
+        m2m_changed.connect(
+            _touch_owners,
+            sender=through,
+            dispatch_uid=f"conditional_touch_{through.__name__}",
+        )
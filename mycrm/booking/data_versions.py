@@ -0,0 +1,52 @@
+"""Версии наборов данных для инвалидации кэшей.
+
+Каждый набор данных (например, справочники для bootstrap-документа главной
+страницы) имеет счётчик в таблице `DataVersion`. Сигналы увеличивают счётчик
+при изменении данных набора, а кэши и HTTP-ответы ключуются его значением:
+новая версия — новый ключ, устаревшие записи просто перестают запрашиваться.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataVersion
+
+# Справочники главной страницы: комнаты, сценарии, специалисты, тарифы и т.д.
+# (booking.bootstrap; клиентов в документе нет).
+BOOTSTRAP = "bootstrap"
+# Тарифы, их сценарии, комнаты и недельные интервалы (booking.tariff_index).
+TARIFFS = "tariffs"
+# Разметка дней календарной сетки: комнаты, помещения и сценарии
+# (booking.calendar_fragments).
+CALENDAR_GRID = "calendar_grid"
+# Справочники в памяти процесса: статусы, типы оплаты, комнаты и т.д.
+# (booking.reference_data).
+REFERENCE = "reference"
+
+
+def get_version(name: str) -> int:
+    """Текущая версия набора данных (0, если набор ещё не менялся)."""
+    return (
+        DataVersion.objects.filter(name=name)
+        .values_list("version", flat=True)
+        .first()
+        or 0
+    )
+
+
+def bump_version(name: str) -> None:
+    """Увеличивает версию набора данных.
+
+    Вызывается в той же транзакции, что и изменение данных: новая версия
+    становится видна другим запросам только вместе с самими изменениями.
+    """
+    versions = DataVersion.objects.filter(name=name)
+    if versions.update(version=F("version") + 1, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(name=name, version=1)
+    except IntegrityError:
+        # Параллельный запрос успел создать счётчик раньше.
+        versions.update(version=F("version") + 1, updated_at=timezone.now())
@@ -0,0 +1,185 @@
+"""Выдача идентификаторов для моделей с ручным целочисленным первичным ключом.
+
+Большинство моделей приложения хранят `id = IntegerField(primary_key=True)`:
+идентификаторы согласованы с внешней системой и не генерируются БД. Раньше новый
+ID считался как `Max("id") + 1`, что стоило агрегатного запроса на каждую вставку
+и приводило к дублям при параллельных запросах.
+
+Аллокатор хранит счётчик на таблицу (`IdSequence`) и резервирует идентификаторы
+блоками: один атомарный `UPDATE ... SET last_value = last_value + N` выдаёт процессу
+сразу N идентификаторов, которые затем раздаются без обращения к БД.
+
+Блок резервируется в собственной короткой транзакции, а не в транзакции
+вызывающего кода: иначе блокировка строки счётчика держалась бы до её фиксации
+и выстраивала бы всех пишущих в очередь. Если вызывающий код уже в транзакции,
+резервирование выполняется в отдельном потоке — со своим соединением с БД
+(`_reserve_committed`). Исключение — SQLite: он и так пропускает только одного
+пишущего, а второе соединение ждало бы блокировки, которую держит первое.
+
+Если строка с выданным ID уже существует (например, запись создана через API
+с явным ID), `create_with_allocated_id` подтягивает счётчик к фактическому
+максимуму и повторяет вставку.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F, Max
+
+from .models import IdSequence
+
+DEFAULT_BLOCK_SIZE = 20
+MAX_CREATE_ATTEMPTS = 5
+
+_lock = threading.Lock()
+# (alias БД, имя таблицы) -> [следующий свободный ID, последний ID блока]
+_pools: dict[tuple[str, str], list[int]] = {}
+# Поток резервирования блоков вне транзакции вызывающего кода.
+_reserver: ThreadPoolExecutor | None = None
+
+
+def _block_size() -> int:
+    return max(1, int(getattr(settings, "ID_ALLOCATOR_BLOCK_SIZE", DEFAULT_BLOCK_SIZE)))
+
+
+def _sequence_name(model) -> str:
+    return model._meta.db_table
+
+
+def _current_max_id(model, using: str) -> int:
+    return model._base_manager.using(using).aggregate(max_id=Max("pk"))["max_id"] or 0
+
+
+def _reserve(model, count: int, using: str) -> int:
+    """Резервирует `count` идентификаторов в счётчике и возвращает последний из них."""
+    name = _sequence_name(model)
+    with transaction.atomic(using=using):
+        sequences = IdSequence.objects.using(using).filter(name=name)
+        if not sequences.update(last_value=F("last_value") + count):
+            # Счётчика ещё нет (новая таблица) — заводим его от текущего максимума.
+            try:
+                with transaction.atomic(using=using):
+                    IdSequence.objects.using(using).create(
+                        name=name,
+                        last_value=_current_max_id(model, using) + count,
+                    )
+            except IntegrityError:
+                # Параллельный процесс успел создать счётчик раньше.
+                sequences.update(last_value=F("last_value") + count)
+        return sequences.values_list("last_value", flat=True).get()
+
+
+def _reserve_committed(model, count: int, using: str) -> int:
+    """`_reserve` в потоке аллокатора: транзакция фиксируется сразу."""
+    global _reserver
+
+    def reserve():
+        connections[using].close_if_unusable_or_obsolete()
+        return _reserve(model, count, using)
+
+    with _lock:
+        if _reserver is None:
+            _reserver = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="id-allocator"
+            )
+    return _reserver.submit(reserve).result()
+
+
+def _reserves_apart(connection) -> bool:
+    """Резервировать ли блок вне открытой транзакции соединения."""
+    return connection.in_atomic_block and connection.vendor != "sqlite"
+
+
+def allocate_ids(model, count: int, using: str | None = None) -> list[int]:
+    """Возвращает `count` новых уникальных идентификаторов для модели.
+
+    Идентификаторы берутся из локального блока процесса; при его исчерпании
+    резервируется новый блок размером не меньше `ID_ALLOCATOR_BLOCK_SIZE`.
+
+    Если блок приходится резервировать в транзакции вызывающего кода (SQLite),
+    он не берётся впрок: при её откате счётчик вернётся назад, а выданные
+    идентификаторы могли бы достаться другому процессу. Блок, зафиксированный
+    отдельно, откат не затрагивает — идентификаторы только пропадают.
+    """
+    if count <= 0:
+        return []
+    using = using or router.db_for_write(model)
+    key = (using, _sequence_name(model))
+
+    with _lock:
+        pool = _pools.get(key)
+        if pool and pool[1] - pool[0] + 1 >= count:
+            start = pool[0]
+            pool[0] += count
+            return list(range(start, start + count))
+
+    connection = connections[using]
+    if _reserves_apart(connection):
+        reserve = max(count, _block_size())
+        last = _reserve_committed(model, reserve, using)
+    else:
+        in_transaction = connection.in_atomic_block
+        reserve = count if in_transaction else max(count, _block_size())
+        last = _reserve(model, reserve, using)
+    first = last - reserve + 1
+
+    if reserve > count:
+        with _lock:
+            _pools[key] = [first + count, last]
+    return list(range(first, first + count))
+
+
+def allocate_id(model, using: str | None = None) -> int:
+    """Возвращает один новый уникальный идентификатор для модели."""
+    return allocate_ids(model, 1, using=using)[0]
+
+
+def sync_sequence(model, using: str | None = None) -> int:
+    """Подтягивает счётчик к фактическому максимуму ID в таблице.
+
+    Сбрасывает локальный блок процесса для модели и возвращает новое значение
+    счётчика.
+    """
+    using = using or router.db_for_write(model)
+    name = _sequence_name(model)
+    with _lock:
+        _pools.pop((using, name), None)
+    with transaction.atomic(using=using):
+        max_id = _current_max_id(model, using)
+        sequence, created = IdSequence.objects.using(using).get_or_create(
+            name=name, defaults={"last_value": max_id}
+        )
+        if not created and sequence.last_value < max_id:
+            IdSequence.objects.using(using).filter(
+                name=name, last_value__lt=max_id
+            ).update(last_value=max_id)
+            sequence.last_value = max_id
+    return sequence.last_value
+
+
+def reset_pools() -> None:
+    """Сбрасывает локальные блоки идентификаторов процесса (для тестов)."""
+    with _lock:
+        _pools.clear()
+
+
+def create_with_allocated_id(model, using: str | None = None, **fields):
+    """Создаёт объект модели с новым идентификатором из аллокатора.
+
+    При конфликте первичного ключа счётчик синхронизируется с таблицей, и вставка
+    повторяется с новым ID. Прочие ошибки целостности пробрасываются как есть.
+    """
+    using = using or router.db_for_write(model)
+    for attempt in range(MAX_CREATE_ATTEMPTS):
+        new_id = allocate_id(model, using=using)
+        try:
+            with transaction.atomic(using=using):
+                return model._default_manager.using(using).create(pk=new_id, **fields)
+        except IntegrityError:
+            if not model._base_manager.using(using).filter(pk=new_id).exists():
+                raise
+            if attempt == MAX_CREATE_ATTEMPTS - 1:
+                raise
+            sync_sequence(model, using=using)
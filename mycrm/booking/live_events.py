@@ -0,0 +1,403 @@
+"""Публикация событий броней для живого обновления календаря.
+
+Сигналы `Reservation` и `Payment` (`connect_signals`; новые брони — по
+`reservations_created`, в том числе после массовой вставки) после фиксации
+транзакции публикуют короткие события через брокер. Клиенты календаря получают
+их по SSE (`live_events_stream`) или опросом (`live_events_poll`) и в ответ
+запрашивают дельту сетки (`get_bookings_grid?since=...`).
+
+Брокер выбирается настройкой `LIVE_EVENTS_BROKER` (путь к классу):
+
+* `booking.live_events.DatabaseBroker` (по умолчанию) — таблица `live_events`;
+  события видны всем процессам, ожидание реализовано опросом таблицы;
+* `booking.live_events.InMemoryBroker` — кольцевой буфер в памяти процесса;
+  события публикуются и доходят только в пределах одного процесса, поэтому он
+  годится для разработки в один процесс и для тестов, но не для нескольких
+  рабочих процессов WSGI.
+
+`Broker.shared` — видны ли события всем процессам. Страница календаря
+заменяет опрос сетки раз в 5 секунд редкой синхронизацией только при общем
+брокере: с брокером в памяти события из других процессов до неё не дойдут.
+
+Событие — словарь с полями `id` (возрастающий номер), `type`
+(`reservation.created`, `reservation.updated`, `reservation.cancelled`,
+`reservation.deleted`, `payment`), `reservation_id`, `areas` (помещения до и после
+изменения) и `date_from`/`date_to` (локальные даты, покрывающие прежнее и новое
+время брони).
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import model_state
+from .models import LiveEvent, Payment, Reservation, Room
+from .reservation_signals import reservations_created
+
+DEFAULT_BROKER = "booking.live_events.DatabaseBroker"
+DEFAULT_BUFFER_SIZE = 1000
+DEFAULT_POLL_INTERVAL = 1.0
+# Сколько хранятся события в DatabaseBroker.
+DEFAULT_RETENTION_SECONDS = 60 * 60
+# Как часто процесс удаляет устаревшие события DatabaseBroker при публикации.
+DEFAULT_PRUNE_SECONDS = 60
+# Сколько DatabaseBroker ждёт, пока пропуск в номерах заполнится событием,
+# записанным раньше, но зафиксированным позже.
+DEFAULT_LOOKBACK_SECONDS = 2
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Broker:
+    """Интерфейс брокера событий.
+
+    `events_after` возвращает события с номером больше `last_id` и признак
+    `reset`: часть событий после `last_id` уже недоступна (вытеснены из буфера
+    или брокер перезапущен), и клиенту нужна полная перезагрузка сетки.
+    Ожидание SSE-потока по умолчанию реализовано опросом с интервалом
+    `poll_interval`.
+    """
+
+    poll_interval = DEFAULT_POLL_INTERVAL
+    shared = False
+
+    def publish(self, event: dict) -> int:
+        raise NotImplementedError
+
+    def events_after(self, last_id: int) -> tuple[list[dict], bool]:
+        raise NotImplementedError
+
+    def last_id(self) -> int:
+        raise NotImplementedError
+
+    async def wait_async(self, last_id: int, timeout: float) -> tuple[list[dict], bool]:
+        deadline = time.monotonic() + timeout
+        while True:
+            events, reset = await asyncio.to_thread(self.events_after, last_id)
+            remaining = deadline - time.monotonic()
+            if events or reset or remaining <= 0:
+                return events, reset
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+
+class InMemoryBroker(Broker):
+    """Брокер в памяти процесса: кольцевой буфер последних событий.
+
+    Ожидающие корутины будятся сразу при публикации, без опроса.
+    """
+
+    def __init__(self, buffer_size: int | None = None):
+        self._events = deque(
+            maxlen=buffer_size
+            or getattr(settings, "LIVE_EVENTS_BUFFER_SIZE", DEFAULT_BUFFER_SIZE)
+        )
+        self._last_id = 0
+        self._lock = threading.Lock()
+        # Ожидающие корутины: (event loop, asyncio.Event).
+        self._async_waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def publish(self, event: dict) -> int:
+        with self._lock:
+            self._last_id += 1
+            event = {**event, "id": self._last_id}
+            self._events.append(event)
+            waiters = list(self._async_waiters)
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+        return event["id"]
+
+    def events_after(self, last_id: int) -> tuple[list[dict], bool]:
+        with self._lock:
+            return self._events_after(last_id)
+
+    def _events_after(self, last_id: int) -> tuple[list[dict], bool]:
+        if last_id > self._last_id:
+            # Номер из прошлой жизни процесса.
+            return [], True
+        oldest = self._events[0]["id"] if self._events else self._last_id + 1
+        if last_id < oldest - 1:
+            return [e for e in self._events if e["id"] > last_id], True
+        return [e for e in self._events if e["id"] > last_id], False
+
+    def last_id(self) -> int:
+        with self._lock:
+            return self._last_id
+
+    async def wait_async(self, last_id: int, timeout: float) -> tuple[list[dict], bool]:
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            events, reset = self._events_after(last_id)
+            if events or reset:
+                return events, reset
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._async_waiters.discard(waiter)
+        return self.events_after(last_id)
+
+
+class DatabaseBroker(Broker):
+    """Брокер на таблице `live_events`: события общие для всех процессов.
+
+    Номера событий выдаются при вставке, а фиксируются вставки не по порядку
+    номеров; откаченная вставка оставляет пропуск навсегда. Поэтому пропуск
+    сам по себе не означает потерю событий:
+
+    * события удалены по сроку хранения (`reset`), только если в таблице не
+      осталось ни одного события с номером не больше `last_id` — старейшее
+      хранимое событие новее курсора клиента;
+    * событие за пропуском, записанное меньше `lookback` секунд назад, пока не
+      отдаётся: пропущенный номер ещё может зафиксироваться, и курсор клиента
+      не должен уйти дальше него. Более старые пропуски считаются откатами.
+
+    Устаревшие события удаляются при публикации не чаще раза в
+    LIVE_EVENTS_PRUNE_SECONDS секунд на процесс (`prune`); последнее событие
+    не удаляется никогда — по нему определяется старейший хранимый номер.
+    """
+
+    shared = True
+
+    def __init__(self):
+        self.poll_interval = getattr(
+            settings, "LIVE_EVENTS_POLL_INTERVAL", DEFAULT_POLL_INTERVAL
+        )
+        self._pruned_at = None
+
+    def _retention(self) -> timedelta:
+        return timedelta(
+            seconds=getattr(
+                settings, "LIVE_EVENTS_RETENTION_SECONDS", DEFAULT_RETENTION_SECONDS
+            )
+        )
+
+    def _lookback(self) -> timedelta:
+        return timedelta(
+            seconds=getattr(
+                settings, "LIVE_EVENTS_LOOKBACK_SECONDS", DEFAULT_LOOKBACK_SECONDS
+            )
+        )
+
+    def publish(self, event: dict) -> int:
+        record = LiveEvent.objects.create(created_at=timezone.now(), payload=event)
+        interval = getattr(settings, "LIVE_EVENTS_PRUNE_SECONDS", DEFAULT_PRUNE_SECONDS)
+        now = time.monotonic()
+        if self._pruned_at is None or now - self._pruned_at >= interval:
+            self._pruned_at = now
+            self.prune(record.id)
+        return record.id
+
+    def prune(self, newest_id: int | None = None) -> int:
+        """Удаляет события старше срока хранения, кроме последнего."""
+        if newest_id is None:
+            newest_id = self.last_id()
+        deleted, _ = LiveEvent.objects.filter(
+            created_at__lt=timezone.now() - self._retention(), id__lt=newest_id
+        ).delete()
+        return deleted
+
+    def events_after(self, last_id: int) -> tuple[list[dict], bool]:
+        records = list(
+            LiveEvent.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "created_at", "payload")
+        )
+        reset = bool(
+            last_id
+            and records
+            and records[0][0] > last_id + 1
+            and not LiveEvent.objects.filter(id__lte=last_id).exists()
+        )
+        settled = timezone.now() - self._lookback()
+        expected = records[0][0] if reset or not last_id else last_id + 1
+        events = []
+        for event_id, created_at, payload in records:
+            if event_id != expected and created_at > settled:
+                break
+            events.append({**payload, "id": event_id})
+            expected = event_id + 1
+        return events, reset
+
+    def last_id(self) -> int:
+        return (
+            LiveEvent.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        )
+
+
+def get_broker() -> Broker:
+    """Брокер процесса (создаётся при первом обращении)."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, "LIVE_EVENTS_BROKER", DEFAULT_BROKER)
+                _broker = import_string(path)()
+    return _broker
+
+
+def reset_broker() -> None:
+    """Сбрасывает брокер процесса (для тестов и смены настроек)."""
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def reservation_events(
+    changes: list[tuple[str, int, list[tuple[int | None, object, object]]]],
+) -> list[dict]:
+    """События по изменениям броней.
+
+    `changes` — список (тип события, ID брони, положения), где положения — список
+    (room_id, datetimestart, datetimeend) до и после изменения; пустые значения
+    пропускаются. Помещения комнат загружаются одним запросом.
+    """
+    room_ids = {
+        room_id for _, _, positions in changes for room_id, _, _ in positions if room_id
+    }
+    area_by_room = dict(Room.objects.filter(id__in=room_ids).values_list("id", "area_id"))
+    events = []
+    for event_type, reservation_id, positions in changes:
+        dates = [
+            timezone.localdate(value)
+            for _, start, end in positions
+            for value in (start, end)
+            if value
+        ]
+        areas = {area_by_room.get(room_id) for room_id, _, _ in positions}
+        events.append(
+            {
+                "type": event_type,
+                "reservation_id": reservation_id,
+                "areas": sorted(areas - {None}),
+                "date_from": min(dates).isoformat() if dates else None,
+                "date_to": max(dates).isoformat() if dates else None,
+            }
+        )
+    return events
+
+
+def publish_on_commit(changes, using: str | None = None) -> None:
+    """Публикует события изменений броней после фиксации текущей транзакции.
+
+    Ошибка брокера не должна ломать сохранение брони, поэтому колбэк
+    регистрируется как robust: исключение только пишется в лог.
+    """
+
+    def publish():
+        broker = get_broker()
+        for event in reservation_events(changes):
+            broker.publish(event)
+
+    transaction.on_commit(publish, using=using, robust=True)
+
+
+def event_matches(
+    event: dict,
+    area_id: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> bool:
+    """Относится ли событие к сетке с фильтром по помещению и диапазону дат."""
+    if area_id is not None and event["areas"] and area_id not in event["areas"]:
+        return False
+    if event["date_from"] is None:
+        return True
+    if date_to is not None and date.fromisoformat(event["date_from"]) > date_to:
+        return False
+    if date_from is not None and date.fromisoformat(event["date_to"]) < date_from:
+        return False
+    return True
+
+
+# Статусы, при которых бронь не показывается в сетке.
+INACTIVE_STATUS_IDS = (4, 1082)
+# Поля положения брони в сетке.
+POSITION_FIELDS = ("room_id", "datetimestart", "datetimeend")
+
+
+def _position(values: dict) -> tuple:
+    return tuple(values.get(field) for field in POSITION_FIELDS)
+
+
+def _publish_reservation_save(sender, instance, created, using, **kwargs):
+    if created:
+        # Новые брони — через reservations_created.
+        return
+    current = _position(model_state.current(instance))
+    if instance.status_id in INACTIVE_STATUS_IDS:
+        event_type = "reservation.cancelled"
+    else:
+        event_type = "reservation.updated"
+    previous = model_state.previous(instance)
+    previous = _position(previous) if previous else current
+    publish_on_commit([(event_type, instance.pk, [previous, current])], using=using)
+
+
+def _publish_reservations_created(sender, reservations, using, **kwargs):
+    publish_on_commit(
+        [
+            (
+                "reservation.created",
+                reservation.pk,
+                [_position(model_state.current(reservation))],
+            )
+            for reservation in reservations
+        ],
+        using=using,
+    )
+
+
+def _publish_reservation_delete(sender, instance, using, **kwargs):
+    position = _position(model_state.current(instance))
+    publish_on_commit([("reservation.deleted", instance.pk, [position])], using=using)
+
+
+def _publish_payment(sender, instance, using, **kwargs):
+    reservation = (
+        Reservation.objects.using(using)
+        .filter(pk=instance.reservation_id)
+        .values_list("room_id", "datetimestart", "datetimeend")
+        .first()
+    )
+    publish_on_commit(
+        [("payment", instance.reservation_id, [reservation] if reservation else [])],
+        using=using,
+    )
+
+
+def connect_signals() -> None:
+    """Подключает публикацию событий к сигналам моделей (из `booking.signals`)."""
+    model_state.track(Reservation, *POSITION_FIELDS)
+    post_save.connect(
+        _publish_reservation_save,
+        sender=Reservation,
+        dispatch_uid="live_events_reservation_save",
+    )
+    post_delete.connect(
+        _publish_reservation_delete,
+        sender=Reservation,
+        dispatch_uid="live_events_reservation_delete",
+    )
+    reservations_created.connect(
+        _publish_reservations_created,
+        sender=Reservation,
+        dispatch_uid="live_events_reservations_created",
+    )
+    for signal in (post_save, post_delete):
+        signal.connect(
+            _publish_payment,
+            sender=Payment,
+            dispatch_uid=f"live_events_payment_{signal is post_save}",
+        )
@@ -0,0 +1,155 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Avg, Count
+from django.test.utils import CaptureQueriesContext
+
+from booking import client_summary
+from booking.models import (
+    Client,
+    ClientGroup,
+    ClientRating,
+    Scenario,
+    Subscription,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает построение списка клиентов с агрегатами по оценкам, "
+        "абонементам и группам и чтение из сводок ClientSummary. Все данные "
+        "создаются во временной транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=50_000,
+            help="Сколько клиентов засеять (по умолчанию 50000)",
+        )
+        parser.add_argument(
+            "--groups",
+            type=int,
+            default=500,
+            help="Сколько групп клиентов засеять",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Размер пачки bulk_create при засеве",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(
+                    max(1, options["clients"]),
+                    max(1, options["groups"]),
+                    max(1, options["batch_size"]),
+                )
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write("Тестовые данные откатены.")
+
+    def _run(self, total, group_count, batch_size):
+        rng = random.Random(0)
+        base_id = 10_000_000
+
+        scenarios = [
+            Scenario.objects.create(id=base_id + i, name=f"benchmark-{base_id + i}")
+            for i in range(2)
+        ]
+        groups = ClientGroup.objects.bulk_create(
+            [
+                ClientGroup(id=base_id + i, name=f"benchmark-{i}")
+                for i in range(group_count)
+            ]
+        )
+
+        client_ids = range(base_id, base_id + total)
+        Client.objects.bulk_create(
+            (
+                Client(id=client_id, name=f"Клиент {client_id}", phone=f"+0{client_id}")
+                for client_id in client_ids
+            ),
+            batch_size=batch_size,
+        )
+        ClientRating.objects.bulk_create(
+            (
+                ClientRating(client_id=client_id, rating=rng.randint(1, 5))
+                for client_id in client_ids
+                for _ in range(client_id % 3)
+            ),
+            batch_size=batch_size,
+        )
+        Subscription.objects.bulk_create(
+            (
+                Subscription(
+                    id=client_id,
+                    client_id=client_id,
+                    scenario=scenarios[client_id % 2],
+                    balance=rng.randint(0, 10),
+                )
+                for client_id in client_ids
+                if client_id % 4
+            ),
+            batch_size=batch_size,
+        )
+        Client.groups.through.objects.bulk_create(
+            (
+                Client.groups.through(
+                    client_id=client_id, clientgroup=groups[client_id % group_count]
+                )
+                for client_id in client_ids
+                if client_id % 5 == 0
+            ),
+            batch_size=batch_size,
+        )
+        self.stdout.write(f"Засеяно клиентов: {total}, групп: {group_count}")
+
+        t0 = time.perf_counter()
+        client_summary.rebuild(batch_size=batch_size)
+        self.stdout.write(
+            f"Пересборка сводок: {(time.perf_counter() - t0) * 1000:.0f} мс"
+        )
+
+        self.stdout.write(f"{'вариант':>10} | {'запросов':>9} | {'время, мс':>10}")
+        for label, build in (
+            ("агрегаты", self._list_with_aggregates),
+            ("сводки", self._list_with_summaries),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                t0 = time.perf_counter()
+                rows = build()
+                elapsed = (time.perf_counter() - t0) * 1000
+            assert len(rows) >= total
+            self.stdout.write(f"{label:>10} | {len(queries):>9} | {elapsed:>10.0f}")
+
+    @staticmethod
+    def _list_with_aggregates():
+        clients = Client.objects.annotate(
+            rating_avg=Avg("clientrating__rating"),
+            rating_count=Count("clientrating", distinct=True),
+        ).prefetch_related("subscription_set", "groups")
+        return [
+            (
+                client.id,
+                client.rating_avg,
+                client.rating_count,
+                {s.scenario_id: s.balance for s in client.subscription_set.all()},
+                [group.id for group in client.groups.all()],
+            )
+            for client in clients
+        ]
+
+    @staticmethod
+    def _list_with_summaries():
+        return list(client_summary.client_rows())
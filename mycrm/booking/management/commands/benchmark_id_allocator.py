@@ -0,0 +1,113 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from booking import id_allocator
+from booking.models import Client
+
+NAME_PREFIX = "benchmark-id-"
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает параллельные вставки клиентов с ID из Max(id) + 1 и из "
+        "booking.id_allocator: вставок в секунду и вставок, потерянных на "
+        "дублях ID. Каждая вставка — в своей транзакции, как в представлениях. "
+        "Созданные клиенты удаляются. Завершается ошибкой, если аллокатор "
+        "потерял вставку или медленнее Max(id) + 1 больше чем в --min-ratio раз."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=16,
+            help="Параллельных потоков (по умолчанию 16)",
+        )
+        parser.add_argument(
+            "--inserts",
+            type=int,
+            default=50,
+            help="Вставок на поток (по умолчанию 50)",
+        )
+        parser.add_argument(
+            "--min-ratio",
+            type=float,
+            default=1.0,
+            help=(
+                "Минимальное отношение скорости аллокатора к Max(id) + 1 с учётом "
+                "потерянных вставок (по умолчанию 1.0)"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        threads = max(1, options["threads"])
+        inserts = max(1, options["inserts"])
+        total = threads * inserts
+        try:
+            baseline = self._measure(threads, inserts, self._insert_max_plus_one)
+            allocator = self._measure(threads, inserts, self._insert_allocated)
+        finally:
+            Client.objects.filter(name__startswith=NAME_PREFIX).delete()
+
+        self.stdout.write(
+            f"{'вариант':>10} | {'вставок':>8} | {'потеряно':>8} | {'вставок/с':>10}"
+        )
+        for label, (inserted, elapsed) in (
+            ("Max+1", baseline),
+            ("аллокатор", allocator),
+        ):
+            self.stdout.write(
+                f"{label:>10} | {inserted:>8} | {total - inserted:>8} | "
+                f"{inserted / elapsed:>10.0f}"
+            )
+
+        if allocator[0] != total:
+            raise CommandError(
+                f"Аллокатор потерял вставок: {total - allocator[0]} из {total}"
+            )
+        ratio = (allocator[0] / allocator[1]) / (baseline[0] / baseline[1])
+        self.stdout.write(f"Отношение скоростей: {ratio:.2f}")
+        if ratio < options["min_ratio"]:
+            raise CommandError(
+                f"Аллокатор медленнее ожидаемого: {ratio:.2f} < {options['min_ratio']}"
+            )
+
+    def _measure(self, threads, inserts, insert):
+        """(успешных вставок, секунд) при `threads` потоках по `inserts` вставок."""
+        Client.objects.filter(name__startswith=NAME_PREFIX).delete()
+        id_allocator.reset_pools()
+        barrier = threading.Barrier(threads)
+        inserted = [0] * threads
+
+        def worker(n):
+            try:
+                barrier.wait()
+                for i in range(inserts):
+                    try:
+                        with transaction.atomic():
+                            insert(f"{NAME_PREFIX}{n}-{i}", f"+0{n:03d}{i:05d}")
+                    except Exception:  # noqa: BLE001 - дубль ID или блокировка
+                        continue
+                    inserted[n] += 1
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return sum(inserted), time.perf_counter() - started
+
+    @staticmethod
+    def _insert_max_plus_one(name, phone):
+        max_id = Client.objects.order_by("-id").values_list("id", flat=True).first()
+        Client.objects.create(id=(max_id or 0) + 1, name=name, phone=phone)
+
+    @staticmethod
+    def _insert_allocated(name, phone):
+        id_allocator.create_with_allocated_id(Client, name=name, phone=phone)
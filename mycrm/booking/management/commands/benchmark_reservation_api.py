@@ -0,0 +1,178 @@
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, time as dt_time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from booking.api import ReservationViewSet
+from booking.api.pagination import ReservationPagination
+from booking.models import Area, Reservation, Room, Scenario, Service, ServiceGroup
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет страницы списка /api/reservations/ (keyset-пагинация и "
+        "фильтры) на засеянной таблице броней: первую, среднюю и последнюю "
+        "страницу и страницы с фильтрами. Все данные создаются во временной "
+        "транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1_000_000,
+            help="Сколько броней засеять (по умолчанию 1 000 000)",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=100,
+            help="Размер страницы",
+        )
+        parser.add_argument(
+            "--probes",
+            type=int,
+            default=20,
+            help="Количество замеров на вариант",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(
+                    max(1, options["rows"]),
+                    max(1, options["page_size"]),
+                    max(1, options["probes"]),
+                )
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write("Тестовые данные откатены.")
+
+    def _seed(self, row_count, base_id):
+        tz = timezone.get_current_timezone()
+        scenario = Scenario.objects.create(id=base_id, name=f"benchmark-{base_id}")
+        areas = [
+            Area.objects.create(id=base_id + i, name=f"benchmark-{i}") for i in (0, 1)
+        ]
+        room_ids = [base_id + i for i in range(40)]
+        Room.objects.bulk_create(
+            Room(
+                id=room_id,
+                name=f"benchmark-{room_id}",
+                area=areas[i % 2],
+                hourstart=dt_time(8),
+                hourend=dt_time(23),
+            )
+            for i, room_id in enumerate(room_ids)
+        )
+        group = ServiceGroup.objects.create(id=base_id, name="benchmark")
+        service = Service.objects.create(
+            id=base_id, name="benchmark", group=group, cost=1
+        )
+
+        # По 10 часовых броней в день в каждой комнате, день за днём.
+        first_day = datetime.combine(timezone.localdate(), dt_time(8))
+        per_day = len(room_ids) * 10
+        through = Reservation.services.through
+        batch_size = 10_000
+        for offset in range(0, row_count, batch_size):
+            batch = range(offset, min(offset + batch_size, row_count))
+            reservations = []
+            for k in batch:
+                start = timezone.make_aware(
+                    first_day
+                    + timedelta(days=k // per_day, hours=(k // len(room_ids)) % 10),
+                    tz,
+                )
+                reservations.append(
+                    Reservation(
+                        id=base_id + k,
+                        datetimestart=start,
+                        datetimeend=start + timedelta(hours=1),
+                        room_id=room_ids[k % len(room_ids)],
+                        scenario=scenario,
+                    )
+                )
+            Reservation.objects.bulk_create(reservations)
+            through.objects.bulk_create(
+                through(reservation_id=base_id + k, service_id=service.id)
+                for k in batch
+                if k % 4 == 0
+            )
+        return room_ids, areas, first_day.date()
+
+    def _run(self, row_count, page_size, probes):
+        base_id = 10_000_000
+        t0 = time.perf_counter()
+        room_ids, areas, first_day = self._seed(row_count, base_id)
+        self.stdout.write(
+            f"Броней: {row_count}, засеяно за {time.perf_counter() - t0:.0f} с"
+        )
+        # Недавно изменённые брони для updated_since.
+        since = timezone.now() + timedelta(days=1)
+        Reservation.objects.filter(
+            id__in=range(base_id, base_id + row_count, max(1, row_count // 50))
+        ).update(updated_at=since + timedelta(minutes=1))
+        # При DEBUG журнал запросов засева переполнен и сбивает их подсчёт.
+        reset_queries()
+
+        user = User(username="benchmark", is_active=True)
+        view = ReservationViewSet.as_view({"get": "list"})
+        factory = APIRequestFactory()
+        pagination = ReservationPagination()
+
+        def cursor_at(position):
+            row = Reservation.objects.order_by("datetimestart", "id")[position]
+            return pagination.encode_cursor(row)
+
+        total = Reservation.objects.count()
+        middle_day = first_day + timedelta(days=row_count // 800)
+        variants = [
+            ("первая страница", {}),
+            ("середина таблицы", {"cursor": cursor_at(total // 2)}),
+            ("последняя страница", {"cursor": cursor_at(max(0, total - 2))}),
+            ("room", {"room": room_ids[7]}),
+            ("area", {"area": areas[1].id}),
+            ("area + date_from", {"area": areas[1].id, "date_from": middle_day}),
+            ("updated_since", {"updated_since": since.isoformat()}),
+        ]
+
+        self.stdout.write(
+            f"{'вариант':<22} | {'запросов':>9} | {'мс (медиана)':>13} | "
+            f"{'КБ (пик)':>9} | {'строк':>6} | {'next':>5}"
+        )
+        for label, params in variants:
+            params = {"page_size": page_size, **params}
+            samples = []
+            for _ in range(probes):
+                request = factory.get("/api/reservations/", params)
+                force_authenticate(request, user=user)
+                with CaptureQueriesContext(connection) as queries:
+                    t0 = time.perf_counter()
+                    response = view(request)
+                    response.render()
+                    samples.append((time.perf_counter() - t0) * 1000)
+            request = factory.get("/api/reservations/", params)
+            force_authenticate(request, user=user)
+            tracemalloc.start()
+            response = view(request)
+            response.render()
+            peak = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+            next_url = response.data["next"]
+            self.stdout.write(
+                f"{label:<22} | {len(queries):>9} | "
+                f"{statistics.median(samples):>13.1f} | {peak:>9.0f} | "
+                f"{len(response.data['results']):>6} | {'да' if next_url else 'нет':>5}"
+            )
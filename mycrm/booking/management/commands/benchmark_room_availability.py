@@ -0,0 +1,136 @@
+import statistics
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from booking.models import Area, Reservation, Room, Scenario
+from booking.views.create_booking import check_room_availability
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет время проверки доступности комнаты и создания брони по мере роста "
+        "истории броней. Все данные создаются во временной транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--total",
+            type=int,
+            default=500_000,
+            help="Сколько исторических броней засеять в комнату (по умолчанию 500000)",
+        )
+        parser.add_argument(
+            "--checkpoints",
+            type=int,
+            default=5,
+            help="На скольких точках роста истории делать замер",
+        )
+        parser.add_argument(
+            "--probes",
+            type=int,
+            default=200,
+            help="Количество замеров на каждой точке",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Размер пачки bulk_create при засеве",
+        )
+
+    def handle(self, *args, **options):
+        total = max(0, options["total"])
+        checkpoints = max(1, options["checkpoints"])
+        probes = max(1, options["probes"])
+        batch_size = max(1, options["batch_size"])
+
+        try:
+            with transaction.atomic():
+                self._run(total, checkpoints, probes, batch_size)
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write("Тестовые данные откатены.")
+
+    def _run(self, total, checkpoints, probes, batch_size):
+        tz = timezone.get_current_timezone()
+        base_id = 10_000_000
+
+        scenario = Scenario.objects.create(
+            id=base_id, name=f"benchmark-{base_id}", active=True
+        )
+        area = Area.objects.create(id=base_id, name="benchmark")
+        room = Room.objects.create(
+            id=base_id,
+            name="benchmark",
+            area=area,
+            hourstart=dt_time(0, 0),
+            hourend=dt_time(23, 59),
+        )
+
+        # История раскладывается в прошлое: по 12 броней в сутки, по часу каждая.
+        history_start = timezone.make_aware(datetime(2000, 1, 1, 8, 0), tz)
+        probe_day = timezone.make_aware(datetime(2100, 1, 1, 8, 0), tz)
+
+        step = total // checkpoints if total else 0
+        targets = [step * (i + 1) for i in range(checkpoints)] if step else [0]
+        seeded = 0
+        next_id = base_id
+
+        self.stdout.write(
+            f"{'история':>10} | {'check, мс (медиана)':>20} | {'create, мс (медиана)':>21}"
+        )
+        for target in targets:
+            while seeded < target:
+                chunk = min(batch_size, target - seeded)
+                objs = []
+                for i in range(chunk):
+                    n = seeded + i
+                    start = history_start + timedelta(days=n // 12, hours=n % 12)
+                    objs.append(
+                        Reservation(
+                            id=next_id,
+                            datetimestart=start,
+                            datetimeend=start + timedelta(hours=1),
+                            room=room,
+                            scenario=scenario,
+                        )
+                    )
+                    next_id += 1
+                Reservation.objects.bulk_create(objs, batch_size=batch_size)
+                seeded += chunk
+
+            check_ms = []
+            create_ms = []
+            for i in range(probes):
+                start = probe_day + timedelta(days=i // 12, hours=i % 12)
+                end = start + timedelta(hours=1)
+
+                t0 = time.perf_counter()
+                check_room_availability(room, start, end)
+                check_ms.append((time.perf_counter() - t0) * 1000)
+
+                sid = transaction.savepoint()
+                t0 = time.perf_counter()
+                check_room_availability(room, start, end)
+                Reservation.objects.create(
+                    id=next_id + i,
+                    datetimestart=start,
+                    datetimeend=end,
+                    room=room,
+                    scenario=scenario,
+                )
+                create_ms.append((time.perf_counter() - t0) * 1000)
+                transaction.savepoint_rollback(sid)
+
+            self.stdout.write(
+                f"{seeded:>10} | {statistics.median(check_ms):>20.3f} | "
+                f"{statistics.median(create_ms):>21.3f}"
+            )
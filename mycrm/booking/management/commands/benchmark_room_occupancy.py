@@ -0,0 +1,222 @@
+import random
+import statistics
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from booking import room_occupancy
+from booking.models import Area, Reservation, Room, Scenario
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает проверку занятости помещения и расчёт занятости месячной сетки "
+        "по броням (сравнение datetime) и по битовым картам RoomDayOccupancy. Все "
+        "данные создаются во временной транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rooms",
+            type=int,
+            default=20,
+            help="Сколько помещений засеять (по умолчанию 20)",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="На сколько дней засеять брони",
+        )
+        parser.add_argument(
+            "--probes",
+            type=int,
+            default=2000,
+            help="Количество проверок занятости",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Размер пачки bulk_create при засеве",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(
+                    max(1, options["rooms"]),
+                    max(31, options["days"]),
+                    max(1, options["probes"]),
+                    max(1, options["batch_size"]),
+                )
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write("Тестовые данные откатены.")
+
+    def _run(self, room_count, days, probes, batch_size):
+        rng = random.Random(0)
+        tz = timezone.get_current_timezone()
+        base_id = 10_000_000
+        first_day = date(2100, 1, 1)
+
+        scenario = Scenario.objects.create(id=base_id, name=f"benchmark-{base_id}")
+        area = Area.objects.create(id=base_id, name="benchmark")
+        rooms = Room.objects.bulk_create(
+            [
+                Room(
+                    id=base_id + i,
+                    name=f"benchmark-{i}",
+                    area=area,
+                    hourstart=dt_time(0, 0),
+                    hourend=dt_time(23, 59),
+                )
+                for i in range(room_count)
+            ]
+        )
+        room_ids = [room.id for room in rooms]
+
+        def at(day, slot):
+            return timezone.make_aware(
+                datetime.combine(day, dt_time()) + timedelta(minutes=15 * slot), tz
+            )
+
+        def seed():
+            next_id = base_id
+            for room_id in room_ids:
+                for offset in range(days):
+                    day = first_day + timedelta(days=offset)
+                    slot = 32 + rng.randrange(4)  # 08:00–09:00
+                    while slot < 88:
+                        length = rng.choice((2, 4, 4, 6, 8))
+                        yield Reservation(
+                            id=next_id,
+                            datetimestart=at(day, slot),
+                            datetimeend=at(day, min(slot + length, 92)),
+                            room_id=room_id,
+                            scenario=scenario,
+                        )
+                        next_id += 1
+                        slot += length + rng.randrange(4)
+
+        Reservation.objects.bulk_create(seed(), batch_size=batch_size)
+        t0 = time.perf_counter()
+        built = room_occupancy.rebuild()
+        seeded = Reservation.objects.filter(room_id__in=room_ids).count()
+        self.stdout.write(
+            f"Засеяно броней: {seeded}, "
+            f"карт: {built}, пересборка {(time.perf_counter() - t0) * 1000:.0f} мс"
+        )
+
+        checks = []
+        for _ in range(probes):
+            day = first_day + timedelta(days=rng.randrange(days))
+            slot = rng.randrange(90)
+            checks.append(
+                (
+                    rng.choice(room_ids),
+                    at(day, slot),
+                    at(day, slot + rng.choice((2, 4))),
+                )
+            )
+
+        occupancy = room_occupancy.load(
+            room_ids, {start.date() for _, start, _ in checks}
+        )
+        self.stdout.write(f"{'проверка занятости':<28} | {'мкс (медиана)':>14}")
+        for label, check in (
+            ("запрос по броням", self._query_conflict),
+            ("запрос карты + AND", room_occupancy.room_conflict),
+            (
+                "AND по загруженной карте",
+                lambda room_id, start, end: room_occupancy.conflict(
+                    occupancy, room_id, start, end
+                ),
+            ),
+        ):
+            samples = []
+            for room_id, start, end in checks:
+                t0 = time.perf_counter()
+                check(room_id, start, end)
+                samples.append((time.perf_counter() - t0) * 1_000_000)
+            self.stdout.write(f"{label:<28} | {statistics.median(samples):>14.1f}")
+
+        month = [first_day + timedelta(days=offset) for offset in range(31)]
+        room_days = len(room_ids) * len(month)
+        self.stdout.write(
+            f"{'месячная сетка':<28} | {'всего, мс':>10} | {'мкс на комнату-день':>20}"
+        )
+        results = {}
+        for label, build in (
+            ("сравнение datetime", self._grid_by_datetimes),
+            ("битовые карты", self._grid_by_bitmaps),
+        ):
+            t0 = time.perf_counter()
+            results[label] = build(room_ids, month)
+            elapsed = time.perf_counter() - t0
+            self.stdout.write(
+                f"{label:<28} | {elapsed * 1000:>10.1f} | "
+                f"{elapsed * 1_000_000 / room_days:>20.1f}"
+            )
+        assert len(set(map(repr, results.values()))) == 1
+
+    @staticmethod
+    def _query_conflict(room_id, start, end):
+        return (
+            Reservation.objects.filter(
+                room_id=room_id, datetimestart__lt=end, datetimeend__gt=start
+            )
+            .exclude(status_id__in=room_occupancy.INACTIVE_STATUS_IDS)
+            .exists()
+        )
+
+    @staticmethod
+    def _grid_by_datetimes(room_ids, month):
+        """Занятость ячеек сетки сравнением границ броней с границами ячеек."""
+        tz = timezone.get_current_timezone()
+        range_start = timezone.make_aware(datetime.combine(month[0], dt_time()), tz)
+        range_end = range_start + timedelta(days=len(month))
+        bookings = {}
+        for room_id, start, end in (
+            Reservation.objects.filter(
+                room_id__in=room_ids,
+                datetimestart__lt=range_end,
+                datetimeend__gt=range_start,
+            )
+            .exclude(status_id__in=room_occupancy.INACTIVE_STATUS_IDS)
+            .values_list("room_id", "datetimestart", "datetimeend")
+        ):
+            day = timezone.localtime(start).date()
+            bookings.setdefault((room_id, day), []).append((start, end))
+
+        step = timedelta(minutes=room_occupancy.SLOT_MINUTES)
+        grid = {}
+        for room_id in room_ids:
+            for day in month:
+                day_bookings = bookings.get((room_id, day), ())
+                cell_start = timezone.make_aware(datetime.combine(day, dt_time()), tz)
+                busy = 0
+                for slot in range(room_occupancy.SLOTS_PER_DAY):
+                    cell_end = cell_start + step
+                    if any(s < cell_end and e > cell_start for s, e in day_bookings):
+                        busy += 1
+                    cell_start = cell_end
+                grid[(room_id, day)] = busy
+        return grid
+
+    @staticmethod
+    def _grid_by_bitmaps(room_ids, month):
+        """Та же занятость по битовым картам: число занятых слотов — popcount."""
+        occupancy = room_occupancy.grid(room_ids, month[0], month[-1])
+        return {
+            (room_id, day): occupancy[room_id].get(day, 0).bit_count()
+            for room_id in room_ids
+            for day in month
+        }
@@ -0,0 +1,137 @@
+import random
+import statistics
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from booking import room_occupancy
+from booking.models import Area, Reservation, Room, Scenario
+from booking.slot_search import find_free_slots
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет поиск ближайших свободных слотов по всем комнатам в 14-дневном "
+        "окне: при свободных слотах в первый день и когда всё окно, кроме "
+        "последнего дня, занято. Все данные создаются во временной транзакции и "
+        "откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rooms",
+            type=int,
+            default=40,
+            help="Сколько комнат засеять (по умолчанию 40)",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=14,
+            help="Окно поиска в днях",
+        )
+        parser.add_argument(
+            "--probes",
+            type=int,
+            default=20,
+            help="Количество замеров на вариант",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(
+                    max(1, options["rooms"]),
+                    max(2, options["days"]),
+                    max(1, options["probes"]),
+                )
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write("Тестовые данные откатены.")
+
+    def _run(self, room_count, days, probes):
+        rng = random.Random(0)
+        tz = timezone.get_current_timezone()
+        base_id = 10_000_000
+        first_day = timezone.localdate() + timedelta(days=1)
+
+        scenario = Scenario.objects.create(id=base_id, name=f"benchmark-{base_id}")
+        area = Area.objects.create(id=base_id, name="benchmark")
+        room_ids = [base_id + i for i in range(room_count)]
+        Room.objects.bulk_create(
+            Room(
+                id=room_id,
+                name=f"benchmark-{room_id}",
+                area=area,
+                hourstart=dt_time(8),
+                hourend=dt_time(23),
+            )
+            for room_id in room_ids
+        )
+
+        def at(day, minutes):
+            return timezone.make_aware(
+                datetime.combine(day, dt_time()) + timedelta(minutes=minutes), tz
+            )
+
+        # Плотное расписание: брони по 30–120 минут с зазорами по 15 минут
+        # (30 минут подряд свободны только в одной комнате из десяти), кроме
+        # последнего дня окна — он свободен целиком.
+        reservations = []
+        for room_id in room_ids:
+            for offset in range(days - 1):
+                day = first_day + timedelta(days=offset)
+                minute = 8 * 60
+                while minute < 23 * 60:
+                    length = rng.choice((30, 60, 90, 120))
+                    reservations.append(
+                        Reservation(
+                            id=base_id + len(reservations),
+                            datetimestart=at(day, minute),
+                            datetimeend=at(day, min(minute + length, 23 * 60)),
+                            room_id=room_id,
+                            scenario=scenario,
+                        )
+                    )
+                    minute += length + (30 if room_id % 10 == 0 else 15)
+        Reservation.objects.bulk_create(reservations, batch_size=5000)
+        # bulk_create не отправляет сигналов — карты занятости строятся явно.
+        room_occupancy.refresh(
+            (room_id, first_day + timedelta(days=offset))
+            for room_id in room_ids
+            for offset in range(days)
+        )
+        self.stdout.write(f"Комнат: {room_count}, броней: {len(reservations)}")
+
+        self.stdout.write(
+            f"{'вариант':<30} | {'запросов':>9} | {'мс (медиана)':>13} | {'слотов':>7}"
+        )
+        for label, duration in (
+            ("30 минут, с первого дня", 30),
+            ("60 минут, последний день", 60),
+        ):
+            samples = []
+            for _ in range(probes):
+                with CaptureQueriesContext(connection) as queries:
+                    t0 = time.perf_counter()
+                    slots = find_free_slots(
+                        scenario=scenario,
+                        duration_minutes=duration,
+                        date_from=first_day,
+                        date_to=first_day + timedelta(days=days - 1),
+                        limit=10,
+                        area_id=area.id,
+                    )
+                    samples.append((time.perf_counter() - t0) * 1000)
+            self.stdout.write(
+                f"{label:<30} | {len(queries):>9} | "
+                f"{statistics.median(samples):>13.1f} | {len(slots):>7}"
+            )
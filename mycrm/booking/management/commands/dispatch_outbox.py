@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Доставляет исходящие сообщения (booking.outbox) во внешние системы. "
+        "По умолчанию работает постоянно: пачка за пачкой, а когда очередь пуста, "
+        "ждёт --interval секунд. Можно запускать несколько экземпляров."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Разобрать созревшие сообщения и завершиться",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Пауза при пустой очереди, секунд (по умолчанию 2)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Размер пачки (по умолчанию OUTBOX_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            "--requeue-dead",
+            action="store_true",
+            help="Вернуть недоставленные сообщения в очередь и завершиться",
+        )
+
+    def handle(self, *args, **options):
+        if options["requeue_dead"]:
+            count = outbox.requeue_dead()
+            self.stdout.write(self.style.SUCCESS(f"Возвращено в очередь: {count}"))
+            return
+
+        try:
+            while True:
+                counts = outbox.dispatch(batch_size=options["batch_size"])
+                if any(counts.values()):
+                    self.stdout.write(
+                        f"Доставлено: {counts['delivered']}, "
+                        f"отложено: {counts['retried']}, "
+                        f"не доставлено: {counts['dead']}"
+                    )
+                    continue
+                if options["once"]:
+                    return
+                time.sleep(max(0.1, options["interval"]))
+        except KeyboardInterrupt:
+            self.stdout.write("Остановлено")
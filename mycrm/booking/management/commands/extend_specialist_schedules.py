@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from booking import specialist_schedule
+
+
+class Command(BaseCommand):
+    help = (
+        "Сдвигает горизонт проекции расписаний специалистов: удаляет прошедшие "
+        "даты и достраивает недостающие. Запускать раз в сутки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Пересобрать весь горизонт по исходным таблицам",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["full"]:
+                created = specialist_schedule.rebuild()
+                self.stdout.write(self.style.SUCCESS(f"Пересобрано строк: {created}"))
+                return
+            deleted, created = specialist_schedule.extend()
+        self.stdout.write(
+            self.style.SUCCESS(f"Удалено строк: {deleted}, добавлено строк: {created}")
+        )
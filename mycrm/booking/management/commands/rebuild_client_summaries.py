@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from booking import client_summary
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает сводки по клиентам (средняя оценка, число оценок, балансы "
+        "абонементов, группы) по исходным таблицам"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Сколько клиентов пересчитывать за один проход (по умолчанию 2000)",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = client_summary.rebuild(batch_size=max(1, options["batch_size"]))
+        self.stdout.write(self.style.SUCCESS(f"Пересобрано сводок: {total}"))
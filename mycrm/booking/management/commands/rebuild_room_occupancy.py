@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from booking import room_occupancy
+
+
+class Command(BaseCommand):
+    help = "Пересобирает битовые карты занятости помещений по таблице броней"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = room_occupancy.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Пересобрано строк: {total}"))
@@ -0,0 +1,55 @@
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from booking import tariff_unit_ledger
+
+SAMPLE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Записывает снимки балансов тарифных единиц на начало дня по журналу "
+        "и сверяет балансы абонементов с журналом. Запускать раз в сутки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Дата снимка ГГГГ-ММ-ДД (по умолчанию — сегодня): баланс на 00:00",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options["date"]) if options["date"] else None
+        except ValueError:
+            raise CommandError("Дата должна быть в формате ГГГГ-ММ-ДД")
+        day = day or timezone.localdate()
+        moment = timezone.make_aware(datetime.combine(day, time.min))
+
+        with transaction.atomic():
+            created = tariff_unit_ledger.take_snapshots(moment)
+        self.stdout.write(
+            self.style.SUCCESS(f"Снимков на {moment:%d.%m.%Y %H:%M}: {created}")
+        )
+
+        drift = list(
+            tariff_unit_ledger.find_drift()
+            .order_by("pk")
+            .values_list("pk", "balance", "ledger_balance")
+        )
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Балансы совпадают с журналом"))
+            return
+        self.stdout.write(
+            self.style.WARNING(f"Абонементов с расхождением: {len(drift)}")
+        )
+        for subscription_id, balance, ledger_balance in drift[:SAMPLE_SIZE]:
+            self.stdout.write(
+                f"  абонемент {subscription_id}: баланс {balance}, "
+                f"по журналу {ledger_balance}"
+            )
+        if len(drift) > SAMPLE_SIZE:
+            self.stdout.write(f"  ... и ещё {len(drift) - SAMPLE_SIZE}")
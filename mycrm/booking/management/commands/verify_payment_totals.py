@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from booking import payment_totals
+
+SAMPLE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет денормализованные суммы платежей броней (paid_amount, "
+        "paid_tariff_units_amount) с таблицей платежей и при --repair исправляет их"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Пересчитать суммы у расходящихся броней",
+        )
+
+    def handle(self, *args, **options):
+        drift = payment_totals.find_drift().order_by("id")
+        count = drift.count()
+        if not count:
+            self.stdout.write(self.style.SUCCESS("Расхождений нет"))
+            return
+
+        self.stdout.write(self.style.WARNING(f"Броней с расхождением: {count}"))
+        for reservation in drift[:SAMPLE_SIZE]:
+            self.stdout.write(
+                f"  бронь {reservation.id}: оплачено {reservation.paid_amount} "
+                f"(по платежам {reservation.actual_paid_amount}), тарифными "
+                f"единицами {reservation.paid_tariff_units_amount} "
+                f"(по платежам {reservation.actual_paid_tariff_units_amount})"
+            )
+        if count > SAMPLE_SIZE:
+            self.stdout.write(f"  ... и ещё {count - SAMPLE_SIZE}")
+
+        if not options["repair"]:
+            self.stdout.write("Для исправления запустите команду с --repair")
+            return
+
+        with transaction.atomic():
+            repaired = payment_totals.repair()
+        self.stdout.write(self.style.SUCCESS(f"Исправлено броней: {repaired}"))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from booking import room_occupancy
+
+SAMPLE_SIZE = 20
+
+
+def _describe(state):
+    if state is None:
+        return "нет строки"
+    mask, aligned = state
+    width = room_occupancy.SLOTS_PER_DAY // 4
+    return f"{mask:0{width}x}{'' if aligned else ' (не выровнено)'}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет битовые карты занятости помещений с таблицей броней и при "
+        "--repair пересчитывает расходящиеся даты"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Пересчитать карты расходящихся дат",
+        )
+
+    def handle(self, *args, **options):
+        drift = room_occupancy.find_drift()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Расхождений нет"))
+            return
+
+        self.stdout.write(self.style.WARNING(f"Дат с расхождением: {len(drift)}"))
+        for (room_id, day), (stored, wanted) in sorted(drift.items())[:SAMPLE_SIZE]:
+            self.stdout.write(
+                f"  помещение {room_id}, {day}: сохранено {_describe(stored)}, "
+                f"по броням {_describe(wanted)}"
+            )
+        if len(drift) > SAMPLE_SIZE:
+            self.stdout.write(f"  ... и ещё {len(drift) - SAMPLE_SIZE}")
+
+        if not options["repair"]:
+            self.stdout.write("Для исправления запустите команду с --repair")
+            return
+
+        with transaction.atomic():
+            room_occupancy.refresh(drift)
+        self.stdout.write(self.style.SUCCESS(f"Исправлено дат: {len(drift)}"))
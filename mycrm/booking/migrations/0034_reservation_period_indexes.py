@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0033_schedule_scenario_fk'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['room', 'datetimeend', 'datetimestart'], name='reservation_room_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['specialist', 'datetimeend', 'datetimestart'], name='reservation_spec_period_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:24
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_sequences(apps, schema_editor):
+    """Заводит счётчики для всех моделей с ручным целочисленным первичным ключом."""
+    IdSequence = apps.get_model("booking", "IdSequence")
+    db_alias = schema_editor.connection.alias
+    for model in apps.get_app_config("booking").get_models():
+        pk = model._meta.pk
+        if not isinstance(pk, models.IntegerField) or isinstance(pk, models.AutoField):
+            continue
+        max_id = model.objects.using(db_alias).aggregate(max_id=Max("pk"))["max_id"]
+        IdSequence.objects.using(db_alias).update_or_create(
+            name=model._meta.db_table,
+            defaults={"last_value": max_id or 0},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0034_reservation_period_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('name', models.CharField(help_text='Имя таблицы (db_table) модели', max_length=100, primary_key=True, serialize=False, verbose_name='Таблица')),
+                ('last_value', models.BigIntegerField(default=0, help_text='Последний выданный идентификатор', verbose_name='Последний ID')),
+            ],
+            options={
+                'verbose_name': 'Последовательность ID',
+                'verbose_name_plural': 'Последовательности ID',
+                'db_table': 'id_sequences',
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0035_id_sequences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('name', models.CharField(help_text='Имя набора данных', max_length=100, primary_key=True, serialize=False, verbose_name='Набор данных')),
+                ('version', models.BigIntegerField(default=0, help_text='Текущий номер версии', verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия данных',
+                'verbose_name_plural': 'Версии данных',
+                'db_table': 'data_versions',
+            },
+        ),
+    ]
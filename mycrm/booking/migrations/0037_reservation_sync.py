@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0036_data_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationTombstone',
+            fields=[
+                ('reservation_id', models.IntegerField(help_text='ID удалённой брони', primary_key=True, serialize=False, verbose_name='Бронь')),
+                ('deleted_at', models.DateTimeField(db_index=True, help_text='Время удаления брони', verbose_name='Удалена')),
+            ],
+            options={
+                'verbose_name': 'Удалённая бронь',
+                'verbose_name_plural': 'Удалённые брони',
+                'db_table': 'reservation_tombstones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['updated_at'], name='reservation_updated_at_idx'),
+        ),
+    ]
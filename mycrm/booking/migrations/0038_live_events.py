@@ -0,0 +1,26 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0037_reservation_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiveEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, help_text='Время публикации события', verbose_name='Создано')),
+                ('payload', models.JSONField(help_text='Данные события', verbose_name='Данные')),
+            ],
+            options={
+                'verbose_name': 'Событие календаря',
+                'verbose_name_plural': 'События календаря',
+                'db_table': 'live_events',
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:51
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_paid_totals(apps, schema_editor):
+    Payment = apps.get_model("booking", "Payment")
+    Reservation = apps.get_model("booking", "Reservation")
+    money = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def total(**filters):
+        payments = (
+            Payment.objects.filter(reservation=OuterRef("pk"), canceled=False, **filters)
+            .order_by()
+            .values("reservation")
+            .annotate(total=Sum("amount"))
+            .values("total")
+        )
+        return Coalesce(
+            Subquery(payments, output_field=money), Value(Decimal("0")), output_field=money
+        )
+
+    Reservation.objects.update(
+        paid_amount=total(),
+        paid_tariff_units_amount=total(payment_type__name="Тарифные единицы"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0038_live_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='paid_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Сумма неотменённых платежей по брони', max_digits=10, verbose_name='Оплачено'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='paid_tariff_units_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Сумма неотменённых платежей тарифными единицами', max_digits=10, verbose_name='Оплачено тарифными единицами'),
+        ),
+        migrations.RunPython(fill_paid_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Avg, Count
+
+
+def fill_client_summaries(apps, schema_editor):
+    Client = apps.get_model("booking", "Client")
+    ClientRating = apps.get_model("booking", "ClientRating")
+    ClientSummary = apps.get_model("booking", "ClientSummary")
+    Subscription = apps.get_model("booking", "Subscription")
+
+    summaries = {
+        client_id: ClientSummary(client_id=client_id, balances={}, group_ids=[])
+        for client_id in Client.objects.values_list("id", flat=True)
+    }
+    ratings = (
+        ClientRating.objects.values("client_id")
+        .annotate(avg=Avg("rating"), count=Count("id"))
+        .order_by()
+    )
+    for row in ratings:
+        summaries[row["client_id"]].rating_avg = row["avg"]
+        summaries[row["client_id"]].rating_count = row["count"]
+    for client_id, scenario_id, balance in Subscription.objects.values_list(
+        "client_id", "scenario_id", "balance"
+    ).order_by("client_id", "scenario_id"):
+        summaries[client_id].balances[str(scenario_id)] = balance
+    for client_id, group_id in Client.groups.through.objects.values_list(
+        "client_id", "clientgroup_id"
+    ).order_by("client_id", "clientgroup_id"):
+        summaries[client_id].group_ids.append(group_id)
+    ClientSummary.objects.bulk_create(summaries.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0039_reservation_paid_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientSummary',
+            fields=[
+                ('client', models.OneToOneField(help_text='ID клиента', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='booking.client', verbose_name='Клиент')),
+                ('rating_avg', models.FloatField(blank=True, help_text='Средняя оценка клиента', null=True, verbose_name='Средняя оценка')),
+                ('rating_count', models.IntegerField(default=0, help_text='Количество оценок клиента', verbose_name='Количество оценок')),
+                ('balances', models.JSONField(default=dict, help_text='Балансы тарифных единиц по сценариям: {ID сценария: баланс}', verbose_name='Балансы абонементов')),
+                ('group_ids', models.JSONField(default=list, help_text='ID групп, в которые входит клиент', verbose_name='Группы клиента')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Время последнего пересчёта', verbose_name='Пересчитано')),
+            ],
+            options={
+                'verbose_name': 'Сводка по клиенту',
+                'verbose_name_plural': 'Сводки по клиентам',
+                'db_table': 'client_summaries',
+            },
+        ),
+        migrations.RunPython(fill_client_summaries, migrations.RunPython.noop),
+    ]
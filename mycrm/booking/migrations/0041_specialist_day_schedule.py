@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0040_client_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecialistDaySchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Дата', verbose_name='Дата')),
+                ('restricted', models.BooleanField(help_text='Ограничивает ли расписание доступность специалиста', verbose_name='Есть расписание')),
+                ('intervals', models.JSONField(default=list, help_text='Рабочие интервалы в минутах от полуночи: [[начало, конец], ...]', verbose_name='Рабочие интервалы')),
+                ('scenario', models.ForeignKey(blank=True, help_text='Сценарий (пусто — без учёта сценария)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='specialist_day_schedules', to='booking.scenario', verbose_name='Сценарий')),
+                ('specialist', models.ForeignKey(help_text='ID специалиста', on_delete=django.db.models.deletion.CASCADE, related_name='day_schedules', to='booking.specialist', verbose_name='Специалист')),
+            ],
+            options={
+                'verbose_name': 'Расписание специалиста на дату',
+                'verbose_name_plural': 'Расписания специалистов на даты',
+                'db_table': 'specialist_day_schedules',
+                'indexes': [models.Index(fields=['date', 'scenario'], name='specialist__date_65dec7_idx')],
+                'unique_together': {('specialist', 'date', 'scenario')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_room_occupancy(apps, schema_editor):
+    # Из модуля берутся только чистые функции расчёта масок, не модели.
+    from booking.room_occupancy import INACTIVE_STATUS_IDS, accumulate, to_bytes
+
+    Reservation = apps.get_model("booking", "Reservation")
+    RoomDayOccupancy = apps.get_model("booking", "RoomDayOccupancy")
+
+    rows = (
+        Reservation.objects.exclude(status_id__in=INACTIVE_STATUS_IDS)
+        .values_list("room_id", "datetimestart", "datetimeend")
+        .iterator(chunk_size=2000)
+    )
+    RoomDayOccupancy.objects.bulk_create(
+        (
+            RoomDayOccupancy(
+                room_id=room_id, date=day, slots=to_bytes(mask), aligned=aligned
+            )
+            for (room_id, day), (mask, aligned) in accumulate(rows).items()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0041_specialist_day_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomDayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Дата (локальная)', verbose_name='Дата')),
+                ('slots', models.BinaryField(help_text='96 бит занятости слотов по 15 минут, младший бит — 00:00', max_length=12, verbose_name='Занятые слоты')),
+                ('aligned', models.BooleanField(default=True, help_text='Все активные брони даты начинаются и заканчиваются на границе слота', verbose_name='Брони выровнены по слотам')),
+                ('room', models.ForeignKey(help_text='ID помещения', on_delete=django.db.models.deletion.CASCADE, related_name='occupancy_days', to='booking.room', verbose_name='Помещение')),
+            ],
+            options={
+                'verbose_name': 'Занятость помещения на дату',
+                'verbose_name_plural': 'Занятость помещений по датам',
+                'db_table': 'room_day_occupancy',
+                'indexes': [models.Index(fields=['date'], name='room_day_oc_date_f3871c_idx')],
+                'unique_together': {('room', 'date')},
+            },
+        ),
+        migrations.RunPython(fill_room_occupancy, migrations.RunPython.noop),
+    ]
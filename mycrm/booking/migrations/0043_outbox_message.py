@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0042_room_day_occupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(help_text='Тип сообщения (получатель)', max_length=50, verbose_name='Тип')),
+                ('idempotency_key', models.CharField(help_text='Ключ идемпотентности: повторная постановка и повторная доставка одного сообщения не создают дублей', max_length=150, unique=True, verbose_name='Ключ идемпотентности')),
+                ('payload', models.JSONField(help_text='Тело сообщения', verbose_name='Данные')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает доставки'), ('delivered', 'Доставлено'), ('dead', 'Не доставлено')], default='pending', help_text='Состояние доставки', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Количество попыток доставки', verbose_name='Попыток')),
+                ('next_attempt_at', models.DateTimeField(help_text='Не раньше этого времени будет следующая попытка', verbose_name='Следующая попытка')),
+                ('locked_until', models.DateTimeField(blank=True, help_text='Сообщение взято диспетчером до этого времени', null=True, verbose_name='Взято до')),
+                ('lease', models.CharField(blank=True, default='', help_text='Метка диспетчера, взявшего сообщение', max_length=32, verbose_name='Метка диспетчера')),
+                ('last_error', models.TextField(blank=True, default='', help_text='Ошибка последней попытки', verbose_name='Последняя ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Время постановки в очередь', verbose_name='Создано')),
+                ('delivered_at', models.DateTimeField(blank=True, help_text='Время успешной доставки', null=True, verbose_name='Доставлено')),
+            ],
+            options={
+                'verbose_name': 'Исходящее сообщение',
+                'verbose_name_plural': 'Исходящие сообщения',
+                'db_table': 'outbox_messages',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='outbox_mess_status_f4b9f9_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0043_outbox_message'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['datetimestart', 'id'], name='reservation_start_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['room', 'datetimestart', 'id'], name='reservation_room_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['specialist', 'datetimestart', 'id'], name='reservation_spec_start_idx'),
+        ),
+    ]
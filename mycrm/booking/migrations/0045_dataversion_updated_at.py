@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0044_reservation_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataversion',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Когда версия менялась последний раз', verbose_name='Изменена'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+from booking.phones import phone_key
+
+
+def fill_phone_normalized(apps, schema_editor):
+    Client = apps.get_model('booking', 'Client')
+    clients = list(Client.objects.using(schema_editor.connection.alias).only('id', 'phone'))
+    for client in clients:
+        client.phone_normalized = phone_key(client.phone)
+    Client.objects.using(schema_editor.connection.alias).bulk_update(
+        clients, ['phone_normalized'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0045_dataversion_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='phone_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='Телефон без оформления: ключ поиска и проверки дубликатов', max_length=150, verbose_name='Нормализованный телефон'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['name', 'id'], name='client_name_idx'),
+        ),
+        migrations.RunPython(fill_phone_normalized, migrations.RunPython.noop),
+    ]
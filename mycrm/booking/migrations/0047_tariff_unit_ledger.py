@@ -0,0 +1,71 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    # Текущие балансы — начальные записи журнала: сумма журнала абонемента
+    # сразу равна его балансу.
+    Subscription = apps.get_model('booking', 'Subscription')
+    TariffUnitLedger = apps.get_model('booking', 'TariffUnitLedger')
+    alias = schema_editor.connection.alias
+    TariffUnitLedger.objects.using(alias).bulk_create(
+        (
+            TariffUnitLedger(
+                subscription_id=subscription_id,
+                kind='adjustment',
+                units=balance,
+                comment='Начальный баланс',
+            )
+            for subscription_id, balance in Subscription.objects.using(alias)
+            .exclude(balance=0)
+            .values_list('id', 'balance')
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0046_client_phone_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TariffUnitBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(help_text='Баланс учитывает движения не позже этого времени', verbose_name='На момент')),
+                ('balance', models.IntegerField(help_text='Баланс тарифных единиц на момент снимка', verbose_name='Баланс')),
+                ('subscription', models.ForeignKey(help_text='Абонемент', on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='booking.subscription', verbose_name='Абонемент')),
+            ],
+            options={
+                'verbose_name': 'Снимок баланса тарифных единиц',
+                'verbose_name_plural': 'Снимки балансов тарифных единиц',
+                'db_table': 'tariff_unit_balance_snapshots',
+                'unique_together': {('subscription', 'taken_at')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TariffUnitLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('credit', 'Начисление'), ('debit', 'Списание'), ('adjustment', 'Корректировка баланса')], help_text='Вид движения', max_length=20, verbose_name='Вид')),
+                ('units', models.IntegerField(help_text='Изменение баланса в тарифных единицах (списание — меньше нуля)', verbose_name='Единиц')),
+                ('comment', models.TextField(blank=True, default='', help_text='Комментарий к движению', verbose_name='Комментарий')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Время движения', verbose_name='Создано')),
+                ('payment', models.ForeignKey(blank=True, help_text='Платёж тарифными единицами или его возврат', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tariff_unit_entries', to='booking.payment', verbose_name='Платёж')),
+                ('reservation', models.ForeignKey(blank=True, help_text='Бронь, за которую списаны или возвращены единицы', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tariff_unit_entries', to='booking.reservation', verbose_name='Бронь')),
+                ('subscription', models.ForeignKey(help_text='Абонемент', on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='booking.subscription', verbose_name='Абонемент')),
+            ],
+            options={
+                'verbose_name': 'Движение тарифных единиц',
+                'verbose_name_plural': 'Журнал тарифных единиц',
+                'db_table': 'tariff_unit_ledger',
+                'indexes': [models.Index(fields=['subscription', 'created_at'], name='tariff_unit_ledger_sub_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0047_tariff_unit_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Дата обновления клиента или его групп', verbose_name='Обновлён'),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Дата обновления абонемента', verbose_name='Обновлён'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Дата обновления платежа', verbose_name='Обновлён'),
+        ),
+    ]
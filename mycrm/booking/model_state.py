@@ -0,0 +1,91 @@
+"""Значения полей строки в БД до сохранения — для сигналов post_save.
+
+Модули, которым нужно прежнее состояние строки (перенос сумм платежа в
+бронь, пересчёт занятости и события при переносе брони, сводки клиентов,
+проекция расписаний), регистрируют поля модели через `track`. Перед
+сохранением существующей строки (pre_save) все отслеживаемые поля модели
+читаются одним запросом, общим для всех модулей. Новые строки
+(`_state.adding`) и сохранения с `update_fields` без отслеживаемых полей
+запросов не делают; загрузка объектов из БД ничего не стоит.
+
+`previous` — значения в БД до сохранения (None у новой строки), `current` —
+значения после сохранения; поля, не загруженные в объект (only/defer), не
+сохраняются и берутся из прежних.
+
+`track(..., lock=True)` — строка читается с блокировкой (SELECT ... FOR UPDATE,
+если сохранение идёт в транзакции) и до удаления тоже (pre_delete): модуль
+переносит разницу прежних и новых значений в другие строки, и параллельное
+изменение той же строки не должно прочитать прежние значения до фиксации
+первого.
+"""
+
+from django.db import connections
+from django.db.models.signals import pre_delete, pre_save
+
+# Модель -> отслеживаемые поля (attname).
+_FIELDS = {}
+# Модели, строки которых читаются с блокировкой.
+_LOCKED = set()
+
+
+def track(model, *fields: str, lock: bool = False) -> None:
+    """Отслеживает прежние значения полей `fields` (attname) модели `model`."""
+    tracked = _FIELDS.get(model)
+    if tracked is None:
+        tracked = _FIELDS[model] = []
+        pre_save.connect(
+            _load_previous,
+            sender=model,
+            dispatch_uid=f"model_state_{model._meta.label}",
+        )
+    tracked.extend(field for field in fields if field not in tracked)
+    if lock and model not in _LOCKED:
+        _LOCKED.add(model)
+        pre_delete.connect(
+            _load_deleted,
+            sender=model,
+            dispatch_uid=f"model_state_delete_{model._meta.label}",
+        )
+
+
+def _read(sender, instance, using) -> dict | None:
+    rows = sender._base_manager.using(using).filter(pk=instance.pk)
+    if sender in _LOCKED and connections[using].in_atomic_block:
+        rows = rows.select_for_update()
+    return rows.values(*_FIELDS[sender]).first()
+
+
+def _load_previous(sender, instance, using, update_fields=None, raw=False, **kwargs):
+    instance._previous_state = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    fields = _FIELDS[sender]
+    if update_fields is not None:
+        saved = {sender._meta.get_field(name).attname for name in update_fields}
+        if saved.isdisjoint(fields):
+            # Отслеживаемые поля не сохраняются: прежние значения — текущие.
+            instance._previous_state = current(instance)
+            return
+    instance._previous_state = _read(sender, instance, using)
+
+
+def _load_deleted(sender, instance, using, **kwargs):
+    instance._previous_state = _read(sender, instance, using)
+
+
+def previous(instance) -> dict | None:
+    """Отслеживаемые поля строки в БД до последнего сохранения объекта.
+
+    У моделей с `lock=True` после удаления — поля удалённой строки.
+    """
+    return getattr(instance, "_previous_state", None)
+
+
+def current(instance) -> dict:
+    """Отслеживаемые поля объекта (через __dict__, без подгрузки отложенных)."""
+    values = dict(previous(instance) or {})
+    loaded = instance.__dict__
+    values.update(
+        (field, loaded[field]) for field in _FIELDS[type(instance)] if field in loaded
+    )
+    return values
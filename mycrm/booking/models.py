@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.db.models import PROTECT, CASCADE, Q, F
 
+from .phones import phone_key
+
 
 class Subscription(models.Model):
     """Модель для хранения информации об абонементах"""
@@ -21,6 +23,12 @@ class Subscription(models.Model):
     balance = models.IntegerField(
         help_text="Баланс тарифных единиц", verbose_name="Баланс тарифных единиц"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        help_text="Дата обновления абонемента",
+        verbose_name="Обновлён",
+    )
 
     class Meta:
         app_label = "booking"
@@ -28,6 +36,23 @@ class Subscription(models.Model):
         verbose_name = "Абонемент"
         verbose_name_plural = "Абонементы"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Баланс на момент чтения: сохранение без его изменения не затирает
+        # списания после чтения (booking.tariff_unit_ledger).
+        instance._ledger_balance = instance.__dict__.get("balance")
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields:
+            kwargs["update_fields"] = {*update_fields, "updated_at"}
+        # Изменение баланса записывается в журнал тарифных единиц сигналом
+        # post_save (booking.tariff_unit_ledger) в одной транзакции с абонементом.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.client} - {self.scenario} ({self.balance} ед.)"
 
@@ -378,6 +403,21 @@ class Reservation(models.Model):
         null=True,
         blank=True,
     )
+    # Денормализованные суммы платежей, ведутся booking.payment_totals.
+    paid_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text="Сумма неотменённых платежей по брони",
+        verbose_name="Оплачено",
+    )
+    paid_tariff_units_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text="Сумма неотменённых платежей тарифными единицами",
+        verbose_name="Оплачено тарифными единицами",
+    )
     created_at = models.DateTimeField(
         auto_now_add=True, help_text="Дата создания брони", verbose_name="Создана"
     )
@@ -389,6 +429,54 @@ class Reservation(models.Model):
         db_table = "reservations"
         verbose_name = "Бронь"
         verbose_name_plural = "Брони"
+        indexes = [
+            # Поиск пересечений по комнате: room = X AND end > start AND start < end.
+            # Диапазон берётся по datetimeend: прошлые брони (вся история) отсекаются
+            # индексом, и сканируются только брони, заканчивающиеся после начала.
+            models.Index(
+                fields=["room", "datetimeend", "datetimestart"],
+                name="reservation_room_period_idx",
+            ),
+            # Поиск пересечений и занятости по специалисту (тот же принцип).
+            models.Index(
+                fields=["specialist", "datetimeend", "datetimestart"],
+                name="reservation_spec_period_idx",
+            ),
+            # Инкрементальная синхронизация сетки: брони, изменённые после курсора.
+            models.Index(fields=["updated_at"], name="reservation_updated_at_idx"),
+            # Keyset-пагинация списка API: ORDER BY datetimestart, id — целиком и
+            # с фильтром по комнате или специалисту.
+            models.Index(
+                fields=["datetimestart", "id"], name="reservation_start_id_idx"
+            ),
+            models.Index(
+                fields=["room", "datetimestart", "id"],
+                name="reservation_room_start_idx",
+            ),
+            models.Index(
+                fields=["specialist", "datetimestart", "id"],
+                name="reservation_spec_start_idx",
+            ),
+        ]
+
+    # Поля, которые пишет только booking.payment_totals (UPDATE с F()).
+    PAYMENT_TOTAL_FIELDS = ("paid_amount", "paid_tariff_units_amount")
+
+    def save(self, *args, **kwargs):
+        # Обычное сохранение существующей брони не перезаписывает суммы платежей:
+        # иначе копия брони, загруженная до нового платежа, затёрла бы его.
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            skipped = set(self.PAYMENT_TOTAL_FIELDS) | self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
 
 
 class Scenario(models.Model):
@@ -828,6 +916,15 @@ class Client(models.Model):
         blank=False,
         unique=True,
     )
+    phone_normalized = models.CharField(
+        max_length=150,
+        help_text="Телефон без оформления: ключ поиска и проверки дубликатов",
+        verbose_name="Нормализованный телефон",
+        blank=True,
+        default="",
+        editable=False,
+        db_index=True,
+    )
     email = models.EmailField(
         max_length=150,
         help_text="Email клиента",
@@ -842,18 +939,44 @@ class Client(models.Model):
         verbose_name="Группы клиента",
         help_text="Группы, в которые входит клиент",
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        help_text="Дата обновления клиента или его групп",
+        verbose_name="Обновлён",
+    )
 
     class Meta:
         db_table = "clients"
         verbose_name = "Клиент"
         verbose_name_plural = "Клиенты"
+        indexes = [
+            # Список клиентов по имени и поиск по его началу (client_search).
+            models.Index(fields=["name", "id"], name="client_name_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Ключ телефона заполняется при каждом сохранении; bulk_create и
+        # QuerySet.update его не пересчитывают.
+        self.phone_normalized = phone_key(self.phone)
+        update_fields = kwargs.get("update_fields")
+        if update_fields:
+            update_fields = {*update_fields, "updated_at"}
+            if "phone" in update_fields:
+                update_fields.add("phone_normalized")
+            kwargs["update_fields"] = update_fields
+        super().save(*args, **kwargs)
+
     @property
     def rating(self):
         """Возвращает средний рейтинг клиента"""
+        try:
+            return self.summary.rating_avg
+        except ClientSummary.DoesNotExist:
+            pass
         ratings = self.clientrating_set.all()
         if ratings.exists():
             return ratings.aggregate(models.Avg("rating"))["rating__avg"]
@@ -1138,7 +1261,10 @@ class Payment(models.Model):
         auto_now_add=True, help_text="Дата создания платежа", verbose_name="Создан"
     )
     updated_at = models.DateTimeField(
-        auto_now=True, help_text="Дата обновления платежа", verbose_name="Обновлён"
+        auto_now=True,
+        db_index=True,
+        help_text="Дата обновления платежа",
+        verbose_name="Обновлён",
     )
     comment = models.TextField(
         help_text="Комментарий к платежу",
@@ -1157,5 +1283,469 @@ class Payment(models.Model):
         verbose_name = "Платёж"
         verbose_name_plural = "Платежи"
 
+    def save(self, *args, **kwargs):
+        # Суммы платежей брони обновляются сигналом post_save
+        # (booking.payment_totals) в одной транзакции с платежом.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         return f"Платёж {self.id} для брони {self.reservation.id}"
+
+
+class IdSequence(models.Model):
+    """Счётчик идентификаторов для моделей с ручным целочисленным первичным ключом.
+
+    Хранит последний выданный ID для таблицы. Используется `booking.id_allocator`
+    вместо `Max("id") + 1`.
+    """
+
+    name = models.CharField(
+        primary_key=True,
+        max_length=100,
+        help_text="Имя таблицы (db_table) модели",
+        verbose_name="Таблица",
+    )
+    last_value = models.BigIntegerField(
+        default=0,
+        help_text="Последний выданный идентификатор",
+        verbose_name="Последний ID",
+    )
+
+    class Meta:
+        db_table = "id_sequences"
+        verbose_name = "Последовательность ID"
+        verbose_name_plural = "Последовательности ID"
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+
+class DataVersion(models.Model):
+    """Версия набора данных для инвалидации кэшей.
+
+    Счётчик увеличивается сигналами при изменении данных, входящих в набор
+    (см. `booking.data_versions`). Кэши и HTTP-ответы ключуются номером версии.
+    """
+
+    name = models.CharField(
+        primary_key=True,
+        max_length=100,
+        help_text="Имя набора данных",
+        verbose_name="Набор данных",
+    )
+    version = models.BigIntegerField(
+        default=0,
+        help_text="Текущий номер версии",
+        verbose_name="Версия",
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Когда версия менялась последний раз",
+        verbose_name="Изменена",
+    )
+
+    class Meta:
+        db_table = "data_versions"
+        verbose_name = "Версия данных"
+        verbose_name_plural = "Версии данных"
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
+
+
+class ReservationTombstone(models.Model):
+    """Отметка об удалённой брони для инкрементальной синхронизации сетки.
+
+    Удалённая строка брони пропадает из выборки по `updated_at`, поэтому факт
+    удаления хранится отдельно (см. `booking.calendar_feed.bookings_delta`).
+    Старые отметки удаляются по истечении срока хранения.
+    """
+
+    reservation_id = models.IntegerField(
+        primary_key=True,
+        help_text="ID удалённой брони",
+        verbose_name="Бронь",
+    )
+    deleted_at = models.DateTimeField(
+        db_index=True,
+        help_text="Время удаления брони",
+        verbose_name="Удалена",
+    )
+
+    class Meta:
+        db_table = "reservation_tombstones"
+        verbose_name = "Удалённая бронь"
+        verbose_name_plural = "Удалённые брони"
+
+    def __str__(self):
+        return f"{self.reservation_id}: {self.deleted_at}"
+
+
+class LiveEvent(models.Model):
+    """Событие брони для живого обновления календаря.
+
+    Хранилище `booking.live_events.DatabaseBroker`: события видны всем процессам
+    приложения и удаляются по истечении срока хранения.
+    """
+
+    created_at = models.DateTimeField(
+        db_index=True,
+        help_text="Время публикации события",
+        verbose_name="Создано",
+    )
+    payload = models.JSONField(
+        help_text="Данные события",
+        verbose_name="Данные",
+    )
+
+    class Meta:
+        db_table = "live_events"
+        verbose_name = "Событие календаря"
+        verbose_name_plural = "События календаря"
+
+    def __str__(self):
+        return f"{self.id}: {self.payload.get('type')}"
+
+
+class ClientSummary(models.Model):
+    """Сводка по клиенту для списков клиентов.
+
+    Проекция оценок, абонементов и групп клиента: средняя оценка, число оценок,
+    балансы абонементов по сценариям и ID групп. Поддерживается сигналами
+    (см. `booking.client_summary`), пересобирается командой
+    `rebuild_client_summaries`.
+    """
+
+    client = models.OneToOneField(
+        "Client",
+        on_delete=CASCADE,
+        primary_key=True,
+        related_name="summary",
+        help_text="ID клиента",
+        verbose_name="Клиент",
+    )
+    rating_avg = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Средняя оценка клиента",
+        verbose_name="Средняя оценка",
+    )
+    rating_count = models.IntegerField(
+        default=0,
+        help_text="Количество оценок клиента",
+        verbose_name="Количество оценок",
+    )
+    balances = models.JSONField(
+        default=dict,
+        help_text="Балансы тарифных единиц по сценариям: {ID сценария: баланс}",
+        verbose_name="Балансы абонементов",
+    )
+    group_ids = models.JSONField(
+        default=list,
+        help_text="ID групп, в которые входит клиент",
+        verbose_name="Группы клиента",
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Время последнего пересчёта",
+        verbose_name="Пересчитано",
+    )
+
+    class Meta:
+        db_table = "client_summaries"
+        verbose_name = "Сводка по клиенту"
+        verbose_name_plural = "Сводки по клиентам"
+
+    def __str__(self):
+        return f"Сводка: {self.client_id}"
+
+
+class SpecialistDaySchedule(models.Model):
+    """Рабочее время специалиста на дату для сценария.
+
+    Проекция weekly-интервалов и override-ов на скользящий горизонт дат
+    (см. `booking.specialist_schedule`): правила приоритета override/weekly и
+    fallback по сценарию уже применены, интервалы объединены. Строка со
+    scenario=NULL — расписание без учёта сценария.
+    """
+
+    specialist = models.ForeignKey(
+        "Specialist",
+        on_delete=CASCADE,
+        related_name="day_schedules",
+        help_text="ID специалиста",
+        verbose_name="Специалист",
+    )
+    date = models.DateField(
+        help_text="Дата",
+        verbose_name="Дата",
+    )
+    scenario = models.ForeignKey(
+        "Scenario",
+        on_delete=CASCADE,
+        null=True,
+        blank=True,
+        related_name="specialist_day_schedules",
+        help_text="Сценарий (пусто — без учёта сценария)",
+        verbose_name="Сценарий",
+    )
+    restricted = models.BooleanField(
+        help_text="Ограничивает ли расписание доступность специалиста",
+        verbose_name="Есть расписание",
+    )
+    intervals = models.JSONField(
+        default=list,
+        help_text="Рабочие интервалы в минутах от полуночи: [[начало, конец], ...]",
+        verbose_name="Рабочие интервалы",
+    )
+
+    class Meta:
+        db_table = "specialist_day_schedules"
+        verbose_name = "Расписание специалиста на дату"
+        verbose_name_plural = "Расписания специалистов на даты"
+        unique_together = ("specialist", "date", "scenario")
+        indexes = [models.Index(fields=["date", "scenario"])]
+
+    def __str__(self):
+        return f"{self.specialist_id} — {self.date} [{self.scenario_id}]"
+
+
+class RoomDayOccupancy(models.Model):
+    """Занятость помещения на дату в 15-минутных слотах (см. booking.room_occupancy)"""
+
+    room = models.ForeignKey(
+        "Room",
+        on_delete=CASCADE,
+        related_name="occupancy_days",
+        help_text="ID помещения",
+        verbose_name="Помещение",
+    )
+    date = models.DateField(
+        help_text="Дата (локальная)",
+        verbose_name="Дата",
+    )
+    slots = models.BinaryField(
+        max_length=12,
+        help_text="96 бит занятости слотов по 15 минут, младший бит — 00:00",
+        verbose_name="Занятые слоты",
+    )
+    aligned = models.BooleanField(
+        default=True,
+        help_text="Все активные брони даты начинаются и заканчиваются на границе слота",
+        verbose_name="Брони выровнены по слотам",
+    )
+
+    class Meta:
+        db_table = "room_day_occupancy"
+        verbose_name = "Занятость помещения на дату"
+        verbose_name_plural = "Занятость помещений по датам"
+        unique_together = ("room", "date")
+        indexes = [models.Index(fields=["date"])]
+
+    def __str__(self):
+        return f"{self.room_id} — {self.date}"
+
+
+class OutboxMessage(models.Model):
+    """Исходящее сообщение во внешнюю систему (см. booking.outbox).
+
+    Пишется в той же транзакции, что и изменение, о котором сообщает, и
+    доставляется фоновым диспетчером (`dispatch_outbox`) с повторами.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_DELIVERED = "delivered"
+    STATUS_DEAD = "dead"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Ожидает доставки"),
+        (STATUS_DELIVERED, "Доставлено"),
+        (STATUS_DEAD, "Не доставлено"),
+    )
+
+    topic = models.CharField(
+        max_length=50,
+        help_text="Тип сообщения (получатель)",
+        verbose_name="Тип",
+    )
+    idempotency_key = models.CharField(
+        max_length=150,
+        unique=True,
+        help_text="Ключ идемпотентности: повторная постановка и повторная "
+        "доставка одного сообщения не создают дублей",
+        verbose_name="Ключ идемпотентности",
+    )
+    payload = models.JSONField(
+        help_text="Тело сообщения",
+        verbose_name="Данные",
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        help_text="Состояние доставки",
+        verbose_name="Статус",
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Количество попыток доставки",
+        verbose_name="Попыток",
+    )
+    next_attempt_at = models.DateTimeField(
+        help_text="Не раньше этого времени будет следующая попытка",
+        verbose_name="Следующая попытка",
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Сообщение взято диспетчером до этого времени",
+        verbose_name="Взято до",
+    )
+    lease = models.CharField(
+        max_length=32,
+        blank=True,
+        default="",
+        help_text="Метка диспетчера, взявшего сообщение",
+        verbose_name="Метка диспетчера",
+    )
+    last_error = models.TextField(
+        blank=True,
+        default="",
+        help_text="Ошибка последней попытки",
+        verbose_name="Последняя ошибка",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Время постановки в очередь",
+        verbose_name="Создано",
+    )
+    delivered_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Время успешной доставки",
+        verbose_name="Доставлено",
+    )
+
+    class Meta:
+        db_table = "outbox_messages"
+        verbose_name = "Исходящее сообщение"
+        verbose_name_plural = "Исходящие сообщения"
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.topic} {self.idempotency_key} ({self.status})"
+
+
+class TariffUnitLedger(models.Model):
+    """Движение тарифных единиц абонемента (см. booking.tariff_unit_ledger).
+
+    Журнал только пополняется: `Subscription.balance` — сумма `units` всех
+    записей абонемента.
+    """
+
+    KIND_CREDIT = "credit"
+    KIND_DEBIT = "debit"
+    KIND_ADJUSTMENT = "adjustment"
+    KIND_CHOICES = (
+        (KIND_CREDIT, "Начисление"),
+        (KIND_DEBIT, "Списание"),
+        (KIND_ADJUSTMENT, "Корректировка баланса"),
+    )
+
+    subscription = models.ForeignKey(
+        "Subscription",
+        on_delete=CASCADE,
+        related_name="ledger_entries",
+        help_text="Абонемент",
+        verbose_name="Абонемент",
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES,
+        help_text="Вид движения",
+        verbose_name="Вид",
+    )
+    units = models.IntegerField(
+        help_text="Изменение баланса в тарифных единицах (списание — меньше нуля)",
+        verbose_name="Единиц",
+    )
+    reservation = models.ForeignKey(
+        "Reservation",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="tariff_unit_entries",
+        help_text="Бронь, за которую списаны или возвращены единицы",
+        verbose_name="Бронь",
+    )
+    payment = models.ForeignKey(
+        "Payment",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="tariff_unit_entries",
+        help_text="Платёж тарифными единицами или его возврат",
+        verbose_name="Платёж",
+    )
+    comment = models.TextField(
+        blank=True,
+        default="",
+        help_text="Комментарий к движению",
+        verbose_name="Комментарий",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Время движения",
+        verbose_name="Создано",
+    )
+
+    class Meta:
+        db_table = "tariff_unit_ledger"
+        verbose_name = "Движение тарифных единиц"
+        verbose_name_plural = "Журнал тарифных единиц"
+        indexes = [
+            models.Index(
+                fields=["subscription", "created_at"],
+                name="tariff_unit_ledger_sub_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.subscription_id}: {self.units:+d} ({self.kind})"
+
+
+class TariffUnitBalanceSnapshot(models.Model):
+    """Баланс абонемента на момент времени (см. booking.tariff_unit_ledger).
+
+    Баланс на любую дату — ближайший снимок не позже неё плюс движения между
+    ними, без суммирования журнала с начала.
+    """
+
+    subscription = models.ForeignKey(
+        "Subscription",
+        on_delete=CASCADE,
+        related_name="balance_snapshots",
+        help_text="Абонемент",
+        verbose_name="Абонемент",
+    )
+    taken_at = models.DateTimeField(
+        help_text="Баланс учитывает движения не позже этого времени",
+        verbose_name="На момент",
+    )
+    balance = models.IntegerField(
+        help_text="Баланс тарифных единиц на момент снимка",
+        verbose_name="Баланс",
+    )
+
+    class Meta:
+        db_table = "tariff_unit_balance_snapshots"
+        verbose_name = "Снимок баланса тарифных единиц"
+        verbose_name_plural = "Снимки балансов тарифных единиц"
+        unique_together = ("subscription", "taken_at")
+
+    def __str__(self):
+        return f"{self.subscription_id} на {self.taken_at}: {self.balance}"
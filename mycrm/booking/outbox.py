@@ -0,0 +1,318 @@
+"""Исходящие сообщения во внешние системы (transactional outbox).
+
+Сообщение (`OutboxMessage`) записывается в той же транзакции, что и изменение,
+о котором оно сообщает: откат транзакции отменяет и сообщение, а запрос
+пользователя не ждёт внешний сервис. Доставляет сообщения фоновый диспетчер —
+команда `dispatch_outbox`:
+
+* берёт пачку созревших сообщений (`claim`) под аренду: каждое помечается
+  меткой диспетчера и временем `locked_until`, поэтому несколько диспетчеров
+  не отправят одно сообщение одновременно, а сообщения упавшего диспетчера
+  после истечения аренды заберёт другой;
+* отправляет пачку по одному соединению (keep-alive);
+* 2xx — доставлено; 4xx (кроме 408, 425 и 429) — ошибка данных, сообщение сразу
+  уходит в «мёртвые»; остальные ошибки и сбои сети — повтор с
+  экспоненциальной задержкой (`backoff_seconds`), после OUTBOX_MAX_ATTEMPTS
+  попыток — в «мёртвые». Мёртвые сообщения возвращает в очередь
+  `dispatch_outbox --requeue-dead`.
+
+Ключ идемпотентности сообщения уникален (повторная постановка не создаёт
+дубль) и передаётся получателю в заголовке `Idempotency-Key`, чтобы повтор
+после потерянного ответа не выполнялся дважды.
+
+Получатели описаны в `topics()`; сейчас это `approve_booking` — подтверждение
+брони, созданной через API, во внешнем каталоге (APPROVE_BOOKING_URL).
+Журнал доставки пишется в `booking.api.booking_integration_logging`.
+"""
+
+import base64
+import http.client
+import json
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .api.booking_integration_logging import logger
+from .models import OutboxMessage
+
+APPROVE_BOOKING = "approve_booking"
+
+DEFAULT_APPROVE_BOOKING_URL = (
+    "https://repa.plavno.io:8443/~api/json/catalog.crm/approveBooking"
+)
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 10
+DEFAULT_BACKOFF_BASE_SECONDS = 10
+DEFAULT_BACKOFF_MAX_SECONDS = 60 * 60
+DEFAULT_TIMEOUT_SECONDS = 5
+DEFAULT_LEASE_SECONDS = 120
+
+# Коды 4xx, после которых имеет смысл повторить запрос.
+RETRYABLE_CLIENT_ERRORS = (408, 425, 429)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+@dataclass
+class Topic:
+    """Получатель сообщений: адрес и (опционально) Basic-авторизация."""
+
+    url: str
+    username: str = ""
+    password: str = ""
+
+
+def topics() -> dict[str, Topic]:
+    return {
+        APPROVE_BOOKING: Topic(
+            url=_setting("APPROVE_BOOKING_URL", DEFAULT_APPROVE_BOOKING_URL),
+            username=_setting("APPROVE_BOOKING_USERNAME", "x4"),
+            password=_setting("APPROVE_BOOKING_PASSWORD", "x4"),
+        ),
+    }
+
+
+def enqueue(topic: str, idempotency_key: str, payload: dict, using="default"):
+    """Ставит сообщение в очередь в текущей транзакции.
+
+    Повторный вызов с тем же ключом возвращает уже поставленное сообщение.
+    """
+    try:
+        with transaction.atomic(using=using):
+            return OutboxMessage.objects.using(using).create(
+                topic=topic,
+                idempotency_key=idempotency_key,
+                payload=payload,
+                next_attempt_at=timezone.now(),
+            )
+    except IntegrityError:
+        return OutboxMessage.objects.using(using).get(idempotency_key=idempotency_key)
+
+
+def approve_booking(reservation_id, using="default"):
+    """Сообщение внешнему каталогу о брони, созданной через API."""
+    return enqueue(
+        APPROVE_BOOKING,
+        f"approveBooking:{reservation_id}",
+        {"id": str(reservation_id)},
+        using=using,
+    )
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Задержка перед попыткой номер `attempts + 1`: экспонента с разбросом.
+
+    base × 2^(attempts−1), не больше OUTBOX_BACKOFF_MAX_SECONDS; фактическая
+    задержка — случайная в верхней половине этого значения, чтобы после сбоя
+    получателя повторы не шли одной волной.
+    """
+    base = _setting("OUTBOX_BACKOFF_BASE_SECONDS", DEFAULT_BACKOFF_BASE_SECONDS)
+    cap = _setting("OUTBOX_BACKOFF_MAX_SECONDS", DEFAULT_BACKOFF_MAX_SECONDS)
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim(batch_size: int, now=None, using="default") -> list[OutboxMessage]:
+    """Берёт под аренду до `batch_size` созревших сообщений."""
+    now = now or timezone.now()
+    due = OutboxMessage.objects.using(using).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        status=OutboxMessage.STATUS_PENDING,
+        next_attempt_at__lte=now,
+    )
+    ids = list(
+        due.order_by("next_attempt_at", "id").values_list("id", flat=True)[
+            :batch_size
+        ]
+    )
+    if not ids:
+        return []
+    lease = uuid.uuid4().hex
+    lease_seconds = _setting("OUTBOX_LEASE_SECONDS", DEFAULT_LEASE_SECONDS)
+    # Условие повторяется в UPDATE: сообщение, которое успел взять другой
+    # диспетчер, не перехватывается.
+    due.filter(id__in=ids).update(
+        lease=lease, locked_until=now + timedelta(seconds=lease_seconds)
+    )
+    return list(
+        OutboxMessage.objects.using(using)
+        .filter(lease=lease)
+        .order_by("next_attempt_at", "id")
+    )
+
+
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+class _Connections:
+    """HTTP-соединения пачки: одно на хост, переиспользуются между сообщениями."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._connections = {}
+
+    def post(self, url: str, body: bytes, headers: dict) -> tuple[int, str]:
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        while True:
+            connection = self._connections.get(key)
+            reused = connection is not None
+            if connection is None:
+                factory = (
+                    http.client.HTTPSConnection
+                    if parts.scheme == "https"
+                    else http.client.HTTPConnection
+                )
+                connection = factory(parts.netloc, timeout=self.timeout)
+                self._connections[key] = connection
+            try:
+                connection.request("POST", path, body=body, headers=headers)
+                response = connection.getresponse()
+                return response.status, response.read().decode("utf-8", "replace")
+            except Exception as e:
+                self._drop(key)
+                # Сервер закрыл keep-alive соединение — повтор на новом.
+                if not (reused and isinstance(e, _STALE_CONNECTION_ERRORS)):
+                    raise
+
+    def _drop(self, key):
+        connection = self._connections.pop(key, None)
+        if connection is not None:
+            connection.close()
+
+    def close(self):
+        for key in list(self._connections):
+            self._drop(key)
+
+
+def _deliver(connections, topic: Topic, message: OutboxMessage) -> tuple[int, str]:
+    headers = {
+        "Content-Type": "application/json",
+        "Idempotency-Key": message.idempotency_key,
+    }
+    if topic.username:
+        credentials = f"{topic.username}:{topic.password}".encode()
+        headers["Authorization"] = "Basic " + base64.b64encode(credentials).decode()
+    body = json.dumps(message.payload).encode()
+    return connections.post(topic.url, body, headers)
+
+
+def _finish(message: OutboxMessage, using, **fields) -> None:
+    # Запись только если аренда всё ещё наша.
+    OutboxMessage.objects.using(using).filter(
+        id=message.id, lease=message.lease
+    ).update(lease="", locked_until=None, **fields)
+
+
+def dispatch(batch_size=None, using="default") -> dict[str, int]:
+    """Одна пачка доставки; возвращает счётчики delivered/retried/dead."""
+    batch_size = batch_size or _setting("OUTBOX_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    max_attempts = _setting("OUTBOX_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)
+    counts = {"delivered": 0, "retried": 0, "dead": 0}
+    messages = claim(batch_size, using=using)
+    if not messages:
+        return counts
+
+    known = topics()
+    connections = _Connections(
+        _setting("OUTBOX_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS)
+    )
+    try:
+        for message in messages:
+            attempts = message.attempts + 1
+            topic = known.get(message.topic)
+            retryable = True
+            if topic is None:
+                error, retryable = f"Неизвестный тип сообщения {message.topic}", False
+            else:
+                logger.info(
+                    f"Отправляю {message.topic}: url={topic.url}, "
+                    f"key={message.idempotency_key}, payload={message.payload}, "
+                    f"попытка {attempts}"
+                )
+                try:
+                    status, text = _deliver(connections, topic, message)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                else:
+                    logger.info(
+                        f"Ответ {message.topic}: key={message.idempotency_key}, "
+                        f"status={status}, text={text[:500]}"
+                    )
+                    if 200 <= status < 300:
+                        _finish(
+                            message,
+                            using,
+                            status=OutboxMessage.STATUS_DELIVERED,
+                            attempts=attempts,
+                            delivered_at=timezone.now(),
+                            last_error="",
+                        )
+                        counts["delivered"] += 1
+                        continue
+                    error = f"HTTP {status}: {text[:500]}"
+                    retryable = not (
+                        400 <= status < 500 and status not in RETRYABLE_CLIENT_ERRORS
+                    )
+
+            if retryable and attempts < max_attempts:
+                delay = backoff_seconds(attempts)
+                logger.warning(
+                    f"Ошибка {message.topic}: key={message.idempotency_key}, "
+                    f"{error}; повтор через {delay:.0f} с"
+                )
+                _finish(
+                    message,
+                    using,
+                    attempts=attempts,
+                    next_attempt_at=timezone.now() + timedelta(seconds=delay),
+                    last_error=error,
+                )
+                counts["retried"] += 1
+            else:
+                logger.error(
+                    f"Сообщение {message.topic} не доставлено: "
+                    f"key={message.idempotency_key}, попыток {attempts}, {error}"
+                )
+                _finish(
+                    message,
+                    using,
+                    status=OutboxMessage.STATUS_DEAD,
+                    attempts=attempts,
+                    last_error=error,
+                )
+                counts["dead"] += 1
+    finally:
+        connections.close()
+    return counts
+
+
+def requeue_dead(using="default") -> int:
+    """Возвращает мёртвые сообщения в очередь с обнулённым счётчиком попыток."""
+    return (
+        OutboxMessage.objects.using(using)
+        .filter(status=OutboxMessage.STATUS_DEAD)
+        .update(
+            status=OutboxMessage.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            lease="",
+            locked_until=None,
+        )
+    )
@@ -0,0 +1,179 @@
+"""Денормализованные суммы платежей брони.
+
+`Reservation.paid_amount` — сумма неотменённых платежей брони,
+`Reservation.paid_tariff_units_amount` — та же сумма только по платежам типа
+«Тарифные единицы». Календарь и карточка брони читают их без агрегатов по
+`Payment`.
+
+Суммы ведутся сигналами `Payment` (`connect_signals`): при сохранении или
+удалении платежа вклад его прежнего (`booking.model_state`) и нового
+состояния переносится в бронь
+одним `UPDATE ... SET paid_amount = paid_amount + delta` в той же транзакции,
+что и сам платёж. Прежнее состояние читается с блокировкой строки платежа:
+параллельные правки одного платежа выполняются по очереди, и вторая видит
+результат первой. Тип оплаты «Тарифные единицы» определяется по справочнику в
+памяти (`booking.reference_data`), без запроса на каждое сохранение.
+Расхождения (правки в обход моделей, `QuerySet.update`) находит и исправляет
+команда `verify_payment_totals`.
+"""
+
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Abs, Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from . import model_state, reference_data
+from .models import Payment, PaymentType, Reservation
+
+TARIFF_UNITS_PAYMENT_TYPE = "Тарифные единицы"
+
+ZERO = Decimal("0")
+TOLERANCE = Decimal("0.005")
+
+# Поля платежа, от которых зависят суммы брони.
+STATE_FIELDS = ("reservation_id", "amount", "canceled", "payment_type_id")
+
+
+def payment_state(values: dict | None) -> tuple | None:
+    """Состояние платежа, от которого зависят суммы брони, по значениям полей."""
+    if not values or "reservation_id" not in values or "amount" not in values:
+        return None
+    return (
+        values["reservation_id"],
+        values["amount"],
+        values.get("canceled", False),
+        values.get("payment_type_id"),
+    )
+
+
+def _is_tariff_units(payment_type_id) -> bool:
+    if payment_type_id is None:
+        return False
+    try:
+        payment_type = reference_data.get(PaymentType, id=payment_type_id)
+    except PaymentType.DoesNotExist:
+        return False
+    return payment_type.name == TARIFF_UNITS_PAYMENT_TYPE
+
+
+def _contribution(state) -> tuple[Decimal, Decimal]:
+    """Вклад платежа в (paid_amount, paid_tariff_units_amount)."""
+    if state is None:
+        return ZERO, ZERO
+    _, amount, canceled, payment_type_id = state
+    if canceled or amount is None:
+        return ZERO, ZERO
+    amount = Decimal(str(amount))
+    tariff_units = amount if _is_tariff_units(payment_type_id) else ZERO
+    return amount, tariff_units
+
+
+def apply_payment_change(old_state, new_state, using: str = "default") -> None:
+    """Переносит изменение платежа в суммы брони (или двух броней при переносе)."""
+    deltas: dict[int, list[Decimal]] = {}
+    for state, sign in ((old_state, -1), (new_state, 1)):
+        if state is None or state[0] is None:
+            continue
+        paid, tariff_units = _contribution(state)
+        delta = deltas.setdefault(state[0], [ZERO, ZERO])
+        delta[0] += sign * paid
+        delta[1] += sign * tariff_units
+
+    now = timezone.now()
+    for reservation_id, (paid, tariff_units) in deltas.items():
+        # updated_at меняется и при нулевой дельте: изменение платежа должно
+        # попасть в инкрементальную синхронизацию сетки.
+        Reservation.objects.using(using).filter(pk=reservation_id).update(
+            paid_amount=F("paid_amount") + paid,
+            paid_tariff_units_amount=F("paid_tariff_units_amount") + tariff_units,
+            updated_at=now,
+        )
+
+
+def _total_subquery(extra: Q | None = None):
+    payments = Payment.objects.filter(reservation=OuterRef("pk"), canceled=False)
+    if extra is not None:
+        payments = payments.filter(extra)
+    money = DecimalField(max_digits=10, decimal_places=2)
+    return Coalesce(
+        Subquery(
+            payments.order_by()
+            .values("reservation")
+            .annotate(total=Sum("amount"))
+            .values("total"),
+            output_field=money,
+        ),
+        Value(ZERO),
+        output_field=money,
+    )
+
+
+def with_actual_totals(queryset):
+    """Аннотирует брони суммами, посчитанными по таблице платежей."""
+    return queryset.annotate(
+        actual_paid_amount=_total_subquery(),
+        actual_paid_tariff_units_amount=_total_subquery(
+            Q(payment_type__name=TARIFF_UNITS_PAYMENT_TYPE)
+        ),
+    )
+
+
+def find_drift(queryset=None):
+    """Брони, у которых сохранённые суммы расходятся с платежами."""
+    queryset = with_actual_totals(
+        queryset if queryset is not None else Reservation.objects.all()
+    )
+    # SQLite хранит десятичные числа как REAL: сравнение с допуском в полкопейки.
+    return queryset.annotate(
+        paid_diff=Abs(F("paid_amount") - F("actual_paid_amount")),
+        tariff_units_diff=Abs(
+            F("paid_tariff_units_amount") - F("actual_paid_tariff_units_amount")
+        ),
+    ).filter(Q(paid_diff__gte=TOLERANCE) | Q(tariff_units_diff__gte=TOLERANCE))
+
+
+def repair(queryset=None) -> int:
+    """Пересчитывает суммы у расходящихся броней; возвращает их количество.
+
+    Одно UPDATE с подзапросами по всем расходящимся броням, без загрузки
+    объектов в память.
+    """
+    drifted_ids = find_drift(queryset).values("pk")
+    # updated_at — чтобы исправление попало в синхронизацию сетки и сменило
+    # ETag ответов API (booking.conditional).
+    return Reservation.objects.filter(pk__in=drifted_ids).update(
+        paid_amount=_total_subquery(),
+        paid_tariff_units_amount=_total_subquery(
+            Q(payment_type__name=TARIFF_UNITS_PAYMENT_TYPE)
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def _update_totals(sender, instance, using, created=False, **kwargs):
+    previous = None if created else model_state.previous(instance)
+    apply_payment_change(
+        payment_state(previous),
+        payment_state(model_state.current(instance)),
+        using=using,
+    )
+
+
+def _remove_totals(sender, instance, using, **kwargs):
+    # Удалённая строка, прочитанная с блокировкой перед удалением.
+    apply_payment_change(
+        payment_state(model_state.previous(instance)), None, using=using
+    )
+
+
+def connect_signals() -> None:
+    """Подключает ведение сумм к сигналам `Payment` (из `booking.signals`)."""
+    model_state.track(Payment, *STATE_FIELDS, lock=True)
+    post_save.connect(
+        _update_totals, sender=Payment, dispatch_uid="payment_totals_save"
+    )
+    post_delete.connect(
+        _remove_totals, sender=Payment, dispatch_uid="payment_totals_delete"
+    )
@@ -0,0 +1,27 @@
+"""Нормализация телефонов клиентов."""
+
+import re
+
+
+def normalize_phone(value):
+    """Нормализует телефон к формату +375XXXXXXXXX"""
+    if not value:
+        return None
+    digits = re.sub(r"\D", "", value)
+    if digits.startswith("375") and len(digits) == 12:
+        return "+" + digits
+    return None
+
+
+def phone_key(value) -> str:
+    """Ключ телефона для поиска и проверки дубликатов (`Client.phone_normalized`).
+
+    Белорусский номер — как у `normalize_phone`; прочие — «+» и все цифры,
+    чтобы номера, записанные с пробелами и скобками, совпадали с набранными
+    слитно. Пустая строка — в номере нет цифр.
+    """
+    normalized = normalize_phone(value)
+    if normalized:
+        return normalized
+    digits = re.sub(r"\D", "", value or "")
+    return "+" + digits if digits else ""
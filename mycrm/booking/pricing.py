@@ -0,0 +1,209 @@
+"""Расчёт стоимости броней пакетом.
+
+На вход — набор предполагаемых броней (`QuoteRequest`), на выход для каждой —
+`Quote`: услуги и их стоимость, подходящие тарифы и выбранный тариф, стоимость
+аренды, итог и количество тарифных единиц, которое спишет оплата абонементом.
+
+Справочники загружаются один раз на пакет (`PriceBook`): сценарии, услуги и
+тарифные единицы — по запросу на каждый, тарифы — из индекса
+`booking.tariff_index` без запросов. Поэтому цена серии из N броней стоит
+столько же запросов, сколько цена одной.
+
+Правила те же, что и при создании и редактировании брони:
+
+- сценарии с обязательным тарифом: аренда = стоимость тарифа × длительность /
+  базовая длительность тарифа; тариф должен быть активен и подходить брони;
+- остальные сценарии: аренда = число тарифных единиц × стоимость единицы
+  (так считает форма брони);
+- итог = аренда + стоимость услуг; суммы округляются до копеек
+  (`_quantize_money`, ROUND_HALF_UP).
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.utils import timezone
+
+from . import tariff_index
+from .models import Scenario, Service, Tariff, TariffUnit
+
+ZERO = Decimal("0")
+
+TARIFF_REQUIRED_SCENARIOS = {
+    "Репетиционная точка",
+    "Музыкальный класс",
+}
+
+
+def _quantize_money(value: Decimal) -> Decimal:
+    if value is None:
+        return value
+    return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def duration_minutes(start: datetime, end: datetime) -> int:
+    return int((end - start).total_seconds() // 60)
+
+
+def rental_cost(tariff: Tariff, minutes: int) -> Decimal:
+    """Стоимость аренды по тарифу за `minutes` минут."""
+    return _quantize_money(
+        (tariff.base_cost or ZERO)
+        * (Decimal(minutes) / Decimal(max(1, int(tariff.base_duration_minutes))))
+    )
+
+
+def services_cost(services) -> Decimal:
+    return sum((service.cost or ZERO for service in services), ZERO)
+
+
+def unit_minutes(tariff_unit: TariffUnit) -> int:
+    """Размер тарифной единицы в минутах."""
+    size = tariff_unit.min_reservation_time
+    return size.hour * 60 + size.minute
+
+
+def required_units(tariff_unit: TariffUnit | None, minutes: int) -> int:
+    """Сколько целых тарифных единиц занимает бронь длительностью `minutes`."""
+    if tariff_unit is None or unit_minutes(tariff_unit) <= 0:
+        return 0
+    return minutes // unit_minutes(tariff_unit)
+
+
+def _local_hm(value: datetime):
+    """(локальная дата, время без секунд) — так сверяются интервалы тарифов."""
+    local = timezone.localtime(value)
+    return local.date(), local.time().replace(second=0, microsecond=0)
+
+
+@dataclass
+class QuoteRequest:
+    scenario_id: int
+    room_id: int | None
+    start: datetime
+    end: datetime
+    service_ids: list[int] = field(default_factory=list)
+    tariff_id: int | None = None
+    people_count: int | None = None
+
+
+@dataclass
+class Quote:
+    duration_minutes: int
+    services: list[Service]
+    services_cost: Decimal
+    tariff_required: bool
+    # ID подходящих тарифов (только для сценариев с обязательным тарифом).
+    tariff_ids: list[int]
+    # Выбранный тариф, если он подходит брони; объект из индекса тарифов —
+    # только для чтения.
+    tariff: Tariff | None
+    # Почему выбранный тариф не применён (None — применён или не нужен).
+    tariff_error: str | None
+    rental_cost: Decimal | None
+    total_cost: Decimal
+    tariff_unit: TariffUnit | None
+    required_units: int
+
+    def as_dict(self) -> dict:
+        return {
+            "duration_minutes": self.duration_minutes,
+            "services": [
+                {"id": s.id, "name": s.name, "cost": str(s.cost or ZERO)}
+                for s in self.services
+            ],
+            "services_cost": str(self.services_cost),
+            "tariff_required": self.tariff_required,
+            "tariff_ids": self.tariff_ids,
+            "tariff_id": self.tariff.id if self.tariff is not None else None,
+            "tariff_error": self.tariff_error,
+            "rental_cost": (
+                str(self.rental_cost) if self.rental_cost is not None else None
+            ),
+            "total_cost": str(self.total_cost),
+            "tariff_unit_cost": (
+                str(self.tariff_unit.tariff_unit_cost)
+                if self.tariff_unit is not None
+                else None
+            ),
+            "required_units": self.required_units,
+        }
+
+
+class PriceBook:
+    """Справочники, нужные для расчёта пакета броней."""
+
+    def __init__(self, requests):
+        scenario_ids = {r.scenario_id for r in requests}
+        self.scenario_names = dict(
+            Scenario.objects.filter(id__in=scenario_ids).values_list("id", "name")
+        )
+        self.services = Service.objects.in_bulk(
+            {sid for r in requests for sid in r.service_ids}
+        )
+        self.tariff_units = {
+            unit.scenario_id: unit
+            for unit in TariffUnit.objects.filter(scenario_id__in=scenario_ids)
+        }
+        self.tariffs = tariff_index.get_index()
+
+    def tariff_required(self, scenario_id) -> bool:
+        return self.scenario_names.get(scenario_id) in TARIFF_REQUIRED_SCENARIOS
+
+    def quote(self, request: QuoteRequest) -> Quote:
+        minutes = duration_minutes(request.start, request.end)
+        # Дубли схлопываются, как при фильтре id__in.
+        services = [
+            self.services[sid]
+            for sid in sorted(set(request.service_ids))
+            if sid in self.services
+        ]
+        cost_of_services = services_cost(services)
+        tariff_unit = self.tariff_units.get(request.scenario_id)
+        units = required_units(tariff_unit, minutes)
+
+        tariff_required = self.tariff_required(request.scenario_id)
+        tariff_ids, tariff, tariff_error, rental = [], None, None, None
+        if tariff_required:
+            start, end = _local_hm(request.start), _local_hm(request.end)
+            tariff_ids = self.tariffs.tariff_ids(
+                request.scenario_id,
+                request.room_id,
+                start[0].weekday(),
+                start[1],
+                end[1],
+                request.people_count,
+            )
+            if not request.tariff_id:
+                tariff_error = "Выберите тариф"
+            elif request.tariff_id not in tariff_ids:
+                tariff_error = "Выбранный тариф недоступен"
+            else:
+                tariff = self.tariffs.tariffs[request.tariff_id]
+                rental = rental_cost(tariff, minutes)
+        elif tariff_unit is not None:
+            rental = _quantize_money(units * tariff_unit.tariff_unit_cost)
+
+        return Quote(
+            duration_minutes=minutes,
+            services=services,
+            services_cost=cost_of_services,
+            tariff_required=tariff_required,
+            tariff_ids=tariff_ids,
+            tariff=tariff,
+            tariff_error=tariff_error,
+            rental_cost=rental,
+            total_cost=_quantize_money((rental or ZERO) + cost_of_services),
+            tariff_unit=tariff_unit,
+            required_units=units,
+        )
+
+
+def quote_batch(requests) -> list[Quote]:
+    """Цены для пакета броней в порядке запросов."""
+    requests = list(requests)
+    if not requests:
+        return []
+    book = PriceBook(requests)
+    return [book.quote(request) for request in requests]
@@ -0,0 +1,238 @@
+"""Справочники в памяти процесса: статусы, типы оплаты, комнаты и т.п.
+
+Горячие пути (создание и отмена брони, запись платежей) раз за разом читают
+одни и те же строки маленьких, почти не меняющихся таблиц. Реестр загружает
+каждую таблицу из `MODELS` целиком при первом обращении к ней (один запрос)
+и дальше отвечает на `get` и `filter` по равенству полей без запросов к БД.
+
+Объекты справочников общие для всех запросов процесса: их можно передавать
+в связи (`booking.status = ...`) и читать, но не изменять и не сохранять.
+Связи читаются как обычно (запросом); у комнат помещение загружено сразу.
+
+Реестр живёт в памяти процесса (`booking.versioned_cache`). Сигналы
+(`booking.signals`) на моделях из `MODELS` сбрасывают реестр текущего процесса
+и увеличивают версию набора `reference` (`booking.data_versions`) — так же при
+сохранении из админки. Другие процессы сверяют версию не чаще раза в
+REFERENCE_DATA_CHECK_SECONDS секунд (по умолчанию 5; 0 — при каждом обращении)
+и загружают таблицы заново, если она изменилась. Если в загруженной таблице
+ничего не нашлось (строка могла быть добавлена другим процессом до сверки
+версии), `get` и `filter` ищут в БД; найденная там строка сбрасывает реестр.
+
+REFERENCE_DATA_ENABLED = False отключает реестр: каждый вызов идёт в БД, как
+`Model.objects`. Доля ответов без БД — `stats()`.
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.http import Http404
+
+from . import data_versions
+from .models import (
+    Area,
+    CancellationReason,
+    PaymentType,
+    ReservationStatusType,
+    Room,
+    Scenario,
+    ServiceGroup,
+    TariffUnit,
+)
+from .versioned_cache import VersionedCache
+
+MODELS = (
+    Area,
+    CancellationReason,
+    PaymentType,
+    ReservationStatusType,
+    Room,
+    Scenario,
+    ServiceGroup,
+    TariffUnit,
+)
+
+
+def _attname(model, field: str) -> str:
+    """Имя атрибута для поиска: pk/id — ключ, связь — её *_id."""
+    if field == "pk":
+        return model._meta.pk.attname
+    return model._meta.get_field(field).attname
+
+
+def _value(value):
+    """Объект связи сравнивается по ключу (`scenario=booking.scenario`)."""
+    return value.pk if isinstance(value, models.Model) else value
+
+
+class ReferenceData:
+    """Таблицы справочников одной версии; каждая загружается при первом обращении."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._by_pk = {}
+        # Индексы по полям строятся при первом поиске по полю:
+        # (модель, поле) → {значение: [объекты]}.
+        self._indexes = {}
+
+    def rows(self, model) -> list:
+        rows = self._rows.get(model)
+        if rows is None:
+            with self._lock:
+                rows = self._rows.get(model)
+                if rows is None:
+                    rows = self._load(model)
+        return rows
+
+    def _load(self, model) -> list:
+        queryset = model._default_manager.all()
+        if model is Room:
+            queryset = queryset.select_related("area")
+        if not model._meta.ordering:
+            queryset = queryset.order_by("pk")
+        rows = list(queryset)
+        self._by_pk[model] = {row.pk: row for row in rows}
+        self._rows[model] = rows
+        return rows
+
+    def lookup(self, model, **lookup) -> list:
+        """Объекты `model`, у которых все поля из `lookup` равны значениям."""
+        items = [
+            (_attname(model, field), _value(value)) for field, value in lookup.items()
+        ]
+        attname, value = items[0]
+        if attname == model._meta.pk.attname:
+            try:
+                value = model._meta.pk.to_python(value)
+            except ValidationError:
+                # Некорректный ключ: ошибку даст запрос в БД.
+                return []
+            self.rows(model)
+            row = self._by_pk[model].get(value)
+            found = [row] if row is not None else []
+        else:
+            key = (model, attname)
+            index = self._indexes.get(key)
+            if index is None:
+                index = {}
+                for row in self.rows(model):
+                    index.setdefault(getattr(row, attname), []).append(row)
+                self._indexes[key] = index
+            found = index.get(value, [])
+        for attname, value in items[1:]:
+            found = [row for row in found if getattr(row, attname) == value]
+        return found
+
+
+_cache = VersionedCache(
+    data_versions.REFERENCE, ReferenceData, "REFERENCE_DATA_CHECK_SECONDS"
+)
+# Счётчики обращений с момента запуска процесса (или reset_stats).
+_hits = 0
+_misses = 0
+
+
+def enabled() -> bool:
+    return getattr(settings, "REFERENCE_DATA_ENABLED", True)
+
+
+def get_registry() -> ReferenceData:
+    """Актуальный реестр процесса; загружается при первом обращении и смене версии."""
+    return _cache.get()
+
+
+def _count(hit: bool) -> None:
+    global _hits, _misses
+    if hit:
+        _hits += 1
+    else:
+        _misses += 1
+
+
+def _check(model) -> None:
+    if model not in MODELS:
+        raise ValueError(f"{model.__name__} не входит в справочники")
+
+
+def get(model, **lookup):
+    """Единственный объект `model` по равенству полей, как `Model.objects.get`.
+
+    Нет строки — `model.DoesNotExist`, несколько — `MultipleObjectsReturned`.
+    """
+    _check(model)
+    if enabled():
+        found = get_registry().lookup(model, **lookup)
+        if len(found) == 1:
+            _count(True)
+            return found[0]
+        if len(found) > 1:
+            _count(True)
+            raise model.MultipleObjectsReturned(
+                f"get() returned more than one {model.__name__}"
+            )
+    _count(False)
+    row = model._default_manager.get(**lookup)
+    if enabled():
+        # Строки нет в реестре: он загружен до её добавления другим процессом.
+        invalidate()
+    return row
+
+
+def get_or_404(model, **lookup):
+    """`get`, но отсутствие строки — Http404, как у `get_object_or_404`."""
+    try:
+        return get(model, **lookup)
+    except model.DoesNotExist:
+        raise Http404(f"No {model._meta.object_name} matches the given query.")
+
+
+def filter(model, **lookup) -> list:
+    """Объекты `model` с равными полями, в порядке `Meta.ordering` (иначе по pk).
+
+    Без условий — вся таблица.
+    """
+    _check(model)
+    if enabled():
+        registry = get_registry()
+        found = registry.lookup(model, **lookup) if lookup else registry.rows(model)
+        if found:
+            _count(True)
+            return list(found)
+    _count(False)
+    queryset = model._default_manager.filter(**lookup)
+    if not model._meta.ordering:
+        queryset = queryset.order_by("pk")
+    rows = list(queryset)
+    if rows and enabled():
+        # Строк нет в реестре: он загружен до их добавления другим процессом.
+        invalidate()
+    return rows
+
+
+def stats() -> dict:
+    """Обращения процесса к реестру: hits (без БД), misses, loads, hit_rate."""
+    total = _hits + _misses
+    return {
+        "hits": _hits,
+        "misses": _misses,
+        "loads": _cache.builds,
+        "hit_rate": _hits / total if total else 0.0,
+    }
+
+
+def reset_stats() -> None:
+    global _hits, _misses
+    _hits = _misses = 0
+    _cache.builds = 0
+
+
+def invalidate() -> None:
+    """Сбрасывает реестр текущего процесса."""
+    _cache.invalidate()
+
+
+def reference_changed() -> None:
+    """Вызывается сигналами при изменении справочников (в транзакции изменения)."""
+    _cache.changed()
@@ -0,0 +1,43 @@
+"""Сигнал о созданных бронях — общий для post_save и массовой вставки.
+
+`bulk_create` не отправляет post_save, поэтому модули, которые ведут данные по
+новым броням (карты занятости помещений, события живого обновления), слушают не
+post_save, а `reservations_created`. Его отправляет обработчик post_save при
+создании одной брони и `created` после массовой вставки серии: новый модуль,
+подписанный на сигнал, получает брони из обоих путей.
+
+Аргументы сигнала: `sender` — Reservation, `reservations` — список созданных
+броней, `using` — alias БД. Отправляется в транзакции создания.
+"""
+
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+
+from .models import Reservation
+
+reservations_created = Signal()
+
+
+def created(reservations, using: str = "default") -> None:
+    """Сообщает о бронях, созданных без post_save (`bulk_create`)."""
+    reservations = list(reservations)
+    if reservations:
+        reservations_created.send(
+            sender=Reservation, reservations=reservations, using=using
+        )
+
+
+def _created_on_save(sender, instance, created, using, **kwargs):
+    if created:
+        reservations_created.send(
+            sender=Reservation, reservations=[instance], using=using
+        )
+
+
+def connect_signals() -> None:
+    """Отправляет `reservations_created` по post_save брони (из `booking.signals`)."""
+    post_save.connect(
+        _created_on_save,
+        sender=Reservation,
+        dispatch_uid="reservation_signals_created",
+    )
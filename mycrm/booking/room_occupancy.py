@@ -0,0 +1,341 @@
+"""Битовые карты занятости помещений (`RoomDayOccupancy`).
+
+Календарь работает 15-минутными ячейками, поэтому сутки помещения — это 96
+слотов, а занятость — 96-битное число: бит i занят, если активная бронь
+пересекает интервал [i * 15, (i + 1) * 15) минут локального времени. Бронь,
+не выровненная по слотам, занимает все задетые слоты целиком, а строка даты
+помечается `aligned=False`.
+
+Инвариант: строка есть для каждой пары (помещение, дата) с активными бронями;
+нет строки — в этот день помещение свободно. Строки пересчитываются сигналами
+брони (`connect_signals`; новые брони — по `reservations_created`, в том
+числе после массовой вставки серии), сверяются командой
+`verify_room_occupancy` и пересобираются `rebuild_room_occupancy`.
+
+Проверка пересечения сводится к AND масок. Непустое пересечение точно
+означает конфликт, если и запрос, и брони даты выровнены по слотам. Пустое
+означает «свободно» только пока карта согласована с бронями: запись в обход
+сигналов (QuerySet.update, loaddata, SQL) оставляет её устаревшей. Поэтому
+при создании и изменении броней карта лишь быстро отклоняет явный конфликт,
+а разрешает бронь диапазонный запрос по броням; «свободно» по карте
+используется только для чтения (сетка, поиск свободных слотов).
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from . import model_state
+from .reservation_signals import reservations_created
+from .models import Reservation, RoomDayOccupancy
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOT_SECONDS = SLOT_MINUTES * 60
+SLOT_BYTES = SLOTS_PER_DAY // 8
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+# Статусы, при которых бронь не занимает помещение.
+INACTIVE_STATUS_IDS = (4, 1082)
+
+BATCH_SIZE = 2000
+
+
+def to_bytes(mask: int) -> bytes:
+    return mask.to_bytes(SLOT_BYTES, "little")
+
+
+def from_bytes(value) -> int:
+    return int.from_bytes(bytes(value), "little")
+
+
+def slot_mask(first_slot: int, end_slot: int) -> int:
+    """Маска слотов [first_slot, end_slot)."""
+    if end_slot <= first_slot:
+        return 0
+    return ((1 << end_slot) - 1) ^ ((1 << first_slot) - 1)
+
+
+def busy_minutes(mask: int) -> list:
+    """Занятые интервалы маски в минутах от полуночи: [[начало, конец], ...]."""
+    result = []
+    slot = 0
+    while mask:
+        skip = (mask & -mask).bit_length() - 1
+        mask >>= skip
+        slot += skip
+        run = (~mask & (mask + 1)).bit_length() - 1
+        result.append([slot * SLOT_MINUTES, (slot + run) * SLOT_MINUTES])
+        mask >>= run
+        slot += run
+    return result
+
+
+def _seconds(value: datetime) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def day_masks(start: datetime, end: datetime) -> dict[date, tuple[int, bool]]:
+    """Маски интервала [start, end) по локальным датам: {дата: (маска, выровнен)}."""
+    local_start = timezone.localtime(start)
+    local_end = timezone.localtime(end)
+    result = {}
+    day = local_start.date()
+    while day <= local_end.date():
+        from_seconds = _seconds(local_start) if day == local_start.date() else 0
+        to_seconds = 24 * 3600
+        if day == local_end.date():
+            to_seconds = _seconds(local_end) + (1 if local_end.microsecond else 0)
+        if to_seconds > from_seconds:
+            result[day] = (
+                slot_mask(
+                    from_seconds // SLOT_SECONDS,
+                    -(-to_seconds // SLOT_SECONDS),
+                ),
+                from_seconds % SLOT_SECONDS == 0
+                and to_seconds % SLOT_SECONDS == 0
+                and not local_start.microsecond,
+            )
+        day += timedelta(days=1)
+    return result
+
+
+def _day_bounds(first: date, last: date) -> tuple[datetime, datetime]:
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(first, time.min), tz),
+        timezone.make_aware(datetime.combine(last + timedelta(days=1), time.min), tz),
+    )
+
+
+def accumulate(rows, keep=None) -> dict[tuple[int, date], list]:
+    """Складывает брони (room_id, start, end) в {(room_id, дата): [маска, выровнены]}.
+
+    `keep(room_id, дата)` отбирает нужные пары; None — все.
+    """
+    result = {}
+    for room_id, start, end in rows:
+        for day, (mask, aligned) in day_masks(start, end).items():
+            if keep is not None and not keep(room_id, day):
+                continue
+            entry = result.setdefault((room_id, day), [0, True])
+            entry[0] |= mask
+            entry[1] = entry[1] and aligned
+    return result
+
+
+def _active(using: str):
+    return Reservation.objects.using(using).exclude(status_id__in=INACTIVE_STATUS_IDS)
+
+
+def build(room_ids, dates, using: str = "default") -> dict[tuple[int, date], list]:
+    """Маски занятости помещений `room_ids` на даты `dates` по таблице броней."""
+    room_ids, dates = set(room_ids), set(dates)
+    if not room_ids or not dates:
+        return {}
+    range_start, range_end = _day_bounds(min(dates), max(dates))
+    rows = (
+        _active(using)
+        .filter(
+            room_id__in=room_ids,
+            datetimestart__lt=range_end,
+            datetimeend__gt=range_start,
+        )
+        .values_list("room_id", "datetimestart", "datetimeend")
+    )
+    return accumulate(rows, keep=lambda room_id, day: day in dates)
+
+
+def _save(masks, using: str) -> None:
+    RoomDayOccupancy.objects.using(using).bulk_create(
+        [
+            RoomDayOccupancy(
+                room_id=room_id, date=day, slots=to_bytes(mask), aligned=aligned
+            )
+            for (room_id, day), (mask, aligned) in masks.items()
+        ],
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["room", "date"],
+        update_fields=["slots", "aligned"],
+    )
+
+
+def keys_for(room_id, start, end) -> set[tuple[int, date]]:
+    """Пары (помещение, дата), которые занимает интервал брони."""
+    if room_id is None or start is None or end is None:
+        return set()
+    return {(room_id, day) for day in day_masks(start, end)}
+
+
+def refresh(keys, using: str = "default") -> int:
+    """Пересчитывает строки для пар (помещение, дата); возвращает число непустых."""
+    keys = set(keys)
+    if not keys:
+        return 0
+    by_room = {}
+    for room_id, day in keys:
+        by_room.setdefault(room_id, set()).add(day)
+    masks = {}
+    # Обычно это одна-две даты одного помещения — один запрос на помещение.
+    for room_id, dates in by_room.items():
+        masks.update(build([room_id], dates, using=using))
+
+    empty = keys - masks.keys()
+    for room_id, dates in by_room.items():
+        stale = {day for day in dates if (room_id, day) in empty}
+        if stale:
+            RoomDayOccupancy.objects.using(using).filter(
+                room_id=room_id, date__in=stale
+            ).delete()
+    _save(masks, using)
+    return len(masks)
+
+
+def expected(using: str = "default") -> dict[tuple[int, date], list]:
+    """Маски по всем активным броням."""
+    rows = (
+        _active(using)
+        .values_list("room_id", "datetimestart", "datetimeend")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    return accumulate(rows)
+
+
+def stored(using: str = "default") -> dict[tuple[int, date], list]:
+    return {
+        (room_id, day): [from_bytes(slots), aligned]
+        for room_id, day, slots, aligned in RoomDayOccupancy.objects.using(
+            using
+        ).values_list("room_id", "date", "slots", "aligned")
+    }
+
+
+def rebuild(using: str = "default") -> int:
+    """Пересобирает все строки по таблице броней; возвращает их количество."""
+    masks = expected(using)
+    RoomDayOccupancy.objects.using(using).all().delete()
+    _save(masks, using)
+    return len(masks)
+
+
+def find_drift(using: str = "default") -> dict[tuple[int, date], tuple]:
+    """Расхождения с таблицей броней: {(помещение, дата): (сохранено, должно быть)}.
+
+    Значения — [маска, выровнены] или None, если строки нет.
+    """
+    actual, wanted = stored(using), expected(using)
+    return {
+        key: (actual.get(key), wanted.get(key))
+        for key in actual.keys() | wanted.keys()
+        if actual.get(key) != wanted.get(key)
+    }
+
+
+def load(room_ids, dates, using: str = "default") -> dict[tuple[int, date], tuple]:
+    """Сохранённые маски: {(помещение, дата): (маска, выровнены)} одним запросом."""
+    room_ids, dates = set(room_ids), set(dates)
+    if not room_ids or not dates:
+        return {}
+    rows = RoomDayOccupancy.objects.using(using).filter(
+        room_id__in=room_ids, date__in=dates
+    )
+    return {
+        (room_id, day): (from_bytes(slots), aligned)
+        for room_id, day, slots, aligned in rows.values_list(
+            "room_id", "date", "slots", "aligned"
+        )
+    }
+
+
+def conflict(occupancy, room_id, start: datetime, end: datetime) -> bool | None:
+    """Пересекается ли [start, end) с занятостью из `load`.
+
+    False — точно свободно, True — точно занято, None — нужна точная проверка
+    по броням (маски пересекаются, но кто-то не выровнен по слотам).
+    """
+    result = False
+    for day, (mask, aligned) in day_masks(start, end).items():
+        busy, busy_aligned = occupancy.get((room_id, day), (0, True))
+        if not busy & mask:
+            continue
+        if not (aligned and busy_aligned):
+            result = None
+            continue
+        return True
+    return result
+
+
+def room_conflict(room_id, start: datetime, end: datetime, using: str = "default"):
+    """`conflict` для одной брони с чтением масок её дат."""
+    dates = day_masks(start, end)
+    return conflict(load([room_id], dates, using=using), room_id, start, end)
+
+
+def grid(room_ids, date_from: date, date_to: date, using: str = "default"):
+    """Занятость сетки: {room_id: {дата: маска}} для дат с бронями."""
+    dates = [
+        date_from + timedelta(days=offset)
+        for offset in range((date_to - date_from).days + 1)
+    ]
+    result = {room_id: {} for room_id in room_ids}
+    for (room_id, day), (mask, _aligned) in load(room_ids, dates, using).items():
+        result[room_id][day] = mask
+    return result
+
+
+# Поля брони, от которых зависят строки карт.
+STATE_FIELDS = ("room_id", "datetimestart", "datetimeend", "status_id")
+
+
+def _state(values: dict | None):
+    if not values or values.get("status_id") in INACTIVE_STATUS_IDS:
+        return None
+    return values.get("room_id"), values.get("datetimestart"), values.get("datetimeend")
+
+
+def _keys(state) -> set:
+    return keys_for(*state) if state is not None else set()
+
+
+def _refresh_on_save(sender, instance, created, using, **kwargs):
+    if created:
+        # Новые брони — через reservations_created.
+        return
+    current = _state(model_state.current(instance))
+    previous = _state(model_state.previous(instance))
+    if previous == current:
+        return
+    refresh(_keys(previous) | _keys(current), using=using)
+
+
+def _refresh_on_create(sender, reservations, using, **kwargs):
+    keys = set()
+    for reservation in reservations:
+        keys |= _keys(_state(model_state.current(reservation)))
+    refresh(keys, using=using)
+
+
+def _refresh_on_delete(sender, instance, using, **kwargs):
+    refresh(_keys(_state(model_state.current(instance))), using=using)
+
+
+def connect_signals() -> None:
+    """Подключает пересчёт карт к сигналам `Reservation` (из `booking.signals`)."""
+    model_state.track(Reservation, *STATE_FIELDS)
+    post_save.connect(
+        _refresh_on_save,
+        sender=Reservation,
+        dispatch_uid="room_occupancy_reservation_save",
+    )
+    post_delete.connect(
+        _refresh_on_delete,
+        sender=Reservation,
+        dispatch_uid="room_occupancy_reservation_delete",
+    )
+    reservations_created.connect(
+        _refresh_on_create,
+        sender=Reservation,
+        dispatch_uid="room_occupancy_reservations_created",
+    )
@@ -0,0 +1,205 @@
+"""Сигналы приложения booking: инвалидация версий кэшируемых наборов данных
+(bootstrap-документ, индекс тарифов, разметка календарной сетки, справочники
+в памяти процесса), отметки удаления броней для инкрементальной синхронизации
+сетки и поисковый индекс клиентов.
+
+Обработчики, которым нужно прежнее состояние строки или собственные данные
+модуля (версии таблиц условных GET-ответов, суммы платежей броней, сводки
+клиентов, проекция расписаний специалистов, события живого обновления, карты
+занятости помещений, журнал тарифных единиц), живут в своих модулях и
+подключаются здесь их `connect_signals`."""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from . import (
+    calendar_feed,
+    client_search,
+    client_summary,
+    conditional,
+    data_versions,
+    live_events,
+    payment_totals,
+    reference_data,
+    reservation_signals,
+    room_occupancy,
+    specialist_schedule,
+    tariff_index,
+    tariff_unit_ledger,
+)
+from .models import (
+    Area,
+    Client,
+    ClientGroup,
+    PaymentType,
+    Reservation,
+    Room,
+    Scenario,
+    Specialist,
+    SpecialistService,
+    Tariff,
+    TariffUnit,
+    TariffWeeklyInterval,
+)
+
+# Модели, данные которых входят в bootstrap-документ главной страницы.
+BOOTSTRAP_MODELS = (
+    Area,
+    ClientGroup,
+    PaymentType,
+    Room,
+    Scenario,
+    Specialist,
+    SpecialistService,
+    Tariff,
+    TariffUnit,
+    TariffWeeklyInterval,
+)
+
+BOOTSTRAP_M2M = (
+    Area.scenario.through,
+    Room.scenario.through,
+    Specialist.directions.through,
+    Specialist.scenarios.through,
+    Specialist.specialist_services.through,
+    Tariff.rooms.through,
+    Tariff.scenarios.through,
+)
+
+
+def _bump_bootstrap(sender, **kwargs):
+    data_versions.bump_version(data_versions.BOOTSTRAP)
+
+
+def _bump_bootstrap_m2m(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        data_versions.bump_version(data_versions.BOOTSTRAP)
+
+
+for _model in BOOTSTRAP_MODELS:
+    post_save.connect(
+        _bump_bootstrap, sender=_model, dispatch_uid=f"bootstrap_save_{_model.__name__}"
+    )
+    post_delete.connect(
+        _bump_bootstrap,
+        sender=_model,
+        dispatch_uid=f"bootstrap_delete_{_model.__name__}",
+    )
+
+for _through in BOOTSTRAP_M2M:
+    m2m_changed.connect(
+        _bump_bootstrap_m2m,
+        sender=_through,
+        dispatch_uid=f"bootstrap_m2m_{_through.__name__}",
+    )
+
+
+# Модели, от которых зависит индекс применимости тарифов.
+TARIFF_INDEX_MODELS = (
+    Tariff,
+    TariffWeeklyInterval,
+    Tariff.rooms.through,
+    Tariff.scenarios.through,
+)
+
+
+def _tariffs_changed(sender, **kwargs):
+    tariff_index.tariffs_changed()
+
+
+def _tariffs_changed_m2m(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        tariff_index.tariffs_changed()
+
+
+for _model in TARIFF_INDEX_MODELS:
+    post_save.connect(
+        _tariffs_changed,
+        sender=_model,
+        dispatch_uid=f"tariff_index_save_{_model.__name__}",
+    )
+    # Для связей — и при каскадном удалении комнаты или сценария.
+    post_delete.connect(
+        _tariffs_changed,
+        sender=_model,
+        dispatch_uid=f"tariff_index_delete_{_model.__name__}",
+    )
+for _through in (Tariff.rooms.through, Tariff.scenarios.through):
+    m2m_changed.connect(
+        _tariffs_changed_m2m,
+        sender=_through,
+        dispatch_uid=f"tariff_index_m2m_{_through.__name__}",
+    )
+
+
+# Модели, от которых зависит разметка дней календарной сетки.
+CALENDAR_GRID_MODELS = (Area, Room, Scenario)
+
+
+def _bump_calendar_grid(sender, **kwargs):
+    data_versions.bump_version(data_versions.CALENDAR_GRID)
+
+
+for _model in CALENDAR_GRID_MODELS:
+    post_save.connect(
+        _bump_calendar_grid,
+        sender=_model,
+        dispatch_uid=f"calendar_grid_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        _bump_calendar_grid,
+        sender=_model,
+        dispatch_uid=f"calendar_grid_delete_{_model.__name__}",
+    )
+
+
+def _reference_changed(sender, **kwargs):
+    reference_data.reference_changed()
+
+
+for _model in reference_data.MODELS:
+    post_save.connect(
+        _reference_changed,
+        sender=_model,
+        dispatch_uid=f"reference_data_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        _reference_changed,
+        sender=_model,
+        dispatch_uid=f"reference_data_delete_{_model.__name__}",
+    )
+
+
+def _record_reservation_deletion(sender, instance, **kwargs):
+    calendar_feed.record_deletion(instance.pk)
+
+
+post_delete.connect(
+    _record_reservation_deletion,
+    sender=Reservation,
+    dispatch_uid="calendar_feed_reservation_delete",
+)
+
+
+def _index_client(sender, instance, using, **kwargs):
+    client_search.index_client(instance, using=using)
+
+
+def _unindex_client(sender, instance, using, **kwargs):
+    client_search.unindex_client(instance.pk, using=using)
+
+
+post_save.connect(_index_client, sender=Client, dispatch_uid="client_search_save")
+post_delete.connect(
+    _unindex_client, sender=Client, dispatch_uid="client_search_delete"
+)
+
+
+# Обработчики, которые ведут данные своих модулей.
+reservation_signals.connect_signals()
+conditional.connect_signals()
+payment_totals.connect_signals()
+client_summary.connect_signals()
+specialist_schedule.connect_signals()
+live_events.connect_signals()
+room_occupancy.connect_signals()
+tariff_unit_ledger.connect_signals()
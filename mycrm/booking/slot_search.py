@@ -0,0 +1,312 @@
+"""Поиск ближайших свободных слотов для брони.
+
+Вместо проверки слотов по одному запросом все исходные данные окна дат
+загружаются фиксированным числом запросов: комнаты, их битовые карты
+занятости (`booking.room_occupancy`), расписания и брони специалистов. Тарифы
+(если сценарий их требует) берутся из индекса `booking.tariff_index`.
+Дальше для каждой пары (комната, дата) свободное время считается в минутах
+от полуночи проходом по отсортированным интервалам:
+
+    рабочие часы комнаты − брони комнаты
+    ∩ интервалы подходящих тарифов (если тариф обязателен)
+    ∩ ⋃ по специалистам (рабочее время − брони специалиста и его клиента)
+
+Начала слотов выравниваются по 15-минутной сетке календаря. Внутри одной
+комнаты предлагаемые слоты не пересекаются: следующий ищется после конца
+предыдущего. Результат упорядочен по началу слота, затем по ID комнаты.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from . import room_occupancy, tariff_index
+from .models import Reservation, Room, Specialist
+from .pricing import TARIFF_REQUIRED_SCENARIOS
+from .specialist_availability import (
+    DAY_MINUTES,
+    INACTIVE_STATUS_IDS,
+    SpecialistSchedules,
+    merge_minutes,
+    time_to_minutes,
+)
+
+SLOT_MINUTES = 15
+
+
+@dataclass
+class FreeSlot:
+    start: datetime
+    end: datetime
+    room_id: int
+    specialist_ids: list[int] = field(default_factory=list)
+    tariff_ids: list[int] = field(default_factory=list)
+
+
+def _intersect(a, b) -> list:
+    """Пересечение двух отсортированных списков непересекающихся интервалов."""
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start = max(a[i][0], b[j][0])
+        end = min(a[i][1], b[j][1])
+        if start < end:
+            result.append([start, end])
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def _subtract(free, busy) -> list:
+    """`free` без `busy`; оба списка отсортированы и объединены."""
+    result = []
+    j = 0
+    for start, end in free:
+        while j < len(busy) and busy[j][1] <= start:
+            j += 1
+        k = j
+        while k < len(busy) and busy[k][0] < end:
+            if busy[k][0] > start:
+                result.append([start, busy[k][0]])
+            start = max(start, busy[k][1])
+            k += 1
+        if start < end:
+            result.append([start, end])
+    return result
+
+
+def _contains(intervals, start, end) -> bool:
+    return any(s <= start and end <= e for s, e in intervals)
+
+
+def _day_start(day: date) -> datetime:
+    return timezone.make_aware(
+        datetime.combine(day, time.min), timezone.get_current_timezone()
+    )
+
+
+def _busy_minutes(rows, dates) -> dict:
+    """Брони (ключ, start, end) → {(ключ, дата): объединённые интервалы в минутах}."""
+    tz = timezone.get_current_timezone()
+    periods = {}
+    for key, start, end in rows:
+        local_start = start.astimezone(tz)
+        local_end = end.astimezone(tz)
+        day = local_start.date()
+        while day <= local_end.date():
+            if day in dates:
+                from_minute = 0
+                if day == local_start.date():
+                    from_minute = local_start.hour * 60 + local_start.minute
+                to_minute = DAY_MINUTES
+                if day == local_end.date():
+                    to_minute = local_end.hour * 60 + local_end.minute
+                    to_minute += bool(local_end.second or local_end.microsecond)
+                periods.setdefault((key, day), []).append((from_minute, to_minute))
+            day += timedelta(days=1)
+    return {key: merge_minutes(items) for key, items in periods.items()}
+
+
+def _reservations(range_start, range_end, **filters):
+    return (
+        Reservation.objects.filter(
+            datetimestart__lt=range_end, datetimeend__gt=range_start, **filters
+        )
+        .exclude(status_id__in=INACTIVE_STATUS_IDS)
+        .order_by()
+    )
+
+
+def find_free_slots(
+    *,
+    scenario,
+    duration_minutes: int,
+    date_from: date,
+    date_to: date,
+    limit: int = 10,
+    room_ids=None,
+    area_id=None,
+    specialist=None,
+    direction=None,
+    people_count=None,
+    now: datetime | None = None,
+) -> list[FreeSlot]:
+    """Ближайшие `limit` свободных слотов длительностью `duration_minutes`.
+
+    `room_ids`/`area_id` сужают набор комнат (по умолчанию — активные комнаты
+    сценария). Если передан `specialist`, слот должен подходить ему; если
+    `direction` — хотя бы одному активному специалисту направления в
+    сценарии (в слоте перечисляются все подходящие). Слоты раньше `now`
+    (по умолчанию — текущий момент) не предлагаются.
+    """
+    if duration_minutes <= 0 or date_from > date_to or limit <= 0:
+        return []
+    now = timezone.localtime(now or timezone.now())
+    dates = [
+        day
+        for day in (
+            date_from + timedelta(days=offset)
+            for offset in range((date_to - date_from).days + 1)
+        )
+        if day >= now.date()
+    ]
+    if not dates:
+        return []
+    date_set = set(dates)
+    range_start = _day_start(dates[0])
+    range_end = _day_start(dates[-1] + timedelta(days=1))
+
+    rooms = Room.objects.filter(is_active=True).filter(
+        Q(scenario=scenario) | Q(scenario__isnull=True)
+    )
+    if room_ids is not None:
+        rooms = rooms.filter(id__in=room_ids)
+    if area_id is not None:
+        rooms = rooms.filter(area_id=area_id)
+    rooms = {
+        room_id: [[time_to_minutes(start), time_to_minutes(end)]]
+        for room_id, start, end in rooms.distinct()
+        .order_by("id")
+        .values_list("id", "hourstart", "hourend")
+    }
+    if not rooms:
+        return []
+
+    # Занятость комнат — из битовых карт (booking.room_occupancy): одна строка на
+    # комнату-день вместо всех броней окна. Брони дат, не выровненных по
+    # слотам, читаются отдельно — маска для них лишь оценка сверху.
+    occupancy = room_occupancy.load(rooms, dates)
+    room_busy = {
+        key: room_occupancy.busy_minutes(mask)
+        for key, (mask, aligned) in occupancy.items()
+        if aligned
+    }
+    unaligned = occupancy.keys() - room_busy.keys()
+    if unaligned:
+        exact = _busy_minutes(
+            _reservations(
+                _day_start(min(day for _, day in unaligned)),
+                _day_start(max(day for _, day in unaligned) + timedelta(days=1)),
+                room_id__in={room_id for room_id, _ in unaligned},
+            ).values_list("room_id", "datetimestart", "datetimeend"),
+            date_set,
+        )
+        room_busy.update((key, exact.get(key, [])) for key in unaligned)
+
+    # Тарифы — из индекса booking.tariff_index: слот должен целиком лежать в
+    # одном интервале тарифа, как в get_available_tariffs_for_booking.
+    tariffs = None
+    if scenario.name in TARIFF_REQUIRED_SCENARIOS:
+        tariffs = tariff_index.get_index()
+
+    specialists = None
+    if specialist is not None:
+        specialists = [specialist]
+    elif direction is not None:
+        specialists = list(
+            Specialist.objects.filter(
+                active=True, directions=direction, scenarios=scenario
+            )
+            .distinct()
+            .order_by("id")
+        )
+        if not specialists:
+            return []
+
+    specialist_free = {}
+    if specialists is not None:
+        schedules = SpecialistSchedules(
+            [s.id for s in specialists], dates, [scenario.id]
+        )
+        spec_busy = _busy_minutes(
+            _reservations(
+                range_start, range_end, specialist_id__in=[s.id for s in specialists]
+            ).values_list("specialist_id", "datetimestart", "datetimeend"),
+            date_set,
+        )
+        client_ids = {s.client_id for s in specialists if s.client_id}
+        client_busy = _busy_minutes(
+            _reservations(range_start, range_end, client_id__in=client_ids)
+            .values_list("client_id", "datetimestart", "datetimeend")
+            if client_ids
+            else (),
+            date_set,
+        )
+        for day in dates:
+            for s in specialists:
+                work = schedules.work_minutes(s.id, day, scenario.id)
+                free = [[0, DAY_MINUTES]] if work is None else work
+                free = _subtract(free, spec_busy.get((s.id, day), []))
+                free = _subtract(free, client_busy.get((s.client_id, day), []))
+                specialist_free[(s.id, day)] = free
+
+    slots = []
+    for day in dates:
+        earliest = 0
+        if day == now.date():
+            earliest = now.hour * 60 + now.minute + bool(now.second or now.microsecond)
+        day_slots = []
+        specialists_free = None
+        if specialists is not None:
+            specialists_free = merge_minutes(
+                interval
+                for s in specialists
+                for interval in specialist_free[(s.id, day)]
+            )
+        for room_id, hours in rooms.items():
+            free = _subtract(hours, room_busy.get((room_id, day), []))
+            free = _intersect(free, [[earliest, DAY_MINUTES]])
+            room_tariffs = []
+            if tariffs is not None:
+                room_tariffs = [
+                    (time_to_minutes(start), time_to_minutes(end), tariff_id)
+                    for start, end, tariff_id in tariffs.intervals(
+                        scenario.id, room_id, day.weekday(), people_count
+                    )
+                ]
+                free = _intersect(
+                    free, merge_minutes((s, e) for s, e, _ in room_tariffs)
+                )
+            if specialists_free is not None:
+                free = _intersect(free, specialists_free)
+
+            for start_free, end_free in free:
+                start = -(-start_free // SLOT_MINUTES) * SLOT_MINUTES
+                while start + duration_minutes <= end_free:
+                    end = start + duration_minutes
+                    tariff_ids = sorted(
+                        {t_id for s, e, t_id in room_tariffs if s <= start and end <= e}
+                    )
+                    specialist_ids = [
+                        s.id
+                        for s in specialists or ()
+                        if _contains(specialist_free[(s.id, day)], start, end)
+                    ]
+                    if (tariffs is not None and not tariff_ids) or (
+                        specialists is not None and not specialist_ids
+                    ):
+                        start += SLOT_MINUTES
+                        continue
+                    day_slots.append((start, room_id, specialist_ids, tariff_ids))
+                    start = -(-end // SLOT_MINUTES) * SLOT_MINUTES
+
+        day_slots.sort(key=lambda slot: (slot[0], slot[1]))
+        origin = _day_start(day)
+        for start, room_id, specialist_ids, tariff_ids in day_slots:
+            slot_start = timezone.localtime(origin + timedelta(minutes=start))
+            slots.append(
+                FreeSlot(
+                    start=slot_start,
+                    end=slot_start + timedelta(minutes=duration_minutes),
+                    room_id=room_id,
+                    specialist_ids=specialist_ids,
+                    tariff_ids=tariff_ids,
+                )
+            )
+            if len(slots) >= limit:
+                return slots
+    return slots
@@ -0,0 +1,379 @@
+"""Пакетная проверка доступности специалистов.
+
+Расписание специалиста на дату складывается из override-ов (исключений на
+конкретную дату) и weekly-интервалов:
+- override на дату важнее weekly: он либо делает день выходным, либо задаёт
+  рабочие интервалы;
+- если у специалиста нет weekly-интервалов вообще — расписание не
+  ограничивает доступность;
+- при указанном сценарии сначала берутся записи этого сценария, если их нет —
+  глобальные (scenario=NULL).
+
+`SpecialistSchedules` загружает расписания набора специалистов на набор дат
+фиксированным числом запросов (из проекции `SpecialistDaySchedule`, а вне её
+горизонта — из исходных таблиц), `resolve_availability` проверяет набор
+специалистов на наборе окон (расписание плюс пересечения с бронями, где
+специалист — преподаватель или клиент). Число запросов не зависит ни от числа
+специалистов, ни от числа окон.
+"""
+
+from bisect import bisect_left
+from datetime import datetime, time
+from itertools import accumulate
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    Reservation,
+    SpecialistDaySchedule,
+    SpecialistScheduleOverride,
+    SpecialistWeeklyInterval,
+)
+
+# Статусы броней, которые не занимают время: 4 — отменена, 1082 — cancelled.
+INACTIVE_STATUS_IDS = (4, 1082)
+
+DAY_MINUTES = 24 * 60
+
+
+def time_to_minutes(t) -> int:
+    """Конвертирует `datetime.time` в минуты от полуночи (0..1439)."""
+    return t.hour * 60 + t.minute
+
+
+def minutes_to_time(minutes: int) -> time:
+    """Минуты от полуночи → `datetime.time` (конец суток — 23:59)."""
+    minutes = min(minutes, DAY_MINUTES - 1)
+    return time(minutes // 60, minutes % 60)
+
+
+def merge_minutes(intervals) -> list:
+    """Объединяет пересекающиеся/прилегающие интервалы в минутах, обрезая их сутками."""
+    merged = []
+    for start, end in sorted(intervals):
+        start, end = max(start, 0), min(end, DAY_MINUTES)
+        if start >= end:
+            continue
+        if not merged or start > merged[-1][1]:
+            merged.append([start, end])
+        else:
+            merged[-1][1] = max(merged[-1][1], end)
+    return merged
+
+
+class SpecialistSchedules:
+    """Расписания набора специалистов на набор дат.
+
+    Сначала читается проекция `SpecialistDaySchedule` (один запрос). Пары
+    (специалист, дата), которых в ней нет (даты вне горизонта проекции,
+    новые специалисты), считаются по исходным таблицам: override-ы с
+    интервалами (два запроса) и weekly-интервалы (один запрос). Дальнейшие
+    обращения запросов не делают. `scenario_ids` — сценарии, для которых будут
+    запрашиваться расписания (None в наборе — расписание без учёта сценария).
+    `use_projection=False` — только исходные таблицы (так проекция и строится).
+    """
+
+    def __init__(
+        self, specialist_ids, dates, scenario_ids=(None,), use_projection=True
+    ):
+        specialist_ids = set(specialist_ids)
+        dates = set(dates)
+        scenario_ids = set(scenario_ids)
+
+        # Ключ: (spec_id, date, scenario_id|None) → объединённые интервалы в
+        # минутах или None, если расписание не ограничивает.
+        self._days = {}
+        if use_projection and specialist_ids and dates:
+            scenario_rows = Q(scenario_id__in=scenario_ids - {None})
+            if None in scenario_ids:
+                scenario_rows |= Q(scenario__isnull=True)
+            for spec_id, day, sc_id, restricted, intervals in (
+                SpecialistDaySchedule.objects.filter(
+                    scenario_rows, specialist_id__in=specialist_ids, date__in=dates
+                )
+                .order_by()
+                .values_list(
+                    "specialist_id", "date", "scenario_id", "restricted", "intervals"
+                )
+            ):
+                self._days[(spec_id, day, sc_id)] = intervals if restricted else None
+
+            missing = {
+                (spec_id, day)
+                for spec_id in specialist_ids
+                for day in dates
+                for sc_id in scenario_ids
+                if (spec_id, day, sc_id) not in self._days
+            }
+            specialist_ids = {spec_id for spec_id, _ in missing}
+            dates = {day for _, day in missing}
+
+        scenario_filter = Q()
+        if None not in scenario_ids:
+            scenario_filter = Q(scenario_id__in=scenario_ids) | Q(scenario__isnull=True)
+
+        # Ключ: (spec_id, date, scenario_id|None) → override
+        self._overrides = {}
+        if specialist_ids and dates:
+            for override in SpecialistScheduleOverride.objects.filter(
+                scenario_filter, specialist_id__in=specialist_ids, date__in=dates
+            ).prefetch_related("intervals"):
+                key = (override.specialist_id, override.date, override.scenario_id)
+                self._overrides[key] = override
+
+        # Ключ: (spec_id, weekday, scenario_id|None) → list of (start, end)
+        self._weekly = {}
+        # spec_id → сценарии, для которых у специалиста есть weekly-интервалы
+        self._weekly_scenarios = {}
+        if specialist_ids and dates:
+            for spec_id, weekday, sc_id, start_t, end_t in (
+                SpecialistWeeklyInterval.objects.filter(
+                    scenario_filter, specialist_id__in=specialist_ids
+                )
+                .order_by()
+                .values_list(
+                    "specialist_id", "weekday", "scenario_id", "start_time", "end_time"
+                )
+            ):
+                self._weekly.setdefault((spec_id, int(weekday), sc_id), []).append(
+                    (start_t, end_t)
+                )
+                self._weekly_scenarios.setdefault(spec_id, set()).add(sc_id)
+
+    def _override(self, spec_id, target_date, scenario_id):
+        if scenario_id is not None:
+            specific = self._overrides.get((spec_id, target_date, scenario_id))
+            if specific is not None:
+                return specific
+        return self._overrides.get((spec_id, target_date, None))
+
+    def _has_weekly(self, spec_id, scenario_id) -> bool:
+        scenarios = self._weekly_scenarios.get(spec_id, ())
+        if scenario_id is None:
+            return bool(scenarios)
+        return scenario_id in scenarios or None in scenarios
+
+    def schedule(self, spec_id, target_date, scenario_id=None) -> dict:
+        """Расписание специалиста на дату.
+
+        Формат ответа:
+        - restricted: расписание ограничивает/не ограничивает доступность
+        - is_day_off: является ли дата выходным для специалиста
+        - intervals: список пар (start_time, end_time)
+        """
+        key = (spec_id, target_date, scenario_id)
+        if key in self._days:
+            minutes = self._days[key]
+            if minutes is None:
+                return {"restricted": False, "is_day_off": False, "intervals": []}
+            return {
+                "restricted": True,
+                "is_day_off": not minutes,
+                "intervals": [
+                    (minutes_to_time(start), minutes_to_time(end))
+                    for start, end in minutes
+                ],
+            }
+
+        override = self._override(spec_id, target_date, scenario_id)
+        if override is not None:
+            if override.is_day_off:
+                return {"restricted": True, "is_day_off": True, "intervals": []}
+            return {
+                "restricted": True,
+                "is_day_off": False,
+                "intervals": [
+                    (i.start_time, i.end_time) for i in override.intervals.all()
+                ],
+            }
+
+        if not self._has_weekly(spec_id, scenario_id):
+            return {"restricted": False, "is_day_off": False, "intervals": []}
+
+        weekday = int(target_date.weekday())
+        intervals = []
+        if scenario_id is not None:
+            intervals = self._weekly.get((spec_id, weekday, scenario_id), [])
+        if not intervals:
+            intervals = self._weekly.get((spec_id, weekday, None), [])
+        return {
+            "restricted": True,
+            "is_day_off": len(intervals) == 0,
+            "intervals": intervals,
+        }
+
+    def work_minutes(self, spec_id, target_date, scenario_id=None) -> list | None:
+        """Объединённые рабочие интервалы в минутах; None — расписание не ограничивает."""
+        key = (spec_id, target_date, scenario_id)
+        if key in self._days:
+            return self._days[key]
+        schedule = self.schedule(spec_id, target_date, scenario_id)
+        if not schedule["restricted"]:
+            return None
+        return merge_minutes(
+            (time_to_minutes(start_t), time_to_minutes(end_t))
+            for start_t, end_t in schedule["intervals"]
+            if start_t is not None and end_t is not None
+        )
+
+
+def local_booking_period(start_datetime: datetime, end_datetime: datetime):
+    """Переводит границы брони в локальное время и проверяет, что это одни сутки."""
+    # Приводим naive datetime к aware, чтобы сравнения были корректными.
+    if timezone.is_naive(start_datetime):
+        start_datetime = timezone.make_aware(
+            start_datetime, timezone.get_current_timezone()
+        )
+    if timezone.is_naive(end_datetime):
+        end_datetime = timezone.make_aware(
+            end_datetime, timezone.get_current_timezone()
+        )
+
+    # Дальше считаем всё в локальном времени.
+    local_start = timezone.localtime(start_datetime)
+    local_end = timezone.localtime(end_datetime)
+    if local_start.date() != local_end.date():
+        raise ValidationError("Бронь не может пересекать сутки")
+    return local_start, local_end
+
+
+def check_schedule_covers(schedule: dict, local_start: datetime, local_end: datetime):
+    """Проверяет, что интервал брони попадает в рабочее время из `schedule`.
+
+    Рабочие интервалы предварительно объединяются, чтобы корректно учитывать
+    прилегающие/пересекающиеся интервалы.
+    """
+    if not schedule.get("restricted"):
+        return True
+    if schedule.get("is_day_off"):
+        raise ValidationError("У специалиста выходной в выбранную дату")
+
+    intervals = schedule.get("intervals") or []
+    if not intervals:
+        raise ValidationError("У специалиста выходной в выбранную дату")
+
+    start_minutes = time_to_minutes(local_start.time())
+    end_minutes = time_to_minutes(local_end.time())
+
+    merged = merge_minutes(
+        (time_to_minutes(start_t), time_to_minutes(end_t))
+        for start_t, end_t in intervals
+        if start_t is not None and end_t is not None
+    )
+    for s, e in merged:
+        if start_minutes >= s and end_minutes <= e:
+            return True
+
+    raise ValidationError("Специалист не работает в это время")
+
+
+def busy_index(periods):
+    """Готовит занятые интервалы к проверке пересечений за O(log n).
+
+    Возвращает отсортированные начала и накопленный максимум концов: среди
+    интервалов, начинающихся раньше `end`, пересечение есть тогда и только тогда,
+    когда самый поздний конец больше `start`.
+    """
+    periods = sorted(periods)
+    starts = [start for start, _ in periods]
+    max_ends = list(accumulate((end for _, end in periods), max))
+    return starts, max_ends
+
+
+def overlaps_busy(index, start: datetime, end: datetime) -> bool:
+    starts, max_ends = index
+    pos = bisect_left(starts, end)
+    return pos > 0 and max_ends[pos - 1] > start
+
+
+def _busy_by(field, values, range_start, range_end, exclude_reservation_id):
+    """Занятые интервалы броней по значениям `field` в диапазоне: {значение: индекс}."""
+    if not values:
+        return {}
+    bookings = Reservation.objects.filter(
+        **{f"{field}__in": values},
+        datetimestart__lt=range_end,
+        datetimeend__gt=range_start,
+    ).exclude(status_id__in=INACTIVE_STATUS_IDS)
+    if exclude_reservation_id is not None:
+        bookings = bookings.exclude(id=exclude_reservation_id)
+    periods = {}
+    for value, start, end in bookings.values_list(
+        field, "datetimestart", "datetimeend"
+    ):
+        periods.setdefault(value, []).append((start, end))
+    return {value: busy_index(items) for value, items in periods.items()}
+
+
+def resolve_availability(specialists, windows, exclude_reservation_id=None) -> dict:
+    """Доступность специалистов в окнах.
+
+    `specialists` — объекты `Specialist` (нужны id и client_id), `windows` —
+    список (start_datetime, end_datetime, scenario_id). Бронь
+    `exclude_reservation_id` (редактируемая) занятостью не считается.
+
+    Возвращает {(specialist_id, индекс окна): None или текст ошибки}. Проверки
+    идут в том же порядке, что и при создании брони: сутки и расписание, затем
+    занятость как клиента, затем как преподавателя. Запросов не больше шести.
+    """
+    specialists = list(specialists)
+    result = {}
+    periods = {}
+    for index, (start, end, _) in enumerate(windows):
+        try:
+            periods[index] = local_booking_period(start, end)
+        except ValidationError as e:
+            for specialist in specialists:
+                result[(specialist.id, index)] = e.messages[0]
+    if not specialists or not periods:
+        return result
+
+    schedules = SpecialistSchedules(
+        {s.id for s in specialists},
+        {local_start.date() for local_start, _ in periods.values()},
+        {windows[index][2] for index in periods},
+    )
+    range_start = min(local_start for local_start, _ in periods.values())
+    range_end = max(local_end for _, local_end in periods.values())
+    specialist_busy = _busy_by(
+        "specialist_id",
+        {s.id for s in specialists},
+        range_start,
+        range_end,
+        exclude_reservation_id,
+    )
+    client_busy = _busy_by(
+        "client_id",
+        {s.client_id for s in specialists if s.client_id},
+        range_start,
+        range_end,
+        exclude_reservation_id,
+    )
+
+    for index, (local_start, local_end) in periods.items():
+        scenario_id = windows[index][2]
+        for specialist in specialists:
+            error = None
+            try:
+                check_schedule_covers(
+                    schedules.schedule(specialist.id, local_start.date(), scenario_id),
+                    local_start,
+                    local_end,
+                )
+            except ValidationError as e:
+                error = e.messages[0]
+            else:
+                # Специалист может быть занят не только как преподаватель, но и
+                # как клиент (например, если сам берёт урок у другого специалиста).
+                as_client = client_busy.get(specialist.client_id)
+                as_specialist = specialist_busy.get(specialist.id)
+                if as_client and overlaps_busy(as_client, local_start, local_end):
+                    error = "Специалист занят в это время (он записан как клиент)"
+                elif as_specialist and overlaps_busy(
+                    as_specialist, local_start, local_end
+                ):
+                    error = "Специалист уже занят в это время"
+            result[(specialist.id, index)] = error
+    return result
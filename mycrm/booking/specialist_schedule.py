@@ -0,0 +1,250 @@
+"""Проекция расписаний специалистов по дням (`SpecialistDaySchedule`).
+
+Рабочее время специалиста на дату выводится из weekly-интервалов и
+override-ов с приоритетами и fallback по сценарию (см.
+`booking.specialist_availability`). Проекция хранит результат для каждой
+тройки (специалист, дата, сценарий) на скользящем горизонте
+SPECIALIST_SCHEDULE_HORIZON_DAYS дней от сегодняшнего дня (по умолчанию 120),
+причём для каждого сценария и для расписания без сценария (scenario=NULL):
+любой запрос расписания в горизонте — одно чтение по индексу.
+
+Строки пересобираются сигналами (`connect_signals`) в транзакции изменения:
+- weekly-интервал — даты его дня недели (все даты горизонта, если у
+  специалиста появился или исчез первый интервал сценария: от этого зависит,
+  ограничивает ли расписание доступность вообще);
+- override и его интервалы — дата override-а;
+- новый специалист — весь горизонт, новый сценарий — весь горизонт только
+  по этому сценарию.
+
+Команда `extend_specialist_schedules` раз в сутки удаляет прошедшие даты и
+достраивает горизонт. Даты, которых нет в проекции, `SpecialistSchedules`
+считает по исходным таблицам.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from . import model_state
+from .models import (
+    Scenario,
+    Specialist,
+    SpecialistDaySchedule,
+    SpecialistOverrideInterval,
+    SpecialistScheduleOverride,
+    SpecialistWeeklyInterval,
+)
+from .specialist_availability import SpecialistSchedules
+
+BATCH_SIZE = 2000
+
+
+def horizon_days() -> int:
+    return getattr(settings, "SPECIALIST_SCHEDULE_HORIZON_DAYS", 120)
+
+
+def horizon_dates() -> list:
+    """Даты горизонта проекции начиная с сегодняшнего дня."""
+    today = timezone.localdate()
+    return [today + timedelta(days=offset) for offset in range(horizon_days())]
+
+
+def rebuild(
+    specialist_ids=None, dates=None, scenario_ids=None, using: str = "default"
+) -> int:
+    """Пересобирает строки проекции; возвращает число записанных строк.
+
+    `specialist_ids` — специалисты (None — все), `dates` — даты (None — весь
+    горизонт), `scenario_ids` — сценарии (None — все и расписание без
+    сценария). Даты вне горизонта пропускаются.
+    """
+    in_horizon = set(horizon_dates())
+    dates = in_horizon if dates is None else set(dates) & in_horizon
+    if specialist_ids is None:
+        specialist_ids = Specialist.objects.using(using).values_list("id", flat=True)
+    specialist_ids = set(specialist_ids)
+    if not dates or not specialist_ids:
+        return 0
+
+    existing = SpecialistDaySchedule.objects.using(using).filter(
+        specialist_id__in=specialist_ids
+    )
+    if scenario_ids is None:
+        scenario_ids = [
+            None,
+            *Scenario.objects.using(using).values_list("id", flat=True),
+        ]
+    else:
+        scenario_ids = list(scenario_ids)
+        existing = existing.filter(scenario_id__in=scenario_ids)
+    schedules = SpecialistSchedules(specialist_ids, dates, use_projection=False)
+    rows = [
+        SpecialistDaySchedule(
+            specialist_id=spec_id,
+            date=day,
+            scenario_id=scenario_id,
+            restricted=minutes is not None,
+            intervals=minutes or [],
+        )
+        for spec_id in specialist_ids
+        for day in dates
+        for scenario_id in scenario_ids
+        for minutes in [schedules.work_minutes(spec_id, day, scenario_id)]
+    ]
+    if dates != in_horizon:
+        existing = existing.filter(date__in=dates)
+    existing.delete()
+    SpecialistDaySchedule.objects.using(using).bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+def weekly_interval_state(values: dict | None) -> tuple | None:
+    """(specialist_id, scenario_id, weekday) weekly-интервала по значениям полей."""
+    if not values or values.get("specialist_id") is None:
+        return None
+    return values["specialist_id"], values.get("scenario_id"), values.get("weekday")
+
+
+def weekly_interval_changed(old_state, new_state, using: str = "default") -> None:
+    """Пересобирает проекцию после изменения или удаления weekly-интервала."""
+    states = {old_state, new_state} - {None}
+    whole_horizon = set()
+    for spec_id, scenario_id in {state[:2] for state in states}:
+        # Первый/последний интервал сценария меняет то, ограничивает ли
+        # расписание специалиста доступность во все дни, а не только в этот.
+        count = (
+            SpecialistWeeklyInterval.objects.using(using)
+            .filter(specialist_id=spec_id, scenario_id=scenario_id)
+            .count()
+        )
+        added_first = (
+            count == 1
+            and new_state is not None
+            and new_state[:2] == (spec_id, scenario_id)
+        )
+        if count == 0 or added_first:
+            whole_horizon.add(spec_id)
+
+    for spec_id in {state[0] for state in states}:
+        if spec_id in whole_horizon:
+            rebuild({spec_id}, using=using)
+            continue
+        weekdays = {int(state[2]) for state in states if state[0] == spec_id}
+        rebuild(
+            {spec_id},
+            [day for day in horizon_dates() if day.weekday() in weekdays],
+            using=using,
+        )
+
+
+def extend(using: str = "default") -> tuple[int, int]:
+    """Сдвигает горизонт: удаляет прошедшие даты, достраивает недостающие.
+
+    Возвращает (удалено строк, записано строк).
+    """
+    dates = horizon_dates()
+    deleted, _ = (
+        SpecialistDaySchedule.objects.using(using).filter(date__lt=dates[0]).delete()
+    )
+    built = set(
+        SpecialistDaySchedule.objects.using(using)
+        .filter(date__gte=dates[0])
+        .values_list("date", flat=True)
+        .distinct()
+    )
+    created = rebuild(dates=[day for day in dates if day not in built], using=using)
+    return deleted, created
+
+
+def _rebuild_on_weekly_save(sender, instance, created, using, **kwargs):
+    previous = None if created else model_state.previous(instance)
+    weekly_interval_changed(
+        weekly_interval_state(previous),
+        weekly_interval_state(model_state.current(instance)),
+        using=using,
+    )
+
+
+def _rebuild_on_weekly_delete(sender, instance, using, **kwargs):
+    weekly_interval_changed(
+        weekly_interval_state(model_state.current(instance)), None, using=using
+    )
+
+
+def _override_state(values: dict | None):
+    if not values:
+        return None
+    return values.get("specialist_id"), values.get("date")
+
+
+def _rebuild_on_override_change(sender, instance, using, **kwargs):
+    states = {
+        _override_state(model_state.previous(instance)),
+        _override_state(model_state.current(instance)),
+    }
+    for spec_id, day in states - {None}:
+        if spec_id is not None and day is not None:
+            rebuild({spec_id}, [day], using=using)
+
+
+def _rebuild_on_override_interval_change(sender, instance, using, **kwargs):
+    override = (
+        SpecialistScheduleOverride.objects.using(using)
+        .filter(pk=instance.override_id)
+        .values_list("specialist_id", "date")
+        .first()
+    )
+    if override is not None:
+        rebuild({override[0]}, [override[1]], using=using)
+
+
+def _build_for_new_specialist(sender, instance, created, using, raw=False, **kwargs):
+    if created and not raw:
+        rebuild({instance.pk}, using=using)
+
+
+def _build_for_new_scenario(sender, instance, created, using, raw=False, **kwargs):
+    if created and not raw:
+        # Строки остальных сценариев от нового сценария не зависят.
+        rebuild(scenario_ids=[instance.pk], using=using)
+
+
+def connect_signals() -> None:
+    """Подключает пересборку проекции к сигналам моделей (из `booking.signals`)."""
+    model_state.track(
+        SpecialistWeeklyInterval, "specialist_id", "scenario_id", "weekday"
+    )
+    model_state.track(SpecialistScheduleOverride, "specialist_id", "date")
+    post_save.connect(
+        _rebuild_on_weekly_save,
+        sender=SpecialistWeeklyInterval,
+        dispatch_uid="specialist_schedule_weekly_save",
+    )
+    post_delete.connect(
+        _rebuild_on_weekly_delete,
+        sender=SpecialistWeeklyInterval,
+        dispatch_uid="specialist_schedule_weekly_delete",
+    )
+    for signal in (post_save, post_delete):
+        signal.connect(
+            _rebuild_on_override_change,
+            sender=SpecialistScheduleOverride,
+            dispatch_uid=f"specialist_schedule_override_{signal is post_save}",
+        )
+        signal.connect(
+            _rebuild_on_override_interval_change,
+            sender=SpecialistOverrideInterval,
+            dispatch_uid=f"specialist_schedule_override_interval_{signal is post_save}",
+        )
+    post_save.connect(
+        _build_for_new_specialist,
+        sender=Specialist,
+        dispatch_uid="specialist_schedule_specialist",
+    )
+    post_save.connect(
+        _build_for_new_scenario,
+        sender=Scenario,
+        dispatch_uid="specialist_schedule_scenario",
+    )
@@ -199,6 +199,80 @@
             row.style.display = '';
         }
 
+        /**
+         * Данные блока для `/booking/quote/` в формате blocks_json.
+         * Время первого блока в single-режиме берётся из глобального состояния.
+         */
+        function _blockQuotePayload(blockEl, index) {
+            var dateInput = blockEl.querySelector('input[id^="modal-create-date"]');
+            var dateIso = dateInput ? String(dateInput.value || '').trim() : '';
+            var state = blockEl._bulkTimeState || {};
+            var start = state.startMinutes;
+            var end = state.endMinutes;
+            if (index === 0 && !Number.isFinite(start)) {
+                start = window.currentStartTimeMinutes;
+                end = window.currentEndTimeMinutes;
+            }
+            var duration = (Number.isFinite(start) && Number.isFinite(end) && end > start) ? end - start : null;
+            if (duration === null && Number.isFinite(start) && Number.isFinite(state.selectedPeriods)) {
+                duration = state.selectedPeriods * (state._lastMinMinutes || _getScenarioMinMinutesGlobal());
+            }
+
+            var block = { services: [], tariff_id: '' };
+            if (dateIso && duration !== null) {
+                var hm = window.BookingModalUtils.formatMinutesToHm;
+                block.full_datetime = dateIso + ' ' + hm(start) + ':00';
+                block.duration = String(Math.floor(duration / 60)).padStart(2, '0') + ':' + String(duration % 60).padStart(2, '0');
+            }
+            var servicesSelect = blockEl.querySelector('.custom-select[id^="services"]');
+            if (servicesSelect && servicesSelect._selectedOptions) {
+                Array.from(servicesSelect._selectedOptions).forEach(function (li) {
+                    var serviceId = li.getAttribute('data-value');
+                    if (serviceId) block.services.push(String(serviceId));
+                });
+            }
+            var tariffLi = blockEl.querySelector('.custom-select[id^="tariff"] ul.options li.selected');
+            if (tariffLi) {
+                block.tariff_id = String(tariffLi.getAttribute('data-value') || '');
+            }
+            return block;
+        }
+
+        /**
+         * Пересчитывает стоимость всех блоков на сервере (booking.pricing) одним
+         * запросом. Локальный расчёт остаётся мгновенным предпросмотром; ответ
+         * сервера его заменяет. Блоки, которые сервер не смог посчитать
+         * (не выбрано время или тариф), не трогаются.
+         */
+        function scheduleServerQuote() {
+            if (!window.BookingModalUtils || typeof window.BookingModalUtils.requestBookingQuote !== 'function') return;
+            if (!window.currentScenarioFilterId) return;
+
+            var blocks = getBlocks();
+            if (!blocks.length) return;
+            var roomIdField = document.getElementById('roomIdField');
+            var peopleCountInput = document.getElementById('people-count');
+            var payload = {
+                scenario_id: window.currentScenarioFilterId,
+                room_id: roomIdField ? roomIdField.value : '',
+                people_count: peopleCountInput ? String(peopleCountInput.value || '').trim() : '',
+                blocks: blocks.map(_blockQuotePayload)
+            };
+
+            window.BookingModalUtils.requestBookingQuote(payload, function (data) {
+                (data.quotes || []).forEach(function (q, i) {
+                    var blockEl = blocks[i];
+                    if (!q || q.error || !blockEl || !blockEl.isConnected) return;
+                    var ce = blockEl.querySelector('[id^="bookingCostValue"]');
+                    if (ce) {
+                        ce.textContent = formatCostNumber(parseFloat(q.total_cost)) + ' BYN';
+                    }
+                });
+                updateBulkTotalCost();
+            });
+        }
+        window.scheduleCreateBookingQuote = scheduleServerQuote;
+
         var __bulkBusySpecialistsByDateCache = window.__bulkBusySpecialistsByDateCache || (window.__bulkBusySpecialistsByDateCache = {});
         var __bulkBusySpecialistsByDateInflight = window.__bulkBusySpecialistsByDateInflight || (window.__bulkBusySpecialistsByDateInflight = {});
 
@@ -1245,6 +1319,7 @@
 
         function calculateAndUpdateBookingCostInBlock(blockEl) {
             if (!blockEl) return;
+            scheduleServerQuote();
 
             var costElement = blockEl.querySelector('[id^="bookingCostValue"]');
             if (!costElement) return;
@@ -3092,6 +3167,9 @@
                  * из кода, который относится к single-режиму.
                  */
                 function calculateAndUpdateBookingCost() {
+                    if (typeof window.scheduleCreateBookingQuote === 'function') {
+                        window.scheduleCreateBookingQuote();
+                    }
                     if (!isTariffScenario() && window.BookingServicesUtils && typeof window.BookingServicesUtils.calculateAndUpdateTotalCost === 'function') {
                         window.BookingServicesUtils.calculateAndUpdateTotalCost({
                             costElementId: 'bookingCostValue',
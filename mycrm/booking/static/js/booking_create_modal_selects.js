@@ -950,6 +950,69 @@
             }
         }
 
+        // Клиенты не загружаются с главной страницей: список ищется на сервере
+        // по мере ввода, в селекте — только текущая страница совпадений.
+        function renderClientOptions(clientSelect, data) {
+            var optionsEl = clientSelect.querySelector('ul.options');
+            if (!optionsEl) return;
+
+            var selected = optionsEl.querySelector('li[data-type="client"].selected');
+            optionsEl.querySelectorAll('li[data-type="client"]:not(.selected), #client-search-more').forEach(function (li) {
+                li.remove();
+            });
+
+            var fragment = document.createDocumentFragment();
+            (data.clients || []).forEach(function (client) {
+                if (selected && selected.getAttribute('data-value') === String(client.id)) {
+                    selected.style.display = '';
+                    return;
+                }
+                var li = document.createElement('li');
+                li.setAttribute('data-value', client.id);
+                li.setAttribute('data-type', 'client');
+                li.textContent = client.name;
+                if (client.phone && window.BookingModalUtils) {
+                    li.title = window.BookingModalUtils.formatPhoneNumber(client.phone);
+                }
+                fragment.appendChild(li);
+            });
+            if (data.has_more) {
+                var more = document.createElement('li');
+                more.id = 'client-search-more';
+                more.style.cursor = 'default';
+                more.style.color = '#818EA2';
+                more.textContent = 'Показаны первые совпадения — уточните запрос';
+                fragment.appendChild(more);
+            }
+
+            var firstGroup = optionsEl.querySelector('li[data-type="group"]');
+            optionsEl.insertBefore(fragment, firstGroup);
+        }
+
+        function loadClientOptions(clientSelect, query) {
+            if (!window.BookingModalUtils || typeof window.BookingModalUtils.searchClients !== 'function') {
+                return;
+            }
+            clientSelect._clientSearchQuery = query;
+            window.BookingModalUtils.searchClients(query, function (data) {
+                renderClientOptions(clientSelect, data);
+            }, query ? undefined : 0);
+        }
+
+        var clientSelectEl = document.getElementById('client');
+        if (clientSelectEl && !clientSelectEl._clientSearchBound) {
+            clientSelectEl._clientSearchBound = true;
+            // Первая страница клиентов — при открытии селекта, если с прошлого
+            // раза изменилась строка поиска (её сбрасывает выбор или закрытие модалки).
+            clientSelectEl.addEventListener('click', function () {
+                var input = clientSelectEl.querySelector('#client-search-input');
+                var query = input ? String(input.value || '').trim() : '';
+                if (clientSelectEl._clientSearchQuery !== query) {
+                    loadClientOptions(clientSelectEl, query);
+                }
+            });
+        }
+
         if (window.BookingSelectsUtils && typeof window.BookingSelectsUtils.bindSelectsInRoot === 'function') {
             window.BookingSelectsUtils.bindSelectsInRoot({
                 rootEl: modalElement,
@@ -958,11 +1021,14 @@
                 skipSelectIds: ['services', 'start-time', 'end-time', 'duration'],
                 selectConfigs: {
                     'client': {
-                        ignoreOptionIds: ['search-option'],
+                        ignoreOptionIds: ['search-option', 'client-search-more'],
                         searchInputSelector: '#client-search-input',
                         searchOptionId: 'search-option',
                         focusSearchOnOpen: true,
                         clearSearchOnSelect: true,
+                        onSearch: function (ctx) {
+                            loadClientOptions(ctx.selectEl, ctx.query);
+                        },
                         onSelected: function () {
                             if (typeof window.updateSubmitButtonState === 'function') {
                                 window.updateSubmitButtonState();
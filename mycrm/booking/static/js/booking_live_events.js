@@ -0,0 +1,174 @@
+/**
+ * BookingLiveEvents — живое обновление календаря
+ *
+ * Подписывается на события броней сервера: по SSE (`/booking/live-events/stream/`),
+ * а если сервер работает под WSGI и отвечает на SSE кодом 204 — опросом
+ * (`/booking/live-events/poll/`) раз в POLL_INTERVAL_MS: сервер отвечает сразу,
+ * не удерживая рабочий процесс в ожидании событий. События — только сигнал «что-то изменилось»:
+ * данные сетки подтягиваются обработчиком `onChange` (дельта get_bookings_grid).
+ *
+ * @namespace BookingLiveEvents
+ */
+(function () {
+    // Предотвращаем повторную инициализацию
+    if (window.BookingLiveEvents) {
+        return;
+    }
+
+    var STREAM_URL = '/booking/live-events/stream/';
+    var POLL_URL = '/booking/live-events/poll/';
+    var POLL_INTERVAL_MS = 3000;
+    var POLL_RETRY_MS = 5000;
+
+    /**
+     * Подключается к потоку событий
+     * @param {Object} options
+     * @param {Function} options.getFilter - Возвращает {area_id, date_from, date_to}
+     * @param {Function} options.onChange - Вызывается при подходящих событиях (массив событий)
+     * @param {Function} [options.onReset] - Вызывается, когда часть событий потеряна
+     * @returns {Object} {isConnected(), syncFilter(), close()}
+     */
+    function connect(options) {
+        var filterKey = null;
+        var lastId = null;
+        var source = null;
+        var mode = 'sse';
+        var connected = false;
+        var closed = false;
+        var pollGeneration = 0;
+
+        function currentFilter() {
+            var filter = options.getFilter() || {};
+            var params = new URLSearchParams();
+            Object.keys(filter).forEach(function (key) {
+                if (filter[key] !== null && filter[key] !== undefined && filter[key] !== '') {
+                    params.append(key, filter[key]);
+                }
+            });
+            return params;
+        }
+
+        function handleReset() {
+            if (typeof options.onReset === 'function') {
+                options.onReset();
+            } else {
+                options.onChange([]);
+            }
+        }
+
+        function openStream() {
+            var params = currentFilter();
+            filterKey = params.toString();
+            if (lastId !== null) {
+                params.append('last_id', lastId);
+            }
+            source = new EventSource(STREAM_URL + '?' + params.toString());
+            source.onopen = function () {
+                connected = true;
+            };
+            source.addEventListener('booking', function (e) {
+                lastId = parseInt(e.lastEventId, 10);
+                options.onChange([JSON.parse(e.data)]);
+            });
+            source.addEventListener('reset', function (e) {
+                lastId = parseInt(e.lastEventId, 10);
+                handleReset();
+            });
+            source.onerror = function () {
+                connected = false;
+                // CLOSED — сервер ответил не потоком (204 под WSGI): переходим на опрос.
+                if (source.readyState === EventSource.CLOSED && !closed) {
+                    source = null;
+                    mode = 'poll';
+                    startPolling();
+                }
+            };
+        }
+
+        function sleep(ms) {
+            return new Promise(function (resolve) { setTimeout(resolve, ms); });
+        }
+
+        async function pollLoop(generation) {
+            while (!closed && generation === pollGeneration) {
+                var params = currentFilter();
+                filterKey = params.toString();
+                if (lastId !== null) {
+                    params.append('last_id', lastId);
+                }
+                try {
+                    var response = await fetch(POLL_URL + '?' + params.toString());
+                    if (!response.ok) {
+                        throw new Error('HTTP ' + response.status);
+                    }
+                    var data = await response.json();
+                    if (generation !== pollGeneration) {
+                        return;
+                    }
+                    connected = true;
+                    var initial = lastId === null;
+                    lastId = data.last_id;
+                    if (data.reset) {
+                        handleReset();
+                    } else if (!initial && data.events.length) {
+                        options.onChange(data.events);
+                    }
+                    if (!initial) {
+                        await sleep(POLL_INTERVAL_MS);
+                    }
+                } catch (error) {
+                    connected = false;
+                    await sleep(POLL_RETRY_MS);
+                }
+            }
+        }
+
+        function startPolling() {
+            pollGeneration += 1;
+            pollLoop(pollGeneration);
+        }
+
+        /**
+         * Переподключается, если фильтр сетки (помещение, диапазон) изменился
+         */
+        function syncFilter() {
+            if (closed || currentFilter().toString() === filterKey) {
+                return;
+            }
+            if (mode === 'sse' && source) {
+                source.close();
+                openStream();
+            } else if (mode === 'poll') {
+                // Текущий цикл опроса завершится, его ответ будет проигнорирован.
+                startPolling();
+            }
+        }
+
+        function close() {
+            closed = true;
+            connected = false;
+            pollGeneration += 1;
+            if (source) {
+                source.close();
+                source = null;
+            }
+        }
+
+        if (typeof window.EventSource === 'function') {
+            openStream();
+        } else {
+            mode = 'poll';
+            startPolling();
+        }
+
+        return {
+            isConnected: function () { return connected; },
+            syncFilter: syncFilter,
+            close: close,
+        };
+    }
+
+    window.BookingLiveEvents = {
+        connect: connect,
+    };
+})();
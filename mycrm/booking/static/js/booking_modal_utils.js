@@ -328,6 +328,71 @@
         costElement.textContent = formatted + ' BYN';
     }
 
+    var quoteTimer = null;
+    var quoteSeq = 0;
+
+    /**
+     * Запрашивает цены блоков формы брони у сервера (`/booking/quote/`).
+     * Вызовы в пределах `delay` мс склеиваются в один запрос, ответ на
+     * устаревший запрос отбрасывается.
+     * @param {Object} payload - {scenario_id, room_id, people_count, blocks: [...]}
+     * @param {Function} onQuotes - Вызывается с ответом сервера ({quotes, total_cost})
+     * @param {number} [delay=250] - Задержка перед запросом, мс
+     */
+    function requestBookingQuote(payload, onQuotes, delay) {
+        if (quoteTimer) clearTimeout(quoteTimer);
+        quoteTimer = setTimeout(function () {
+            quoteTimer = null;
+            var seq = ++quoteSeq;
+            fetch('/booking/quote/', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-Requested-With': 'XMLHttpRequest'
+                },
+                body: JSON.stringify(payload)
+            })
+                .then(function (r) { return r.ok ? r.json() : null; })
+                .then(function (data) {
+                    if (seq !== quoteSeq) return;
+                    if (data && data.success && typeof onQuotes === 'function') {
+                        onQuotes(data);
+                    }
+                })
+                .catch(function () {});
+        }, delay === undefined ? 250 : delay);
+    }
+
+    var clientSearchTimer = null;
+    var clientSearchSeq = 0;
+
+    /**
+     * Ищет клиентов на сервере (`/booking/client/search/`) по мере ввода.
+     * Вызовы в пределах `delay` мс склеиваются в один запрос, ответ на
+     * устаревший запрос отбрасывается.
+     * @param {string} query - Строка поиска (пустая — первые клиенты по имени)
+     * @param {Function} onResults - Вызывается с ответом сервера ({clients, has_more})
+     * @param {number} [delay=200] - Задержка перед запросом, мс
+     */
+    function searchClients(query, onResults, delay) {
+        if (clientSearchTimer) clearTimeout(clientSearchTimer);
+        clientSearchTimer = setTimeout(function () {
+            clientSearchTimer = null;
+            var seq = ++clientSearchSeq;
+            fetch('/booking/client/search/?q=' + encodeURIComponent(query || ''), {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
+            })
+                .then(function (r) { return r.ok ? r.json() : null; })
+                .then(function (data) {
+                    if (seq !== clientSearchSeq) return;
+                    if (data && data.success && typeof onResults === 'function') {
+                        onResults(data);
+                    }
+                })
+                .catch(function () {});
+        }, delay === undefined ? 200 : delay);
+    }
+
     /* =========================================================================
      * СЕКЦИЯ 5: Форматирование данных
      * ========================================================================= */
@@ -503,6 +568,8 @@
         // Стоимость
         getSelectedServicesCost: getSelectedServicesCost,
         calculateAndUpdateBookingCost: calculateAndUpdateBookingCost,
+        requestBookingQuote: requestBookingQuote,
+        searchClients: searchClients,
         
         // Форматирование
         formatPhoneNumber: formatPhoneNumber,
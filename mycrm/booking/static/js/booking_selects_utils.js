@@ -154,6 +154,8 @@
      * - searchOptionId: string (id li, внутри которого инпут поиска)
      * - focusSearchOnOpen: boolean
      * - clearSearchOnSelect: boolean
+     * - onSearch: Function({selectEl, query}) — вызывается после локальной
+     *   фильтрации, например чтобы подгрузить опции с сервера
      */
     function bindSingleSelect(config) {
         if (!config || !config.selectEl) return;
@@ -261,6 +263,9 @@
                         var text = String(opt.textContent || '').trim().toLowerCase();
                         opt.style.display = text.indexOf(filter) !== -1 ? '' : 'none';
                     });
+                    if (typeof config.onSearch === 'function') {
+                        config.onSearch({ selectEl: selectEl, query: String(this.value || '').trim() });
+                    }
                 });
             }
 
@@ -315,7 +320,8 @@
                 searchInputSelector: perCfg.searchInputSelector,
                 searchOptionId: perCfg.searchOptionId,
                 focusSearchOnOpen: perCfg.focusSearchOnOpen,
-                clearSearchOnSelect: perCfg.clearSearchOnSelect
+                clearSearchOnSelect: perCfg.clearSearchOnSelect,
+                onSearch: perCfg.onSearch
             });
         });
     }
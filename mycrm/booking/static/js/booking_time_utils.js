@@ -49,6 +49,110 @@
         );
     }
 
+    /**
+     * Форматирует Date в строку "YYYY-MM-DD HH:MM:SS" (локальное время)
+     * @param {Date} dt - Дата-время
+     * @returns {string}
+     */
+    function formatDatetimeStr(dt) {
+        function pad(n) { return String(n).padStart(2, '0'); }
+        return dt.getFullYear() + '-' + pad(dt.getMonth() + 1) + '-' + pad(dt.getDate()) +
+            ' ' + pad(dt.getHours()) + ':' + pad(dt.getMinutes()) + ':' + pad(dt.getSeconds());
+    }
+
+    /**
+     * Разворачивает бронь в последовательность тайм-слотов календаря
+     *
+     * Бэкенд отдаёт только границы брони (`datetime_start`, `datetime_end`, локальное
+     * время "YYYY-MM-DD HH:MM:SS") и шаг сетки `block_length_minutes`. Слоты идут
+     * с этим шагом от начала брони; последний слот — не позже окончания брони.
+     * @param {Object} booking - Бронь с бэкенда
+     * @returns {Array<string>} Слоты в формате "YYYY-MM-DD HH:MM:SS"
+     * @example
+     * expandBookingBlocks({datetime_start: "2025-12-22 14:00:00", datetime_end: "2025-12-22 14:30:00", block_length_minutes: 15})
+     * // ["2025-12-22 14:00:00", "2025-12-22 14:15:00", "2025-12-22 14:30:00"]
+     */
+    function expandBookingBlocks(booking) {
+        if (!booking) return [];
+        var start = parseDatetimeStr(booking.datetime_start);
+        var end = parseDatetimeStr(booking.datetime_end);
+        if (!start || !end) return [];
+        var step = parseInt(booking.block_length_minutes, 10) || 15;
+        var totalMinutes = Math.floor((end.getTime() - start.getTime()) / 60000);
+        var blocks = [];
+        for (var i = 0; i <= totalMinutes; i += step) {
+            blocks.push(formatDatetimeStr(new Date(start.getTime() + i * 60000)));
+        }
+        return blocks;
+    }
+
+    /**
+     * Восстанавливает построчный список броней из колоночного ответа сетки
+     *
+     * Ответ `format=columnar` (`booking/calendar_feed.py`): параллельные массивы
+     * в `columns`, ссылки на словари `rooms`/`clients`/`client_groups` (-1 — нет
+     * значения), время в минутах от полуночи даты `origin`, суммы в копейках.
+     * Результат совпадает с построчным `bookings_in_range`.
+     * @param {Object} payload - Значение `bookings_columnar` из ответа
+     * @returns {Array<Object>} Брони в формате `bookings_in_range`
+     */
+    function decodeColumnarBookings(payload) {
+        if (!payload || !payload.columns) return [];
+        var cols = payload.columns;
+        var rooms = payload.rooms || [];
+        var clients = payload.clients || [];
+        var clientGroups = payload.client_groups || [];
+        var originParts = String(payload.origin).split('-');
+        // Минуты отсчитываются в UTC, чтобы переход на летнее время в браузере
+        // не сдвигал локальное время сервера.
+        var originMs = Date.UTC(
+            parseInt(originParts[0], 10),
+            parseInt(originParts[1], 10) - 1,
+            parseInt(originParts[2], 10)
+        );
+
+        function pad(n) { return String(n).padStart(2, '0'); }
+        function datetimeAt(minutes) {
+            var dt = new Date(originMs + minutes * 60000);
+            return dt.getUTCFullYear() + '-' + pad(dt.getUTCMonth() + 1) + '-' + pad(dt.getUTCDate()) +
+                ' ' + pad(dt.getUTCHours()) + ':' + pad(dt.getUTCMinutes()) + ':00';
+        }
+        function money(cents) {
+            return (cents / 100).toFixed(2);
+        }
+
+        var result = [];
+        for (var i = 0; i < payload.count; i++) {
+            var room = rooms[cols.room[i]] || [null, null];
+            var client = cols.client[i] >= 0 ? clients[cols.client[i]] : null;
+            var group = cols.client_group[i] >= 0 ? clientGroups[cols.client_group[i]] : null;
+            var total = cols.total_cost[i];
+            var paid = cols.paid_amount[i];
+            result.push({
+                id: cols.id[i],
+                room_name: room[1],
+                idroom: room[0],
+                scenario_id: cols.scenario_id[i],
+                datetime_start: datetimeAt(cols.start[i]),
+                datetime_end: datetimeAt(cols.end[i]),
+                block_length_minutes: payload.block_length_minutes,
+                client_id: client ? client[0] : null,
+                client_name: client ? client[1] : null,
+                client_comment: client ? client[2] : null,
+                client_phone: client ? client[3] : null,
+                client_group_id: group ? group[0] : null,
+                client_group_name: group ? group[1] : null,
+                specialist_id: cols.specialist_id[i],
+                status_id: cols.status_id[i],
+                comment: cols.comment[i],
+                total_cost: money(total),
+                paid_amount: money(paid),
+                remaining_amount: money(Math.max(total - paid, 0)),
+            });
+        }
+        return result;
+    }
+
     /**
      * Форматирует количество минут в строку времени HH:MM
      * @param {number} totalMinutes - Общее количество минут от начала суток
@@ -234,9 +338,10 @@
     /**
      * Нормализует массив бронирований в формат интервалов для указанной даты
      *
-     * Входные данные (`bookings`) приходят с бэкенда и содержат `blocks_datetime_range`:
-     * это последовательность тайм-слотов (обычно шаг 15 минут) в виде строк
-     * "YYYY-MM-DD HH:MM:SS". Для расчёта занятости нам достаточно границ:
+     * Входные данные (`bookings`) приходят с бэкенда с границами брони и шагом сетки;
+     * `expandBookingBlocks` разворачивает их в последовательность тайм-слотов
+     * (обычно шаг 15 минут) в виде строк "YYYY-MM-DD HH:MM:SS". Для расчёта
+     * занятости нам достаточно границ:
      *
      * - начало = первый элемент массива на нужную дату
      * - конец  = последний элемент массива на нужную дату
@@ -246,7 +351,7 @@
      *
      * Этот формат используется и в bulk UI: к реальным бронированиям комнаты
      * могут добавляться «синтетические» интервалы занятости из других bulk-блоков.
-     * @param {Array} bookings - Массив бронирований с blocks_datetime_range
+     * @param {Array} bookings - Массив бронирований (datetime_start/datetime_end)
      * @param {string} dateIso - Дата в формате ISO (YYYY-MM-DD)
      * @param {number|string} [excludeBookingId] - ID брони для исключения (при редактировании)
      * @returns {Array<{bookingId: number, startMinutes: number, endMinutes: number}>}
@@ -256,12 +361,12 @@
 
         var parsed = [];
         bookings.forEach(function (booking) {
-            if (!booking || !booking.blocks_datetime_range || !booking.blocks_datetime_range.length) return;
+            if (!booking) return;
             if (excludeBookingId !== undefined && excludeBookingId !== null && String(booking.id) === String(excludeBookingId)) {
                 return;
             }
 
-            var blocksOnDate = booking.blocks_datetime_range.filter(function (block) {
+            var blocksOnDate = expandBookingBlocks(booking).filter(function (block) {
                 return String(block).startsWith(dateIso);
             });
             if (blocksOnDate.length === 0) return;
@@ -270,7 +375,7 @@
             var endDt = parseDatetimeStr(blocksOnDate[blocksOnDate.length - 1]);
             if (!startDt || !endDt) return;
 
-            // Последний элемент в blocks_datetime_range - это время окончания брони,
+            // Последний слот брони - это время окончания брони,
             // не нужно добавлять +15 (раньше добавляли, т.к. думали что это начало последнего интервала)
             var endMinutes = endDt.getHours() * 60 + endDt.getMinutes();
 
@@ -847,6 +952,9 @@
      */
     window.BookingTimeUtils = {
         parseDatetimeStr: parseDatetimeStr,
+        formatDatetimeStr: formatDatetimeStr,
+        expandBookingBlocks: expandBookingBlocks,
+        decodeColumnarBookings: decodeColumnarBookings,
         formatTimeHHMM: formatTimeHHMM,
         parseTimeToMinutes: parseTimeToMinutes,
         formatDurationHuman: formatDurationHuman,
@@ -0,0 +1,160 @@
+"""Скомпилированный индекс применимости тарифов.
+
+Тариф подходит брони, если он активен, привязан к сценарию и комнате брони,
+вмещает нужное количество людей и бронь начинается и заканчивается внутри
+одного его недельного интервала в день недели брони.
+
+Индекс хранит интервалы активных тарифов по ключу (сценарий, комната, день
+недели), отсортированные по началу, вместе с вместимостью тарифа. Поиск
+тарифов по индексу запросов не делает. Объекты тарифов в индексе загружены
+вместе с недельными интервалами (`tariff.weekly_intervals.all()` тоже без
+запросов) и используются только для чтения.
+
+Индекс живёт в памяти процесса (`booking.versioned_cache`) и собирается при
+первом обращении (четыре запроса). Сигналы (`booking.signals`) на `Tariff`,
+его связях со сценариями и комнатами и `TariffWeeklyInterval` сбрасывают
+индекс текущего процесса и увеличивают версию набора `tariffs`
+(`booking.data_versions`). Другие процессы сверяют версию не чаще раза в
+TARIFF_INDEX_CHECK_SECONDS секунд (по умолчанию 5; 0 — при каждом обращении)
+и пересобирают индекс, если она изменилась.
+"""
+
+from bisect import bisect_right
+from datetime import date, time
+
+from . import data_versions
+from .models import Tariff
+from .versioned_cache import VersionedCache
+
+
+class TariffIndex:
+    """Интервалы активных тарифов по (сценарий, комната, день недели)."""
+
+    def __init__(self):
+        tariffs = list(
+            Tariff.objects.filter(active=True)
+            .prefetch_related("weekly_intervals")
+            .order_by("id")
+        )
+        self.tariffs = {tariff.id: tariff for tariff in tariffs}
+        scenarios = {}
+        for tariff_id, scenario_id in Tariff.scenarios.through.objects.filter(
+            tariff_id__in=self.tariffs
+        ).values_list("tariff_id", "scenario_id"):
+            scenarios.setdefault(tariff_id, []).append(scenario_id)
+        rooms = {}
+        for tariff_id, room_id in Tariff.rooms.through.objects.filter(
+            tariff_id__in=self.tariffs
+        ).values_list("tariff_id", "room_id"):
+            rooms.setdefault(tariff_id, []).append(room_id)
+
+        # Ключ: (scenario_id, room_id, weekday) → [(start, end, max_people, tariff_id)]
+        entries = {}
+        for tariff in tariffs:
+            for interval in tariff.weekly_intervals.all():
+                entry = (
+                    interval.start_time,
+                    interval.end_time,
+                    tariff.max_people,
+                    tariff.id,
+                )
+                for scenario_id in scenarios.get(tariff.id, ()):
+                    for room_id in rooms.get(tariff.id, ()):
+                        key = (scenario_id, room_id, int(interval.weekday))
+                        entries.setdefault(key, []).append(entry)
+        self._intervals = {key: sorted(items) for key, items in entries.items()}
+        self._starts = {
+            key: [entry[0] for entry in items] for key, items in self._intervals.items()
+        }
+
+    def intervals(self, scenario_id, room_id, weekday: int, people_count=None):
+        """Интервалы тарифов на `people_count` людей: [(start, end, tariff_id)]."""
+        people = people_count if people_count is not None else 1
+        return [
+            (start, end, tariff_id)
+            for start, end, max_people, tariff_id in self._intervals.get(
+                (scenario_id, room_id, weekday), ()
+            )
+            if max_people >= people
+        ]
+
+    def tariff_ids(
+        self,
+        scenario_id,
+        room_id,
+        weekday: int,
+        start_time: time,
+        end_time: time | None,
+        people_count=None,
+    ) -> list[int]:
+        """ID тарифов, в один интервал которых попадает бронь, по возрастанию."""
+        key = (scenario_id, room_id, weekday)
+        starts = self._starts.get(key)
+        if not starts:
+            return []
+        people = people_count if people_count is not None else 1
+        found = set()
+        # Интервалы, начинающиеся позже брони, ей не подходят.
+        for start, end, max_people, tariff_id in self._intervals[key][
+            : bisect_right(starts, start_time)
+        ]:
+            if max_people < people or not start_time < end:
+                continue
+            if end_time is not None and end_time > end:
+                continue
+            found.add(tariff_id)
+        return sorted(found)
+
+    def available(
+        self,
+        scenario_id,
+        room_id,
+        target_date: date,
+        start_time: time,
+        end_time: time | None,
+        people_count=None,
+    ) -> list[Tariff]:
+        """Подходящие тарифы (объекты `Tariff`) для одной брони."""
+        return [
+            self.tariffs[tariff_id]
+            for tariff_id in self.tariff_ids(
+                scenario_id,
+                room_id,
+                target_date.weekday(),
+                start_time,
+                end_time,
+                people_count,
+            )
+        ]
+
+    def quote(self, scenario_id, room_id, windows, people_count=None) -> list:
+        """Подходящие тарифы для набора окон [(дата, начало, конец), ...].
+
+        Возвращает список списков `Tariff` в порядке окон.
+        """
+        return [
+            self.available(
+                scenario_id, room_id, target_date, start_time, end_time, people_count
+            )
+            for target_date, start_time, end_time in windows
+        ]
+
+
+_cache = VersionedCache(
+    data_versions.TARIFFS, TariffIndex, "TARIFF_INDEX_CHECK_SECONDS"
+)
+
+
+def get_index() -> TariffIndex:
+    """Актуальный индекс процесса; собирается при первом обращении и смене версии."""
+    return _cache.get()
+
+
+def invalidate() -> None:
+    """Сбрасывает индекс текущего процесса."""
+    _cache.invalidate()
+
+
+def tariffs_changed() -> None:
+    """Вызывается сигналами при изменении тарифов (в транзакции изменения)."""
+    _cache.changed()
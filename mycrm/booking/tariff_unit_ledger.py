@@ -0,0 +1,339 @@
+"""Журнал тарифных единиц абонементов.
+
+Раньше возврат единиц при отмене брони читал `Subscription.balance`,
+прибавлял к нему в Python и сохранял абонемент: при параллельных действиях
+администраторов одно изменение баланса затирало другое. Теперь каждое
+изменение — запись журнала `TariffUnitLedger` (начисление, списание или
+корректировка, со ссылками на бронь и платёж), а `Subscription.balance` —
+накопленная сумма журнала. `credit` и `debit` меняют её одним
+`UPDATE ... SET balance = balance + units` в той же транзакции, что и запись
+журнала. Списание — условный UPDATE (`balance >= units`): остаток проверяется
+без чтения строки и без окна между проверкой и списанием.
+
+Баланс, сохранённый через модель (админка, API абонементов, команды), тоже
+попадает в журнал — корректировкой на разницу с балансом в БД (сигналы,
+`connect_signals`). Сохранение абонемента без изменения баланса не
+перезаписывает его значением, прочитанным до параллельного списания: баланс
+на момент чтения запоминает `Subscription.from_db`.
+
+Баланс на прошлую дату (`balance_at`) — ближайший снимок
+`TariffUnitBalanceSnapshot` не позже неё плюс движения после снимка. Снимки
+делает команда `snapshot_tariff_unit_balances` (например, раз в сутки).
+"""
+
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.expressions import Combinable
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+
+from . import client_summary, reference_data
+from .models import (
+    Subscription,
+    TariffUnit,
+    TariffUnitBalanceSnapshot,
+    TariffUnitLedger,
+)
+from .payment_totals import TARIFF_UNITS_PAYMENT_TYPE
+
+# Движения раньше первого снимка абонемента.
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class InsufficientUnits(ValueError):
+    """На абонементе меньше единиц, чем нужно списать."""
+
+
+def _apply(subscription, units, kind, reservation, payment, comment, using):
+    with transaction.atomic(using=using):
+        rows = Subscription.objects.using(using).filter(pk=subscription.pk)
+        if units < 0:
+            rows = rows.filter(balance__gte=-units)
+        # UPDATE — первый запрос транзакции: строка сразу блокируется на
+        # запись, параллельные изменения баланса ждут её фиксации.
+        if not rows.update(
+            balance=F("balance") + units, updated_at=timezone.now()
+        ):
+            if units < 0 and subscription.pk is not None:
+                raise InsufficientUnits("Недостаточно тарифных единиц на абонементе")
+            raise Subscription.DoesNotExist("Абонемент не найден")
+        entry = TariffUnitLedger.objects.using(using).create(
+            subscription_id=subscription.pk,
+            kind=kind,
+            units=units,
+            reservation=reservation,
+            payment=payment,
+            comment=comment,
+        )
+        client_summary.refresh({subscription.client_id}, using=using)
+        subscription.refresh_from_db(using=using, fields=["balance"])
+        remember_balance(subscription)
+    return entry
+
+
+def credit(
+    subscription,
+    units: int,
+    *,
+    reservation=None,
+    payment=None,
+    comment: str = "",
+    using: str = DEFAULT_DB_ALIAS,
+) -> TariffUnitLedger:
+    """Начисляет `units` единиц на абонемент; `subscription.balance` обновляется."""
+    if units <= 0:
+        raise ValueError("Количество тарифных единиц должно быть больше 0")
+    return _apply(
+        subscription,
+        units,
+        TariffUnitLedger.KIND_CREDIT,
+        reservation,
+        payment,
+        comment,
+        using,
+    )
+
+
+def debit(
+    subscription,
+    units: int,
+    *,
+    reservation=None,
+    payment=None,
+    comment: str = "",
+    using: str = DEFAULT_DB_ALIAS,
+) -> TariffUnitLedger:
+    """Списывает `units` единиц с абонемента.
+
+    Если единиц не хватает — `InsufficientUnits`, баланс и журнал не меняются.
+    """
+    if units <= 0:
+        raise ValueError("Количество тарифных единиц должно быть больше 0")
+    return _apply(
+        subscription,
+        -units,
+        TariffUnitLedger.KIND_DEBIT,
+        reservation,
+        payment,
+        comment,
+        using,
+    )
+
+
+def units_for_amount(amount, scenario_id) -> int:
+    """Сколько целых тарифных единиц сценария составляет сумма `amount`."""
+    tariff_unit = reference_data.get(TariffUnit, scenario_id=scenario_id)
+    return int(Decimal(str(amount)) / tariff_unit.tariff_unit_cost)
+
+
+def payment_units(payment) -> int:
+    """Единицы, которыми оплачен платёж (0 — платёж не тарифными единицами)."""
+    if payment.canceled or payment.payment_type.name != TARIFF_UNITS_PAYMENT_TYPE:
+        return 0
+    return units_for_amount(payment.amount, payment.reservation.scenario_id)
+
+
+def charge_payment(payment, using: str = DEFAULT_DB_ALIAS):
+    """Приводит списание по платежу к его текущим сумме, типу и отмене.
+
+    Уже списанное по платежу берётся из журнала. Платёж единицами по брони без
+    клиента, без абонемента клиента по сценарию брони или по сценарию без
+    тарифной единицы ничего не списывает, как и до журнала. Возвращает запись
+    журнала или None, если списывать и возвращать нечего.
+    """
+    reservation = payment.reservation
+    subscription = (
+        Subscription.objects.using(using)
+        .filter(client_id=reservation.client_id, scenario_id=reservation.scenario_id)
+        .first()
+    )
+    if subscription is None:
+        return None
+    charged = -_entries_total(
+        TariffUnitLedger.objects.using(using).filter(payment_id=payment.pk)
+    )
+    try:
+        units = payment_units(payment) - charged
+    except TariffUnit.DoesNotExist:
+        return None
+    if not units:
+        return None
+    options = {"reservation": reservation, "payment": payment, "using": using}
+    if units > 0:
+        return debit(
+            subscription, units, comment=f"Оплата брони {reservation.pk}", **options
+        )
+    return credit(
+        subscription,
+        -units,
+        comment=f"Изменение оплаты брони {reservation.pk}",
+        **options,
+    )
+
+
+def remember_balance(subscription) -> None:
+    """Запоминает баланс в БД после изменений журнала (при чтении — from_db)."""
+    subscription._ledger_balance = subscription.__dict__.get("balance")
+
+
+def before_save(subscription, update_fields=None, using=DEFAULT_DB_ALIAS) -> None:
+    """Сигнал pre_save абонемента: готовит корректировку баланса."""
+    subscription._ledger_adjustment = 0
+    if update_fields is not None and "balance" not in update_fields:
+        return
+    if not subscription._state.adding and subscription.balance == getattr(
+        subscription, "_ledger_balance", None
+    ):
+        # Баланс не менялся: UPDATE оставит значение из БД, а не прочитанное
+        # до параллельного списания.
+        subscription.balance = F("balance")
+        return
+    current = (
+        Subscription.objects.using(using)
+        .filter(pk=subscription.pk)
+        .values_list("balance", flat=True)
+        .first()
+    )
+    subscription._ledger_adjustment = subscription.balance - (current or 0)
+
+
+def after_save(subscription, using=DEFAULT_DB_ALIAS) -> None:
+    """Сигнал post_save абонемента: записывает корректировку в журнал."""
+    if isinstance(subscription.balance, Combinable):
+        subscription.refresh_from_db(using=using, fields=["balance"])
+    units = getattr(subscription, "_ledger_adjustment", 0)
+    if units:
+        TariffUnitLedger.objects.using(using).create(
+            subscription_id=subscription.pk,
+            kind=TariffUnitLedger.KIND_ADJUSTMENT,
+            units=units,
+            comment="Баланс изменён напрямую",
+        )
+    subscription._ledger_adjustment = 0
+    remember_balance(subscription)
+
+
+def _entries_total(entries):
+    return entries.aggregate(total=Sum("units"))["total"] or 0
+
+
+def balance_at(subscription_id, moment, using: str = DEFAULT_DB_ALIAS) -> int:
+    """Баланс абонемента с учётом движений не позже `moment` (два запроса)."""
+    snapshot = (
+        TariffUnitBalanceSnapshot.objects.using(using)
+        .filter(subscription_id=subscription_id, taken_at__lte=moment)
+        .order_by("-taken_at")
+        .first()
+    )
+    entries = TariffUnitLedger.objects.using(using).filter(
+        subscription_id=subscription_id, created_at__lte=moment
+    )
+    if snapshot is None:
+        return _entries_total(entries)
+    return snapshot.balance + _entries_total(
+        entries.filter(created_at__gt=snapshot.taken_at)
+    )
+
+
+def take_snapshots(moment=None, using: str = DEFAULT_DB_ALIAS) -> int:
+    """Снимки балансов на `moment` (по умолчанию — сейчас); возвращает их число.
+
+    Баланс считается по журналу: предыдущий снимок плюс движения после него.
+    Снимок пишется только для абонементов, у которых после предыдущего снимка
+    были движения, — `balance_at` для остальных берёт предыдущий.
+    """
+    moment = moment or timezone.now()
+    previous = TariffUnitBalanceSnapshot.objects.using(using).filter(
+        subscription=OuterRef("pk"), taken_at__lte=moment
+    ).order_by("-taken_at")
+    movements = (
+        TariffUnitLedger.objects.using(using)
+        .filter(
+            subscription=OuterRef("pk"),
+            created_at__gt=OuterRef("since"),
+            created_at__lte=moment,
+        )
+        .order_by()
+        .values("subscription")
+        .annotate(total=Sum("units"))
+        .values("total")
+    )
+    rows = (
+        Subscription.objects.using(using)
+        .annotate(
+            since=Coalesce(Subquery(previous.values("taken_at")[:1]), Value(_EPOCH)),
+            previous_balance=Coalesce(
+                Subquery(previous.values("balance")[:1]), Value(0)
+            ),
+        )
+        .annotate(movement=Subquery(movements, output_field=IntegerField()))
+        .filter(movement__isnull=False)
+        .exclude(balance_snapshots__taken_at=moment)
+        .values_list("pk", "previous_balance", "movement")
+    )
+    snapshots = [
+        TariffUnitBalanceSnapshot(
+            subscription_id=subscription_id,
+            taken_at=moment,
+            balance=previous_balance + movement,
+        )
+        for subscription_id, previous_balance, movement in rows
+    ]
+    TariffUnitBalanceSnapshot.objects.using(using).bulk_create(
+        snapshots, batch_size=1000
+    )
+    return len(snapshots)
+
+
+def find_drift(using: str = DEFAULT_DB_ALIAS):
+    """Абонементы, у которых баланс расходится с суммой журнала.
+
+    Расхождение дают только изменения в обход моделей (`QuerySet.update`).
+    """
+    totals = (
+        TariffUnitLedger.objects.using(using)
+        .filter(subscription=OuterRef("pk"))
+        .order_by()
+        .values("subscription")
+        .annotate(total=Sum("units"))
+        .values("total")
+    )
+    return (
+        Subscription.objects.using(using)
+        .annotate(
+            ledger_balance=Coalesce(
+                Subquery(totals, output_field=IntegerField()), Value(0)
+            )
+        )
+        .exclude(balance=F("ledger_balance"))
+    )
+
+
+def _prepare_adjustment(
+    sender, instance, using, update_fields=None, raw=False, **kwargs
+):
+    if not raw:
+        before_save(instance, update_fields, using=using)
+
+
+def _record_adjustment(sender, instance, using, raw=False, **kwargs):
+    if not raw:
+        after_save(instance, using=using)
+
+
+def connect_signals() -> None:
+    """Подключает журнал к сигналам `Subscription` (из `booking.signals`)."""
+    pre_save.connect(
+        _prepare_adjustment,
+        sender=Subscription,
+        dispatch_uid="tariff_unit_ledger_pre_save",
+    )
+    post_save.connect(
+        _record_adjustment,
+        sender=Subscription,
+        dispatch_uid="tariff_unit_ledger_save",
+    )
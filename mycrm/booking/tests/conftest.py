@@ -0,0 +1,25 @@
+import pytest
+from django.core.cache import cache
+
+from booking import reference_data, tariff_index
+
+
+@pytest.fixture(autouse=True)
+def _fresh_tariff_index():
+    # Откат транзакции теста не отправляет сигналов: индекс тарифов и
+    # справочники, загруженные в предыдущем тесте, сбрасываются явно.
+    tariff_index.invalidate()
+    reference_data.invalidate()
+    yield
+    tariff_index.invalidate()
+    reference_data.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    # Версии наборов данных откатываются вместе с транзакцией теста и
+    # повторяются в следующем: кэш (bootstrap, разметка дней сетки) общий
+    # на процесс и очищается явно.
+    cache.clear()
+    yield
+    cache.clear()
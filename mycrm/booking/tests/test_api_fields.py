@@ -0,0 +1,92 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from booking.models import (
+    Area,
+    Client,
+    ClientGroup,
+    Reservation,
+    Room,
+    Scenario,
+    Service,
+    ServiceGroup,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def auth_client():
+    User.objects.create_user(username="admin", password="secret")
+    client = APIClient()
+    token = client.post(
+        "/api/token/", {"username": "admin", "password": "secret"}
+    ).data["access"]
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    return client
+
+
+@pytest.fixture
+def reservations():
+    scenario = Scenario.objects.create(id=1, name="Звукозапись")
+    Area.objects.create(id=1, name="Первое")
+    room = Room.objects.create(
+        id=1, name="Комната", area_id=1, hourstart=time(8), hourend=time(23)
+    )
+    room.scenario.add(scenario)
+    group = ClientGroup.objects.create(id=1, name="Постоянные")
+    ServiceGroup.objects.create(id=1, name="Оборудование")
+    service = Service.objects.create(id=1, name="Микрофон", group_id=1, cost=5)
+    start = timezone.make_aware(datetime(2030, 5, 6, 10))
+    for i in range(6):
+        client = Client.objects.create(id=i + 1, name=f"Клиент {i}", phone=f"+3752{i}")
+        client.groups.add(group)
+        reservation = Reservation.objects.create(
+            id=i + 1,
+            datetimestart=start + timedelta(hours=i),
+            datetimeend=start + timedelta(hours=i + 1),
+            room=room,
+            scenario=scenario,
+            client=client,
+        )
+        reservation.services.add(service)
+
+
+def test_fields_and_expand(auth_client, reservations, django_assert_num_queries):
+    response = auth_client.get("/api/reservations/?fields=id,datetimestart")
+    assert set(response.data["results"][0]) == {"id", "datetimestart"}
+
+    # Пользователь токена, валидаторы ETag (счётчики таблиц, max(updated_at)
+    # броней и клиентов), брони, клиенты с группами, комнаты со сценариями,
+    # услуги — независимо от числа строк.
+    with django_assert_num_queries(10):
+        response = auth_client.get(
+            "/api/reservations/?fields=id,services&expand=client,room"
+        )
+    first = response.data["results"][0]
+    assert set(first) == {"id", "services", "client", "room"}
+    assert first["client"]["name"] == "Клиент 0"
+    assert first["client"]["groups"] == [1]
+    assert first["room"]["scenario"] == [1]
+    assert first["services"] == [1]
+
+    response = auth_client.get("/api/clients/1/")
+    assert set(response.data) == {
+        "id", "phone", "groups", "name", "comment", "email", "updated_at"
+    }
+    assert auth_client.get("/api/clients/?fields=phone_normalized").status_code == 400
+
+    response = auth_client.get("/api/clients/1/?fields=name,groups&expand=groups")
+    assert set(response.data) == {"name", "groups"}
+    assert response.data["groups"][0]["name"] == "Постоянные"
+
+
+def test_invalid_fields(auth_client, reservations):
+    response = auth_client.get("/api/reservations/?fields=id,nope")
+    assert response.status_code == 400 and "fields" in response.data
+    response = auth_client.get("/api/reservations/?expand=datetimestart")
+    assert response.status_code == 400 and "expand" in response.data
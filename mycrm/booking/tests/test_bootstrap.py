@@ -0,0 +1,88 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from booking import data_versions
+from booking.models import Area, Client, ClientGroup, Scenario
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _version():
+    return data_versions.get_version(data_versions.BOOTSTRAP)
+
+
+def _url(version, fmt="json"):
+    return reverse("bootstrap", kwargs={"version": version, "fmt": fmt})
+
+
+def test_version_is_bumped_by_reference_data_changes():
+    before = _version()
+    area = Area.objects.create(id=1, name="Помещение")
+    after_create = _version()
+    area.scenario.add(Scenario.objects.create(id=1, name="Звукозапись"))
+
+    assert before < after_create < _version()
+
+    # Клиентов в документе нет: их изменения версию не меняют.
+    version = _version()
+    client = Client.objects.create(id=1, name="Клиент", phone="+375290000001")
+    client.groups.add(ClientGroup.objects.create(id=1, name="Группа"))
+    assert _version() == version + 1
+
+
+def test_document_is_cached_per_version_with_etag(admin_client):
+    ClientGroup.objects.create(id=1, name="Группа")
+    version = _version()
+
+    response = admin_client.get(_url(version))
+
+    assert response.status_code == 200
+    assert "immutable" in response["Cache-Control"]
+    assert [g["name"] for g in response.json()["client_groups"]] == ["Группа"]
+    assert "clients" not in response.json()
+
+    not_modified = admin_client.get(
+        _url(version), HTTP_IF_NONE_MATCH=response["ETag"]
+    )
+    assert not_modified.status_code == 304
+
+    # Изменение группы даёт новую версию, старая перенаправляется на неё.
+    ClientGroup.objects.get(id=1).save()
+    stale = admin_client.get(_url(version))
+    assert stale.status_code == 302
+    assert stale["Location"] == _url(_version())
+
+
+def test_script_format_sets_global(admin_client):
+    response = admin_client.get(_url(_version(), fmt="js"))
+
+    assert response.status_code == 200
+    assert response.content.decode().startswith("window.BOOTSTRAP = {")
+
+
+def test_index_queries_do_not_depend_on_client_count(admin_client):
+    scenario = Scenario.objects.create(id=1, name="Репетиционная точка")
+    Area.objects.create(id=1, name="Помещение").scenario.add(scenario)
+
+    def index_queries():
+        with CaptureQueriesContext(connection) as ctx:
+            response = admin_client.get(reverse("user_index"))
+        assert response.status_code == 200
+        return len(ctx)
+
+    Client.objects.create(id=1, name="Клиент 1", phone="+375290000001")
+    few = index_queries()
+    Client.objects.bulk_create(
+        Client(id=i, name=f"Клиент {i}", phone=f"+37529{i:07d}") for i in range(2, 200)
+    )
+    assert index_queries() == few
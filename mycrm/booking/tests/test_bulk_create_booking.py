@@ -0,0 +1,181 @@
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from booking import tariff_index
+from booking.reservation_signals import reservations_created
+from booking.models import (
+    Area,
+    Client,
+    Reservation,
+    Room,
+    Scenario,
+    Service,
+    ServiceGroup,
+    Tariff,
+    TariffWeeklyInterval,
+)
+
+pytestmark = pytest.mark.django_db
+
+FIRST_DAY = date(2030, 5, 6)
+
+
+@pytest.fixture
+def setup():
+    scenario = Scenario.objects.create(id=1, name="Репетиционная точка")
+    area = Area.objects.create(id=1, name="Помещение")
+    room = Room.objects.create(
+        id=1, name="Комната", area=area, hourstart=time(8, 0), hourend=time(23, 0)
+    )
+    client = Client.objects.create(id=1, name="Клиент", phone="+375290000001")
+    group = ServiceGroup.objects.create(id=1, name="Группа")
+    service = Service.objects.create(id=1, name="Пульт", group=group, cost=5)
+    tariff = Tariff.objects.create(
+        name="Дневной", max_people=5, base_duration_minutes=60, base_cost=20
+    )
+    tariff.scenarios.add(scenario)
+    tariff.rooms.add(room)
+    TariffWeeklyInterval.objects.bulk_create(
+        TariffWeeklyInterval(
+            tariff=tariff, weekday=d, start_time=time(8, 0), end_time=time(23, 0)
+        )
+        for d in range(7)
+    )
+    return {"room": room, "client": client, "service": service, "tariff": tariff}
+
+
+def _post(client, setup, blocks):
+    response = client.post(
+        reverse("create_booking"),
+        {
+            "blocks_json": json.dumps(blocks),
+            "scenario_id": 1,
+            "room_id": setup["room"].id,
+            "client_id": setup["client"].id,
+            "people_count": 2,
+        },
+    )
+    return response.json()
+
+
+def _aware(day, hour):
+    return timezone.make_aware(
+        datetime.combine(day, time(hour)), timezone.get_current_timezone()
+    )
+
+
+def _block(day_offset, hour, duration="2:00", setup=None):
+    day = FIRST_DAY + timedelta(days=day_offset)
+    block = {"full_datetime": f"{day} {hour:02d}:00:00", "duration": duration}
+    if setup:
+        block["tariff_id"] = setup["tariff"].id
+        block["services"] = [setup["service"].id]
+    return block
+
+
+def test_series_is_created_in_constant_number_of_queries(
+    client, setup, django_assert_max_num_queries
+):
+    blocks = [_block(7 * week, 10, setup=setup) for week in range(80)]
+    tariff_index.get_index()  # индекс тарифов собирается один раз на процесс
+
+    with django_assert_max_num_queries(20):
+        data = _post(client, setup, blocks)
+
+    assert data["success"], data
+    assert len(data["reservation_ids"]) == 80
+    reservations = Reservation.objects.filter(id__in=data["reservation_ids"])
+    assert reservations.count() == 80
+    # 2 часа по 20 + услуга 5.
+    assert {r.total_cost for r in reservations} == {Decimal("45.00")}
+    assert Reservation.services.through.objects.count() == 80
+
+
+def test_series_and_single_booking_share_created_hook(client, setup):
+    created = []
+
+    def receiver(sender, reservations, **kwargs):
+        created.append([reservation.id for reservation in reservations])
+
+    reservations_created.connect(receiver, sender=Reservation)
+    try:
+        blocks = [_block(0, 10, setup=setup), _block(7, 10, setup=setup)]
+        data = _post(client, setup, blocks)
+        Reservation.objects.create(
+            id=100,
+            datetimestart=_aware(FIRST_DAY, 14),
+            datetimeend=_aware(FIRST_DAY, 15),
+            room=setup["room"],
+            scenario_id=1,
+            status_id=1080,
+        )
+    finally:
+        reservations_created.disconnect(receiver, sender=Reservation)
+
+    # Серия — одним вызовом после bulk_create, одиночная бронь — по post_save.
+    assert created == [data["reservation_ids"], [100]]
+
+
+def test_intra_batch_overlap_reports_block_numbers(client, setup):
+    blocks = [
+        _block(0, 10, setup=setup),
+        _block(1, 10, setup=setup),
+        _block(0, 11, setup=setup),
+    ]
+
+    data = _post(client, setup, blocks)
+
+    assert not data["success"]
+    assert data["block_index"] == 3
+    assert data["error"] == "Пересечение с блоком №1"
+    assert not Reservation.objects.exists()
+
+
+def test_first_failing_block_is_reported(client, setup):
+    Reservation.objects.create(
+        id=100,
+        datetimestart=_aware(FIRST_DAY + timedelta(days=2), 11),
+        datetimeend=_aware(FIRST_DAY + timedelta(days=2), 12),
+        room=setup["room"],
+        scenario_id=1,
+        status_id=1080,
+    )
+    blocks = [
+        _block(0, 10, setup=setup),
+        _block(1, 10, duration="0:00-", setup=setup),
+        _block(2, 10, setup=setup),
+    ]
+
+    data = _post(client, setup, blocks)
+    assert data["block_index"] == 2
+    assert data["field"] == "duration"
+
+    blocks[1] = _block(1, 10, setup=setup)
+    data = _post(client, setup, blocks)
+    assert data["block_index"] == 3
+    assert data["error"] == "На это время уже есть бронирование"
+    assert Reservation.objects.count() == 1
+
+
+    # Бронь, записанная без сигналов, не попала в карту занятости — и всё же
+    # не даёт создать пересекающуюся.
+    Reservation.objects.bulk_create(
+        [
+            Reservation(
+                id=101,
+                datetimestart=_aware(FIRST_DAY, 9),
+                datetimeend=_aware(FIRST_DAY, 11),
+                room=setup["room"],
+                scenario_id=1,
+                status_id=1080,
+            )
+        ]
+    )
+    data = _post(client, setup, blocks)
+    assert data["block_index"] == 1
+    assert data["error"] == "На это время уже есть бронирование"
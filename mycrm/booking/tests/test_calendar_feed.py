@@ -0,0 +1,189 @@
+import gzip
+import json
+import zlib
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from booking.calendar_feed import (
+    add_blocks_datetime_range_and_room_name,
+    bookings_columnar,
+)
+from booking.models import (
+    Area,
+    Client,
+    ClientGroup,
+    Payment,
+    PaymentType,
+    Reservation,
+    Room,
+    Scenario,
+)
+
+pytestmark = pytest.mark.django_db
+
+DAY = date(2030, 5, 6)
+
+
+@pytest.fixture
+def bookings():
+    scenario = Scenario.objects.create(id=1, name="Репетиционная точка")
+    area = Area.objects.create(id=1, name="Помещение")
+    rooms = [
+        Room.objects.create(
+            id=i, name=f"Комната {i}", area=area, hourstart=time(8), hourend=time(23)
+        )
+        for i in (1, 2)
+    ]
+    clients = [
+        Client.objects.create(
+            id=i, name=f"Клиент {i}", phone=f"+37529000000{i}", comment="Постоянный"
+        )
+        for i in (1, 2, 3)
+    ]
+    group = ClientGroup.objects.create(id=1, name="Группа")
+    payment_type = PaymentType.objects.create(id=1, name="Наличные")
+    tz = timezone.get_current_timezone()
+    for i in range(1, 61):
+        start = timezone.make_aware(
+            datetime.combine(DAY + timedelta(days=i % 20), time(8 + i % 12, 30)), tz
+        )
+        Reservation.objects.create(
+            id=i,
+            datetimestart=start,
+            datetimeend=start + timedelta(minutes=90),
+            room=rooms[i % 2],
+            scenario=scenario,
+            client=clients[i % 3] if i % 4 else None,
+            client_group=group if i % 5 == 0 else None,
+            status_id=1080,
+            total_cost=Decimal("45.50"),
+            comment=f"Бронь {i}",
+        )
+    Payment.objects.create(
+        id=1, reservation_id=1, payment_type=payment_type, amount=Decimal("50")
+    )
+    return Reservation.objects.order_by("id")
+
+
+def _decode(payload):
+    """Построчный вид колоночного ответа (как decodeColumnarBookings на фронтенде)."""
+    cols = payload["columns"]
+    origin = datetime.fromisoformat(payload["origin"])
+    rows = []
+    for i in range(payload["count"]):
+        room = payload["rooms"][cols["room"][i]]
+        client = payload["clients"][cols["client"][i]] if cols["client"][i] >= 0 else None
+        group = (
+            payload["client_groups"][cols["client_group"][i]]
+            if cols["client_group"][i] >= 0
+            else None
+        )
+        total, paid = cols["total_cost"][i], cols["paid_amount"][i]
+        rows.append(
+            {
+                "id": cols["id"][i],
+                "room_name": room[1],
+                "idroom": room[0],
+                "scenario_id": cols["scenario_id"][i],
+                "datetime_start": str(origin + timedelta(minutes=cols["start"][i])),
+                "datetime_end": str(origin + timedelta(minutes=cols["end"][i])),
+                "block_length_minutes": payload["block_length_minutes"],
+                "client_id": client[0] if client else None,
+                "client_name": client[1] if client else None,
+                "client_comment": client[2] if client else None,
+                "client_phone": client[3] if client else None,
+                "client_group_id": group[0] if group else None,
+                "client_group_name": group[1] if group else None,
+                "specialist_id": cols["specialist_id"][i],
+                "status_id": cols["status_id"][i],
+                "comment": cols["comment"][i],
+                "total_cost": f"{total / 100:.2f}",
+                "paid_amount": f"{paid / 100:.2f}",
+                "remaining_amount": f"{max(total - paid, 0) / 100:.2f}",
+            }
+        )
+    return rows
+
+
+def _normalized(rows):
+    """Суммы сравниваются как числа: построчный формат отдаёт str(Decimal)."""
+    money = ("total_cost", "paid_amount", "remaining_amount")
+    return [{k: Decimal(v) if k in money else v for k, v in row.items()} for row in rows]
+
+
+def test_columnar_format_decodes_to_row_format(bookings):
+    rows = add_blocks_datetime_range_and_room_name(bookings, 15)
+    columnar = bookings_columnar(bookings, 15, DAY)
+
+    assert _normalized(_decode(columnar)) == _normalized(rows)
+    assert len(columnar["rooms"]) == 2
+    assert len(columnar["clients"]) == 3
+
+    rows_size = len(json.dumps(rows, ensure_ascii=False))
+    columnar_size = len(json.dumps(columnar, ensure_ascii=False))
+    assert columnar_size * 2 < rows_size
+
+
+def test_grid_negotiates_format_and_compression(admin_client, bookings):
+    url = reverse("get_bookings_grid")
+    params = {"date_from": str(DAY), "date_to": str(DAY + timedelta(days=30))}
+
+    rows = admin_client.get(url, params).json()
+    assert len(rows["bookings_in_range"]) == 60
+
+    response = admin_client.get(
+        url, {**params, "format": "columnar"}, HTTP_ACCEPT_ENCODING="gzip"
+    )
+    assert response["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response["Vary"]
+    data = json.loads(gzip.decompress(response.content))
+    assert "bookings_in_range" not in data
+    assert _normalized(_decode(data["bookings_columnar"])) == _normalized(
+        rows["bookings_in_range"]
+    )
+
+
+def test_calendar_grid_streams_days(admin_client, bookings):
+    url = reverse("get_calendar_grid")
+    params = {
+        "date_from": str(DAY),
+        "date_to": str(DAY + timedelta(days=29)),
+        "format": "columnar",
+    }
+    whole = admin_client.get(url, params).json()
+
+    response = admin_client.get(
+        url, {**params, "stream": "1"}, HTTP_ACCEPT_ENCODING="gzip"
+    )
+    assert response.streaming
+    assert response["Content-Type"].startswith("application/x-ndjson")
+    assert response["Content-Encoding"] == "gzip"
+    # Каждая сжатая часть распаковывается сразу в целые строки NDJSON.
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    parts = [decompressor.decompress(part) for part in response.streaming_content]
+    assert all(part.endswith(b"\n") for part in parts[:-1] if part)
+    assert len([part for part in parts if part]) > 2
+    lines = [json.loads(line) for line in b"".join(parts).splitlines()]
+
+    header, days, end = lines[0], lines[1:-1], lines[-1]
+    assert header["type"] == "grid" and header["time_cells"] == whole["time_cells"]
+    assert end == {"type": "end"}
+    assert [day["date"] for day in days] == [
+        str(DAY + timedelta(days=i)) for i in range(30)
+    ]
+    # Дни вместе дают ту же разметку и те же брони, что и ответ целиком.
+    assert "".join(day["html"] for day in days).split() == whole["html"].split()
+    streamed = [row for day in days for row in _decode(day["bookings_columnar"])]
+    assert len(streamed) == 60
+    assert sorted(streamed, key=lambda row: row["id"]) == sorted(
+        _decode(whole["bookings_columnar"]), key=lambda row: row["id"]
+    )
+    for day in days:
+        assert all(
+            row["datetime_start"].startswith(day["date"])
+            for row in _decode(day["bookings_columnar"])
+        )
@@ -0,0 +1,68 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from booking.models import Area, Reservation, Room, Scenario
+
+pytestmark = pytest.mark.django_db
+
+DAY = date(2030, 5, 6)
+
+
+@pytest.fixture
+def rooms():
+    Scenario.objects.create(id=1, name="Репетиционная точка")
+    area = Area.objects.create(id=1, name="Помещение")
+    return [
+        Room.objects.create(
+            id=i, name=f"Комната {i}", area=area, hourstart=time(8), hourend=time(23)
+        )
+        for i in (1, 2)
+    ]
+
+
+def _grid(admin_client, first=DAY, days=7):
+    params = {
+        "date_from": str(first),
+        "date_to": str(first + timedelta(days=days - 1)),
+        "area_id": 1,
+        "scenario_id": 1,
+    }
+    with CaptureQueriesContext(connection) as ctx:
+        html = admin_client.get(reverse("get_calendar_grid"), params).json()["html"]
+    return html, len(ctx)
+
+
+def test_days_are_served_from_cache(admin_client, rooms):
+    html, cold = _grid(admin_client)
+    assert html.count("Комната 2") and 'id="table-7"' in html
+
+    # Повтор и брони не меняют разметку: комнаты не выбираются заново.
+    start = timezone.make_aware(datetime.combine(DAY, time(10)))
+    Reservation.objects.create(
+        id=1,
+        datetimestart=start,
+        datetimeend=start + timedelta(hours=1),
+        room=rooms[0],
+        scenario_id=1,
+        status_id=1080,
+    )
+    warm_html, warm = _grid(admin_client)
+    assert warm_html == html and warm < cold
+
+    # Тот же день в другом диапазоне — из кэша, но со своим номером таблицы.
+    shifted, _ = _grid(admin_client, first=DAY + timedelta(days=3), days=2)
+    assert 'id="table-1"' in shifted and 'id="table-2"' in shifted
+    assert "table-3" not in shifted and "__calendar_day_number__" not in shifted
+
+
+def test_room_change_invalidates_days(admin_client, rooms):
+    _grid(admin_client)
+    rooms[1].name = "Большой зал"
+    rooms[1].save()
+    html, _ = _grid(admin_client)
+    assert "Большой зал" in html and "Комната 2" not in html
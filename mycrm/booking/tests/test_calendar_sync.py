@@ -0,0 +1,221 @@
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from decimal import Decimal
+
+import pytest
+from django.db import DatabaseError, OperationalError, connections, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from booking.models import (
+    Area,
+    Payment,
+    PaymentType,
+    Reservation,
+    ReservationTombstone,
+    Room,
+    Scenario,
+)
+
+DAY = date(2030, 5, 6)
+RANGE = {"date_from": str(DAY), "date_to": str(DAY + timedelta(days=6))}
+WRITERS = 4
+EDITS_PER_WRITER = 15
+
+
+def _aware(day, hour):
+    return timezone.make_aware(
+        datetime.combine(day, dt_time(hour)), timezone.get_current_timezone()
+    )
+
+
+@pytest.fixture
+def setup(db):
+    scenario = Scenario.objects.create(id=1, name="Репетиционная точка")
+    area = Area.objects.create(id=1, name="Помещение")
+    for room_id in (1, 2):
+        Room.objects.create(
+            id=room_id,
+            name=f"Комната {room_id}",
+            area=area,
+            hourstart=dt_time(8),
+            hourend=dt_time(23),
+        )
+    PaymentType.objects.create(id=1, name="Наличные")
+    for reservation_id in range(1, 21):
+        Reservation.objects.create(
+            id=reservation_id,
+            datetimestart=_aware(DAY + timedelta(days=reservation_id % 7), 10),
+            datetimeend=_aware(DAY + timedelta(days=reservation_id % 7), 12),
+            room_id=1 + reservation_id % 2,
+            scenario=scenario,
+            status_id=1080,
+            total_cost=Decimal("40"),
+        )
+
+
+class GridClient:
+    """Клиент сетки: полная загрузка, затем применение дельт по курсору."""
+
+    def __init__(self, http_client):
+        self.http = http_client
+        self.cursor = None
+        self.bookings = {}
+
+    def _get(self, **params):
+        response = self.http.get(reverse("get_bookings_grid"), {**RANGE, **params})
+        assert response.status_code == 200
+        return response.json()
+
+    def full(self):
+        return {b["id"]: b for b in self._get()["bookings_in_range"]}
+
+    def sync(self):
+        data = self._get(since=self.cursor) if self.cursor else self._get()
+        if data["delta"]:
+            for reservation_id in data["removed_ids"]:
+                self.bookings.pop(reservation_id, None)
+        else:
+            self.bookings = {}
+        self.bookings.update({b["id"]: b for b in data["bookings_in_range"]})
+        self.cursor = data["cursor"]
+        return data
+
+
+@pytest.mark.django_db
+def test_delta_returns_changes_and_removals(admin_client, setup, settings):
+    # Без перекрытия окна в дельту попадают только изменения после курсора.
+    settings.BOOKINGS_SYNC_OVERLAP_SECONDS = 0
+    grid = GridClient(admin_client)
+    grid.sync()
+    assert len(grid.bookings) == 20
+
+    moved = Reservation.objects.get(id=1)
+    moved.datetimestart = _aware(DAY + timedelta(days=30), 10)
+    moved.datetimeend = _aware(DAY + timedelta(days=30), 12)
+    moved.save()
+    Reservation.objects.filter(id=2).get().delete()
+    cancelled = Reservation.objects.get(id=3)
+    cancelled.status_id = 1082
+    cancelled.save()
+    Payment.objects.create(
+        id=1, reservation_id=4, payment_type_id=1, amount=Decimal("15")
+    )
+    Reservation.objects.create(
+        id=21,
+        datetimestart=_aware(DAY, 18),
+        datetimeend=_aware(DAY, 19),
+        room_id=1,
+        scenario_id=1,
+        status_id=1080,
+    )
+
+    data = grid.sync()
+
+    assert data["delta"]
+    assert {b["id"] for b in data["bookings_in_range"]} == {4, 21}
+    assert {1, 2, 3} <= set(data["removed_ids"])
+    assert ReservationTombstone.objects.filter(reservation_id=2).exists()
+    assert grid.bookings == grid.full()
+    assert Decimal(grid.bookings[4]["paid_amount"]) == Decimal("15")
+
+
+@pytest.mark.django_db
+def test_invalid_or_expired_cursor(admin_client, setup, settings):
+    url = reverse("get_bookings_grid")
+    assert admin_client.get(url, {**RANGE, "since": "abc"}).status_code == 400
+
+    settings.BOOKINGS_SYNC_TOMBSTONE_TTL_SECONDS = 60
+    stale = str(int((timezone.now() - timedelta(hours=1)).timestamp() * 1_000_000))
+    data = admin_client.get(url, {**RANGE, "since": stale}).json()
+    assert not data["delta"]
+    assert len(data["bookings_in_range"]) == 20
+
+
+@pytest.mark.django_db(transaction=True)
+def test_delta_sync_converges_under_concurrent_edits(admin_client, setup):
+    grid = GridClient(admin_client)
+    grid.sync()
+
+    # Правка, зафиксированная уже после выдачи курсора: updated_at у неё раньше
+    # курсора, но она должна прийти в следующей дельте.
+    saved, polled = threading.Event(), threading.Event()
+
+    def late_commit():
+        try:
+            with transaction.atomic():
+                reservation = Reservation.objects.get(id=5)
+                reservation.comment = "Поздняя фиксация"
+                reservation.save()
+                saved.set()
+                polled.wait(5)
+        finally:
+            connections.close_all()
+
+    writer = threading.Thread(target=late_commit)
+    writer.start()
+    saved.wait(5)
+    grid.sync()
+    polled.set()
+    writer.join()
+    grid.sync()
+    assert grid.bookings[5]["comment"] == "Поздняя фиксация"
+
+    # Несколько писателей правят, переносят, отменяют и удаляют брони, пока
+    # клиент синхронизируется дельтами.
+    errors = []
+
+    def apply_edit(rnd, n, i):
+        reservation = Reservation.objects.filter(id=rnd.randint(1, 20)).first()
+        if reservation is None:
+            return
+        action = rnd.choice(("comment", "move", "status", "delete"))
+        if action == "delete":
+            reservation.delete()
+            return
+        if action == "comment":
+            reservation.comment = f"Правка {n}-{i}"
+        elif action == "move":
+            shift = timedelta(days=rnd.choice((-10, 1, 10)))
+            reservation.datetimestart += shift
+            reservation.datetimeend += shift
+        else:
+            reservation.status_id = rnd.choice((1080, 1082))
+        try:
+            # Бронь могла быть удалена другим писателем — не вставляем её заново.
+            reservation.save(force_update=True)
+        except DatabaseError as e:
+            if "did not affect any rows" not in str(e):
+                raise
+
+    def edit(n):
+        rnd = random.Random(n)
+        try:
+            for i in range(EDITS_PER_WRITER):
+                # SQLite не ждёт блокировку при конкурентном повышении уровня
+                # блокировки, а сразу отвечает "database is locked".
+                for _attempt in range(50):
+                    try:
+                        apply_edit(rnd, n, i)
+                        break
+                    except OperationalError:
+                        time.sleep(0.01)
+        except Exception as e:  # noqa: BLE001 - ошибки проверяются в тесте
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    writers = [threading.Thread(target=edit, args=(n,)) for n in range(WRITERS)]
+    for t in writers:
+        t.start()
+    while any(t.is_alive() for t in writers):
+        grid.sync()
+    for t in writers:
+        t.join()
+
+    assert not errors
+    grid.sync()
+    assert grid.bookings == grid.full()
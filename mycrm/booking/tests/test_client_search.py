@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from django.urls import reverse
+
+from booking import client_search
+from booking.models import Client
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def clients():
+    for pk, name, phone in [
+        (1, "Иванов Пётр", "+375 (29) 123-45-67"),
+        (2, "Петров Иван", "+375331112233"),
+        (3, "Сидорова Анна", "+375447654321"),
+        (4, "Ivanova Maria", "+48 600 100 200"),
+    ]:
+        Client.objects.create(id=pk, name=name, phone=phone)
+
+
+def _ids(query, **kwargs):
+    rows, _ = client_search.search(query, **kwargs)
+    return [row["id"] for row in rows]
+
+
+@pytest.mark.parametrize("fts", [True, False])
+def test_search(clients, fts, monkeypatch):
+    if not fts:
+        monkeypatch.setitem(client_search._available, "default", False)
+    assert client_search.fts_available() is fts
+
+    assert sorted(_ids("иван")) == [1, 2]
+    assert _ids("ИВАН петр") == [2]
+    assert _ids("ПЁТР иванов") == [1]
+    # Одна-две буквы — начало имени.
+    assert _ids("ив") == [1] and _ids("Пе") == [2] and _ids("iv") == [4]
+    assert _ids("Анна 4476") == [3]
+    assert _ids("maria") == [4]
+    # Телефон с кодом страны — префикс ключа, иначе — подстрока номера.
+    assert _ids("+375 29 12") == [1]
+    assert _ids("8029 123") == [1]
+    assert _ids("600 100") == [4]
+    assert _ids("1112") == [2]
+    # Пустой запрос — первые клиенты по имени.
+    assert _ids("") == [4, 1, 2, 3]
+
+    rows, has_more = client_search.search("", limit=3)
+    assert len(rows) == 3 and has_more
+    rows, has_more = client_search.search("", limit=3, offset=3)
+    assert [row["id"] for row in rows] == [3] and not has_more
+
+
+def test_index_follows_changes_and_caps_results(clients, monkeypatch):
+    client = Client.objects.get(id=3)
+    client.name = "Смирнова Анна"
+    client.phone = "+375 29 000-00-01"
+    client.save(update_fields=["name", "phone"])
+    assert _ids("смирн") == [3] and _ids("сидор") == []
+    assert _ids("375290000") == [3]
+    Client.objects.filter(id=3).delete()
+    assert _ids("анна") == []
+
+    monkeypatch.setattr(client_search, "MAX_RESULTS", 2)
+    rows, has_more = client_search.search("", limit=2)
+    assert len(rows) == 2 and not has_more
+    assert client_search.search("", offset=2) == ([], False)
+
+
+def test_search_view_and_duplicate_phone(admin_client, clients):
+    response = admin_client.get(reverse("search_clients"), {"q": "иван", "limit": 1})
+    data = response.json()
+    assert data["success"] and data["has_more"]
+    assert data["clients"][0].keys() == {"id", "name", "phone"}
+    response = admin_client.get(reverse("search_clients"), {"limit": "x"})
+    assert response.status_code == 400
+
+    # Телефон первого клиента записан с пробелами и скобками — дубликат
+    # находится по ключу телефона.
+    response = admin_client.post(
+        reverse("add_client"),
+        json.dumps({"name": "Новый Клиент", "phone": "+375291234567"}),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+    assert "уже существует" in response.json()["error"]
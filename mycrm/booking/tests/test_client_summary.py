@@ -0,0 +1,110 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from booking.models import (
+    Client,
+    ClientGroup,
+    ClientRating,
+    ClientSummary,
+    Scenario,
+    Subscription,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def clients():
+    for scenario_id in (1, 2):
+        Scenario.objects.create(id=scenario_id, name=f"Сценарий {scenario_id}")
+    return [
+        Client.objects.create(id=client_id, name=f"Клиент {client_id}", phone=f"+{client_id}")
+        for client_id in (1, 2, 3)
+    ]
+
+
+def _summary(client_id):
+    return ClientSummary.objects.get(client_id=client_id)
+
+
+def test_summary_follows_ratings_and_subscriptions(clients):
+    assert _summary(1).rating_count == 0
+
+    first = ClientRating.objects.create(client_id=1, rating=5)
+    ClientRating.objects.create(client_id=1, rating=2)
+    summary = _summary(1)
+    assert (summary.rating_avg, summary.rating_count) == (3.5, 2)
+    assert clients[0].rating == 3.5
+
+    # Перенос оценки другому клиенту пересчитывает обоих.
+    first.client_id = 2
+    first.save()
+    assert (_summary(1).rating_avg, _summary(1).rating_count) == (2, 1)
+    assert (_summary(2).rating_avg, _summary(2).rating_count) == (5, 1)
+    first.delete()
+    assert (_summary(2).rating_avg, _summary(2).rating_count) == (None, 0)
+
+    subscription = Subscription.objects.create(id=1, client_id=1, scenario_id=1, balance=4)
+    Subscription.objects.create(id=2, client_id=1, scenario_id=2, balance=1)
+    subscription.balance -= 3
+    subscription.save()
+    assert _summary(1).balances == {"1": 1, "2": 1}
+    subscription.delete()
+    assert _summary(1).balances == {"2": 1}
+
+
+def test_summary_follows_group_membership(clients):
+    band = ClientGroup.objects.create(id=1, name="Группа")
+    other = ClientGroup.objects.create(id=2, name="Другая")
+
+    clients[0].groups.add(band, other)
+    band.clients.add(clients[1], clients[2])
+    assert _summary(1).group_ids == [1, 2]
+    assert _summary(3).group_ids == [1]
+
+    band.clients.remove(clients[2])
+    assert _summary(3).group_ids == []
+    band.clients.clear()
+    assert _summary(1).group_ids == [2]
+    assert _summary(2).group_ids == []
+
+    other.delete()
+    assert _summary(1).group_ids == []
+
+
+def test_read_api_uses_one_query(admin_client, clients, django_assert_num_queries):
+    band = ClientGroup.objects.create(id=1, name="Группа")
+    band.clients.add(*clients[:2])
+    for client in clients:
+        ClientRating.objects.create(client=client, rating=4)
+        Subscription.objects.create(id=client.id, client=client, scenario_id=1, balance=client.id)
+
+    url = reverse("get_client_summaries")
+    admin_client.get(url)  # сессия и пользователь
+    with django_assert_num_queries(3):
+        data = admin_client.get(url, {"group_id": 1}).json()
+
+    assert data["success"]
+    assert [c["id"] for c in data["clients"]] == [1, 2]
+    assert data["clients"][1] == {
+        "id": 2,
+        "name": "Клиент 2",
+        "comment": None,
+        "phone": "+2",
+        "rating": 4.0,
+        "rating_count": 1,
+        "balances": {"1": 2},
+        "group_ids": [1],
+    }
+
+
+def test_rebuild_command_restores_summaries(clients):
+    ClientRating.objects.create(client_id=3, rating=1)
+    ClientSummary.objects.filter(client_id=3).update(rating_count=10, rating_avg=None)
+    ClientSummary.objects.filter(client_id=2).delete()
+
+    call_command("rebuild_client_summaries", batch_size=2)
+
+    assert ClientSummary.objects.count() == 3
+    assert (_summary(3).rating_avg, _summary(3).rating_count) == (1, 1)
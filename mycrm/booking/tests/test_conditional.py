@@ -0,0 +1,136 @@
+from datetime import time
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from booking import conditional
+from booking.models import (
+    Area,
+    CancellationReason,
+    Client,
+    ClientGroup,
+    DataVersion,
+    Room,
+    Scenario,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def auth_client():
+    User.objects.create_user(username="admin", password="secret")
+    client = APIClient()
+    token = client.post(
+        "/api/token/", {"username": "admin", "password": "secret"}
+    ).data["access"]
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    return client
+
+
+def test_api_not_modified(auth_client, django_assert_num_queries):
+    area = Area.objects.create(id=1, name="Первое")
+    Room.objects.create(
+        id=1, name="Комната", area=area, hourstart=time(8), hourend=time(23)
+    )
+
+    response = auth_client.get("/api/rooms/")
+    etag = response["ETag"]
+    assert response.status_code == 200 and response["Last-Modified"]
+
+    # Пользователь токена и версия таблицы — без выборки и подсчёта комнат.
+    with django_assert_num_queries(2):
+        response = auth_client.get("/api/rooms/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304 and response["ETag"] == etag
+
+    # Другие параметры — другое тело и другой ETag.
+    response = auth_client.get("/api/rooms/?fields=id", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+    # Изменение связи many-to-many меняет версию таблицы комнат.
+    Room.objects.get(id=1).scenario.add(Scenario.objects.create(id=1, name="Звук"))
+    response = auth_client.get("/api/rooms/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200 and response.data[0]["scenario"] == [1]
+    etag = response["ETag"]
+
+    # Развёрнутая связь: изменение помещения меняет ETag комнат с expand=area.
+    response = auth_client.get("/api/rooms/?expand=area")
+    expanded = response["ETag"]
+    area.name = "Переименовано"
+    area.save()
+    assert auth_client.get(
+        "/api/rooms/?expand=area", HTTP_IF_NONE_MATCH=expanded
+    ).status_code == 200
+    assert auth_client.get(
+        "/api/rooms/", HTTP_IF_NONE_MATCH=etag
+    ).status_code == 304
+
+
+def test_function_view_not_modified(admin_client):
+    CancellationReason.objects.create(id=1, name="Заболел", order=1)
+    url = reverse("get_cancellation_reasons")
+
+    response = admin_client.get(url)
+    assert response.status_code == 200
+    response = admin_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == 304 and response.content == b""
+
+    # bulk_create не шлёт сигналов: версию таблицы увеличивает вызывающий код.
+    etag = response["ETag"]
+    CancellationReason.objects.bulk_create([CancellationReason(id=2, name="Уехал")])
+    conditional.bump_table(CancellationReason)
+    response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200 and len(response.json()["reasons"]) == 2
+
+
+def test_updated_at_tables_skip_version_counter(auth_client):
+    group = ClientGroup.objects.create(id=1, name="Постоянные")
+    client = Client.objects.create(id=1, name="Клиент", phone="+375290000001")
+    client.groups.add(group)
+    response = auth_client.get("/api/clients/")
+    etag = response["ETag"]
+    # Удаление не сдвигает max(updated_at): без Last-Modified.
+    assert response.status_code == 200 and not response.has_header("Last-Modified")
+
+    # Связь со стороны группы обновляет updated_at клиента.
+    group.clients.clear()
+    response = auth_client.get("/api/clients/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200 and response.data[0]["groups"] == []
+    etag = response["ETag"]
+
+    # Сохранение клиентов не пишет счётчик версии таблицы.
+    Client.objects.create(id=2, name="Второй", phone="+375290000002")
+    name = conditional.table_version_name(Client)
+    assert not DataVersion.objects.filter(name=name).exists()
+
+    # Удаление строки не сдвигает max(updated_at) — ETag меняет счётчик удалений.
+    etag = auth_client.get("/api/clients/")["ETag"]
+    Client.objects.filter(id=2).delete()
+    assert auth_client.get(
+        "/api/clients/", HTTP_IF_NONE_MATCH=etag
+    ).status_code == 200
+
+
+def test_retrieve_uses_row_updated_at(auth_client, django_assert_num_queries):
+    client = Client.objects.create(id=1, name="Клиент", phone="+375290000001")
+    Client.objects.create(id=2, name="Второй", phone="+375290000002")
+    etag = auth_client.get("/api/clients/1/")["ETag"]
+
+    # Пользователь токена и updated_at самой строки — без агрегатов по таблице.
+    with django_assert_num_queries(2):
+        response = auth_client.get("/api/clients/1/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    # Изменение другой строки ETag не меняет, изменение самой строки — меняет.
+    Client.objects.filter(id=2).delete()
+    assert auth_client.get(
+        "/api/clients/1/", HTTP_IF_NONE_MATCH=etag
+    ).status_code == 304
+    client.name = "Переименован"
+    client.save()
+    response = auth_client.get("/api/clients/1/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200 and response.data["name"] == "Переименован"
+    assert auth_client.get("/api/clients/3/").status_code == 404
+    assert auth_client.get("/api/clients/x/").status_code == 404
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+from django.db import connections, transaction
+
+from booking import id_allocator
+from booking.id_allocator import allocate_ids, create_with_allocated_id
+from booking.models import Client, IdSequence
+
+THREADS = 16
+INSERTS_PER_THREAD = 25
+
+
+@pytest.fixture(autouse=True)
+def _fresh_pools():
+    id_allocator.reset_pools()
+    yield
+    id_allocator.reset_pools()
+
+
+def _run_in_threads(worker):
+    errors = []
+    barrier = threading.Barrier(THREADS)
+
+    def target(n):
+        try:
+            barrier.wait()
+            worker(n)
+        except Exception as e:  # noqa: BLE001 - ошибки проверяются в тесте
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=target, args=(n,)) for n in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+@pytest.mark.django_db
+def test_allocate_ids_seeds_from_existing_rows_and_skips_pool_in_transaction():
+    # Счётчика ещё нет — он заводится от текущего максимума ID в таблице.
+    IdSequence.objects.filter(name="clients").delete()
+    Client.objects.create(id=41, name="Клиент", phone="+375290000001")
+
+    assert allocate_ids(Client, 3) == [42, 43, 44]
+    # В открытой транзакции блок впрок не резервируется.
+    assert IdSequence.objects.get(name="clients").last_value == 44
+
+
+@pytest.mark.django_db(transaction=True)
+def test_block_is_reserved_outside_callers_transaction(monkeypatch):
+    # SQLite резервирует в транзакции вызывающего кода; остальные БД — отдельно.
+    monkeypatch.setattr(
+        id_allocator, "_reserves_apart", lambda connection: connection.in_atomic_block
+    )
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            assert allocate_ids(Client, 2) == [1, 2]
+            raise RuntimeError
+
+    # Блок зафиксирован отдельно: откат его не вернул, остаток блока в пуле.
+    block = id_allocator._block_size()
+    assert IdSequence.objects.get(name="clients").last_value == block
+    assert allocate_ids(Client, 1) == [3]
+
+
+@pytest.mark.django_db
+def test_create_retries_when_id_is_taken_by_explicit_insert():
+    create_with_allocated_id(Client, name="Первый", phone="+375290000001")
+    # Запись с явным ID в обход аллокатора (например, через API).
+    Client.objects.create(id=2, name="Второй", phone="+375290000002")
+
+    client = create_with_allocated_id(Client, name="Третий", phone="+375290000003")
+
+    assert client.id == 3
+    assert IdSequence.objects.get(name="clients").last_value >= 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_inserts_get_unique_ids():
+    def worker(n):
+        for i in range(INSERTS_PER_THREAD):
+            create_with_allocated_id(
+                Client, name=f"Клиент {n}-{i}", phone=f"+37529{n:03d}{i:04d}"
+            )
+
+    errors = _run_in_threads(worker)
+    assert not errors
+
+    ids = list(Client.objects.values_list("id", flat=True))
+    assert len(ids) == THREADS * INSERTS_PER_THREAD
+    assert len(set(ids)) == len(ids)
+
@@ -0,0 +1,226 @@
+import asyncio
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from django.utils import timezone
+
+from booking import live_events
+from booking.models import (
+    Area,
+    LiveEvent,
+    Payment,
+    PaymentType,
+    Reservation,
+    Room,
+    Scenario,
+)
+
+pytestmark = pytest.mark.django_db
+
+DAY = date(2030, 5, 6)
+
+
+@pytest.fixture(autouse=True)
+def broker(settings):
+    settings.LIVE_EVENTS_BROKER = "booking.live_events.InMemoryBroker"
+    live_events.reset_broker()
+    yield live_events.get_broker()
+    live_events.reset_broker()
+
+
+@pytest.fixture
+def setup():
+    scenario = Scenario.objects.create(id=1, name="Репетиционная точка")
+    for area_id in (1, 2):
+        Area.objects.create(id=area_id, name=f"Помещение {area_id}")
+        Room.objects.create(
+            id=area_id,
+            name=f"Комната {area_id}",
+            area_id=area_id,
+            hourstart=time(8),
+            hourend=time(23),
+        )
+    PaymentType.objects.create(id=1, name="Наличные")
+    return scenario
+
+
+def _aware(day, hour):
+    return timezone.make_aware(
+        datetime.combine(day, time(hour)), timezone.get_current_timezone()
+    )
+
+
+def _create_reservation(reservation_id=1, room_id=1, day=DAY):
+    return Reservation.objects.create(
+        id=reservation_id,
+        datetimestart=_aware(day, 10),
+        datetimeend=_aware(day, 12),
+        room_id=room_id,
+        scenario_id=1,
+        status_id=1080,
+        total_cost=Decimal("40"),
+    )
+
+
+def test_signals_publish_after_commit(
+    setup, broker, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        _create_reservation()
+    assert broker.last_id() == 0
+    for callback in callbacks:
+        callback()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        reservation = Reservation.objects.get(id=1)
+        reservation.room_id = 2
+        reservation.datetimestart = _aware(DAY + timedelta(days=20), 10)
+        reservation.datetimeend = _aware(DAY + timedelta(days=20), 12)
+        reservation.save()
+        Payment.objects.create(
+            id=1, reservation=reservation, payment_type_id=1, amount=Decimal("5")
+        )
+        reservation.status_id = 1082
+        reservation.save()
+
+    events, reset = broker.events_after(0)
+    assert not reset
+    assert [e["type"] for e in events] == [
+        "reservation.created",
+        "reservation.updated",
+        "payment",
+        "reservation.cancelled",
+    ]
+    # Перенос виден и в старом, и в новом помещении и диапазоне.
+    assert events[1]["areas"] == [1, 2]
+    assert events[1]["date_from"] == str(DAY)
+    assert events[1]["date_to"] == str(DAY + timedelta(days=20))
+    assert live_events.event_matches(events[1], area_id=1, date_to=DAY)
+    assert not live_events.event_matches(events[0], area_id=2)
+
+
+def test_poll_filters_by_area_and_range(
+    admin_client, setup, broker, django_capture_on_commit_callbacks
+):
+    url = reverse("live_events_poll")
+    filters = {"area_id": 1, "date_from": str(DAY), "date_to": str(DAY)}
+
+    start = admin_client.get(url, filters).json()
+    assert start["last_id"] == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        _create_reservation(1, room_id=2)
+        _create_reservation(2, room_id=1, day=DAY + timedelta(days=3))
+        _create_reservation(3, room_id=1)
+
+    data = admin_client.get(url, {**filters, "last_id": 0}).json()
+    assert [e["reservation_id"] for e in data["events"]] == [3]
+    assert data["last_id"] == 3
+
+    idle = admin_client.get(url, {**filters, "last_id": 3}).json()
+    assert idle["events"] == []
+    assert not idle["reset"]
+
+    # Номер из прошлой жизни процесса — клиенту нужна полная перезагрузка.
+    stale = admin_client.get(url, {**filters, "last_id": 99}).json()
+    assert stale["reset"]
+
+
+def test_stream_falls_back_under_wsgi(admin_client):
+    assert admin_client.get(reverse("live_events_stream")).status_code == 204
+
+
+def test_stream_pushes_events_under_asgi(admin_user, broker):
+    async def scenario():
+        client = AsyncClient()
+        await client.aforce_login(admin_user)
+        response = await client.get(reverse("live_events_stream"), {"area_id": 1})
+        assert response["Content-Type"] == "text/event-stream"
+        chunks = response.streaming_content.__aiter__()
+        assert (await chunks.__anext__()).startswith(b"retry:")
+
+        next_chunk = asyncio.ensure_future(chunks.__anext__())
+        await asyncio.sleep(0.05)
+        broker.publish(
+            {
+                "type": "reservation.created",
+                "reservation_id": 7,
+                "areas": [1],
+                "date_from": str(DAY),
+                "date_to": str(DAY),
+            }
+        )
+        chunk = (await asyncio.wait_for(next_chunk, 2)).decode()
+        await chunks.aclose()
+        return chunk
+
+    chunk = async_to_sync(scenario)()
+    assert chunk.startswith("id: 1\nevent: booking\n")
+    data = json.loads(chunk.split("data: ", 1)[1])
+    assert data["reservation_id"] == 7
+
+
+def test_database_broker_reports_pruned_events(settings):
+    settings.LIVE_EVENTS_RETENTION_SECONDS = 60
+    broker = live_events.DatabaseBroker()
+    first = broker.publish({"type": "payment", "reservation_id": 1})
+    second = broker.publish({"type": "payment", "reservation_id": 2})
+
+    events, reset = broker.events_after(first)
+    assert [e["id"] for e in events] == [second]
+    assert not reset
+
+    # Публикация удаляет устаревшие события не чаще раза в PRUNE_SECONDS.
+    LiveEvent.objects.filter(id__in=[first, second]).update(
+        created_at=timezone.now() - timedelta(hours=1)
+    )
+    third = broker.publish({"type": "payment", "reservation_id": 3})
+    assert LiveEvent.objects.filter(id=second).exists()
+    assert broker.prune() == 2
+    events, reset = broker.events_after(first)
+    assert [e["id"] for e in events] == [third]
+    assert reset
+
+    # Последнее событие не удаляется: по нему виден старейший хранимый номер.
+    LiveEvent.objects.update(created_at=timezone.now() - timedelta(hours=1))
+    assert broker.prune() == 0
+    assert broker.events_after(third) == ([], False)
+
+
+def test_database_broker_waits_for_late_commits(settings):
+    settings.LIVE_EVENTS_LOOKBACK_SECONDS = 2
+    broker = live_events.DatabaseBroker()
+    first, second, third = (
+        broker.publish({"type": "payment", "reservation_id": i}) for i in (1, 2, 3)
+    )
+    # Второе событие ещё не зафиксировано: третье не отдаётся, и курсор клиента
+    # не уходит дальше пропуска.
+    payload = LiveEvent.objects.get(id=second).payload
+    LiveEvent.objects.filter(id=second).delete()
+    assert broker.events_after(first) == ([], False)
+
+    LiveEvent.objects.create(id=second, created_at=timezone.now(), payload=payload)
+    events, reset = broker.events_after(first)
+    assert [e["id"] for e in events] == [second, third] and not reset
+
+    # Давний пропуск — откаченная вставка, а не потерянные события.
+    LiveEvent.objects.filter(id=second).delete()
+    LiveEvent.objects.filter(id=third).update(
+        created_at=timezone.now() - timedelta(seconds=5)
+    )
+    events, reset = broker.events_after(first)
+    assert [e["id"] for e in events] == [third] and not reset
+
+
+def test_default_broker_is_shared_between_processes(settings):
+    del settings.LIVE_EVENTS_BROKER
+    live_events.reset_broker()
+    broker = live_events.get_broker()
+    assert isinstance(broker, live_events.DatabaseBroker)
+    assert broker.shared
+    assert not live_events.InMemoryBroker.shared
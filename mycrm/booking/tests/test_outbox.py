@@ -0,0 +1,184 @@
+import json
+import threading
+from datetime import datetime, time, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from booking import outbox
+from booking.models import OutboxMessage, Room, Scenario
+
+pytestmark = pytest.mark.django_db
+
+
+class StubServer(ThreadingHTTPServer):
+    """Локальный заменитель внешнего каталога: записывает запросы и отвечает
+    кодами из `statuses` по очереди (дальше — 200)."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.requests = []
+        self.statuses = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/approveBooking"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append((dict(self.headers), json.loads(body)))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        reply = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(settings):
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.APPROVE_BOOKING_URL = server.url
+    settings.OUTBOX_MAX_ATTEMPTS = 3
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _make_due():
+    OutboxMessage.objects.update(next_attempt_at=timezone.now() - timedelta(1))
+
+
+def test_api_create_enqueues_in_same_transaction(stub):
+    Scenario.objects.create(id=1, name="Звукозапись")
+    Room.objects.create(id=1, name="Комната", hourstart=time(8), hourend=time(23))
+    User.objects.create_user(username="admin", password="secret")
+    client = APIClient()
+    token = client.post(
+        "/api/token/", {"username": "admin", "password": "secret"}
+    ).data["access"]
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    start = timezone.make_aware(datetime(2030, 5, 6, 10))
+    response = client.post(
+        "/api/reservations/",
+        {
+            "id": 501,
+            "datetimestart": start.isoformat(),
+            "datetimeend": (start + timedelta(hours=1)).isoformat(),
+            "room": 1,
+            "scenario": 1,
+        },
+        format="json",
+    )
+    assert response.status_code == 201, response.data
+    # Внешний сервис в запросе не вызывается.
+    assert stub.requests == []
+    message = OutboxMessage.objects.get()
+    assert message.idempotency_key == "approveBooking:501"
+    assert message.payload == {"id": "501"}
+
+    # Откат транзакции отменяет и сообщение.
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            outbox.approve_booking(502)
+            raise RuntimeError()
+    assert OutboxMessage.objects.count() == 1
+
+
+def test_dispatch_delivers_batch_once(stub):
+    for reservation_id in (1, 2, 3):
+        outbox.approve_booking(reservation_id)
+    outbox.approve_booking(1)  # повторная постановка не создаёт дубль
+
+    assert outbox.dispatch() == {"delivered": 3, "retried": 0, "dead": 0}
+    assert [body for _, body in stub.requests] == [
+        {"id": "1"},
+        {"id": "2"},
+        {"id": "3"},
+    ]
+    headers = stub.requests[0][0]
+    assert headers["Idempotency-Key"] == "approveBooking:1"
+    assert headers["Authorization"] == "Basic eDQ6eDQ="
+    assert set(OutboxMessage.objects.values_list("status", flat=True)) == {
+        OutboxMessage.STATUS_DELIVERED
+    }
+
+    assert outbox.dispatch() == {"delivered": 0, "retried": 0, "dead": 0}
+    assert len(stub.requests) == 3
+
+
+def test_failures_back_off_and_dead_letter(stub, settings):
+    settings.OUTBOX_BACKOFF_BASE_SECONDS = 10
+    transient = outbox.approve_booking(1)
+    rejected = outbox.approve_booking(2)
+    stub.statuses = [503, 400]
+
+    assert outbox.dispatch() == {"delivered": 0, "retried": 1, "dead": 1}
+    transient.refresh_from_db()
+    rejected.refresh_from_db()
+    assert rejected.status == OutboxMessage.STATUS_DEAD
+    assert rejected.last_error.startswith("HTTP 400")
+    assert transient.attempts == 1
+    delay = (transient.next_attempt_at - timezone.now()).total_seconds()
+    assert 4 < delay <= 10
+    # Пока задержка не истекла, сообщение не берётся.
+    assert outbox.dispatch() == {"delivered": 0, "retried": 0, "dead": 0}
+
+    stub.statuses = [500, 500]
+    _make_due()
+    outbox.dispatch()
+    transient.refresh_from_db()
+    delay = (transient.next_attempt_at - timezone.now()).total_seconds()
+    assert transient.attempts == 2 and 9 < delay <= 20
+    _make_due()
+    outbox.dispatch()
+    transient.refresh_from_db()
+    assert transient.status == OutboxMessage.STATUS_DEAD
+    assert transient.attempts == 3
+
+    call_command("dispatch_outbox", "--requeue-dead")
+    call_command("dispatch_outbox", "--once")
+    assert set(OutboxMessage.objects.values_list("status", flat=True)) == {
+        OutboxMessage.STATUS_DELIVERED
+    }
+
+
+def test_unreachable_partner_is_retried(stub, settings):
+    settings.APPROVE_BOOKING_URL = "http://127.0.0.1:9/approveBooking"
+    message = outbox.approve_booking(1)
+
+    assert outbox.dispatch() == {"delivered": 0, "retried": 1, "dead": 0}
+    message.refresh_from_db()
+    assert message.status == OutboxMessage.STATUS_PENDING
+    assert "ConnectionRefusedError" in message.last_error
+    assert message.lease == "" and message.locked_until is None
+
+
+def test_claim_skips_leased_messages():
+    for reservation_id in (1, 2, 3):
+        outbox.approve_booking(reservation_id)
+
+    first = outbox.claim(2)
+    second = outbox.claim(2)
+    assert [m.payload["id"] for m in first] == ["1", "2"]
+    assert [m.payload["id"] for m in second] == ["3"]
+    assert outbox.claim(2) == []
+
+    # Аренда упавшего диспетчера истекает.
+    later = timezone.now() + timedelta(seconds=outbox.DEFAULT_LEASE_SECONDS + 1)
+    assert len(outbox.claim(10, now=later)) == 3
@@ -0,0 +1,166 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from booking import payment_totals
+from booking.models import (
+    Area,
+    Payment,
+    PaymentType,
+    Reservation,
+    Room,
+    Scenario,
+)
+
+pytestmark = pytest.mark.django_db
+
+DAY = date(2030, 5, 6)
+
+
+@pytest.fixture
+def setup():
+    Scenario.objects.create(id=1, name="Репетиционная точка")
+    Area.objects.create(id=1, name="Помещение")
+    Room.objects.create(
+        id=1, name="Комната", area_id=1, hourstart=time(8), hourend=time(23)
+    )
+    PaymentType.objects.create(id=1, name="Наличные")
+    PaymentType.objects.create(id=2, name=payment_totals.TARIFF_UNITS_PAYMENT_TYPE)
+    tz = timezone.get_current_timezone()
+    return [
+        Reservation.objects.create(
+            id=reservation_id,
+            datetimestart=timezone.make_aware(datetime.combine(DAY, time(10)), tz),
+            datetimeend=timezone.make_aware(datetime.combine(DAY, time(12)), tz),
+            room_id=1,
+            scenario_id=1,
+            status_id=1080,
+            total_cost=Decimal("100"),
+        )
+        for reservation_id in (1, 2)
+    ]
+
+
+def _totals(reservation_id):
+    reservation = Reservation.objects.get(id=reservation_id)
+    return reservation.paid_amount, reservation.paid_tariff_units_amount
+
+
+def test_totals_follow_payment_changes(setup):
+    cash = Payment.objects.create(
+        id=1, reservation_id=1, payment_type_id=1, amount=Decimal("30")
+    )
+    units = Payment.objects.create(
+        id=2, reservation_id=1, payment_type_id=2, amount=Decimal("20")
+    )
+    assert _totals(1) == (Decimal("50"), Decimal("20"))
+
+    cash.amount = Decimal("35.50")
+    cash.save(update_fields=["amount"])
+    assert _totals(1) == (Decimal("55.50"), Decimal("20"))
+
+    units.canceled = True
+    units.save()
+    assert _totals(1) == (Decimal("35.50"), Decimal("0"))
+
+    # Перенос платежа на другую бронь меняет суммы обеих.
+    cash.reservation_id = 2
+    cash.save()
+    assert _totals(1) == (Decimal("0"), Decimal("0"))
+    assert _totals(2) == (Decimal("35.50"), Decimal("0"))
+
+    cash.delete()
+    assert _totals(2) == (Decimal("0"), Decimal("0"))
+    assert not payment_totals.find_drift().exists()
+
+
+def test_totals_use_stored_payment_state(setup):
+    Payment.objects.create(
+        id=1, reservation_id=1, payment_type_id=1, amount=Decimal("30")
+    )
+    stale = Payment.objects.get(id=1)
+    fresh = Payment.objects.get(id=1)
+    fresh.amount = Decimal("50")
+    fresh.save()
+
+    # Прежнее состояние читается из БД перед сохранением, а не при загрузке.
+    stale.amount = Decimal("10")
+    stale.save()
+    assert _totals(1) == (Decimal("10"), Decimal("0"))
+
+    # Сохранение без полей сумм не читает прежнее состояние и не трогает бронь.
+    payment = Payment.objects.get(id=1)
+    payment.comment = "Сдача выдана"
+    with CaptureQueriesContext(connection) as queries:
+        payment.save(update_fields=["comment"])
+    assert not [q for q in queries if q["sql"].startswith('SELECT "payments"')]
+    assert _totals(1) == (Decimal("10"), Decimal("0"))
+
+    # Тип оплаты берётся из справочника в памяти, без запроса на сохранение.
+    payment.payment_type_id = 2
+    with CaptureQueriesContext(connection) as queries:
+        payment.save()
+    assert not [q for q in queries if '"payment_types"' in q["sql"]]
+    assert _totals(1) == (Decimal("10"), Decimal("10"))
+
+    # Удаление устаревшего объекта вычитает сумму из БД, а не из объекта.
+    stale.delete()
+    assert _totals(1) == (Decimal("0"), Decimal("0"))
+
+
+def test_stale_reservation_save_keeps_totals(setup):
+    stale = Reservation.objects.get(id=1)
+    Payment.objects.create(
+        id=1, reservation_id=1, payment_type_id=1, amount=Decimal("40")
+    )
+
+    stale.comment = "Перенос по просьбе клиента"
+    stale.save()
+
+    reservation = Reservation.objects.get(id=1)
+    assert reservation.comment == "Перенос по просьбе клиента"
+    assert reservation.paid_amount == Decimal("40")
+
+
+def test_verify_command_repairs_drift(setup, capsys):
+    Payment.objects.create(
+        id=1, reservation_id=1, payment_type_id=2, amount=Decimal("25")
+    )
+    # Правка в обход сигналов.
+    Payment.objects.filter(id=1).update(amount=Decimal("30"))
+    Reservation.objects.filter(id=2).update(paid_amount=Decimal("7"))
+
+    call_command("verify_payment_totals")
+    assert "Броней с расхождением: 2" in capsys.readouterr().out
+    assert _totals(1) == (Decimal("25"), Decimal("25"))
+
+    call_command("verify_payment_totals", "--repair")
+    assert _totals(1) == (Decimal("30"), Decimal("30"))
+    assert _totals(2) == (Decimal("0"), Decimal("0"))
+    assert not payment_totals.find_drift().exists()
+
+
+def test_payment_edit_checks_remaining_against_locked_totals(admin_client, setup):
+    Payment.objects.create(
+        id=1, reservation_id=1, payment_type_id=1, amount=Decimal("30")
+    )
+    Payment.objects.create(
+        id=2, reservation_id=1, payment_type_id=1, amount=Decimal("50")
+    )
+
+    def edit(amount):
+        return admin_client.post(
+            reverse("update_payment", args=[1]),
+            {"amount": amount, "payment_type_id": 1},
+            content_type="application/json",
+        ).json()
+
+    assert edit("60")["error"] == "Сумма платежа превышает доступный остаток"
+    assert edit("50")["success"]
+    assert _totals(1) == (Decimal("100"), Decimal("0"))
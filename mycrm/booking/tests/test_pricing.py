@@ -0,0 +1,139 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from booking import pricing
+from booking.models import (
+    Room,
+    Scenario,
+    Service,
+    ServiceGroup,
+    Tariff,
+    TariffUnit,
+    TariffWeeklyInterval,
+)
+
+pytestmark = pytest.mark.django_db
+
+# Понедельник.
+DAY = date(2030, 5, 6)
+
+
+def _at(hour, minute=0):
+    return timezone.make_aware(
+        datetime.combine(DAY, time(hour, minute)), timezone.get_current_timezone()
+    )
+
+
+@pytest.fixture
+def reference():
+    rehearsal = Scenario.objects.create(id=1, name="Репетиционная точка")
+    Scenario.objects.create(id=2, name="Звукозапись")
+    Room.objects.create(id=1, name="Комната", hourstart=time(8), hourend=time(23))
+    tariff = Tariff.objects.create(
+        id=1,
+        name="Дневной",
+        max_people=4,
+        base_duration_minutes=60,
+        base_cost=Decimal("25.00"),
+    )
+    tariff.scenarios.add(rehearsal)
+    tariff.rooms.add(1)
+    TariffWeeklyInterval.objects.create(
+        tariff=tariff, weekday=DAY.weekday(), start_time=time(9), end_time=time(18)
+    )
+    TariffUnit.objects.create(
+        scenario_id=2,
+        min_reservation_time=time(0, 30),
+        tariff_unit_cost=Decimal("7.50"),
+    )
+    ServiceGroup.objects.create(id=1, name="Оборудование")
+    Service.objects.create(id=1, name="Микрофон", group_id=1, cost=Decimal("3.33"))
+    Service.objects.create(id=2, name="Пульт", group_id=1, cost=Decimal("5"))
+
+
+def test_quote_rules(reference):
+    quotes = pricing.quote_batch(
+        [
+            pricing.QuoteRequest(1, 1, _at(9), _at(10, 20), [2, 1, 1], 1, 2),
+            pricing.QuoteRequest(1, 1, _at(17), _at(19), [], 1, 2),
+            pricing.QuoteRequest(1, 1, _at(9), _at(10), [], 1, 5),
+            pricing.QuoteRequest(2, 1, _at(9), _at(10, 30), [1], None),
+        ]
+    )
+
+    rental = quotes[0]
+    assert [s.id for s in rental.services] == [1, 2]
+    assert rental.services_cost == Decimal("8.33")
+    assert rental.tariff_ids == [1] and rental.tariff.id == 1
+    # 25 × 80 / 60 = 33.333… → 33.33
+    assert rental.rental_cost == Decimal("33.33")
+    assert rental.total_cost == Decimal("41.66")
+
+    assert quotes[1].tariff is None
+    assert quotes[1].tariff_error == "Выбранный тариф недоступен"
+    assert quotes[2].tariff_ids == []
+
+    units = quotes[3]
+    assert not units.tariff_required and units.tariff_error is None
+    assert units.required_units == 3
+    assert units.rental_cost == Decimal("22.50")
+    assert units.total_cost == Decimal("25.83")
+
+
+def test_batch_loads_reference_data_once(reference, django_assert_num_queries):
+    pricing.quote_batch([pricing.QuoteRequest(1, 1, _at(9), _at(10))])  # индекс
+
+    requests = [
+        pricing.QuoteRequest(1 + i % 2, 1, _at(9 + i % 8), _at(10 + i % 8), [1, 2], 1)
+        for i in range(50)
+    ]
+    with django_assert_num_queries(3):
+        quotes = pricing.quote_batch(requests)
+    assert len(quotes) == 50
+
+
+def test_quote_endpoint(admin_client, reference):
+    url = reverse("booking_quote")
+    response = admin_client.post(
+        url,
+        json.dumps(
+            {
+                "scenario_id": 1,
+                "room_id": 1,
+                "people_count": 2,
+                "blocks": [
+                    {
+                        "full_datetime": "2030-05-06 09:00:00",
+                        "duration": "02:00",
+                        "services": ["1"],
+                        "tariff_id": "1",
+                    },
+                    {"full_datetime": "2030-05-06 11:00:00", "duration": "01:00"},
+                    {"duration": "01:00"},
+                ],
+            }
+        ),
+        content_type="application/json",
+    )
+    data = response.json()
+    assert data["success"]
+    first, second, third = data["quotes"]
+    assert first["total_cost"] == "53.33"
+    assert first["rental_cost"] == "50.00"
+    assert first["tariff_id"] == 1 and first["error"] is None
+    assert second["error"] == "Выберите тариф" and second["field"] == "tariff_id"
+    assert second["tariff_ids"] == [1]
+    assert third == {
+        "block_index": 3,
+        "error": "Не указано время начала брони",
+        "field": "full_datetime",
+    }
+    assert data["total_cost"] == "53.33"
+
+    response = admin_client.post(url, "{}", content_type="application/json")
+    assert response.status_code == 400
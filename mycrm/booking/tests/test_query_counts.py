@@ -0,0 +1,154 @@
+"""Регрессионные тесты числа SQL-запросов календарных представлений.
+
+Число запросов не должно расти с количеством броней, клиентов, групп и платежей:
+каждое представление проверяется на одной брони и на нескольких десятках, а
+верхняя граница фиксирует текущий бюджет запросов.
+"""
+
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from booking import reference_data
+from booking.models import (
+    Area,
+    Client,
+    ClientGroup,
+    Payment,
+    PaymentType,
+    Reservation,
+    Room,
+    Scenario,
+    Service,
+    ServiceGroup,
+)
+
+pytestmark = pytest.mark.django_db
+
+DAY = date(2030, 5, 6)
+MANY = 30
+
+
+@pytest.fixture
+def setup():
+    scenario = Scenario.objects.create(id=1, name="Репетиционная точка")
+    area = Area.objects.create(id=1, name="Помещение")
+    area.scenario.add(scenario)
+    room = Room.objects.create(
+        id=1, name="Комната", area=area, hourstart=time(8, 0), hourend=time(23, 0)
+    )
+    room.scenario.add(scenario)
+    group = ServiceGroup.objects.create(id=1, name="Оборудование")
+    services = [
+        Service.objects.create(id=i, name=f"Услуга {i}", group=group, cost=5)
+        for i in (1, 2)
+    ]
+    payment_type = PaymentType.objects.create(id=1, name="Наличные")
+    return {
+        "scenario": scenario,
+        "room": room,
+        "services": services,
+        "payment_type": payment_type,
+    }
+
+
+def _add_reservations(setup, first_id, count, first_day=DAY):
+    """Создаёт брони с собственным клиентом, группой, услугами и платежом."""
+    tz = timezone.get_current_timezone()
+    for reservation_id in range(first_id, first_id + count):
+        day = first_day + timedelta(days=reservation_id % 5)
+        hour = 8 + reservation_id // 5 % 14
+        client = Client.objects.create(
+            id=reservation_id, name=f"Клиент {reservation_id}", phone=f"+375{reservation_id:09d}"
+        )
+        client_group = ClientGroup.objects.create(
+            id=reservation_id, name=f"Группа {reservation_id}"
+        )
+        client.groups.add(client_group)
+        reservation = Reservation.objects.create(
+            id=reservation_id,
+            datetimestart=timezone.make_aware(datetime.combine(day, time(hour)), tz),
+            datetimeend=timezone.make_aware(datetime.combine(day, time(hour + 1)), tz),
+            room=setup["room"],
+            scenario=setup["scenario"],
+            client=client,
+            client_group=client_group,
+            status_id=1080,
+            total_cost=Decimal("30"),
+        )
+        reservation.services.set(setup["services"])
+        Payment.objects.create(
+            id=reservation_id,
+            reservation=reservation,
+            payment_type=setup["payment_type"],
+            amount=Decimal("10"),
+        )
+
+
+def _count_queries(admin_client, url, params=None):
+    # Считаются запросы без кэша разметки дней сетки и справочников процесса.
+    cache.clear()
+    reference_data.invalidate()
+    with CaptureQueriesContext(connection) as ctx:
+        response = admin_client.get(url, params or {})
+    assert response.status_code == 200
+    return len(ctx)
+
+
+GRID_PARAMS = {
+    "date_from": str(DAY),
+    "date_to": str(DAY + timedelta(days=6)),
+    "area_id": 1,
+}
+
+
+@pytest.mark.parametrize(
+    "url_name, params, budget",
+    [
+        ("user_index", None, 40),
+        ("get_bookings_grid", GRID_PARAMS, 5),
+        ("get_calendar_grid", GRID_PARAMS, 7),
+    ],
+)
+def test_calendar_views_do_not_depend_on_booking_count(
+    admin_client, setup, url_name, params, budget
+):
+    url = reverse(url_name)
+    # Главная страница показывает брони текущего месяца.
+    first_day = DAY if params else timezone.localdate().replace(day=1)
+    _add_reservations(setup, 1, 1, first_day)
+    few = _count_queries(admin_client, url, params)
+    _add_reservations(setup, 2, MANY, first_day)
+    many = _count_queries(admin_client, url, params)
+
+    assert many == few
+    assert many <= budget
+
+
+def test_booking_details_do_not_depend_on_services_and_payments(admin_client, setup):
+    _add_reservations(setup, 1, 2)
+    url = reverse("get_booking_details", kwargs={"booking_id": 1})
+    few = _count_queries(admin_client, url)
+
+    for payment_id in range(100, 100 + MANY):
+        Payment.objects.create(
+            id=payment_id,
+            reservation_id=1,
+            payment_type=setup["payment_type"],
+            amount=Decimal("1"),
+        )
+    Reservation.objects.get(id=1).services.add(
+        *[
+            Service.objects.create(id=i, name=f"Услуга {i}", group_id=1, cost=1)
+            for i in range(10, 10 + MANY)
+        ]
+    )
+
+    assert _count_queries(admin_client, url) == few
+    assert few <= 15
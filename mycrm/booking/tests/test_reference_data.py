@@ -0,0 +1,115 @@
+from datetime import time
+
+import pytest
+from django.http import Http404
+
+from booking import data_versions, reference_data
+from booking.models import (
+    Area,
+    CancellationReason,
+    PaymentType,
+    ReservationStatusType,
+    Room,
+    Scenario,
+    TariffUnit,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def references():
+    PaymentType.objects.create(id=1, name="Наличные")
+    PaymentType.objects.create(id=2, name="Тарифные единицы")
+    CancellationReason.objects.create(id=1, name="Болезнь", order=2)
+    CancellationReason.objects.create(id=2, name="Перенос", order=1)
+    CancellationReason.objects.create(id=3, name="Старая", is_active=False)
+    scenario = Scenario.objects.create(id=1, name="Репетиционная точка")
+    area = Area.objects.create(id=1, name="Помещение")
+    Room.objects.create(
+        id=1, name="Комната", area=area, hourstart=time(8), hourend=time(23)
+    )
+    TariffUnit.objects.create(
+        id=1, scenario=scenario, min_reservation_time=time(1), tariff_unit_cost=10
+    )
+
+
+def _lookups():
+    assert reference_data.get(ReservationStatusType, id=1080).name == "approved"
+    assert reference_data.get(PaymentType, pk="2").name == "Тарифные единицы"
+    scenario = reference_data.get(Scenario, id=1)
+    assert reference_data.get(TariffUnit, scenario=scenario).id == 1
+    assert reference_data.get(Room, id=1).area.name == "Помещение"
+    reasons = reference_data.filter(CancellationReason, is_active=True)
+    assert [reason.id for reason in reasons] == [2, 1]
+    assert len(reference_data.filter(PaymentType)) == 2
+
+
+def test_lookups_make_no_queries(references, settings, django_assert_num_queries):
+    settings.REFERENCE_DATA_CHECK_SECONDS = 60
+    # Версия и по запросу на каждую таблицу при первом обращении.
+    with django_assert_num_queries(7):
+        _lookups()
+    reference_data.reset_stats()
+    with django_assert_num_queries(0):
+        _lookups()
+
+    with pytest.raises(PaymentType.DoesNotExist):
+        reference_data.get(PaymentType, id=99)
+    with pytest.raises(Http404):
+        reference_data.get_or_404(Room, id=99)
+    assert reference_data.stats() == {
+        "hits": 7,
+        "misses": 2,
+        "loads": 0,
+        "hit_rate": 7 / 9,
+    }
+
+
+def test_signals_and_version_refresh(references, settings, django_assert_num_queries):
+    registry = reference_data.get_registry()
+    assert reference_data.get(PaymentType, id=1).name == "Наличные"
+    PaymentType.objects.filter(id=1).update(name="Наличные (касса)")
+    assert reference_data.get(PaymentType, id=1).name == "Наличные"
+
+    # Сохранение (в том числе из админки) сбрасывает реестр процесса.
+    PaymentType.objects.create(id=3, name="Карта")
+    assert reference_data.get_registry() is not registry
+    assert reference_data.get(PaymentType, id=1).name == "Наличные (касса)"
+
+    # Другой процесс: строка и версия меняются без сигналов.
+    assert reference_data.get(Scenario, id=1).name == "Репетиционная точка"
+    Scenario.objects.filter(id=1).update(name="Звукозапись")
+    data_versions.bump_version(data_versions.REFERENCE)
+    settings.REFERENCE_DATA_CHECK_SECONDS = 60
+    assert reference_data.get(Scenario, id=1).name == "Репетиционная точка"
+    settings.REFERENCE_DATA_CHECK_SECONDS = 0
+    assert reference_data.get(Scenario, id=1).name == "Звукозапись"
+    with django_assert_num_queries(1):
+        reference_data.get_registry()
+
+
+def test_disabled_registry_reads_database(references, settings):
+    settings.REFERENCE_DATA_ENABLED = False
+    reference_data.reset_stats()
+    PaymentType.objects.filter(id=1).update(name="Наличные (касса)")
+    assert reference_data.get(PaymentType, id=1).name == "Наличные (касса)"
+    reasons = reference_data.filter(CancellationReason, is_active=True)
+    assert [reason.id for reason in reasons] == [2, 1]
+    assert reference_data.stats()["hit_rate"] == 0.0
+
+
+def test_rows_added_by_other_process_are_read_from_database(references, settings):
+    settings.REFERENCE_DATA_CHECK_SECONDS = 60
+    registry = reference_data.get_registry()
+    assert not reference_data.filter(PaymentType, name="Карта")
+
+    # Другой процесс добавил строку, версия ещё не сверена (bulk_create без сигналов).
+    PaymentType.objects.bulk_create([PaymentType(id=3, name="Карта")])
+    assert reference_data.get(PaymentType, id=3).name == "Карта"
+    assert reference_data.get_registry() is not registry
+    assert reference_data.get(PaymentType, id=3).name == "Карта"
+
+    CancellationReason.objects.bulk_create([CancellationReason(id=4, name="Ремонт")])
+    reasons = reference_data.filter(CancellationReason, name="Ремонт")
+    assert [reason.id for reason in reasons] == [4]
@@ -0,0 +1,111 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from booking.models import (
+    Area,
+    Reservation,
+    Room,
+    Scenario,
+    Service,
+    ServiceGroup,
+)
+
+pytestmark = pytest.mark.django_db
+
+START = timezone.make_aware(datetime(2030, 5, 6, 10))
+
+
+@pytest.fixture
+def auth_client():
+    User.objects.create_user(username="admin", password="secret")
+    client = APIClient()
+    token = client.post(
+        "/api/token/", {"username": "admin", "password": "secret"}
+    ).data["access"]
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    return client
+
+
+@pytest.fixture
+def reservations():
+    Scenario.objects.create(id=1, name="Звукозапись")
+    Area.objects.create(id=1, name="Первое")
+    Area.objects.create(id=2, name="Второе")
+    for room_id in (1, 2):
+        Room.objects.create(
+            id=room_id,
+            name=f"Комната {room_id}",
+            area_id=room_id,
+            hourstart=time(8),
+            hourend=time(23),
+        )
+    ServiceGroup.objects.create(id=1, name="Оборудование")
+    service = Service.objects.create(id=1, name="Микрофон", group_id=1, cost=5)
+
+    # По две брони на каждое начало: порядок внутри — по id.
+    rows = []
+    for i in range(10):
+        start = START + timedelta(days=i // 2)
+        rows.append(
+            Reservation.objects.create(
+                id=100 - i,
+                datetimestart=start,
+                datetimeend=start + timedelta(hours=1),
+                room_id=1 + i % 2,
+                scenario_id=1,
+            )
+        )
+    for row in rows[::3]:
+        row.services.add(service)
+    return rows
+
+
+def _walk(client, url):
+    ids, pages = [], 0
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, response.data
+        ids += [row["id"] for row in response.data["results"]]
+        url = response.data["next"]
+        pages += 1
+    return ids, pages
+
+
+def test_keyset_pages(auth_client, reservations, django_assert_num_queries):
+    expected = [
+        r.id for r in sorted(reservations, key=lambda r: (r.datetimestart, r.id))
+    ]
+    ids, pages = _walk(auth_client, "/api/reservations/?page_size=3")
+    assert ids == expected and pages == 4
+
+    # Пользователь токена, валидаторы ETag (счётчик удалений и max(updated_at)
+    # броней), брони и их услуги — при любом размере страницы.
+    with django_assert_num_queries(5):
+        response = auth_client.get("/api/reservations/?page_size=4")
+    assert [row["services"] for row in response.data["results"]] == [[], [1], [1], []]
+
+    assert auth_client.get("/api/reservations/?cursor=bad").status_code == 404
+
+
+def test_filters(auth_client, reservations):
+    ids, pages = _walk(auth_client, "/api/reservations/?area=2&page_size=2")
+    assert ids == [99, 97, 95, 93, 91] and pages == 3
+
+    ids, _ = _walk(
+        auth_client, "/api/reservations/?date_from=2030-05-07&date_to=2030-05-08"
+    )
+    assert sorted(ids) == [95, 96, 97, 98]
+
+    Reservation.objects.filter(id=91).update(
+        updated_at=timezone.now() + timedelta(hours=1)
+    )
+    since = (timezone.now() + timedelta(minutes=30)).isoformat()
+    response = auth_client.get("/api/reservations/", {"updated_since": since})
+    assert [row["id"] for row in response.data["results"]] == [91]
+
+    response = auth_client.get("/api/reservations/?room=1,x")
+    assert response.status_code == 400 and "room" in response.data
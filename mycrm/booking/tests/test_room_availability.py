@@ -0,0 +1,66 @@
+from datetime import datetime, time
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from booking.models import Area, Reservation, ReservationStatusType, Room, Scenario
+from booking.views.create_booking import check_room_availability
+
+pytestmark = pytest.mark.django_db
+
+
+def _dt(hour, minute=0):
+    return timezone.make_aware(
+        datetime(2030, 5, 6, hour, minute), timezone.get_current_timezone()
+    )
+
+
+@pytest.fixture
+def room():
+    area = Area.objects.create(id=1, name="Помещение")
+    return Room.objects.create(
+        id=1, name="Комната", area=area, hourstart=time(8, 0), hourend=time(23, 0)
+    )
+
+
+@pytest.fixture
+def booking(room):
+    scenario = Scenario.objects.create(id=1, name="Репетиционная точка")
+    return Reservation.objects.create(
+        id=1,
+        datetimestart=_dt(10),
+        datetimeend=_dt(12),
+        room=room,
+        scenario=scenario,
+        status_id=1080,
+    )
+
+
+@pytest.mark.parametrize(
+    "start,end",
+    [(_dt(9), _dt(10, 15)), (_dt(11), _dt(11, 30)), (_dt(11, 45), _dt(13))],
+)
+def test_overlap_is_rejected(room, booking, start, end):
+    with pytest.raises(ValidationError):
+        check_room_availability(room, start, end)
+
+
+@pytest.mark.parametrize("start,end", [(_dt(8), _dt(10)), (_dt(12), _dt(13))])
+def test_adjacent_bookings_are_allowed(room, booking, start, end):
+    assert check_room_availability(room, start, end)
+
+
+def test_cancelled_and_excluded_bookings_are_ignored(room, booking):
+    assert check_room_availability(room, _dt(10), _dt(12), exclude_reservation_id=1)
+
+    booking.status = ReservationStatusType.objects.get(id=1082)
+    booking.save()
+    assert check_room_availability(room, _dt(10), _dt(12))
+
+
+def test_outside_room_hours_is_rejected(room):
+    with pytest.raises(ValidationError):
+        check_room_availability(room, _dt(7), _dt(9))
+    with pytest.raises(ValidationError):
+        check_room_availability(room, _dt(22), _dt(23, 30))
@@ -0,0 +1,137 @@
+from datetime import date, datetime, time
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from booking import room_occupancy
+from booking.models import Area, Reservation, Room, RoomDayOccupancy, Scenario
+from booking.views.create_booking import check_room_availability
+
+pytestmark = pytest.mark.django_db
+
+DAY = date(2030, 5, 6)
+
+
+def _dt(hour, minute=0, day=DAY):
+    return timezone.make_aware(
+        datetime.combine(day, time(hour, minute)), timezone.get_current_timezone()
+    )
+
+
+def _slots(hour_from, hour_to):
+    return room_occupancy.slot_mask(hour_from * 4, hour_to * 4)
+
+
+def _stored(room_id=1, day=DAY):
+    return room_occupancy.load([room_id], [day]).get((room_id, day))
+
+
+@pytest.fixture
+def room():
+    Scenario.objects.create(id=1, name="Репетиционная точка")
+    area = Area.objects.create(id=1, name="Помещение")
+    return Room.objects.create(
+        id=1, name="Комната", area=area, hourstart=time(8), hourend=time(23)
+    )
+
+
+def _booking(reservation_id, start, end, **fields):
+    return Reservation.objects.create(
+        id=reservation_id,
+        datetimestart=start,
+        datetimeend=end,
+        room_id=1,
+        scenario_id=1,
+        status_id=1080,
+        **fields,
+    )
+
+
+def test_bitmap_follows_reservation_changes(room):
+    first = _booking(1, _dt(10), _dt(12))
+    _booking(2, _dt(11), _dt(13))
+    assert _stored() == (_slots(10, 13), True)
+
+    first.datetimestart, first.datetimeend = _dt(8), _dt(9, 10)
+    first.save()
+    # 08:00–09:10 занимает слот 09:00–09:15 целиком.
+    assert _stored() == (room_occupancy.slot_mask(32, 37) | _slots(11, 13), False)
+
+    first.status_id = 1082
+    first.save()
+    assert _stored() == (_slots(11, 13), True)
+
+    Reservation.objects.get(id=2).delete()
+    assert _stored() is None
+    assert not RoomDayOccupancy.objects.exists()
+
+
+def test_stale_reservation_save_uses_stored_position(room):
+    _booking(1, _dt(10), _dt(12))
+    stale = Reservation.objects.get(id=1)
+    moved = Reservation.objects.get(id=1)
+    moved.datetimestart, moved.datetimeend = _dt(14), _dt(15)
+    moved.save()
+
+    # Прежнее положение читается из БД: карта освобождает 14:00–15:00.
+    stale.save()
+    assert _stored() == (_slots(10, 12), True)
+
+
+def test_availability_rejects_by_bitmap_and_checks_bookings(
+    room, django_assert_num_queries
+):
+    _booking(1, _dt(10), _dt(12))
+    other_day = date(2030, 5, 7)
+    _booking(2, _dt(14, day=other_day), _dt(14, 10, day=other_day))
+
+    # Явный конфликт отклоняется по карте, «свободно» проверяется по броням.
+    with django_assert_num_queries(1), pytest.raises(ValidationError):
+        check_room_availability(room, _dt(11, 45), _dt(13))
+    with django_assert_num_queries(2):
+        assert check_room_availability(room, _dt(12), _dt(13))
+
+    # Невыровненная бронь: маски пересекаются, точный ответ даёт запрос по броням.
+    end = _dt(15, day=other_day)
+    assert check_room_availability(room, _dt(14, 10, day=other_day), end)
+    with pytest.raises(ValidationError):
+        check_room_availability(room, _dt(14, 5, day=other_day), end)
+    assert check_room_availability(room, _dt(10), _dt(12), exclude_reservation_id=1)
+
+    # Перенос в обход сигналов: карта устарела, но двойной брони нет.
+    Reservation.objects.filter(id=1).update(
+        datetimestart=_dt(16), datetimeend=_dt(17)
+    )
+    with pytest.raises(ValidationError):
+        check_room_availability(room, _dt(16), _dt(17))
+
+
+def test_verify_command_finds_and_repairs_drift(room, capsys):
+    _booking(1, _dt(10), _dt(12))
+    _booking(2, _dt(10, day=date(2030, 5, 7)), _dt(12, day=date(2030, 5, 7)))
+    RoomDayOccupancy.objects.filter(date=DAY).update(slots=room_occupancy.to_bytes(0))
+    RoomDayOccupancy.objects.filter(date=date(2030, 5, 7)).delete()
+
+    call_command("verify_room_occupancy")
+    assert "Дат с расхождением: 2" in capsys.readouterr().out
+
+    call_command("verify_room_occupancy", repair=True)
+    assert room_occupancy.find_drift() == {}
+    assert _stored() == (_slots(10, 12), True)
+
+
+def test_occupancy_endpoint(admin_client, room):
+    _booking(1, _dt(0), _dt(0, 15))
+    _booking(2, _dt(22), _dt(23))
+
+    data = admin_client.get(
+        reverse("get_room_occupancy"),
+        {"date_from": str(DAY), "date_to": "2030-05-31", "area_id": 1},
+    ).json()
+
+    assert data["success"]
+    assert data["slot_minutes"] == 15
+    assert data["occupancy"] == {"1": {str(DAY): "0f0000000000000000000001"}}
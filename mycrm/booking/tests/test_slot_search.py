@@ -0,0 +1,209 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from booking import reference_data
+from booking.models import (
+    Area,
+    Direction,
+    Reservation,
+    Room,
+    Scenario,
+    Specialist,
+    SpecialistWeeklyInterval,
+    Tariff,
+    TariffWeeklyInterval,
+)
+from booking.slot_search import find_free_slots
+
+pytestmark = pytest.mark.django_db
+
+# Понедельник.
+DAY = date(2030, 5, 6)
+
+
+def _at(hour, minute=0, day=DAY):
+    return timezone.make_aware(
+        datetime.combine(day, time(hour, minute)), timezone.get_current_timezone()
+    )
+
+
+def _booking(reservation_id, start, end, room_id=1, **fields):
+    Reservation.objects.create(
+        id=reservation_id,
+        datetimestart=start,
+        datetimeend=end,
+        room_id=room_id,
+        scenario_id=1,
+        status_id=1080,
+        **fields,
+    )
+
+
+def _found(slots):
+    return [
+        (s.start.strftime("%d %H:%M"), s.room_id, s.specialist_ids) for s in slots
+    ]
+
+
+@pytest.fixture
+def rooms():
+    Scenario.objects.create(id=1, name="Звукозапись")
+    Scenario.objects.create(id=2, name="Репетиционная точка")
+    Area.objects.create(id=1, name="Помещение")
+    for room_id, name, opens, closes in ((1, "Первая", 8, 23), (2, "Вторая", 10, 20)):
+        Room.objects.create(
+            id=room_id,
+            name=name,
+            area_id=1,
+            hourstart=time(opens),
+            hourend=time(closes),
+        )
+
+
+def test_earliest_slots_across_rooms(rooms):
+    _booking(1, _at(8), _at(10, 30))
+    _booking(2, _at(11), _at(12), room_id=2)
+
+    slots = find_free_slots(
+        scenario=Scenario.objects.get(id=1),
+        duration_minutes=60,
+        date_from=DAY,
+        date_to=DAY + timedelta(days=13),
+        limit=4,
+    )
+    assert _found(slots) == [
+        ("06 10:00", 2, []),
+        ("06 10:30", 1, []),
+        ("06 11:30", 1, []),
+        ("06 12:00", 2, []),
+    ]
+
+    # Занятый день целиком переносит поиск на следующий.
+    _booking(3, _at(10), _at(20), room_id=2)
+    _booking(4, _at(8), _at(23))
+    slots = find_free_slots(
+        scenario=Scenario.objects.get(id=1),
+        duration_minutes=90,
+        date_from=DAY,
+        date_to=DAY + timedelta(days=1),
+        limit=1,
+        room_ids=[1],
+    )
+    assert _found(slots) == [("07 08:00", 1, [])]
+
+
+def test_specialist_schedule_and_bookings(rooms):
+    direction = Direction.objects.create(id=1, name="Вокал")
+    for specialist_id in (1, 2):
+        specialist = Specialist.objects.create(
+            id=specialist_id, name=f"Педагог {specialist_id}"
+        )
+        specialist.scenarios.add(1)
+        specialist.directions.add(direction)
+        SpecialistWeeklyInterval.objects.create(
+            specialist=specialist,
+            weekday=DAY.weekday(),
+            start_time=time(12 + specialist_id),
+            end_time=time(15),
+        )
+    _booking(1, _at(13), _at(14), room_id=2, specialist_id=1)
+
+    slots = find_free_slots(
+        scenario=Scenario.objects.get(id=1),
+        duration_minutes=60,
+        date_from=DAY,
+        date_to=DAY,
+        limit=10,
+        room_ids=[1],
+        direction=direction,
+    )
+    assert _found(slots) == [("06 14:00", 1, [1, 2])]
+
+    slots = find_free_slots(
+        scenario=Scenario.objects.get(id=1),
+        duration_minutes=30,
+        date_from=DAY,
+        date_to=DAY,
+        limit=10,
+        room_ids=[1],
+        specialist=Specialist.objects.get(id=1),
+    )
+    assert _found(slots) == [("06 14:00", 1, [1]), ("06 14:30", 1, [1])]
+
+
+def test_tariff_intervals_are_not_merged(rooms):
+    scenario = Scenario.objects.get(id=2)
+    for tariff_id, (start, end) in enumerate([(9, 11), (11, 13)], start=1):
+        tariff = Tariff.objects.create(
+            id=tariff_id,
+            name=f"Тариф {tariff_id}",
+            max_people=4,
+            base_duration_minutes=60,
+            base_cost=20,
+        )
+        tariff.scenarios.add(scenario)
+        tariff.rooms.add(1)
+        TariffWeeklyInterval.objects.create(
+            tariff=tariff,
+            weekday=DAY.weekday(),
+            start_time=time(start),
+            end_time=time(end),
+        )
+
+    slots = find_free_slots(
+        scenario=scenario,
+        duration_minutes=120,
+        date_from=DAY,
+        date_to=DAY,
+        limit=10,
+        people_count=2,
+    )
+    assert [(s.start, s.room_id, s.tariff_ids) for s in slots] == [
+        (_at(9), 1, [1]),
+        (_at(11), 1, [2]),
+    ]
+    assert find_free_slots(
+        scenario=scenario,
+        duration_minutes=60,
+        date_from=DAY,
+        date_to=DAY,
+        people_count=5,
+    ) == []
+
+
+def test_endpoint_uses_fixed_number_of_queries(
+    admin_client, rooms, django_assert_max_num_queries
+):
+    for room_id in range(3, 43):
+        Room.objects.create(
+            id=room_id, name=f"Комната {room_id}", hourstart=time(8), hourend=time(9)
+        )
+        _booking(room_id, _at(8), _at(9), room_id=room_id)
+    url = reverse("find_free_slots")
+    admin_client.get(url)  # сессия и пользователь
+    reference_data.get(Scenario, id=1)  # справочники процесса
+
+    params = {
+        "scenario_id": 1,
+        "duration_minutes": 60,
+        "date_from": str(DAY),
+        "limit": 50,
+    }
+    with django_assert_max_num_queries(5):
+        data = admin_client.get(url, params).json()
+    assert data["success"]
+    assert data["date_to"] == str(DAY + timedelta(days=13))
+    assert len(data["slots"]) == 50
+    assert data["slots"][0] == {
+        "start": "2030-05-06 08:00:00",
+        "end": "2030-05-06 09:00:00",
+        "room_id": 1,
+        "specialist_ids": [],
+        "tariff_ids": [],
+    }
+
+    response = admin_client.get(url, {**params, "duration_minutes": "abc"})
+    assert response.status_code == 400
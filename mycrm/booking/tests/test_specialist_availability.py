@@ -0,0 +1,178 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from booking.models import (
+    Area,
+    Client,
+    Reservation,
+    Room,
+    Scenario,
+    Specialist,
+    SpecialistOverrideInterval,
+    SpecialistScheduleOverride,
+    SpecialistWeeklyInterval,
+)
+from booking.specialist_availability import resolve_availability
+
+pytestmark = pytest.mark.django_db
+
+# Понедельник.
+DAY = date(2030, 5, 6)
+
+DAY_OFF = "У специалиста выходной в выбранную дату"
+NOT_WORKING = "Специалист не работает в это время"
+BUSY_AS_CLIENT = "Специалист занят в это время (он записан как клиент)"
+BUSY = "Специалист уже занят в это время"
+
+
+def _at(hour, minute=0, day=DAY):
+    return timezone.make_aware(
+        datetime.combine(day, time(hour, minute)), timezone.get_current_timezone()
+    )
+
+
+def _weekly(specialist_id, start, end, scenario_id=None):
+    SpecialistWeeklyInterval.objects.create(
+        specialist_id=specialist_id,
+        scenario_id=scenario_id,
+        weekday=DAY.weekday(),
+        start_time=time(start),
+        end_time=time(end),
+    )
+
+
+def _booking(reservation_id, start, end, **fields):
+    return Reservation.objects.create(
+        id=reservation_id,
+        datetimestart=start,
+        datetimeend=end,
+        room_id=1,
+        scenario_id=1,
+        status_id=1080,
+        **fields,
+    )
+
+
+def _add_specialists(first_id, count):
+    """Специалисты без расписания и броней."""
+    for specialist_id in range(first_id, first_id + count):
+        Specialist.objects.create(
+            id=specialist_id, name=f"Специалист {specialist_id}"
+        ).scenarios.add(1)
+
+
+@pytest.fixture
+def setup():
+    """Специалисты:
+    1 — без расписания;
+    2 — по понедельникам 10–14, для сценария 2 — 16–20;
+    3 — 10–18, но на DAY выходной;
+    4 — 10–18, на DAY для сценария 1 только 12–13;
+    5 — без расписания, записан клиентом на 10–11;
+    6 — без расписания, ведёт бронь 12:30–13:30.
+    """
+    for scenario_id in (1, 2):
+        Scenario.objects.create(id=scenario_id, name=f"Сценарий {scenario_id}")
+    Area.objects.create(id=1, name="Помещение")
+    Room.objects.create(id=1, name="Комната", area_id=1, hourstart=time(8), hourend=time(23))
+    Client.objects.create(id=1, name="Преподаватель-клиент", phone="+1")
+    _add_specialists(1, 6)
+    Specialist.objects.filter(id=5).update(client_id=1)
+
+    _weekly(2, 10, 14)
+    _weekly(2, 16, 20, scenario_id=2)
+    _weekly(3, 10, 18)
+    SpecialistScheduleOverride.objects.create(specialist_id=3, date=DAY, is_day_off=True)
+    _weekly(4, 10, 18)
+    override = SpecialistScheduleOverride.objects.create(
+        specialist_id=4, date=DAY, scenario_id=1
+    )
+    SpecialistOverrideInterval.objects.create(
+        override=override, start_time=time(12), end_time=time(13)
+    )
+    _booking(1, _at(10), _at(11), client_id=1)
+    _booking(2, _at(12, 30), _at(13, 30), specialist_id=6)
+
+
+def test_resolver_keeps_schedule_semantics(setup):
+    windows = [
+        (_at(10), _at(11), 1),
+        (_at(12), _at(13), 1),
+        (_at(16), _at(17), 2),
+        (_at(16), _at(17), 1),
+        (_at(22), _at(1, day=DAY + timedelta(days=1)), 1),
+    ]
+    result = resolve_availability(Specialist.objects.order_by("id"), windows)
+
+    expected = {
+        1: [None, None, None, None],
+        2: [None, None, None, NOT_WORKING],
+        3: [DAY_OFF, DAY_OFF, DAY_OFF, DAY_OFF],
+        4: [NOT_WORKING, None, None, NOT_WORKING],
+        5: [BUSY_AS_CLIENT, None, None, None],
+        6: [None, BUSY, None, None],
+    }
+    for specialist_id, errors in expected.items():
+        assert [result[(specialist_id, i)] for i in range(4)] == errors
+        assert result[(specialist_id, 4)] == "Бронь не может пересекать сутки"
+
+    # Редактируемая бронь не занимает своего специалиста.
+    again = resolve_availability(
+        Specialist.objects.filter(id=6), windows[1:2], exclude_reservation_id=2
+    )
+    assert again == {(6, 0): None}
+
+
+def test_resolver_query_count_is_fixed(setup):
+    windows = [(_at(hour), _at(hour + 1), 1) for hour in range(9, 20)]
+
+    def count_queries():
+        specialists = list(Specialist.objects.all())
+        with CaptureQueriesContext(connection) as queries:
+            resolve_availability(specialists, windows)
+        return len(queries)
+
+    baseline = count_queries()
+    _add_specialists(100, 40)
+    assert count_queries() == baseline <= 6
+
+
+def test_views_use_resolver(admin_client, setup):
+    _booking(3, _at(12), _at(13))
+
+    specialists = admin_client.get(
+        reverse("get_available_specialists", args=[3])
+    ).json()["specialists"]
+    assert [s["id"] for s in specialists] == [1, 2, 4, 5]
+
+    intervals = admin_client.get(
+        reverse("get_specialists_work_intervals"),
+        {"date_from": str(DAY), "date_to": str(DAY), "scenario_id": 1},
+    ).json()["work_intervals_by_date"][str(DAY)]
+    assert intervals == {
+        "1": [{"startMinutes": 0, "endMinutes": 1440}],
+        "2": [{"startMinutes": 600, "endMinutes": 840}],
+        "4": [{"startMinutes": 720, "endMinutes": 780}],
+        "5": [{"startMinutes": 0, "endMinutes": 1440}],
+        "6": [{"startMinutes": 0, "endMinutes": 1440}],
+    }
+
+    busy = {
+        s["id"]: [(i["startMinutes"], i["endMinutes"]) for i in s["intervals"]]
+        for s in admin_client.get(
+            reverse("get_busy_specialists_for_date"),
+            {"date": str(DAY), "scenario_id": 2},
+        ).json()["busy_specialists"]
+    }
+    assert busy == {
+        2: [(0, 960), (1200, 1440)],
+        3: [(0, 1440)],
+        4: [(0, 600), (1080, 1440)],
+        5: [(600, 660)],
+        6: [(750, 810)],
+    }
@@ -0,0 +1,164 @@
+from datetime import time, timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from booking import specialist_schedule
+from booking.models import (
+    Scenario,
+    Specialist,
+    SpecialistDaySchedule,
+    SpecialistOverrideInterval,
+    SpecialistScheduleOverride,
+    SpecialistWeeklyInterval,
+)
+from booking.specialist_availability import SpecialistSchedules
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def short_horizon(settings):
+    settings.SPECIALIST_SCHEDULE_HORIZON_DAYS = 21
+
+
+@pytest.fixture
+def specialists():
+    for scenario_id in (1, 2):
+        Scenario.objects.create(id=scenario_id, name=f"Сценарий {scenario_id}")
+    return [
+        Specialist.objects.create(id=specialist_id, name=f"Специалист {specialist_id}")
+        for specialist_id in (1, 2)
+    ]
+
+
+def _projection(specialist_id, day, scenario_id=None):
+    row = SpecialistDaySchedule.objects.get(
+        specialist_id=specialist_id, date=day, scenario_id=scenario_id
+    )
+    return row.intervals if row.restricted else None
+
+
+def _assert_matches_live():
+    dates = specialist_schedule.horizon_dates()
+    live = SpecialistSchedules([1, 2], dates, use_projection=False)
+    for spec_id in (1, 2):
+        for day in dates:
+            for scenario_id in (None, 1, 2):
+                assert _projection(spec_id, day, scenario_id) == live.work_minutes(
+                    spec_id, day, scenario_id
+                )
+
+
+def test_projection_follows_schedule_edits(specialists):
+    today = timezone.localdate()
+    assert SpecialistDaySchedule.objects.count() == 2 * 21 * 3
+    assert _projection(1, today) is None
+
+    weekly = SpecialistWeeklyInterval.objects.create(
+        specialist_id=1, weekday=today.weekday(), start_time=time(10), end_time=time(14)
+    )
+    SpecialistWeeklyInterval.objects.create(
+        specialist_id=1,
+        scenario_id=2,
+        weekday=today.weekday(),
+        start_time=time(16),
+        end_time=time(20),
+    )
+    assert _projection(1, today) == [[600, 840]]
+    assert _projection(1, today + timedelta(days=1)) == []
+    assert _projection(1, today, 2) == [[960, 1200]]
+
+    weekly.end_time = time(12)
+    weekly.save()
+    assert _projection(1, today + timedelta(days=7)) == [[600, 720]]
+
+    override = SpecialistScheduleOverride.objects.create(
+        specialist_id=1, date=today + timedelta(days=7), scenario_id=1
+    )
+    SpecialistOverrideInterval.objects.create(
+        override=override, start_time=time(8), end_time=time(9)
+    )
+    assert _projection(1, today + timedelta(days=7), 1) == [[480, 540]]
+
+    override.date = today + timedelta(days=14)
+    override.save()
+    assert _projection(1, today + timedelta(days=7), 1) == [[600, 720]]
+    assert _projection(1, today + timedelta(days=14), 1) == [[480, 540]]
+    _assert_matches_live()
+
+    # Без интервалов без сценария расписание ограничивает только сценарий 2
+    # и общий вид (scenario=NULL).
+    weekly.delete()
+    assert _projection(1, today + timedelta(days=1), 1) is None
+    assert _projection(1, today + timedelta(days=1)) == []
+    _assert_matches_live()
+
+
+def test_weekday_change_rebuilds_only_that_weekday(specialists):
+    today = timezone.localdate()
+    SpecialistWeeklyInterval.objects.create(
+        specialist_id=2, weekday=today.weekday(), start_time=time(10), end_time=time(14)
+    )
+    tomorrow = today + timedelta(days=1)
+    with CaptureQueriesContext(connection) as queries:
+        SpecialistWeeklyInterval.objects.create(
+            specialist_id=2,
+            weekday=tomorrow.weekday(),
+            start_time=time(9),
+            end_time=time(10),
+        )
+    inserts = [
+        q for q in queries if q["sql"].startswith('INSERT INTO "specialist_day_schedules"')
+    ]
+    assert len(inserts) == 1
+    assert _projection(2, tomorrow) == [[540, 600]]
+    _assert_matches_live()
+
+
+def test_new_scenario_builds_only_its_rows(specialists):
+    kept = set(SpecialistDaySchedule.objects.values_list("id", flat=True))
+    Scenario.objects.create(id=3, name="Сценарий 3")
+
+    # Строки прежних сценариев не пересоздаются; новому — весь горизонт.
+    assert set(SpecialistDaySchedule.objects.values_list("id", flat=True)) >= kept
+    added = SpecialistDaySchedule.objects.exclude(id__in=kept)
+    assert added.count() == 2 * 21
+    assert set(added.values_list("scenario_id", flat=True)) == {3}
+
+
+def test_work_intervals_are_read_from_projection(admin_client, specialists):
+    today = timezone.localdate()
+    SpecialistWeeklyInterval.objects.create(
+        specialist_id=1, weekday=today.weekday(), start_time=time(10), end_time=time(14)
+    )
+    url = reverse("get_specialists_work_intervals")
+    params = {"date_from": str(today), "date_to": str(today + timedelta(days=20))}
+    admin_client.get(url, params)  # сессия и пользователь
+
+    with CaptureQueriesContext(connection) as queries:
+        data = admin_client.get(url, params).json()
+    sources = " ".join(q["sql"] for q in queries)
+    assert "specialist_weekly_intervals" not in sources
+    assert "specialist_schedule_overrides" not in sources
+    assert data["work_intervals_by_date"][str(today)]["1"] == [
+        {"startMinutes": 600, "endMinutes": 840}
+    ]
+
+
+def test_extend_drops_past_and_fills_missing_dates(specialists):
+    today = timezone.localdate()
+    SpecialistDaySchedule.objects.create(
+        specialist_id=1, date=today - timedelta(days=1), restricted=False
+    )
+    SpecialistDaySchedule.objects.filter(date=today + timedelta(days=20)).delete()
+
+    call_command("extend_specialist_schedules")
+
+    assert not SpecialistDaySchedule.objects.filter(date__lt=today).exists()
+    assert SpecialistDaySchedule.objects.count() == 2 * 21 * 3
+    _assert_matches_live()
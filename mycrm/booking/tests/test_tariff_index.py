@@ -0,0 +1,125 @@
+from datetime import date, time
+
+import pytest
+
+from booking import data_versions, tariff_index
+from booking.models import Room, Scenario, Tariff, TariffWeeklyInterval
+from booking.views.create_booking import get_available_tariffs_for_booking
+
+pytestmark = pytest.mark.django_db
+
+# Понедельник.
+DAY = date(2030, 5, 6)
+
+
+@pytest.fixture
+def tariffs():
+    scenario = Scenario.objects.create(id=1, name="Репетиционная точка")
+    Scenario.objects.create(id=2, name="Звукозапись")
+    for room_id in (1, 2):
+        Room.objects.create(
+            id=room_id, name=f"Комната {room_id}", hourstart=time(8), hourend=time(23)
+        )
+    result = []
+    for tariff_id, max_people, (start, end) in ((1, 4, (9, 12)), (2, 10, (11, 18))):
+        tariff = Tariff.objects.create(
+            id=tariff_id,
+            name=f"Тариф {tariff_id}",
+            max_people=max_people,
+            base_duration_minutes=60,
+            base_cost=20,
+        )
+        tariff.scenarios.add(scenario)
+        tariff.rooms.add(1)
+        TariffWeeklyInterval.objects.create(
+            tariff=tariff,
+            weekday=DAY.weekday(),
+            start_time=time(start),
+            end_time=time(end),
+        )
+        result.append(tariff)
+    return result
+
+
+def _available(start, end=None, people_count=None, scenario_id=1, room_id=1, day=DAY):
+    return [
+        t.id
+        for t in get_available_tariffs_for_booking(
+            scenario=Scenario.objects.get(id=scenario_id),
+            room=Room.objects.get(id=room_id),
+            date_iso=day.isoformat(),
+            start_time_hm=start,
+            end_time_hm=end,
+            people_count=people_count,
+        )
+    ]
+
+
+def test_lookup_keeps_interval_rules(tariffs):
+    assert _available("09:00", "12:00") == [1]
+    assert _available("11:00", "12:00") == [1, 2]
+    assert _available("11:00") == [1, 2]
+    assert _available("11:30", "12:30") == [2]
+    assert _available("12:00", "13:00") == [2]
+    assert _available("08:30", "10:00") == []
+    assert _available("18:00", "19:00") == []
+    assert _available("11:00", "12:00", people_count=5) == [2]
+    assert _available("11:00", "12:00", scenario_id=2) == []
+    assert _available("11:00", "12:00", room_id=2) == []
+    assert _available("11:00", "12:00", day=date(2030, 5, 7)) == []
+
+
+def test_lookups_make_no_queries(tariffs, django_assert_num_queries, settings):
+    settings.TARIFF_INDEX_CHECK_SECONDS = 60
+    index = tariff_index.get_index()
+    with django_assert_num_queries(0):
+        quotes = index.quote(
+            1,
+            1,
+            [
+                (DAY, time(9), time(10)),
+                (DAY, time(11), time(12)),
+                (DAY, time(13), time(19)),
+            ],
+            people_count=2,
+        )
+        assert [[t.id for t in q] for q in quotes] == [[1], [1, 2], []]
+        assert [i.start_time for i in quotes[0][0].weekly_intervals.all()] == [time(9)]
+        assert tariff_index.get_index() is index
+
+
+def test_signals_invalidate_index(tariffs):
+    assert _available("11:00", "12:00") == [1, 2]
+
+    tariffs[0].rooms.remove(1)
+    assert _available("11:00", "12:00") == [2]
+
+    interval = tariffs[1].weekly_intervals.get()
+    interval.start_time = time(12)
+    interval.save()
+    assert _available("11:00", "12:00") == []
+    assert _available("12:00", "13:00") == [2]
+
+    tariffs[1].active = False
+    tariffs[1].save()
+    assert _available("12:00", "13:00") == []
+
+    tariffs[1].active = True
+    tariffs[1].save()
+    tariffs[1].scenarios.clear()
+    assert _available("12:00", "13:00") == []
+
+
+def test_other_processes_follow_version(tariffs, settings, django_assert_num_queries):
+    index = tariff_index.get_index()
+    # Изменение в другом процессе: строка и версия меняются без сигналов.
+    Tariff.objects.filter(id=1).update(max_people=1)
+    data_versions.bump_version(data_versions.TARIFFS)
+
+    settings.TARIFF_INDEX_CHECK_SECONDS = 60
+    assert tariff_index.get_index() is index
+
+    settings.TARIFF_INDEX_CHECK_SECONDS = 0
+    assert _available("11:00", "12:00", people_count=2) == [2]
+    with django_assert_num_queries(1):
+        tariff_index.get_index()
@@ -0,0 +1,202 @@
+import json
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connections
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+
+from booking import tariff_unit_ledger
+from booking.models import (
+    Area,
+    CancellationReason,
+    Client,
+    ClientSummary,
+    Payment,
+    PaymentType,
+    Reservation,
+    ReservationStatusType,
+    Room,
+    Scenario,
+    Subscription,
+    TariffUnit,
+    TariffUnitLedger,
+)
+from booking.payment_totals import TARIFF_UNITS_PAYMENT_TYPE
+from booking.tariff_unit_ledger import InsufficientUnits
+
+THREADS = 16
+OPERATIONS_PER_THREAD = 20
+
+
+def _subscription(balance):
+    Scenario.objects.create(id=1, name="Репетиционная точка")
+    Client.objects.create(id=1, name="Клиент", phone="+375290000001")
+    return Subscription.objects.create(
+        id=1, client_id=1, scenario_id=1, balance=balance
+    )
+
+
+def _ledger_balance(subscription_id=1):
+    entries = TariffUnitLedger.objects.filter(subscription_id=subscription_id)
+    return entries.aggregate(total=Sum("units"))["total"]
+
+
+@pytest.mark.django_db
+def test_debits_credits_and_direct_saves_are_recorded():
+    subscription = _subscription(5)
+    stale = Subscription.objects.get(id=1)
+
+    tariff_unit_ledger.debit(subscription, 3)
+    assert subscription.balance == 2
+    with pytest.raises(InsufficientUnits):
+        tariff_unit_ledger.debit(subscription, 5)
+    tariff_unit_ledger.credit(subscription, 4)
+    assert ClientSummary.objects.get(client_id=1).balances == {"1": 6}
+
+    # Сохранение объекта, прочитанного до списаний, не возвращает старый баланс.
+    stale.save()
+    assert stale.balance == 6
+    stale.balance = 10
+    stale.save()
+    assert list(
+        TariffUnitLedger.objects.order_by("id").values_list("kind", "units")
+    ) == [("adjustment", 5), ("debit", -3), ("credit", 4), ("adjustment", 4)]
+    assert _ledger_balance() == 10
+    assert not tariff_unit_ledger.find_drift().exists()
+
+
+@pytest.mark.django_db
+def test_balance_at_uses_snapshots(django_assert_num_queries):
+    subscription = _subscription(10)
+    tariff_unit_ledger.debit(subscription, 4)
+    tariff_unit_ledger.credit(subscription, 1)
+    start = timezone.make_aware(datetime.combine(date(2030, 5, 1), time()))
+    for day, entry in enumerate(TariffUnitLedger.objects.order_by("id")):
+        TariffUnitLedger.objects.filter(id=entry.id).update(
+            created_at=start + timedelta(days=day, hours=12)
+        )
+
+    assert tariff_unit_ledger.take_snapshots(start + timedelta(days=2)) == 1
+    # Повтор на тот же момент ничего не добавляет.
+    assert tariff_unit_ledger.take_snapshots(start + timedelta(days=2)) == 0
+    assert tariff_unit_ledger.take_snapshots(start + timedelta(days=3)) == 1
+    assert tariff_unit_ledger.balance_at(1, start) == 0
+    assert tariff_unit_ledger.balance_at(1, start + timedelta(days=1)) == 10
+    with django_assert_num_queries(2):
+        assert tariff_unit_ledger.balance_at(1, start + timedelta(days=2)) == 6
+    assert tariff_unit_ledger.balance_at(1, start + timedelta(days=30)) == 7
+
+
+@pytest.mark.django_db
+def test_unit_payments_are_debited_and_refunded_on_cancel(admin_client):
+    subscription = _subscription(5)
+    Area.objects.create(id=1, name="Помещение")
+    Room.objects.create(
+        id=1, name="Комната", area_id=1, hourstart=time(8), hourend=time(23)
+    )
+    TariffUnit.objects.create(
+        id=1, scenario_id=1, min_reservation_time=time(1), tariff_unit_cost=10
+    )
+    PaymentType.objects.create(id=2, name=TARIFF_UNITS_PAYMENT_TYPE)
+    ReservationStatusType.objects.create(id=4, name="Отменена")
+    CancellationReason.objects.create(id=1, name="Болезнь")
+    start = timezone.make_aware(datetime.combine(date(2030, 5, 6), time(10)))
+    Reservation.objects.create(
+        id=1,
+        datetimestart=start,
+        datetimeend=start + timedelta(hours=2),
+        room_id=1,
+        client_id=1,
+        scenario_id=1,
+        status_id=1080,
+        total_cost=Decimal("100"),
+    )
+
+    def post(name, payload):
+        return admin_client.post(
+            reverse(name, args=[1]),
+            json.dumps(payload),
+            content_type="application/json",
+        ).json()
+
+    payment = {"payment_type_id": 2, "amount": "60"}
+    assert not post("process_batch_payments", {"payments": [payment]})["success"]
+    payment["amount"] = "30"
+    assert post("process_batch_payments", {"payments": [payment]})["success"]
+    subscription.refresh_from_db()
+    assert subscription.balance == 2
+
+    assert post("cancel_booking", {"cancellation_reason_id": 1})["success"]
+    refund = TariffUnitLedger.objects.get(kind="credit")
+    assert (refund.units, refund.reservation_id) == (3, 1)
+    assert refund.payment.amount == Decimal("-30")
+    subscription.refresh_from_db()
+    assert subscription.balance == _ledger_balance() == 5
+
+    # Единицы по платежам отменённой брони уже возвращены: повторно — нет.
+    paid = Payment.objects.get(reservation_id=1, amount=Decimal("30"))
+    response = admin_client.post(reverse("cancel_payment", args=[paid.id]))
+    assert response.status_code == 400
+    subscription.refresh_from_db()
+    assert subscription.balance == _ledger_balance() == 5
+
+    # Групповая бронь без клиента: оплата единицами без списания.
+    Reservation.objects.create(
+        id=2,
+        datetimestart=start + timedelta(hours=3),
+        datetimeend=start + timedelta(hours=5),
+        room_id=1,
+        scenario_id=1,
+        status_id=1080,
+        total_cost=Decimal("100"),
+    )
+    response = admin_client.post(
+        reverse("process_batch_payments", args=[2]),
+        json.dumps({"payments": [payment]}),
+        content_type="application/json",
+    )
+    assert response.json()["success"]
+    assert _ledger_balance() == 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_debits_and_refunds_keep_balance():
+    _subscription(50)
+    debited = []
+    errors = []
+    barrier = threading.Barrier(THREADS)
+
+    def target(n):
+        try:
+            barrier.wait()
+            subscription = Subscription.objects.get(id=1)
+            for _ in range(OPERATIONS_PER_THREAD):
+                if n % 2:
+                    tariff_unit_ledger.credit(subscription, 1)
+                    continue
+                try:
+                    tariff_unit_ledger.debit(subscription, 2)
+                    debited.append(2)
+                except InsufficientUnits:
+                    pass
+        except Exception as e:  # noqa: BLE001 - ошибки проверяются в тесте
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=target, args=(n,)) for n in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+
+    credited = THREADS // 2 * OPERATIONS_PER_THREAD
+    expected = 50 + credited - sum(debited)
+    assert expected >= 0
+    assert Subscription.objects.get(id=1).balance == _ledger_balance() == expected
+    assert ClientSummary.objects.get(client_id=1).balances == {"1": expected}
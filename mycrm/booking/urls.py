@@ -1,4 +1,4 @@
-from django.urls import path, include
+from django.urls import path, include, re_path
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularRedocView,
@@ -29,16 +29,27 @@ from .api import (
     PaymentViewSet,
     AreaViewSet,
 )
-from .views import user_index_view, create_booking_view, add_client_view
+from .views import (
+    user_index_view,
+    create_booking_view,
+    add_client_view,
+    get_client_summaries,
+    search_clients_view,
+)
 from .views.user_index import (
     get_bookings_grid,
     get_calendar_grid,
     get_room_bookings_for_date,
+    get_room_occupancy,
     get_busy_specialists_for_date,
     get_specialists_work_intervals,
     get_pending_requests_count,
 )
 from .views.tariffs import get_available_tariffs_view
+from .views.free_slots import find_free_slots_view
+from .views.quote import quote_view
+from .views.bootstrap import bootstrap_view
+from .views.live_events import live_events_poll, live_events_stream
 from .views.edit_booking import (
     get_booking_details,
     delete_booking_view,
@@ -104,6 +115,11 @@ urlpatterns = [
     path("user_stats_profit/", user_index_view, name="stats_profit"),
     path("user_stats_all/", user_index_view, name="stats_all"),
     path("create_booking/", create_booking_view, name="create_booking"),
+    re_path(
+        r"^bootstrap/(?P<version>[0-9]+)\.(?P<fmt>json|js)$",
+        bootstrap_view,
+        name="bootstrap",
+    ),
     # Управление бронированием
     path(
         "booking/get-booking-details/<int:booking_id>/",
@@ -120,11 +136,31 @@ urlpatterns = [
         get_bookings_grid,
         name="get_bookings_grid",
     ),
+    path(
+        "booking/room-occupancy/",
+        get_room_occupancy,
+        name="get_room_occupancy",
+    ),
+    path(
+        "booking/free-slots/",
+        find_free_slots_view,
+        name="find_free_slots",
+    ),
     path(
         "booking/calendar-grid/",
         get_calendar_grid,
         name="get_calendar_grid",
     ),
+    path(
+        "booking/live-events/stream/",
+        live_events_stream,
+        name="live_events_stream",
+    ),
+    path(
+        "booking/live-events/poll/",
+        live_events_poll,
+        name="live_events_poll",
+    ),
     path(
         "booking/room-bookings-for-date/",
         get_room_bookings_for_date,
@@ -150,6 +186,7 @@ urlpatterns = [
         get_available_tariffs_view,
         name="get_available_tariffs",
     ),
+    path("booking/quote/", quote_view, name="booking_quote"),
     path("booking/edit/<int:booking_id>/", edit_booking_view, name="edit_booking"),
     path(
         "booking/cancel/<int:booking_id>/", cancel_booking_view, name="cancel_booking"
@@ -208,6 +245,12 @@ urlpatterns = [
     ),
     # Управление клиентами
     path("booking/client/add/", add_client_view, name="add_client"),
+    path("booking/client/search/", search_clients_view, name="search_clients"),
+    path(
+        "booking/client-summaries/",
+        get_client_summaries,
+        name="get_client_summaries",
+    ),
     # API-аутентификация
     path("api/token/", CustomTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", CustomTokenRefreshView.as_view(), name="token_refresh"),
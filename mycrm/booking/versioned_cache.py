@@ -0,0 +1,75 @@
+"""Объект в памяти процесса, пересобираемый при смене версии набора данных.
+
+Общая часть индекса тарифов (`booking.tariff_index`) и реестра справочников
+(`booking.reference_data`). Объект собирается функцией `build` при первом
+обращении. Изменение данных в текущем процессе (`changed`, вызывается
+сигналами в транзакции изменения) сбрасывает объект и увеличивает версию
+набора в `booking.data_versions`. Другие процессы сверяют версию не чаще раза
+в `check_seconds()` секунд (настройка `setting`, по умолчанию
+DEFAULT_CHECK_SECONDS; 0 — при каждом обращении) и собирают объект заново,
+если она изменилась.
+"""
+
+import threading
+import time as monotonic_time
+
+from django.conf import settings
+from django.db import transaction
+
+from . import data_versions
+
+DEFAULT_CHECK_SECONDS = 5
+
+
+class _Entry:
+    __slots__ = ("value", "version", "checked_at")
+
+    def __init__(self, value, version: int):
+        self.value = value
+        self.version = version
+        self.checked_at = monotonic_time.monotonic()
+
+
+class VersionedCache:
+    """Объект `build()` версии набора `name` из `booking.data_versions`."""
+
+    def __init__(self, name: str, build, setting: str):
+        self.name = name
+        self.setting = setting
+        self._build = build
+        self._entry: _Entry | None = None
+        self._lock = threading.Lock()
+        # Сборок с момента запуска процесса (или сброса счётчика).
+        self.builds = 0
+
+    def check_seconds(self) -> float:
+        return getattr(settings, self.setting, DEFAULT_CHECK_SECONDS)
+
+    def get(self):
+        """Актуальный объект; собирается при первом обращении и смене версии."""
+        entry = self._entry
+        now = monotonic_time.monotonic()
+        if entry is not None and now - entry.checked_at < self.check_seconds():
+            return entry.value
+
+        version = data_versions.get_version(self.name)
+        if entry is not None and entry.version == version:
+            entry.checked_at = now
+            return entry.value
+        with self._lock:
+            current = self._entry
+            if current is None or current.version != version or current is entry:
+                current = self._entry = _Entry(self._build(), version)
+                self.builds += 1
+            return current.value
+
+    def invalidate(self) -> None:
+        """Сбрасывает объект текущего процесса."""
+        self._entry = None
+
+    def changed(self) -> None:
+        """Данные набора изменились (вызывается в транзакции изменения)."""
+        data_versions.bump_version(self.name)
+        self.invalidate()
+        # Объект, собранный до фиксации транзакции, мог увидеть не все изменения.
+        transaction.on_commit(self.invalidate)
@@ -2,4 +2,8 @@ from .create_booking import create_booking_view
 from .edit_booking import *
 from .menu2 import menu2_view
 from .user_index import user_index_view
-from .client_views import add_client_view
+from .client_views import (
+    add_client_view,
+    get_client_summaries,
+    search_clients_view,
+)
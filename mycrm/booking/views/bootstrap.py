@@ -0,0 +1,51 @@
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse
+from django.shortcuts import redirect
+from django.views.decorators.http import condition, require_GET
+
+from ..bootstrap import get_bootstrap_json, get_bootstrap_version
+
+# Документ версии неизменен: браузер может держать его сколько угодно и не
+# перепроверять. private — документ отдаётся только вошедшим сотрудникам
+# (специалисты с привязкой к клиентам, тарифы): общий кэш прокси не должен
+# отдавать его без проверки входа.
+_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+_CONTENT_TYPES = {
+    "json": "application/json; charset=utf-8",
+    "js": "text/javascript; charset=utf-8",
+}
+
+
+def _bootstrap_etag(request, version, fmt):
+    if int(version) != get_bootstrap_version():
+        return None
+    return f'"bootstrap-{version}-{fmt}"'
+
+
+@login_required(login_url="login")
+@require_GET
+@condition(etag_func=_bootstrap_etag)
+def bootstrap_view(request, version, fmt):
+    """Bootstrap-документ справочников главной страницы.
+
+    `/bootstrap/<version>.json` — сам документ. `/bootstrap/<version>.js` — он же
+    в виде скрипта `window.BOOTSTRAP = {...};`: страница подключает его обычным
+    блокирующим `<script>`, чтобы справочники были доступны до инициализации
+    модалок и календаря, как раньше при встраивании в HTML.
+
+    Устаревшая версия перенаправляется на актуальную.
+    """
+    version = int(version)
+    current_version = get_bootstrap_version()
+    if version != current_version:
+        response = redirect("bootstrap", version=current_version, fmt=fmt)
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    payload = get_bootstrap_json(version)
+    if fmt == "js":
+        payload = f"window.BOOTSTRAP = {payload};"
+    response = HttpResponse(payload, content_type=_CONTENT_TYPES[fmt])
+    response["Cache-Control"] = _CACHE_CONTROL
+    return response
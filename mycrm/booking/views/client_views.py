@@ -5,11 +5,16 @@
 import json
 import re
 
+from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_protect
 
+from .. import client_search
+from ..client_summary import client_rows
+from ..id_allocator import create_with_allocated_id
 from ..models import Client
+from ..phones import normalize_phone
 
 
 def validate_russian_name(value):
@@ -34,16 +39,6 @@ def validate_belarus_phone(value):
     return bool(re.match(pattern, digits))
 
 
-def normalize_phone(value):
-    """Нормализует телефон к формату +375XXXXXXXXX"""
-    if not value:
-        return None
-    digits = re.sub(r"\D", "", value)
-    if digits.startswith("375") and len(digits) == 12:
-        return "+" + digits
-    return None
-
-
 @csrf_protect
 @require_POST
 def add_client_view(request):
@@ -104,8 +99,9 @@ def add_client_view(request):
             status=400,
         )
 
-    # Проверка уникальности телефона
-    if Client.objects.filter(phone=normalized_phone).exists():
+    # Проверка уникальности телефона: точный поиск по индексу ключа телефона
+    # находит и номера, записанные с пробелами и дефисами
+    if Client.objects.filter(phone_normalized=normalized_phone).exists():
         return JsonResponse(
             {
                 "success": False,
@@ -124,14 +120,10 @@ def add_client_view(request):
             status=400,
         )
 
-    # Генерация ID для нового клиента
-    max_id = Client.objects.order_by("-id").values_list("id", flat=True).first()
-    new_id = (max_id or 0) + 1
-
-    # Создание клиента
+    # Создание клиента (ID выдаёт аллокатор)
     try:
-        client = Client.objects.create(
-            id=new_id,
+        client = create_with_allocated_id(
+            Client,
             name=name,
             phone=normalized_phone,
             comment=comment if comment else None,
@@ -147,3 +139,64 @@ def add_client_view(request):
             {"success": False, "error": f"Ошибка при создании клиента: {str(e)}"},
             status=500,
         )
+
+
+@login_required(login_url="login")
+@require_GET
+def get_client_summaries(request):
+    """
+    Клиенты со сводкой: средняя оценка, число оценок, балансы абонементов
+    по сценариям и ID групп
+    GET /booking/client-summaries/
+    Параметры (опционально):
+      - ids: ID клиентов через запятую
+      - group_id: только клиенты группы
+    Список любого размера читается одним запросом.
+    """
+    try:
+        ids = [int(value) for value in request.GET.get("ids", "").split(",") if value]
+        group_id = request.GET.get("group_id")
+        group_id = int(group_id) if group_id else None
+    except ValueError:
+        return JsonResponse(
+            {"success": False, "error": "Некорректные параметры запроса"}, status=400
+        )
+
+    clients = Client.objects.order_by("id")
+    if ids:
+        clients = clients.filter(id__in=ids)
+    if group_id is not None:
+        clients = clients.filter(groups=group_id)
+
+    return JsonResponse(
+        {
+            "success": True,
+            "clients": list(client_rows(clients)),
+        }
+    )
+
+
+@login_required(login_url="login")
+@require_GET
+def search_clients_view(request):
+    """
+    Поиск клиентов по имени и телефону для выпадающих списков
+    GET /booking/client/search/
+    Параметры:
+      - q: строка поиска (пустая — первые клиенты по имени)
+      - limit: размер страницы (по умолчанию 20, не больше 50)
+      - offset: сдвиг страницы
+    Ответ: { success, clients: [{id, name, phone}], has_more }
+    """
+    try:
+        limit = int(request.GET.get("limit") or client_search.DEFAULT_LIMIT)
+        offset = int(request.GET.get("offset") or 0)
+    except ValueError:
+        return JsonResponse(
+            {"success": False, "error": "Некорректные параметры запроса"}, status=400
+        )
+
+    clients, has_more = client_search.search(
+        request.GET.get("q", ""), limit=limit, offset=offset
+    )
+    return JsonResponse({"success": True, "clients": clients, "has_more": has_more})
@@ -1,35 +1,43 @@
 import json
 import re
 from datetime import datetime, timedelta
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 
 from django.core.exceptions import ValidationError
-from django.db.models import Max
 from django.db import transaction
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 
+from .. import (
+    pricing,
+    reference_data,
+    reservation_signals,
+    room_occupancy,
+    tariff_index,
+)
+from ..id_allocator import allocate_ids, create_with_allocated_id
 from ..models import (
     Reservation,
     Room,
-    Service,
     Specialist,
     SpecialistService,
-    SpecialistWeeklyInterval,
-    SpecialistScheduleOverride,
     ReservationStatusType,
     ClientGroup,
     Scenario,
     Direction,
-    Tariff,
+)
+from ..specialist_availability import (
+    SpecialistSchedules,
+    busy_index,
+    check_schedule_covers,
+    local_booking_period,
+    overlaps_busy,
+    resolve_availability,
 )
 
-
-_TARIFF_REQUIRED_SCENARIOS = {
-    "Репетиционная точка",
-    "Музыкальный класс",
-}
+# Статусы броней, которые не занимают время: 4 — отменена, 1082 — cancelled.
+_INACTIVE_STATUS_IDS = (4, 1082)
 
 
 class BulkCreateBookingError(Exception):
@@ -45,12 +53,6 @@ class BulkCreateBookingError(Exception):
         self.field = field
 
 
-def _quantize_money(value: Decimal) -> Decimal:
-    if value is None:
-        return value
-    return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
-
 def _parse_time_hm(value: str):
     if value is None:
         return None
@@ -72,6 +74,7 @@ def get_available_tariffs_for_booking(
     end_time_hm: str | None,
     people_count: int | None,
 ):
+    """Тарифы, подходящие брони; по индексу `booking.tariff_index`, без запросов."""
     if not scenario or not room:
         return []
 
@@ -86,137 +89,42 @@ def get_available_tariffs_for_booking(
     except Exception:
         return []
 
-    people_count_val = people_count if people_count is not None else 1
-    weekday = int(target_date.weekday())
-
-    qs = (
-        Tariff.objects.filter(
-            active=True,
-            scenarios=scenario,
-            rooms=room,
-            max_people__gte=people_count_val,
-        )
-        .prefetch_related("weekly_intervals")
-        .distinct()
+    return tariff_index.get_index().available(
+        scenario.id, room.id, target_date, start_time, end_time, people_count
     )
 
-    result = []
-    for tariff in qs:
-        intervals_all = list(tariff.weekly_intervals.all())
-        if not intervals_all:
-            continue
-
-        day_intervals = [i for i in intervals_all if int(i.weekday) == weekday]
-        if not day_intervals:
-            continue
-
-        fits = False
-        for interval in day_intervals:
-            if not (interval.start_time <= start_time < interval.end_time):
-                continue
-            if end_time is not None and end_time > interval.end_time:
-                continue
-            fits = True
-            break
-        if not fits:
-            continue
-
-        result.append(tariff)
-
-    return result
-
-
-def _time_to_minutes(t):
-    """Конвертирует `datetime.time` в минуты от полуночи (0..1439)."""
-    return t.hour * 60 + t.minute
-
 
 def get_specialist_work_intervals_for_date(
     specialist: Specialist, target_date, scenario_id=None
 ):
     """Возвращает рабочие интервалы специалиста на конкретную дату.
 
-    Приоритет:
-    - Если на дату есть override — используем его (или считаем день выходным).
-    - Иначе используем weekly-интервалы. Если weekly-интервалов в принципе нет —
-      расписание не ограничивает (поведение как раньше).
-    - При наличии scenario_id: сначала ищем записи для конкретного сценария,
-      если нет — fallback на глобальные (scenario=NULL).
+    Правила выбора override/weekly и fallback по сценарию — см.
+    `booking.specialist_availability`.
 
     Формат ответа:
     - restricted: расписание ограничивает/не ограничивает доступность
     - is_day_off: является ли дата выходным для специалиста
     - intervals: список пар (start_time, end_time)
     """
-    # --- Override: приоритет конкретный сценарий > fallback (NULL) ---
-    override_qs_filter = Q(specialist_id=specialist.id, date=target_date)
-    if scenario_id is not None:
-        override_qs_filter &= Q(scenario_id=scenario_id) | Q(scenario__isnull=True)
-    overrides = list(
-        SpecialistScheduleOverride.objects.filter(override_qs_filter).prefetch_related(
-            "intervals"
-        )
-    )
-    override = None
-    if overrides:
-        # Приоритет: конкретный сценарий > fallback (NULL)
-        by_scenario = {o.scenario_id: o for o in overrides}
-        if scenario_id is not None and scenario_id in by_scenario:
-            override = by_scenario[scenario_id]
-        elif None in by_scenario:
-            override = by_scenario[None]
-
-    if override is not None:
-        # Override может пометить день выходным, либо задать конкретные интервалы.
-        if override.is_day_off:
-            return {
-                "restricted": True,
-                "is_day_off": True,
-                "intervals": [],
-            }
-        intervals = [(i.start_time, i.end_time) for i in override.intervals.all()]
-        return {
-            "restricted": True,
-            "is_day_off": False,
-            "intervals": intervals,
-        }
-
-    # --- Weekly: приоритет конкретный сценарий > fallback (NULL) ---
-    weekly_qs_filter = Q(specialist_id=specialist.id)
-    if scenario_id is not None:
-        weekly_qs_filter &= Q(scenario_id=scenario_id) | Q(scenario__isnull=True)
-
-    has_any_weekly = SpecialistWeeklyInterval.objects.filter(weekly_qs_filter).exists()
-    if not has_any_weekly:
-        # Если у специалиста нет weekly-расписания — ничего не ограничиваем.
-        return {
-            "restricted": False,
-            "is_day_off": False,
-            "intervals": [],
-        }
+    return get_specialist_work_intervals_for_dates(
+        specialist, [target_date], scenario_id=scenario_id
+    )[target_date]
 
-    weekday = int(target_date.weekday())
-    weekly_day_qs = SpecialistWeeklyInterval.objects.filter(
-        weekly_qs_filter,
-        weekday=weekday,
-    ).values_list("start_time", "end_time", "scenario_id")
 
-    # Группируем по scenario_id для выбора приоритетных интервалов
-    by_sc = {}
-    for start_t, end_t, sc_id in weekly_day_qs:
-        by_sc.setdefault(sc_id, []).append((start_t, end_t))
-
-    if scenario_id is not None and scenario_id in by_sc:
-        intervals = by_sc[scenario_id]
-    elif None in by_sc:
-        intervals = by_sc[None]
-    else:
-        intervals = []
+def get_specialist_work_intervals_for_dates(
+    specialist: Specialist, dates, scenario_id=None
+):
+    """Рабочие интервалы специалиста сразу на несколько дат.
 
+    Override-ы и weekly-интервалы загружаются одним набором запросов на все даты.
+    Возвращает словарь {дата: ответ в формате get_specialist_work_intervals_for_date}.
+    """
+    dates = set(dates)
+    schedules = SpecialistSchedules([specialist.id], dates, [scenario_id])
     return {
-        "restricted": True,
-        "is_day_off": len(intervals) == 0,
-        "intervals": intervals,
+        target_date: schedules.schedule(specialist.id, target_date, scenario_id)
+        for target_date in dates
     }
 
 
@@ -233,57 +141,11 @@ def check_specialist_schedule(
       при этом рабочие интервалы предварительно объединяются (merge), чтобы
       корректно учитывать прилегающие/пересекающиеся интервалы.
     """
-    # Приводим naive datetime к aware, чтобы сравнения были корректными.
-    if timezone.is_naive(start_datetime):
-        start_datetime = timezone.make_aware(
-            start_datetime, timezone.get_current_timezone()
-        )
-    if timezone.is_naive(end_datetime):
-        end_datetime = timezone.make_aware(
-            end_datetime, timezone.get_current_timezone()
-        )
-
-    # Дальше считаем всё в локальном времени.
-    local_start = timezone.localtime(start_datetime)
-    local_end = timezone.localtime(end_datetime)
-    if local_start.date() != local_end.date():
-        raise ValidationError("Бронь не может пересекать сутки")
-
+    local_start, local_end = local_booking_period(start_datetime, end_datetime)
     schedule = get_specialist_work_intervals_for_date(
         specialist, local_start.date(), scenario_id=scenario_id
     )
-    if not schedule.get("restricted"):
-        return True
-    if schedule.get("is_day_off"):
-        raise ValidationError("У специалиста выходной в выбранную дату")
-
-    intervals = schedule.get("intervals") or []
-    if not intervals:
-        raise ValidationError("У специалиста выходной в выбранную дату")
-
-    start_minutes = _time_to_minutes(local_start.time())
-    end_minutes = _time_to_minutes(local_end.time())
-
-    work_intervals = []
-    for start_t, end_t in intervals:
-        if start_t is None or end_t is None:
-            continue
-        work_intervals.append((_time_to_minutes(start_t), _time_to_minutes(end_t)))
-
-    # Объединяем интервалы, чтобы проверять попадание в “union” рабочего времени.
-    work_intervals.sort(key=lambda x: x[0])
-    merged = []
-    for s, e in work_intervals:
-        if not merged or s > merged[-1][1]:
-            merged.append([s, e])
-        else:
-            merged[-1][1] = max(merged[-1][1], e)
-
-    for s, e in merged:
-        if start_minutes >= s and end_minutes <= e:
-            return True
-
-    raise ValidationError("Специалист не работает в это время")
+    return check_schedule_covers(schedule, local_start, local_end)
 
 
 def check_room_availability(
@@ -302,6 +164,38 @@ def check_room_availability(
             end_datetime, timezone.get_current_timezone()
         )
 
+    _check_room_hours(room, start_datetime, end_datetime)
+
+    # Битовая карта занятости (booking.room_occupancy) только быстро отклоняет
+    # явный конфликт. «Свободно» по карте не доказательство: запись в обход
+    # сигналов (QuerySet.update, loaddata, SQL) оставляет карту устаревшей, а
+    # пропущенный конфликт — это двойная бронь. Решает запрос по броням ниже.
+    busy = room_occupancy.room_conflict(room.id, start_datetime, end_datetime)
+    if busy and exclude_reservation_id is None:
+        raise ValidationError("На это время уже есть бронирование")
+
+    # Точная проверка на стороне БД: интервалы [start, end) пересекаются, если
+    # datetimestart < end и datetimeend > start. Брони, заканчивающиеся ровно в
+    # момент начала новой, пересечением не считаются. Запрос ограничен диапазоном
+    # и опирается на индекс (room, datetimeend, datetimestart): история, закончившаяся
+    # до начала новой брони, отсекается индексом, поэтому время проверки не зависит
+    # от объёма истории броней комнаты.
+    overlapping_bookings = Reservation.objects.filter(
+        room=room,
+        datetimestart__lt=end_datetime,
+        datetimeend__gt=start_datetime,
+    ).exclude(status_id__in=_INACTIVE_STATUS_IDS)
+    if exclude_reservation_id is not None:
+        overlapping_bookings = overlapping_bookings.exclude(id=exclude_reservation_id)
+
+    if overlapping_bookings.exists():
+        raise ValidationError("На это время уже есть бронирование")
+
+    return True
+
+
+def _check_room_hours(room: Room, start_datetime: datetime, end_datetime: datetime):
+    """Проверяет, что бронь укладывается в рабочее время помещения."""
     start_time = start_datetime.time()
     end_time = end_datetime.time()
 
@@ -315,33 +209,6 @@ def check_room_availability(
             f"Запрошено: {start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}"
         )
 
-    existing_bookings = Reservation.objects.filter(room=room).exclude(
-        status_id__in=[4, 1082]
-    )
-    if exclude_reservation_id is not None:
-        existing_bookings = existing_bookings.exclude(id=exclude_reservation_id)
-
-    for booking in existing_bookings:
-        booking_start = booking.datetimestart
-        booking_end = booking.datetimeend
-
-        if timezone.is_naive(booking_start):
-            booking_start = timezone.make_aware(
-                booking_start, timezone.get_current_timezone()
-            )
-        if timezone.is_naive(booking_end):
-            booking_end = timezone.make_aware(
-                booking_end, timezone.get_current_timezone()
-            )
-
-        if booking_end == start_datetime:
-            continue
-
-        if booking_start < end_datetime and booking_end > start_datetime:
-            raise ValidationError("На это время уже есть бронирование")
-
-    return True
-
 
 def check_specialist_availability(
     specialist: Specialist,
@@ -351,39 +218,309 @@ def check_specialist_availability(
     scenario_id=None,
 ) -> bool:
     """Проверка доступности специалиста"""
-    # Сначала проверяем фиксированное расписание (weekly/override), и только потом —
-    # пересечения с существующими бронями.
-    check_specialist_schedule(
-        specialist, start_datetime, end_datetime, scenario_id=scenario_id
+    # Сначала проверяется фиксированное расписание (weekly/override), и только
+    # потом — пересечения с существующими бронями.
+    error = resolve_availability(
+        [specialist],
+        [(start_datetime, end_datetime, scenario_id)],
+        exclude_reservation_id=exclude_reservation_id,
+    )[(specialist.id, 0)]
+    if error:
+        raise ValidationError(error)
+    return True
+
+
+def _first_intra_batch_overlaps(parsed: dict) -> dict:
+    """Пересечения между блоками одной заявки (sort-and-sweep).
+
+    Возвращает {номер блока: номер первого более раннего блока, с которым он
+    пересекается} — как при попарной проверке блоков по порядку.
+    """
+    first_overlap = {}
+    active = []
+    for index, block in sorted(
+        parsed.items(), key=lambda item: (item[1]["start"], item[0])
+    ):
+        # Блоки, закончившиеся к началу текущего, дальше ни с чем не пересекутся.
+        active = [a for a in active if parsed[a]["end"] > block["start"]]
+        for other in active:
+            if parsed[other]["start"] >= block["end"]:
+                continue
+            later, earlier = max(index, other), min(index, other)
+            if earlier < first_overlap.get(later, later):
+                first_overlap[later] = earlier
+        active.append(index)
+    return first_overlap
+
+
+def _parse_bulk_block(block) -> dict:
+    """Разбирает элемент blocks_json. Ошибки — ValidationError с полем в `code`."""
+    if not isinstance(block, dict):
+        raise ValidationError(
+            "Элемент blocks_json должен быть объектом", code="blocks_json"
+        )
+
+    tariff_id_raw = block.get("tariff_id")
+    try:
+        tariff_id = int(tariff_id_raw) if tariff_id_raw else None
+    except (TypeError, ValueError):
+        raise ValidationError("Выбранный тариф недоступен", code="tariff_id")
+
+    total_cost_raw = block.get("total_cost")
+    total_cost = None
+    if total_cost_raw is not None and str(total_cost_raw).strip() != "":
+        try:
+            total_cost = Decimal(str(total_cost_raw).replace(",", "."))
+        except Exception:
+            raise ValidationError("Некорректный формат стоимости", code="total_cost")
+
+    full_datetime = block.get("full_datetime")
+    booking_duration = block.get("duration")
+    if not full_datetime:
+        raise ValidationError("Не указано время начала брони", code="full_datetime")
+    if not booking_duration:
+        raise ValidationError("Не указана длительность", code="duration")
+
+    datetime_match = re.match(
+        r"(\d{4}-\d{2}-\d{2})\s+(\d{2}:\d{2}:\d{2})",
+        str(full_datetime).strip(),
+    )
+    if not datetime_match:
+        raise ValidationError(
+            f"Неверный формат даты/времени: {full_datetime}", code="full_datetime"
+        )
+    full_datetime_clean = f"{datetime_match.group(1)} {datetime_match.group(2)}"
+    start_datetime = timezone.make_aware(
+        datetime.strptime(full_datetime_clean, "%Y-%m-%d %H:%M:%S"),
+        timezone.get_current_timezone(),
     )
+    try:
+        duration_hours, duration_minutes = map(int, str(booking_duration).split(":"))
+    except ValueError:
+        raise ValidationError("Не указана длительность", code="duration")
 
-    # Специалист может быть занят не только как преподаватель, но и как клиент
-    # (например, если сам берёт урок у другого специалиста).
-    if specialist.client_id:
-        client_bookings = Reservation.objects.filter(
-            client_id=specialist.client_id,
-        ).exclude(status_id__in=[4, 1082])
-        if exclude_reservation_id is not None:
-            client_bookings = client_bookings.exclude(id=exclude_reservation_id)
-        if client_bookings.filter(
-            datetimestart__lt=end_datetime, datetimeend__gt=start_datetime
-        ).exists():
-            raise ValidationError(
-                "Специалист занят в это время (он записан как клиент)"
+    service_ids = block.get("services") or []
+    service_ids_list = []
+    if isinstance(service_ids, (list, tuple)):
+        for v in service_ids:
+            try:
+                service_ids_list.append(int(v))
+            except (TypeError, ValueError):
+                continue
+
+    return {
+        "start": start_datetime,
+        "end": start_datetime
+        + timedelta(hours=duration_hours, minutes=duration_minutes),
+        "tariff_id": tariff_id,
+        "total_cost": total_cost,
+        "comment": block.get("comment", ""),
+        # Порядок не важен, дубли услуг раньше тоже схлопывались фильтром id__in.
+        "service_ids": set(service_ids_list),
+    }
+
+
+def create_bulk_reservations(
+    blocks: list,
+    reservation_ids: list[int],
+    *,
+    room: Room,
+    scenario: Scenario,
+    specialist: Specialist | None,
+    specialist_service: SpecialistService | None,
+    direction: Direction | None,
+    client_id: int | None,
+    client_group: ClientGroup | None,
+    people_count: int | None,
+) -> list[int]:
+    """Создаёт серию броней из blocks_json фиксированным числом запросов.
+
+    Все блоки проверяются пакетно: явные конфликты комнаты отклоняются по
+    битовым картам дат серии (booking.room_occupancy), остальные блоки комнаты
+    и специалист проверяются диапазонными запросами на всю серию, пересечения блоков между собой — sort-and-sweep,
+    тарифы, расписание специалиста и стоимость услуг загружаются один раз.
+    Вставка — `bulk_create` броней и одна пакетная вставка связей с услугами.
+
+    Проверки блока идут в прежнем порядке; если ошибок несколько, сообщается
+    ошибка блока с наименьшим номером (BulkCreateBookingError), как при
+    последовательной обработке. Вызывается внутри transaction.atomic().
+    """
+    is_tariff_required = scenario.name in pricing.TARIFF_REQUIRED_SCENARIOS
+    block_errors = {}
+
+    def fail(index, message, field):
+        block_errors.setdefault(
+            index, BulkCreateBookingError(message, block_index=index, field=field)
+        )
+
+    # 1. Разбор блоков (номера блоков в ошибках — с единицы).
+    parsed = {}
+    for index, block in enumerate(blocks, start=1):
+        try:
+            parsed[index] = _parse_bulk_block(block)
+        except ValidationError as e:
+            fail(index, e.messages[0], e.code)
+
+    # 2. Пересечения между блоками одной заявки.
+    for index, earlier in _first_intra_batch_overlaps(parsed).items():
+        fail(index, f"Пересечение с блоком №{earlier}", "full_datetime")
+
+    def pending():
+        return [(i, b) for i, b in sorted(parsed.items()) if i not in block_errors]
+
+    # 3. Обязательность тарифа для сценария.
+    for index, block in pending():
+        if is_tariff_required:
+            if people_count is None:
+                fail(index, "Укажите количество людей", "people_count")
+            elif not block["tariff_id"]:
+                fail(index, "Выберите тариф", "tariff_id")
+        elif block["tariff_id"]:
+            fail(index, "Тариф нельзя указывать для выбранного сценария", "tariff_id")
+
+    # 4. Доступность комнаты и специалиста: один диапазонный запрос на серию.
+    checked = pending()
+    if checked:
+        range_start = min(b["start"] for _, b in checked)
+        range_end = max(b["end"] for _, b in checked)
+
+        def busy(**filters):
+            return busy_index(
+                Reservation.objects.filter(
+                    datetimestart__lt=range_end,
+                    datetimeend__gt=range_start,
+                    **filters,
+                )
+                .exclude(status_id__in=_INACTIVE_STATUS_IDS)
+                .values_list("datetimestart", "datetimeend")
             )
 
-    existing_bookings = Reservation.objects.filter(
-        specialist=specialist,
-    ).exclude(status_id__in=[4, 1082])
-    if exclude_reservation_id is not None:
-        existing_bookings = existing_bookings.exclude(id=exclude_reservation_id)
-    overlapping_bookings = existing_bookings.filter(
-        datetimestart__lt=end_datetime, datetimeend__gt=start_datetime
+        # Комната: маски занятости дат серии только отклоняют явные конфликты;
+        # остальные блоки проверяет диапазонный запрос по броням (карта может
+        # устареть после записи в обход сигналов).
+        occupancy = room_occupancy.load(
+            [room.id],
+            {
+                day
+                for _, b in checked
+                for day in room_occupancy.day_masks(b["start"], b["end"])
+            },
+        )
+        room_conflicts = {
+            index: room_occupancy.conflict(occupancy, room.id, b["start"], b["end"])
+            for index, b in checked
+        }
+        room_busy = None
+        if not all(room_conflicts.values()):
+            room_busy = busy(room=room)
+        specialist_busy = client_busy = schedules = None
+        if specialist:
+            specialist_busy = busy(specialist=specialist)
+            if specialist.client_id:
+                client_busy = busy(client_id=specialist.client_id)
+            schedules = get_specialist_work_intervals_for_dates(
+                specialist,
+                {timezone.localtime(b["start"]).date() for _, b in checked},
+                scenario_id=scenario.id,
+            )
+
+        for index, block in checked:
+            start, end = block["start"], block["end"]
+            try:
+                _check_room_hours(room, start, end)
+                if room_conflicts[index] or overlaps_busy(room_busy, start, end):
+                    raise ValidationError("На это время уже есть бронирование")
+                if specialist:
+                    local_start, local_end = local_booking_period(start, end)
+                    check_schedule_covers(
+                        schedules[local_start.date()], local_start, local_end
+                    )
+                    if client_busy and overlaps_busy(client_busy, start, end):
+                        raise ValidationError(
+                            "Специалист занят в это время (он записан как клиент)"
+                        )
+                    if overlaps_busy(specialist_busy, start, end):
+                        raise ValidationError("Специалист уже занят в это время")
+            except ValidationError as e:
+                fail(
+                    index,
+                    e.messages[0] if getattr(e, "messages", None) else str(e),
+                    "full_datetime",
+                )
+
+    # 5. Цены и тарифы: справочники загружаются один раз на серию
+    # (booking.pricing).
+    checked = pending()
+    quotes = dict(
+        zip(
+            [index for index, _ in checked],
+            pricing.quote_batch(
+                pricing.QuoteRequest(
+                    scenario_id=scenario.id,
+                    room_id=room.id,
+                    start=b["start"],
+                    end=b["end"],
+                    service_ids=b["service_ids"],
+                    tariff_id=b["tariff_id"],
+                    people_count=people_count,
+                )
+                for _, b in checked
+            ),
+        )
     )
-    if overlapping_bookings.exists():
-        raise ValidationError("Специалист уже занят в это время")
+    if is_tariff_required:
+        for index, quote in quotes.items():
+            if quote.tariff is None:
+                fail(index, "Выбранный тариф недоступен", "tariff_id")
+
+    if block_errors:
+        raise block_errors[min(block_errors)]
+
+    # 6. Вставка.
+    approved_status = reference_data.get(ReservationStatusType, id=1080)
+
+    reservations = []
+    service_links = []
+    through = Reservation.services.through
+    for (index, block), reservation_id in zip(sorted(parsed.items()), reservation_ids):
+        quote = quotes[index]
+        total_cost = block["total_cost"]
+        tariff_id = None
+        if is_tariff_required:
+            tariff_id = quote.tariff.id
+            total_cost = quote.total_cost
+
+        reservations.append(
+            Reservation(
+                id=reservation_id,
+                datetimestart=block["start"],
+                datetimeend=block["end"],
+                specialist=specialist,
+                specialist_service=specialist_service,
+                direction=direction,
+                client_id=client_id,
+                client_group=client_group,
+                people_count=people_count,
+                room=room,
+                scenario=scenario,
+                tariff_id=tariff_id,
+                status=approved_status,
+                comment=block["comment"],
+                total_cost=total_cost,
+            )
+        )
+        service_links.extend(
+            through(reservation_id=reservation_id, service_id=service.id)
+            for service in quote.services
+        )
 
-    return True
+    Reservation.objects.bulk_create(reservations)
+    if service_links:
+        through.objects.bulk_create(service_links)
+    # bulk_create не отправляет post_save — обработчики новых броней (карты
+    # занятости, события календаря) получают их через общий сигнал.
+    reservation_signals.created(reservations)
+    return [r.id for r in reservations]
 
 
 @csrf_exempt
@@ -513,8 +650,8 @@ def create_booking_view(request):
                 )
 
             try:
-                room = Room.objects.get(id=room_id)
-                scenario = Scenario.objects.get(id=scenario_id)
+                room = reference_data.get(Room, id=room_id)
+                scenario = reference_data.get(Scenario, id=scenario_id)
                 specialist = (
                     Specialist.objects.get(id=specialist_id) if specialist_id else None
                 )
@@ -691,227 +828,21 @@ def create_booking_view(request):
                         }
                     )
 
-            scenario_name = scenario.name if scenario else ""
-            is_tariff_required = scenario_name in _TARIFF_REQUIRED_SCENARIOS
-
-            created_ids = []
+            # Идентификаторы резервируем до начала транзакции одним блоком.
+            reservation_ids = allocate_ids(Reservation, len(blocks))
             with transaction.atomic():
-                max_id = Reservation.objects.aggregate(max_id=Max("id"))["max_id"] or 0
-                next_id = int(max_id) + 1
-
-                approved_status = ReservationStatusType.objects.get(id=1080)
-
-                # Для bulk-create дополнительно валидируем пересечения *между блоками одной заявки*.
-                # Это отдельная проверка от `check_room_availability` / `check_specialist_availability`,
-                # которые сравнивают с уже существующими бронями в базе.
-                bulk_intervals = []
-
-                for i, block in enumerate(blocks):
-                    if not isinstance(block, dict):
-                        raise BulkCreateBookingError(
-                            "Элемент blocks_json должен быть объектом",
-                            block_index=i + 1,
-                            field="blocks_json",
-                        )
-
-                    service_ids = block.get("services")
-                    if service_ids is None:
-                        service_ids = []
-
-                    full_datetime = block.get("full_datetime")
-                    booking_duration = block.get("duration")
-                    comment = block.get("comment", "")
-
-                    tariff_id_raw = block.get("tariff_id")
-                    tariff_id = int(tariff_id_raw) if tariff_id_raw else None
-
-                    total_cost_raw = block.get("total_cost")
-                    total_cost = None
-                    if total_cost_raw is not None and str(total_cost_raw).strip() != "":
-                        try:
-                            total_cost = Decimal(str(total_cost_raw).replace(",", "."))
-                        except Exception:
-                            raise BulkCreateBookingError(
-                                "Некорректный формат стоимости",
-                                block_index=i + 1,
-                                field="total_cost",
-                            )
-
-                    if not full_datetime:
-                        raise BulkCreateBookingError(
-                            "Не указано время начала брони",
-                            block_index=i + 1,
-                            field="full_datetime",
-                        )
-
-                    if not booking_duration:
-                        raise BulkCreateBookingError(
-                            "Не указана длительность",
-                            block_index=i + 1,
-                            field="duration",
-                        )
-
-                    datetime_match = re.match(
-                        r"(\d{4}-\d{2}-\d{2})\s+(\d{2}:\d{2}:\d{2})",
-                        str(full_datetime).strip(),
-                    )
-                    if not datetime_match:
-                        raise BulkCreateBookingError(
-                            f"Неверный формат даты/времени: {full_datetime}",
-                            block_index=i + 1,
-                            field="full_datetime",
-                        )
-                    full_datetime_clean = (
-                        f"{datetime_match.group(1)} {datetime_match.group(2)}"
-                    )
-                    start_datetime_naive = datetime.strptime(
-                        full_datetime_clean, "%Y-%m-%d %H:%M:%S"
-                    )
-                    start_datetime = timezone.make_aware(
-                        start_datetime_naive, timezone.get_current_timezone()
-                    )
-                    duration_hours, duration_minutes = map(
-                        int, str(booking_duration).split(":")
-                    )
-                    end_datetime = start_datetime + timedelta(
-                        hours=duration_hours, minutes=duration_minutes
-                    )
-
-                    # Пересечение в пределах одной bulk-операции: если блоки выбрали одну дату
-                    # и пересекающиеся интервалы, возвращаем ошибку с привязкой к конкретному блоку.
-                    for prev in bulk_intervals:
-                        if (
-                            prev["start"] < end_datetime
-                            and prev["end"] > start_datetime
-                        ):
-                            raise BulkCreateBookingError(
-                                f"Пересечение с блоком №{prev['index']}",
-                                block_index=i + 1,
-                                field="full_datetime",
-                            )
-                    # Сохраняем интервалы как aware datetime (в той же TZ), чтобы сравнения
-                    # для следующих блоков были корректными и сообщение могло ссылаться на № блока.
-                    bulk_intervals.append(
-                        {"index": i + 1, "start": start_datetime, "end": end_datetime}
-                    )
-
-                    if is_tariff_required:
-                        if people_count is None:
-                            raise BulkCreateBookingError(
-                                "Укажите количество людей",
-                                block_index=i + 1,
-                                field="people_count",
-                            )
-                        if not tariff_id:
-                            raise BulkCreateBookingError(
-                                "Выберите тариф",
-                                block_index=i + 1,
-                                field="tariff_id",
-                            )
-                    else:
-                        if tariff_id:
-                            raise BulkCreateBookingError(
-                                "Тариф нельзя указывать для выбранного сценария",
-                                block_index=i + 1,
-                                field="tariff_id",
-                            )
-
-                    try:
-                        check_room_availability(room, start_datetime, end_datetime)
-                        if specialist:
-                            check_specialist_availability(
-                                specialist,
-                                start_datetime,
-                                end_datetime,
-                                scenario_id=scenario_id,
-                            )
-                    except ValidationError as e:
-                        raise BulkCreateBookingError(
-                            e.messages[0] if getattr(e, "messages", None) else str(e),
-                            block_index=i + 1,
-                            field="full_datetime",
-                        )
-
-                    tariff = None
-                    if is_tariff_required:
-                        tariff = Tariff.objects.filter(
-                            id=tariff_id, active=True
-                        ).first()
-                        if not tariff:
-                            raise BulkCreateBookingError(
-                                "Выбранный тариф недоступен",
-                                block_index=i + 1,
-                                field="tariff_id",
-                            )
-
-                        available_tariffs = get_available_tariffs_for_booking(
-                            scenario=scenario,
-                            room=room,
-                            date_iso=start_datetime.date().isoformat(),
-                            start_time_hm=start_datetime.strftime("%H:%M"),
-                            end_time_hm=end_datetime.strftime("%H:%M"),
-                            people_count=people_count,
-                        )
-                        if str(tariff.id) not in {str(t.id) for t in available_tariffs}:
-                            raise BulkCreateBookingError(
-                                "Выбранный тариф недоступен",
-                                block_index=i + 1,
-                                field="tariff_id",
-                            )
-
-                    service_ids_list = []
-                    if isinstance(service_ids, (list, tuple)):
-                        for v in service_ids:
-                            try:
-                                service_ids_list.append(int(v))
-                            except (TypeError, ValueError):
-                                continue
-
-                    services_qs_for_cost = Service.objects.filter(
-                        id__in=service_ids_list
-                    )
-                    services_cost = Decimal("0")
-                    for s in services_qs_for_cost:
-                        if s.cost:
-                            services_cost += s.cost
-
-                    if is_tariff_required:
-                        duration_total_minutes = int(
-                            (end_datetime - start_datetime).total_seconds() // 60
-                        )
-                        rental_cost = (tariff.base_cost or Decimal("0")) * (
-                            Decimal(duration_total_minutes)
-                            / Decimal(max(1, int(tariff.base_duration_minutes)))
-                        )
-                        rental_cost = _quantize_money(rental_cost)
-                        total_cost = _quantize_money(
-                            (rental_cost or Decimal("0")) + services_cost
-                        )
-
-                    reservation = Reservation.objects.create(
-                        id=next_id,
-                        datetimestart=start_datetime,
-                        datetimeend=end_datetime,
-                        specialist=specialist,
-                        specialist_service=specialist_service,
-                        direction=direction,
-                        client_id=client_id,
-                        client_group=client_group,
-                        people_count=people_count,
-                        room=room,
-                        scenario=scenario,
-                        tariff=tariff,
-                        status=approved_status,
-                        comment=comment,
-                        total_cost=total_cost,
-                    )
-
-                    if service_ids_list:
-                        services = Service.objects.filter(id__in=service_ids_list)
-                        reservation.services.add(*services)
-
-                    created_ids.append(reservation.id)
-                    next_id += 1
+                created_ids = create_bulk_reservations(
+                    blocks,
+                    reservation_ids,
+                    room=room,
+                    scenario=scenario,
+                    specialist=specialist,
+                    specialist_service=specialist_service,
+                    direction=direction,
+                    client_id=client_id,
+                    client_group=client_group,
+                    people_count=people_count,
+                )
 
             return JsonResponse({"success": True, "reservation_ids": created_ids})
 
@@ -978,20 +909,9 @@ def create_booking_view(request):
                 {"success": False, "error": "Не все обязательные поля заполнены"}
             )
 
-        # --- Заглушка для интеграции с внешним API ---
-        # В будущем здесь будет запрос к внешнему API, который вернёт id для бронирования.
-        # Сейчас просто генерируем id для новой брони (максимальный + 1 или случайный).
-        def get_external_booking_id():
-            max_id = Reservation.objects.aggregate(max_id=Max("id"))["max_id"]
-            return (max_id or 0) + 1
-            # Альтернатива: return random.randint(100000, 999999)
-
-        external_booking_id = get_external_booking_id()
-        # --- Конец заглушки ---
-
         try:
-            room = Room.objects.get(id=room_id)
-            scenario = Scenario.objects.get(id=scenario_id)
+            room = reference_data.get(Room, id=room_id)
+            scenario = reference_data.get(Scenario, id=scenario_id)
             specialist = (
                 Specialist.objects.get(id=specialist_id) if specialist_id else None
             )
@@ -1074,7 +994,7 @@ def create_booking_view(request):
         )
 
         scenario_name = scenario.name if scenario else ""
-        is_tariff_required = scenario_name in _TARIFF_REQUIRED_SCENARIOS
+        is_tariff_required = scenario_name in pricing.TARIFF_REQUIRED_SCENARIOS
 
         if is_tariff_required:
             if people_count is None:
@@ -1110,27 +1030,6 @@ def create_booking_view(request):
                 }
             )
 
-        tariff = None
-        if is_tariff_required:
-            tariff = Tariff.objects.filter(id=tariff_id, active=True).first()
-            if not tariff:
-                return JsonResponse(
-                    {"success": False, "error": "Выбранный тариф недоступен"}
-                )
-
-            available_tariffs = get_available_tariffs_for_booking(
-                scenario=scenario,
-                room=room,
-                date_iso=start_datetime.date().isoformat(),
-                start_time_hm=start_datetime.strftime("%H:%M"),
-                end_time_hm=end_datetime.strftime("%H:%M"),
-                people_count=people_count,
-            )
-            if str(tariff.id) not in {str(t.id) for t in available_tariffs}:
-                return JsonResponse(
-                    {"success": False, "error": "Выбранный тариф недоступен"}
-                )
-
         service_ids_list = []
         for v in service_ids:
             try:
@@ -1138,28 +1037,35 @@ def create_booking_view(request):
             except (TypeError, ValueError):
                 continue
 
-        services_qs_for_cost = Service.objects.filter(id__in=service_ids_list)
-        services_cost = Decimal("0")
-        for s in services_qs_for_cost:
-            if s.cost:
-                services_cost += s.cost
-
+        quote = pricing.quote_batch(
+            [
+                pricing.QuoteRequest(
+                    scenario_id=scenario.id,
+                    room_id=room.id,
+                    start=start_datetime,
+                    end=end_datetime,
+                    service_ids=service_ids_list,
+                    tariff_id=tariff_id,
+                    people_count=people_count,
+                )
+            ]
+        )[0]
+        tariff_id = None
         if is_tariff_required:
-            duration_total_minutes = int(
-                (end_datetime - start_datetime).total_seconds() // 60
-            )
-            rental_cost = (tariff.base_cost or Decimal("0")) * (
-                Decimal(duration_total_minutes)
-                / Decimal(max(1, int(tariff.base_duration_minutes)))
-            )
-            rental_cost = _quantize_money(rental_cost)
-            total_cost = _quantize_money((rental_cost or Decimal("0")) + services_cost)
+            if quote.tariff is None:
+                return JsonResponse(
+                    {"success": False, "error": "Выбранный тариф недоступен"}
+                )
+            tariff_id = quote.tariff.id
+            total_cost = quote.total_cost
 
         with transaction.atomic():
-            approved_status = ReservationStatusType.objects.get(id=1080)
+            approved_status = reference_data.get(ReservationStatusType, id=1080)
 
-            reservation = Reservation.objects.create(
-                id=external_booking_id,  # id, полученный от "внешнего API"
+            # ID выдаёт аллокатор (booking.id_allocator). Когда появится интеграция
+            # с внешним API, идентификатор брони будет приходить оттуда.
+            reservation = create_with_allocated_id(
+                Reservation,
                 datetimestart=start_datetime,
                 datetimeend=end_datetime,
                 specialist=specialist,
@@ -1170,15 +1076,14 @@ def create_booking_view(request):
                 people_count=people_count,
                 room=room,
                 scenario=scenario,
-                tariff=tariff,
+                tariff_id=tariff_id,
                 status=approved_status,
                 comment=comment,
                 total_cost=total_cost,
             )
 
-            if service_ids_list:
-                services = Service.objects.filter(id__in=service_ids_list)
-                reservation.services.add(*services)
+            if quote.services:
+                reservation.services.add(*quote.services)
 
         return JsonResponse({"success": True, "reservation_id": reservation.id})
 
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import Prefetch
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
@@ -12,11 +12,10 @@ from django.utils import timezone
 from .create_booking import (
     check_room_availability,
     check_specialist_availability,
-    check_specialist_schedule,
-    get_available_tariffs_for_booking,
-    _TARIFF_REQUIRED_SCENARIOS,
-    _quantize_money,
 )
+from .. import pricing, reference_data, tariff_unit_ledger
+from ..conditional import conditional_view
+from ..id_allocator import create_with_allocated_id
 from ..models import (
     Reservation,
     Room,
@@ -29,18 +28,42 @@ from ..models import (
     CancellationReason,
     Subscription,
     TariffUnit,
-    Tariff,
     Client,
     Direction,
+    ServiceGroup,
 )
+from ..specialist_availability import resolve_availability
 
 
 def get_booking_details(request, booking_id):
     """Получение детальной информации о брони"""
     try:
-        booking = get_object_or_404(Reservation, id=booking_id)
+        # Все связанные объекты, которые читаются ниже, загружаются здесь:
+        # количество запросов не зависит от числа услуг и платежей брони.
+        booking = get_object_or_404(
+            Reservation.objects.select_related(
+                "room__area",
+                "tariff",
+                "client",
+                "specialist",
+                "direction",
+                "specialist_service",
+                "status",
+                "scenario",
+                "client_group",
+            ).prefetch_related(
+                Prefetch("services", queryset=Service.objects.select_related("group")),
+                "tariff__weekly_intervals",
+            ),
+            id=booking_id,
+        )
+        services = list(booking.services.all())
 
-        payment_types = PaymentType.objects.exclude(name="Тарифные единицы")
+        payment_types = [
+            payment_type
+            for payment_type in reference_data.filter(PaymentType)
+            if payment_type.name != "Тарифные единицы"
+        ]
 
         start_datetime = timezone.localtime(booking.datetimestart)
         end_datetime = timezone.localtime(booking.datetimeend)
@@ -95,23 +118,17 @@ def get_booking_details(request, booking_id):
 
         # Вычисляем стоимость аренды и услуг
         total_cost = booking.total_cost or Decimal("0")
-        service_cost = sum(
-            (service.cost or Decimal("0")) for service in booking.services.all()
-        )
+        service_cost = pricing.services_cost(services)
         total_rental_cost = total_cost - service_cost
 
-        # Получаем сумму платежей тарифными единицами
-        rental_payments = Payment.objects.filter(
-            reservation=booking, payment_type__name="Тарифные единицы"
-        ).aggregate(total=Sum("amount"))["total"] or Decimal("0")
+        # Суммы платежей денормализованы в брони (booking.payment_totals)
+        rental_payments = booking.paid_tariff_units_amount
 
         # Вычисляем оставшуюся стоимость аренды
         remaining_rental_cost = (total_rental_cost or Decimal("0")) - rental_payments
 
-        # Получаем сумму всех платежей для данной брони
-        total_payments = Payment.objects.filter(
-            reservation=booking, canceled=False
-        ).aggregate(total=Sum("amount"))["total"] or Decimal("0")
+        # Сумма всех неотменённых платежей для данной брони
+        total_payments = booking.paid_amount
 
         # Вычисляем оставшуюся сумму
         remaining_amount = (total_cost or Decimal("0")) - total_payments
@@ -134,18 +151,14 @@ def get_booking_details(request, booking_id):
                 client_balance = subscription.balance
 
                 # Получаем тарифную единицу для типа брони
-                tariff_unit = TariffUnit.objects.filter(
-                    scenario=booking.scenario
-                ).first()
+                tariff_units = reference_data.filter(
+                    TariffUnit, scenario_id=booking.scenario_id
+                )
+                tariff_unit = tariff_units[0] if tariff_units else None
 
                 if tariff_unit:
-                    # Вычисляем продолжительность брони в минутах
-                    duration_minutes = (
-                        booking.datetimeend - booking.datetimestart
-                    ).seconds // 60
-                    required_units = duration_minutes // (
-                        tariff_unit.min_reservation_time.hour * 60
-                        + tariff_unit.min_reservation_time.minute
+                    required_units = pricing.required_units(
+                        tariff_unit, duration_total_minutes
                     )
                     can_use_units = available_units >= required_units
 
@@ -160,7 +173,7 @@ def get_booking_details(request, booking_id):
         services_by_group = {}
         total_services_cost = Decimal("0")
 
-        for service in booking.services.select_related("group").all():
+        for service in services:
             group_name = service.group.name if service.group else "Другое"
             if group_name not in services_by_group:
                 services_by_group[group_name] = []
@@ -174,7 +187,6 @@ def get_booking_details(request, booking_id):
             if service.cost:
                 total_services_cost += service.cost
 
-        # Получаем все платежи для данной брони
         payments = (
             Payment.objects.filter(reservation=booking)
             .select_related("payment_type")
@@ -265,7 +277,7 @@ def get_booking_details(request, booking_id):
                 if getattr(booking, "specialist_service", None)
                 else None
             ),
-            "service_ids": list(booking.services.values_list("id", flat=True)),
+            "service_ids": [service.id for service in services],
             "scenario_id": booking.scenario_id,
             "services_by_group": services_by_group,
             "total_services_cost": str(total_services_cost),
@@ -319,12 +331,12 @@ def delete_booking_view(request, booking_id):
                 cancellation_reason_id = None
 
         if cancellation_reason_id:
-            cancellation_reason = get_object_or_404(
+            cancellation_reason = reference_data.get_or_404(
                 CancellationReason, id=cancellation_reason_id
             )
             booking.cancellation_reason = cancellation_reason
 
-        cancelled_status = get_object_or_404(ReservationStatusType, id=1082)
+        cancelled_status = reference_data.get_or_404(ReservationStatusType, id=1082)
         booking.status = cancelled_status
         booking.save()
         return JsonResponse({"success": True})
@@ -429,7 +441,7 @@ def edit_booking_view(request, booking_id):
             hours=duration_hours, minutes=duration_minutes
         )
 
-        room = get_object_or_404(Room, id=room_id_int)
+        room = reference_data.get_or_404(Room, id=room_id_int)
 
         if room and not getattr(room, "is_active", True):
             return JsonResponse(
@@ -463,7 +475,7 @@ def edit_booking_view(request, booking_id):
             # Поле `Specialist.scenario` удалено как избыточное.
 
         scenario_name = booking.scenario.name if booking.scenario_id else ""
-        is_tariff_required = scenario_name in _TARIFF_REQUIRED_SCENARIOS
+        is_tariff_required = scenario_name in pricing.TARIFF_REQUIRED_SCENARIOS
         specialist_service = None
         if scenario_name == "Музыкальная школа":
             if not specialist_service_id:
@@ -568,44 +580,28 @@ def edit_booking_view(request, booking_id):
                 status=400,
             )
 
-        tariff = None
-        if is_tariff_required:
-            tariff = Tariff.objects.filter(id=desired_tariff_id, active=True).first()
-            if not tariff:
-                return JsonResponse(
-                    {"success": False, "error": "Выбранный тариф недоступен"},
-                    status=400,
+        if service_ids is None:
+            service_ids_list = list(booking.services.values_list("id", flat=True))
+        quote = pricing.quote_batch(
+            [
+                pricing.QuoteRequest(
+                    scenario_id=booking.scenario_id,
+                    room_id=room.id,
+                    start=start_datetime,
+                    end=end_datetime,
+                    service_ids=service_ids_list,
+                    tariff_id=desired_tariff_id,
+                    people_count=people_count,
                 )
-
-            available_tariffs = get_available_tariffs_for_booking(
-                scenario=booking.scenario,
-                room=room,
-                date_iso=start_datetime.date().isoformat(),
-                start_time_hm=start_datetime.strftime("%H:%M"),
-                end_time_hm=end_datetime.strftime("%H:%M"),
-                people_count=people_count,
-            )
-            if str(tariff.id) not in {str(t.id) for t in available_tariffs}:
+            ]
+        )[0]
+        if is_tariff_required:
+            if quote.tariff is None:
                 return JsonResponse(
                     {"success": False, "error": "Выбранный тариф недоступен"},
                     status=400,
                 )
-
-        services_qs_for_cost = booking.services.all()
-        if service_ids is not None:
-            services_qs_for_cost = Service.objects.filter(id__in=service_ids_list)
-        services_cost = sum((s.cost or Decimal("0")) for s in services_qs_for_cost)
-
-        if is_tariff_required:
-            duration_total_minutes = int(
-                (end_datetime - start_datetime).total_seconds() // 60
-            )
-            rental_cost = (tariff.base_cost or Decimal("0")) * (
-                Decimal(duration_total_minutes)
-                / Decimal(max(1, int(tariff.base_duration_minutes)))
-            )
-            rental_cost = _quantize_money(rental_cost)
-            total_cost = _quantize_money((rental_cost or Decimal("0")) + services_cost)
+            total_cost = quote.total_cost
 
         with transaction.atomic():
             booking.datetimestart = start_datetime
@@ -617,14 +613,11 @@ def edit_booking_view(request, booking_id):
             booking.people_count = people_count
             booking.comment = comment
             booking.total_cost = total_cost
-            booking.tariff = tariff
+            booking.tariff_id = quote.tariff.id if quote.tariff is not None else None
             booking.save()
 
-            if service_ids is None:
-                pass
-            else:
-                services_qs = Service.objects.filter(id__in=service_ids_list)
-                booking.services.set(list(services_qs))
+            if service_ids is not None:
+                booking.services.set(quote.services)
 
         local_start = timezone.localtime(booking.datetimestart)
         local_end = timezone.localtime(booking.datetimeend)
@@ -667,20 +660,26 @@ def cancel_booking_view(request, booking_id):
                 {"success": False, "error": "Не указана причина отмены"}
             )
 
-        cancellation_reason = get_object_or_404(
+        cancellation_reason = reference_data.get_or_404(
             CancellationReason, id=cancellation_reason_id
         )
 
         with transaction.atomic():
+            # Блокировка брони: отмена и изменения её платежей идут по очереди.
+            booking = Reservation.objects.select_for_update().get(id=booking.id)
             # Находим платежи тарифными единицами для этой брони
             tariff_units_payments = Payment.objects.filter(
-                reservation=booking, payment_type__name="Тарифные единицы"
+                reservation=booking,
+                payment_type__name="Тарифные единицы",
+                canceled=False,
             ).select_related("payment_type")
 
             # Если есть платежи тарифными единицами
             if tariff_units_payments.exists():
                 # Получаем тарифную единицу для данного сценария бронирования
-                tariff_unit = TariffUnit.objects.get(scenario=booking.scenario)
+                tariff_unit = reference_data.get(
+                    TariffUnit, scenario_id=booking.scenario_id
+                )
 
                 # Получаем абонемент клиента для данного сценария бронирования
                 subscription = Subscription.objects.get(
@@ -697,18 +696,26 @@ def cancel_booking_view(request, booking_id):
                     total_amount += amount
                     total_units += units
 
-                # Возвращаем единицы на баланс абонемента
-                subscription.balance += total_units
-                subscription.save()
-
                 # Создаем запись о возврате в payments
-                Payment.objects.create(
+                refund = create_with_allocated_id(
+                    Payment,
                     reservation=booking,
                     payment_type=tariff_units_payments.first().payment_type,
                     amount=-total_amount,
                     comment=f"Возврат при отмене брони ({total_units} тарифных единиц)",
                 )
 
+                # Возвращаем единицы на баланс абонемента (запись журнала и
+                # UPDATE баланса без чтения-изменения-записи)
+                if total_units:
+                    tariff_unit_ledger.credit(
+                        subscription,
+                        total_units,
+                        reservation=booking,
+                        payment=refund,
+                        comment=f"Возврат при отмене брони {booking.id}",
+                    )
+
                 # Добавляем информацию о возврате в комментарий
                 refund_comment = f"\n\nВозвращено тарифных единиц: {total_units} (сумма: {total_amount} руб.)"
                 if booking.comment:
@@ -717,7 +724,7 @@ def cancel_booking_view(request, booking_id):
                     booking.comment = f"Возвращено тарифных единиц: {total_units} (сумма: {total_amount} руб.)"
 
             # Отмена брони
-            cancelled_status = ReservationStatusType.objects.get(id=4)
+            cancelled_status = reference_data.get(ReservationStatusType, id=4)
             booking.status = cancelled_status
             booking.cancellation_reason = cancellation_reason
 
@@ -767,61 +774,17 @@ def get_available_specialists(request, booking_id):
         # Получаем бронь
         booking = get_object_or_404(Reservation, id=booking_id)
 
-        # Получаем всех активных специалистов
-        specialists = Specialist.objects.filter(active=True)
-
-        # Исключаем специалистов, у которых есть пересекающиеся брони
-        busy_specialists = (
-            Reservation.objects.filter(
-                specialist__isnull=False,
-                datetimestart__lt=booking.datetimeend,
-                datetimeend__gt=booking.datetimestart,
-            )
-            .exclude(id=booking_id)
-            .exclude(status_id__in=[4, 1082])
-            .values_list("specialist_id", flat=True)
+        # Все активные специалисты проверяются одним пакетом: расписание
+        # (weekly + overrides на дату), занятость бронями и занятость как
+        # клиента (например, сами записаны на урок у другого преподавателя).
+        # Любая ошибка проверки трактуется как недоступность специалиста.
+        specialists = list(Specialist.objects.filter(active=True))
+        availability = resolve_availability(
+            specialists,
+            [(booking.datetimestart, booking.datetimeend, booking.scenario_id)],
+            exclude_reservation_id=booking_id,
         )
-
-        specialists = specialists.exclude(id__in=busy_specialists)
-
-        # Дополнительно исключаем специалистов, которые заняты как клиенты
-        # (например, сами записаны на урок у другого преподавателя).
-        specialist_client_ids = list(
-            specialists.exclude(client_id__isnull=True).values_list(
-                "client_id", flat=True
-            )
-        )
-        if specialist_client_ids:
-            busy_clients = (
-                Reservation.objects.filter(
-                    client_id__in=specialist_client_ids,
-                    datetimestart__lt=booking.datetimeend,
-                    datetimeend__gt=booking.datetimestart,
-                )
-                .exclude(id=booking_id)
-                .exclude(status_id__in=[4, 1082])
-                .values_list("client_id", flat=True)
-            )
-            specialists = specialists.exclude(client_id__in=busy_clients)
-
-        # Исключаем специалистов, которые не работают по расписанию в это время
-        # (weekly интервалы + overrides на конкретную дату). Любая ошибка проверки
-        # трактуется как недоступность специалиста.
-        specialists_by_schedule = []
-        for s in specialists:
-            try:
-                check_specialist_schedule(
-                    s,
-                    booking.datetimestart,
-                    booking.datetimeend,
-                    scenario_id=booking.scenario_id,
-                )
-            except Exception:
-                # Если не попадает в рабочее время / выходной / и т.п.
-                continue
-            specialists_by_schedule.append(s)
-
-        specialists = specialists_by_schedule
+        specialists = [s for s in specialists if availability[(s.id, 0)] is None]
 
         # Формируем список специалистов
         specialists_data = []
@@ -844,6 +807,7 @@ def get_available_specialists(request, booking_id):
         return JsonResponse({"success": False, "error": str(e)}, status=400)
 
 
+@conditional_view(CancellationReason)
 def get_cancellation_reasons(request):
     """Получение списка активных причин отмены"""
     reasons = CancellationReason.objects.filter(is_active=True).order_by(
@@ -857,6 +821,7 @@ def get_cancellation_reasons(request):
     )
 
 
+@conditional_view(Client)
 def get_clients(request):
     """Получение списка клиентов"""
     try:
@@ -895,6 +860,18 @@ def update_booking_client(request, booking_id):
 
 def get_services(request):
     """Получение списка услуг"""
+    if request.GET.get("booking_id"):
+        # current_services брони не отслеживается валидаторами услуг.
+        return _services_response(request)
+    return _conditional_services(request)
+
+
+@conditional_view(Service, ServiceGroup)
+def _conditional_services(request):
+    return _services_response(request)
+
+
+def _services_response(request):
     try:
         booking_id = request.GET.get("booking_id")
         current_services = []
@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from .. import reference_data
+from ..models import Direction, Scenario, Specialist
+from ..slot_search import find_free_slots
+
+# Окно поиска по умолчанию и максимальное, в днях.
+DEFAULT_WINDOW_DAYS = 14
+MAX_WINDOW_DAYS = 31
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+def _error(message):
+    return JsonResponse({"success": False, "error": message}, status=400)
+
+
+def _optional_int(value):
+    if value is None or str(value).strip() == "":
+        return None
+    return int(value)
+
+
+@login_required(login_url="login")
+@require_GET
+def find_free_slots_view(request):
+    """Ближайшие свободные слоты для брони (см. `booking.slot_search`).
+
+    Ожидает параметры GET:
+      - scenario_id       (обязательный)
+      - duration_minutes  (обязательный)
+      - date_from, date_to (YYYY-MM-DD; по умолчанию — 14 дней от сегодня,
+        окно не больше 31 дня)
+      - room_id, area_id, specialist_id, direction_id, people_count
+        (опционально)
+      - limit (по умолчанию 10, не больше 100)
+    """
+    params = request.GET
+    try:
+        scenario_id = int(params.get("scenario_id"))
+        duration_minutes = int(params.get("duration_minutes"))
+    except (TypeError, ValueError):
+        return _error("Параметры scenario_id и duration_minutes обязательны")
+    if duration_minutes <= 0:
+        return _error("Длительность должна быть больше нуля")
+
+    try:
+        room_id = _optional_int(params.get("room_id"))
+        area_id = _optional_int(params.get("area_id"))
+        specialist_id = _optional_int(params.get("specialist_id"))
+        direction_id = _optional_int(params.get("direction_id"))
+        people_count = _optional_int(params.get("people_count"))
+        limit = _optional_int(params.get("limit")) or DEFAULT_LIMIT
+    except (TypeError, ValueError):
+        return _error("Некорректные параметры поиска")
+    limit = min(max(limit, 1), MAX_LIMIT)
+
+    try:
+        date_from = timezone.localdate()
+        if params.get("date_from"):
+            date_from = timezone.datetime.strptime(
+                params["date_from"], "%Y-%m-%d"
+            ).date()
+        date_to = date_from + timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+        if params.get("date_to"):
+            date_to = timezone.datetime.strptime(params["date_to"], "%Y-%m-%d").date()
+    except ValueError:
+        return _error("Некорректный формат даты, ожидается YYYY-MM-DD")
+    if date_from > date_to:
+        return _error("date_from не может быть больше date_to")
+    if (date_to - date_from).days >= MAX_WINDOW_DAYS:
+        return _error("Слишком большой диапазон дат")
+
+    scenarios = reference_data.filter(Scenario, id=scenario_id)
+    scenario = scenarios[0] if scenarios else None
+    if scenario is None:
+        return _error("Сценарий не найден")
+    specialist = direction = None
+    if specialist_id is not None:
+        specialist = Specialist.objects.filter(id=specialist_id).first()
+        if specialist is None:
+            return _error("Специалист не найден")
+    elif direction_id is not None:
+        direction = Direction.objects.filter(id=direction_id).first()
+        if direction is None:
+            return _error("Направление не найдено")
+
+    slots = find_free_slots(
+        scenario=scenario,
+        duration_minutes=duration_minutes,
+        date_from=date_from,
+        date_to=date_to,
+        limit=limit,
+        room_ids=[room_id] if room_id is not None else None,
+        area_id=area_id,
+        specialist=specialist,
+        direction=direction,
+        people_count=people_count,
+    )
+    return JsonResponse(
+        {
+            "success": True,
+            "slots": [
+                {
+                    "start": slot.start.strftime("%Y-%m-%d %H:%M:%S"),
+                    "end": slot.end.strftime("%Y-%m-%d %H:%M:%S"),
+                    "room_id": slot.room_id,
+                    "specialist_ids": slot.specialist_ids,
+                    "tariff_ids": slot.tariff_ids,
+                }
+                for slot in slots
+            ],
+            "date_from": date_from.isoformat(),
+            "date_to": date_to.isoformat(),
+        }
+    )
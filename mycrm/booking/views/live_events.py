@@ -0,0 +1,147 @@
+"""Живое обновление календаря: SSE-поток и опрос.
+
+События публикуются брокером `booking.live_events`. Под ASGI клиент держит
+SSE-соединение (`live_events_stream`); под WSGI потоковый ответ занял бы рабочий
+процесс и буферизовался бы целиком, поэтому SSE отвечает 204 (EventSource после
+этого не переподключается), и клиент переходит на опрос (`live_events_poll`).
+Опрос отвечает сразу, без ожидания событий: ожидание в запросе точно так же
+занимало бы рабочий процесс на всё время ожидания.
+
+Фильтры обоих представлений (GET):
+  - area_id   (опционально)
+  - date_from (YYYY-MM-DD, опционально)
+  - date_to   (YYYY-MM-DD, опционально)
+"""
+
+import json
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from ..live_events import event_matches, get_broker
+
+# Пустой комментарий в SSE-потоке раз в HEARTBEAT_SECONDS не даёт прокси
+# закрыть простаивающее соединение.
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 3000
+
+
+def _parse_filters(request) -> dict:
+    """Фильтры событий из GET; ValueError при некорректных значениях."""
+    area_id = request.GET.get("area_id")
+    date_from = request.GET.get("date_from")
+    date_to = request.GET.get("date_to")
+    return {
+        "area_id": int(area_id) if area_id else None,
+        "date_from": date.fromisoformat(date_from) if date_from else None,
+        "date_to": date.fromisoformat(date_to) if date_to else None,
+    }
+
+
+def _parse_last_id(value) -> int | None:
+    return int(value) if value not in (None, "") else None
+
+
+def _bad_request(error: str) -> JsonResponse:
+    return JsonResponse({"success": False, "error": error}, status=400)
+
+
+def _sse(event: str, data: dict, event_id: int | None = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@login_required(login_url="login")
+async def live_events_stream(request):
+    """SSE-поток событий броней (только под ASGI).
+
+    Поддерживает заголовок Last-Event-ID: после переподключения поток
+    продолжается с пропущенных событий. Событие `reset` означает, что часть
+    событий недоступна и сетку нужно перезагрузить целиком.
+    """
+    if request.method != "GET":
+        return JsonResponse(
+            {"success": False, "error": "Метод не поддерживается"}, status=405
+        )
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    try:
+        filters = _parse_filters(request)
+        last_id = _parse_last_id(
+            request.headers.get("Last-Event-ID") or request.GET.get("last_id")
+        )
+    except ValueError:
+        return _bad_request("Некорректные параметры фильтра")
+
+    broker = get_broker()
+    if last_id is None:
+        last_id = await sync_to_async(broker.last_id, thread_sensitive=False)()
+
+    async def stream():
+        cursor = last_id
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        while True:
+            events, reset = await broker.wait_async(cursor, HEARTBEAT_SECONDS)
+            if reset:
+                cursor = events[-1]["id"] if events else await sync_to_async(
+                    broker.last_id, thread_sensitive=False
+                )()
+                yield _sse("reset", {}, cursor)
+                continue
+            if not events:
+                yield ": ping\n\n"
+                continue
+            for event in events:
+                if event_matches(event, **filters):
+                    yield _sse("booking", event, event["id"])
+            cursor = events[-1]["id"]
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Отключает буферизацию ответа в nginx.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required(login_url="login")
+@require_GET
+def live_events_poll(request):
+    """Опрос событий броней (запасной вариант для WSGI).
+
+    Параметры GET, кроме фильтров:
+      - last_id (номер последнего полученного события; без него запрос
+        возвращает текущий номер)
+
+    Ответ — события после `last_id`, подходящие под фильтры (один запрос к
+    брокеру, без ожидания); клиент повторяет опрос раз в несколько секунд.
+    """
+    try:
+        filters = _parse_filters(request)
+        last_id = _parse_last_id(request.GET.get("last_id"))
+    except ValueError:
+        return _bad_request("Некорректные параметры запроса")
+
+    broker = get_broker()
+    if last_id is None:
+        return JsonResponse(
+            {"success": True, "last_id": broker.last_id(), "events": [], "reset": False}
+        )
+
+    events, reset = broker.events_after(last_id)
+    if events:
+        last_id = events[-1]["id"]
+    elif reset:
+        last_id = broker.last_id()
+    matched = [event for event in events if event_matches(event, **filters)]
+    return JsonResponse(
+        {"success": True, "last_id": last_id, "events": matched, "reset": reset}
+    )
@@ -10,12 +10,20 @@ from django.views.decorators.http import require_POST, require_GET
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 
+from booking import reference_data, tariff_unit_ledger
+from booking.id_allocator import create_with_allocated_id
 from booking.models import Payment, PaymentType, Reservation
 
+# Статус отменённой брони: единицы по её платежам возвращены при отмене.
+CANCELLED_STATUS_ID = 4
+
 
 def save_payments_for_booking(booking, payments_data):
     """Сохраняет платежи для брони в БД.
 
+    Платежи тарифными единицами списывают единицы с абонемента клиента
+    по сценарию брони, если он есть (журнал тарифных единиц).
+
     Args:
         booking: Reservation instance.
         payments_data: Список словарей с ключами payment_type_id и amount.
@@ -26,6 +34,7 @@ def save_payments_for_booking(booking, payments_data):
     Raises:
         ValueError: Если не указаны обязательные поля.
         PaymentType.DoesNotExist: Если тип платежа не найден.
+        InsufficientUnits: Если на абонементе не хватает единиц (ValueError).
     """
     created_payments = []
 
@@ -39,15 +48,17 @@ def save_payments_for_booking(booking, payments_data):
                     "payment_type_id и amount обязательны для каждого платежа"
                 )
 
-            payment_type = PaymentType.objects.get(id=payment_type_id)
+            payment_type = reference_data.get(PaymentType, id=payment_type_id)
 
-            payment = Payment.objects.create(
+            payment = create_with_allocated_id(
+                Payment,
                 reservation=booking,
                 payment_type=payment_type,
                 amount=Decimal(str(amount)),
                 comment=payment_info.get("comment", ""),
                 canceled=False,
             )
+            tariff_unit_ledger.charge_payment(payment)
             created_payments.append(payment.id)
 
     return created_payments
@@ -62,7 +73,6 @@ def process_batch_payments_view(request, booking_id):
         )
 
     try:
-        booking = get_object_or_404(Reservation, id=booking_id)
         data = json.loads(request.body or "{}")
         payments_data = data.get("payments", [])
 
@@ -72,15 +82,6 @@ def process_batch_payments_view(request, booking_id):
                 status=400,
             )
 
-        total_cost = booking.total_cost or Decimal("0")
-        existing_payments = Payment.objects.filter(reservation=booking, canceled=False)
-        existing_total = sum(
-            (payment.amount for payment in existing_payments), Decimal("0")
-        )
-        remaining = total_cost - existing_total
-        if remaining < Decimal("0"):
-            remaining = Decimal("0")
-
         new_total = Decimal("0")
         for payment_info in payments_data:
             amount = payment_info.get("amount")
@@ -90,16 +91,27 @@ def process_batch_payments_view(request, booking_id):
                 )
             new_total += Decimal(str(amount))
 
-        if new_total > remaining:
-            return JsonResponse(
-                {
-                    "success": False,
-                    "error": "Суммарная сумма оплат превышает остаток к оплате по брони",
-                },
-                status=400,
+        # Проверка остатка и запись платежей — в одной транзакции с блокировкой
+        # брони, чтобы параллельные оплаты не превысили стоимость.
+        with transaction.atomic():
+            booking = get_object_or_404(
+                Reservation.objects.select_for_update(), id=booking_id
             )
+            total_cost = booking.total_cost or Decimal("0")
+            remaining = total_cost - booking.paid_amount
+            if remaining < Decimal("0"):
+                remaining = Decimal("0")
+
+            if new_total > remaining:
+                return JsonResponse(
+                    {
+                        "success": False,
+                        "error": "Суммарная сумма оплат превышает остаток к оплате по брони",
+                    },
+                    status=400,
+                )
 
-        created_payments = save_payments_for_booking(booking, payments_data)
+            created_payments = save_payments_for_booking(booking, payments_data)
 
         return JsonResponse({"success": True, "payment_ids": created_payments})
 
@@ -113,6 +125,38 @@ def process_batch_payments_view(request, booking_id):
         return JsonResponse({"success": False, "error": str(e)}, status=500)
 
 
+def _locked_payment(payment_id):
+    """Бронь и платёж под блокировкой (внутри транзакции).
+
+    Все изменения платежей брони идут под блокировкой брони, поэтому
+    параллельные правки и отмены одного платежа выполняются по очереди.
+    """
+    payment = get_object_or_404(Payment, id=payment_id)
+    booking = get_object_or_404(
+        Reservation.objects.select_for_update(), id=payment.reservation_id
+    )
+    payment = (
+        Payment.objects.select_for_update(of=("self",))
+        .select_related("payment_type")
+        .get(id=payment.id)
+    )
+    payment.reservation = booking
+    return booking, payment
+
+
+def _payment_change_error(booking, payment):
+    if payment.canceled:
+        return JsonResponse(
+            {"success": False, "error": "Платёж уже отменён"}, status=400
+        )
+    if booking.status_id == CANCELLED_STATUS_ID:
+        return JsonResponse(
+            {"success": False, "error": "Бронь отменена: платёж изменить нельзя"},
+            status=400,
+        )
+    return None
+
+
 @csrf_exempt
 @require_POST
 def update_payment_view(request, payment_id):
@@ -123,9 +167,6 @@ def update_payment_view(request, payment_id):
     - комментарий (comment, необязателен)
     """
     try:
-        payment = get_object_or_404(Payment, id=payment_id)
-        booking = payment.reservation
-
         try:
             payload = json.loads(request.body or "{}")
         except json.JSONDecodeError:
@@ -144,7 +185,7 @@ def update_payment_view(request, payment_id):
             )
 
         try:
-            payment_type = PaymentType.objects.get(id=payment_type_id)
+            payment_type = reference_data.get(PaymentType, id=payment_type_id)
         except PaymentType.DoesNotExist:
             return JsonResponse(
                 {"success": False, "error": "Тип платежа не найден"}, status=400
@@ -162,36 +203,40 @@ def update_payment_view(request, payment_id):
                 {"success": False, "error": "Сумма должна быть больше 0"}, status=400
             )
 
-        # Проверяем, что новый платеж не превышает остаток с учётом других платежей
-        total_cost = booking.total_cost or Decimal("0")
-        other_payments = Payment.objects.filter(
-            reservation=booking, canceled=False
-        ).exclude(id=payment.id)
-        other_total = sum((p.amount for p in other_payments), Decimal("0"))
-        remaining = total_cost - other_total
-        if remaining < Decimal("0"):
-            remaining = Decimal("0")
-
-        if new_amount - remaining > Decimal("0.000001"):
-            return JsonResponse(
-                {
-                    "success": False,
-                    "error": "Сумма платежа превышает доступный остаток",
-                },
-                status=400,
-            )
+        # Проверка остатка и изменение платежа — в одной транзакции с блокировкой
+        # брони, как в process_batch_payments_view: параллельные правки платежей
+        # брони не превысят её стоимость.
+        with transaction.atomic():
+            booking, payment = _locked_payment(payment_id)
+            if error := _payment_change_error(booking, payment):
+                return error
+
+            # Новый платеж не должен превышать остаток с учётом других платежей
+            total_cost = booking.total_cost or Decimal("0")
+            remaining = total_cost - (booking.paid_amount - payment.amount)
+            if remaining < Decimal("0"):
+                remaining = Decimal("0")
+
+            if new_amount - remaining > Decimal("0.000001"):
+                return JsonResponse(
+                    {
+                        "success": False,
+                        "error": "Сумма платежа превышает доступный остаток",
+                    },
+                    status=400,
+                )
 
-        if payment.canceled:
-            return JsonResponse(
-                {"success": False, "error": "Платёж уже отменён"}, status=400
+            payment.payment_type = payment_type
+            payment.amount = new_amount
+            payment.comment = comment
+            payment.save(
+                update_fields=["payment_type", "amount", "comment", "updated_at"]
             )
-
-        payment.payment_type = payment_type
-        payment.amount = new_amount
-        payment.comment = comment
-        payment.save(update_fields=["payment_type", "amount", "comment", "updated_at"])
+            tariff_unit_ledger.charge_payment(payment)
 
         return JsonResponse({"success": True})
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=500)
 
@@ -201,14 +246,17 @@ def update_payment_view(request, payment_id):
 def cancel_payment_view(request, payment_id):
     """Отмена (деактивация) платежа: помечаем canceled=True и исключаем из расчётов."""
     try:
-        payment = get_object_or_404(Payment, id=payment_id)
-        if payment.canceled:
-            return JsonResponse(
-                {"success": False, "error": "Платёж уже отменён"}, status=400
-            )
-
-        payment.canceled = True
-        payment.save(update_fields=["canceled", "updated_at"])
+        # Проверка и отмена — под блокировкой брони и платежа: параллельные
+        # отмены не вернут единицы дважды, а платежи отменённой брони (единицы
+        # по ним уже возвращены при отмене брони) не отменяются.
+        with transaction.atomic():
+            booking, payment = _locked_payment(payment_id)
+            if error := _payment_change_error(booking, payment):
+                return error
+            payment.canceled = True
+            payment.save(update_fields=["canceled", "updated_at"])
+            # Единицы отменённого платежа возвращаются на абонемент.
+            tariff_unit_ledger.charge_payment(payment)
         return JsonResponse({"success": True})
     except Exception as e:
         return JsonResponse({"success": False, "error": str(e)}, status=500)
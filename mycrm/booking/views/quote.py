@@ -0,0 +1,94 @@
+import json
+from decimal import Decimal
+
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .. import pricing
+from .create_booking import _parse_bulk_block
+
+MAX_BLOCKS = 100
+
+
+def _error(message):
+    return JsonResponse({"success": False, "error": message}, status=400)
+
+
+def _optional_int(value):
+    if value is None or str(value).strip() == "":
+        return None
+    return int(value)
+
+
+@csrf_exempt
+@login_required(login_url="login")
+@require_POST
+def quote_view(request):
+    """Цены для блоков формы брони одним запросом (см. `booking.pricing`).
+
+    Ожидает JSON:
+      - scenario_id   (обязательный)
+      - room_id, people_count (опционально)
+      - blocks: [{full_datetime, duration, services, tariff_id}, ...] — в том же
+        формате, что blocks_json при создании брони, не больше 100
+
+    Незаполненный блок не ошибка запроса: для него возвращается `error` и
+    `field`, остальные блоки считаются как обычно.
+    """
+    try:
+        payload = json.loads(request.body or "{}")
+    except ValueError:
+        return _error("Некорректный JSON")
+    if not isinstance(payload, dict):
+        return _error("Некорректный JSON")
+
+    try:
+        scenario_id = int(payload.get("scenario_id"))
+        room_id = _optional_int(payload.get("room_id"))
+        people_count = _optional_int(payload.get("people_count"))
+    except (TypeError, ValueError):
+        return _error("Некорректные scenario_id, room_id или people_count")
+
+    blocks = payload.get("blocks")
+    if not isinstance(blocks, list) or not blocks:
+        return _error("Передайте хотя бы один блок")
+    if len(blocks) > MAX_BLOCKS:
+        return _error(f"Не больше {MAX_BLOCKS} блоков за запрос")
+
+    results = [None] * len(blocks)
+    requests = {}
+    for position, block in enumerate(blocks):
+        try:
+            parsed = _parse_bulk_block(block)
+        except ValidationError as e:
+            results[position] = {
+                "block_index": position + 1,
+                "error": e.messages[0],
+                "field": e.code,
+            }
+            continue
+        requests[position] = pricing.QuoteRequest(
+            scenario_id=scenario_id,
+            room_id=room_id,
+            start=parsed["start"],
+            end=parsed["end"],
+            service_ids=parsed["service_ids"],
+            tariff_id=parsed["tariff_id"],
+            people_count=people_count,
+        )
+
+    for position, quote in zip(requests, pricing.quote_batch(requests.values())):
+        results[position] = {
+            "block_index": position + 1,
+            "error": quote.tariff_error,
+            "field": "tariff_id" if quote.tariff_error else None,
+            **quote.as_dict(),
+        }
+
+    total = sum(
+        (Decimal(r["total_cost"]) for r in results if "total_cost" in r), Decimal("0")
+    )
+    return JsonResponse({"success": True, "quotes": results, "total_cost": str(total)})
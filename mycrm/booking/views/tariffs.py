@@ -3,14 +3,16 @@ import json
 from datetime import datetime
 
 from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
 
 from .create_booking import get_available_tariffs_for_booking
-from ..models import Room, Scenario
+from .. import reference_data
+from ..conditional import conditional_view
+from ..models import Room, Scenario, Tariff, TariffWeeklyInterval
 
 
 @csrf_exempt
+@conditional_view(Tariff, TariffWeeklyInterval, Scenario, Room)
 def get_available_tariffs_view(request):
     if request.method not in ("GET", "POST"):
         return JsonResponse(
@@ -67,8 +69,8 @@ def get_available_tariffs_view(request):
                 status=400,
             )
 
-    scenario = get_object_or_404(Scenario, id=scenario_id_int)
-    room = get_object_or_404(Room, id=room_id_int)
+    scenario = reference_data.get_or_404(Scenario, id=scenario_id_int)
+    room = reference_data.get_or_404(Room, id=room_id_int)
 
     tariffs = get_available_tariffs_for_booking(
         scenario=scenario,
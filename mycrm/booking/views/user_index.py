@@ -1,38 +1,37 @@
 import json
 from calendar import monthrange
-from decimal import Decimal
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any
 
 from booking.models import (
-    Client,
-    ClientGroup,
-    Payment,
     Room,
     Service,
     Reservation,
     Scenario,
     Specialist,
-    SpecialistWeeklyInterval,
-    SpecialistScheduleOverride,
     Direction,
-    Tariff,
-    TariffWeeklyInterval,
-    TariffUnit,
-    PaymentType,
     Area,
     SpecialistService,  # Услуги преподавателей для сценария "Музыкальная школа"
 )
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.serializers import serialize
-from django.db.models import QuerySet, Q, Case, When, Value, IntegerField, Sum, Count
-from django.http import JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, Case, When, Value, IntegerField, Count
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from django.template.loader import render_to_string
 from django.utils import timezone
 
+from .. import calendar_feed, live_events, room_occupancy
+from ..bootstrap import get_bootstrap_version
+from ..calendar_feed import (
+    COLUMNAR_FORMAT,
+    add_blocks_datetime_range_and_room_name,
+    bookings_columnar,
+)
+from ..calendar_fragments import DayFragments
+from ..compression import compressed
+from ..specialist_availability import DAY_MINUTES, SpecialistSchedules
 from .menu2 import menu2_view
 
 
@@ -147,75 +146,6 @@ def build_time_cells_and_blocks(work_time_start, work_time_end):
     return time_cells, time_blocks
 
 
-def add_blocks_datetime_range_and_room_name(
-    reservation_objects: QuerySet, default_block_length_minutes: int
-) -> list[dict[str, Any]]:
-    reservation_objects = reservation_objects.select_related("room", "client", "status")
-
-    reservations = list(reservation_objects)
-    reservation_ids = [r.id for r in reservations]
-    paid_by_reservation_id: dict[int, Decimal] = {}
-
-    if reservation_ids:
-        payments = (
-            Payment.objects.filter(reservation_id__in=reservation_ids, canceled=False)
-            .values("reservation_id")
-            .annotate(total=Sum("amount"))
-        )
-        paid_by_reservation_id = {
-            int(p["reservation_id"]): (p["total"] or Decimal("0")) for p in payments
-        }
-
-    result = []
-    for reservation in reservations:
-        total_cost = reservation.total_cost or Decimal("0")
-        paid_amount = paid_by_reservation_id.get(reservation.id, Decimal("0"))
-        remaining_amount = total_cost - paid_amount
-        if remaining_amount < Decimal("0"):
-            remaining_amount = Decimal("0")
-
-        local_start = timezone.localtime(reservation.datetimestart)
-        local_end = timezone.localtime(reservation.datetimeend)
-        datetime_str_list = [
-            (local_start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S")
-            for i in range(
-                0,
-                int((local_end - local_start).total_seconds() // 60) + 1,
-                default_block_length_minutes,
-            )
-        ]
-
-        result.append(
-            {
-                "id": reservation.id,
-                "room_name": reservation.room.name,
-                "idroom": reservation.room_id,
-                "scenario_id": reservation.scenario_id,
-                "blocks_datetime_range": datetime_str_list,
-                "client_id": reservation.client_id,
-                "client_name": reservation.client.name if reservation.client else None,
-                "client_comment": (
-                    reservation.client.comment if reservation.client else None
-                ),
-                "client_phone": (
-                    reservation.client.phone if reservation.client else None
-                ),
-                "client_group_id": reservation.client_group_id,
-                "client_group_name": (
-                    reservation.client_group.name if reservation.client_group else None
-                ),
-                "specialist_id": reservation.specialist_id,
-                "status_id": reservation.status.id if reservation.status else 1,
-                "comment": reservation.comment,
-                "total_cost": str(total_cost),
-                "paid_amount": str(paid_amount),
-                "remaining_amount": str(remaining_amount),
-            }
-        )
-
-    return result
-
-
 @login_required(login_url="login")
 def user_index_view(request):
     request_range = "day14"  # по умолчанию 2 неделb
@@ -249,8 +179,6 @@ def user_index_view(request):
     areas = Area.objects.prefetch_related("scenario").order_by("id")
     scenarios = Scenario.objects.order_by("id")
 
-    areas_json = serialize("json", areas, use_natural_primary_keys=True)
-
     default_area = areas[0] if areas else None
     default_scenario = scenarios[0] if scenarios else None
 
@@ -275,43 +203,9 @@ def user_index_view(request):
     )
     bookings_in_range_json = json.dumps(bookings_in_range)
 
-    clients = Client.objects.prefetch_related(
-        "subscription_set__reservation_type", "clientrating_set", "groups"
-    ).all()
-
-    clients_with_balances = []
-    for client in clients:
-        subscriptions = client.subscription_set.all()
-
-        balances = {
-            subscription.reservation_type_id: subscription.balance
-            for subscription in subscriptions
-        }
-
-        group_data = []
-        for group in client.groups.all():
-            group_data.append(
-                {
-                    "id": group.id,
-                    "name": group.name,
-                    "clients": [c.name for c in group.clients.all()],
-                }
-            )
-
-        clients_with_balances.append(
-            {
-                "id": client.id,
-                "name": client.name,
-                "comment": client.comment,
-                "phone": client.phone,
-                "rating": client.rating,
-                "rating_count": client.clientrating_set.count(),
-                "balances": balances,
-                "group": group_data,
-            }
-        )
-
-    clients_json = json.dumps(clients_with_balances)
+    # Справочники (клиенты, тарифы, сценарии и т.д.) страница получает отдельным
+    # кэшируемым bootstrap-документом (booking.bootstrap) — здесь только версия.
+    bootstrap_version = get_bootstrap_version()
 
     services = (
         Service.objects.select_related("group")
@@ -320,48 +214,20 @@ def user_index_view(request):
         .order_by("-usage_count", "name")
     )
 
-    services_json = serialize("json", services, use_natural_foreign_keys=True)
-
     specialists = Specialist.objects.prefetch_related("directions").all()
-    specialists_json = serialize("json", specialists, use_natural_primary_keys=True)
 
     directions = Direction.objects.filter(active=True).order_by("name")
 
-    rooms_all = Room.objects.prefetch_related("scenario").all()
-    rooms_json = serialize("json", rooms_all, use_natural_primary_keys=True)
-
+    rooms = Room.objects.select_related("area")
     if default_area is not None:
-        rooms = rooms_all.filter(area_id=default_area.id)
-    else:
-        rooms = rooms_all
-
-    scenarios_json = serialize("json", scenarios, use_natural_primary_keys=True)
-
-    tariff_units = TariffUnit.objects.all()
-    tariff_units_json = serialize("json", tariff_units)
-
-    tariffs = Tariff.objects.filter(active=True).prefetch_related("scenarios", "rooms")
-    tariffs_json = serialize("json", tariffs)
-
-    tariff_weekly_intervals = TariffWeeklyInterval.objects.filter(tariff__active=True)
-    tariff_weekly_intervals_json = serialize("json", tariff_weekly_intervals)
-
-    # Группы клиентов для сценария "Репетиционная точка"
-    client_groups = ClientGroup.objects.all()
-    client_groups_json = json.dumps(
-        [{"id": cg.id, "name": cg.name} for cg in client_groups]
-    )
-
-    payment_types = PaymentType.objects.all().order_by("id")
-    payment_types_json = json.dumps(
-        [
-            {
-                "id": payment_type.id,
-                "name": payment_type.name,
-            }
-            for payment_type in payment_types
-        ]
-    )
+        rooms = rooms.filter(area_id=default_area.id)
+    calendar_grid_html = DayFragments(
+        request,
+        rooms,
+        time_cells,
+        time_blocks,
+        area_id=default_area.id if default_area is not None else None,
+    ).render_grid(days_of_month)
 
     version_value = ""
     version_file = Path(settings.BASE_DIR).parent / "VERSION"
@@ -374,22 +240,6 @@ def user_index_view(request):
     # Услуги преподавателей для сценария "Музыкальная школа"
     specialist_services = SpecialistService.objects.filter(active=True).order_by("name")
 
-    # Маппинг услуги преподавателя → список ID специалистов, которые её оказывают.
-    # Используется для фильтрации услуг по доступным специалистам на фронтенде.
-    specialist_service_to_specialists = {}
-    for specialist in Specialist.objects.filter(active=True).prefetch_related(
-        "specialist_services"
-    ):
-        for service in specialist.specialist_services.filter(active=True):
-            if service.id not in specialist_service_to_specialists:
-                specialist_service_to_specialists[service.id] = []
-            specialist_service_to_specialists[service.id].append(specialist.id)
-
-    # JSON для передачи на фронтенд: {service_id: [specialist_id, ...]}
-    specialist_service_to_specialists_json = json.dumps(
-        specialist_service_to_specialists
-    )
-
     pending_requests_count = Reservation.objects.filter(status_id=1079).count()
 
     context = {
@@ -398,32 +248,21 @@ def user_index_view(request):
         "time_blocks": time_blocks,
         "time_blocks_json": time_blocks_json,
         "rooms": rooms,
-        "rooms_json": rooms_json,
+        "calendar_grid_html": calendar_grid_html,
         "areas": areas,
-        "areas_json": areas_json,
         "scenarios": scenarios,
-        "scenarios_json": scenarios_json,
         "show_datefrom": days_of_month[0]["date"].date().isoformat(),
         "show_dateto": days_of_month[-1]["date"].date().isoformat(),
         "services": services,
-        "services_json": services_json,
         "specialists": specialists,
-        "specialists_json": specialists_json,
         "directions": directions,
         "bookings_in_range": bookings_in_range_json,
-        "tariff_units_json": tariff_units_json,
-        "tariffs_json": tariffs_json,
-        "tariff_weekly_intervals_json": tariff_weekly_intervals_json,
-        "clients": clients,
-        "clients_json": clients_json,
-        "client_groups": client_groups,
-        "client_groups_json": client_groups_json,
-        "payment_types_json": payment_types_json,
+        "bootstrap_version": bootstrap_version,
         "time_cells": time_cells,
         "app_version": version_value,
         "specialist_services": specialist_services,  # Услуги преподавателей для "Музыкальная школа"
-        "specialist_service_to_specialists_json": specialist_service_to_specialists_json,  # Маппинг услуга→специалисты
         "pending_requests_count": pending_requests_count,
+        "live_events_shared": live_events.get_broker().shared,
     }
 
     return render(request, "booking/user/user_index.html", context)
@@ -437,16 +276,46 @@ def get_pending_requests_count(request):
     )
 
 
+def _bookings_payload(request, bookings_qs, start_date) -> dict[str, Any]:
+    """Брони сетки в формате из параметра `format` (построчный по умолчанию)."""
+    if request.GET.get("format") == COLUMNAR_FORMAT:
+        return {"bookings_columnar": bookings_columnar(bookings_qs, 15, start_date)}
+    return {"bookings_in_range": add_blocks_datetime_range_and_room_name(bookings_qs, 15)}
+
+
 @login_required(login_url="login")
+@compressed
 def get_bookings_grid(request):
     """Возвращает актуальные брони для сетки календаря в заданном диапазоне дат.
 
     Ожидает параметры GET:
       - date_from (YYYY-MM-DD)
       - date_to   (YYYY-MM-DD)
+      - format    (опционально, "columnar" — колоночный формат)
+      - since     (опционально, курсор из предыдущего ответа)
+
+    Формат ответа совместим с bookings_in_range на главной странице; при
+    format=columnar вместо bookings_in_range отдаётся bookings_columnar
+    (см. `booking.calendar_feed`).
 
-    Формат ответа совместим с bookings_in_range на главной странице.
+    Ответ содержит `cursor`. С параметром since возвращаются только брони,
+    изменённые после курсора, и `removed_ids` — брони, которые нужно убрать
+    из сетки (`delta: true`). Если курсор устарел, отдаётся полный список
+    (`delta: false`).
     """
+    cursor = calendar_feed.current_cursor()
+    since_str = request.GET.get("since")
+    since = None
+    if since_str:
+        try:
+            since = calendar_feed.parse_cursor(since_str)
+        except (TypeError, ValueError, OverflowError, OSError):
+            return JsonResponse(
+                {"success": False, "error": "Некорректный курсор since"},
+                status=400,
+            )
+        if calendar_feed.cursor_expired(since):
+            since = None
 
     date_from_str = request.GET.get("date_from")
     date_to_str = request.GET.get("date_to")
@@ -501,19 +370,69 @@ def get_bookings_grid(request):
         if area_id_int is not None:
             bookings_qs = bookings_qs.filter(room__area_id=area_id_int)
 
-    bookings_in_range = add_blocks_datetime_range_and_room_name(bookings_qs, 15)
+    delta = {"delta": False}
+    if since is not None:
+        bookings_qs, removed_ids = calendar_feed.bookings_delta(bookings_qs, since)
+        delta = {"delta": True, "removed_ids": removed_ids}
 
     return JsonResponse(
         {
             "success": True,
-            "bookings_in_range": bookings_in_range,
+            **_bookings_payload(request, bookings_qs, start_date),
+            **delta,
+            "cursor": cursor,
             "date_from": date_from_str,
             "date_to": date_to_str,
         }
     )
 
 
+def _ndjson_line(payload: dict[str, Any]) -> bytes:
+    return (
+        json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+    ).encode()
+
+
+def _calendar_grid_lines(request, header, fragments, days, bookings_qs, start_date):
+    """Строки NDJSON потокового ответа get_calendar_grid.
+
+    Сначала `header` (type="grid": курсор, time_blocks, time_cells), затем по
+    строке на день (type="day": date, html и брони дня в формате из
+    параметра `format`), в конце — {"type": "end"}. Каждый день выбирается и
+    рендерится (или берётся из кэша `fragments`) отдельно, поэтому память
+    сервера ограничена одним днём, а браузер показывает первый день, не
+    дожидаясь остальных.
+
+    Бронь относится к дню своего начала; первому дню достаются и брони,
+    начатые раньше диапазона, — каждая бронь приходит ровно один раз.
+    """
+    yield _ndjson_line({"type": "grid", **header})
+    for number, day in enumerate(days, start=1):
+        day_date = day["date"].date()
+        day_end = timezone.make_aware(
+            timezone.datetime.combine(day_date, timezone.datetime.max.time())
+        )
+        day_qs = bookings_qs.filter(datetimestart__lte=day_end)
+        if number > 1:
+            day_qs = day_qs.filter(
+                datetimestart__gte=timezone.make_aware(
+                    timezone.datetime.combine(day_date, timezone.datetime.min.time())
+                )
+            )
+        (html,) = fragments.render([day], first_number=number)
+        yield _ndjson_line(
+            {
+                "type": "day",
+                "date": day_date.isoformat(),
+                "html": html,
+                **_bookings_payload(request, day_qs, start_date),
+            }
+        )
+    yield _ndjson_line({"type": "end"})
+
+
 @login_required(login_url="login")
+@compressed
 def get_calendar_grid(request):
     """Возвращает HTML календарной сетки и список броней для заданного диапазона дат и фильтров.
 
@@ -522,8 +441,16 @@ def get_calendar_grid(request):
       - date_to   (YYYY-MM-DD)
       - area_id   (опционально)
       - scenario_id (опционально)
+      - format    (опционально, "columnar" — брони в колоночном формате)
+      - stream    (опционально, "1" — потоковый ответ NDJSON по дням,
+                   см. `_calendar_grid_lines`)
+
+    `cursor` в ответе — начальный курсор для синхронизации через
+    get_bookings_grid с параметром since. Разметка дней берётся из кэша
+    `booking.calendar_fragments`.
     """
 
+    cursor = calendar_feed.current_cursor()
     date_from_str = request.GET.get("date_from")
     date_to_str = request.GET.get("date_to")
     area_id = request.GET.get("area_id")
@@ -588,7 +515,8 @@ def get_calendar_grid(request):
         scenario_obj.work_time_end if scenario_obj else None,
     )
 
-    rooms_qs = Room.objects.prefetch_related("scenario").all()
+    # Комнаты выбираются только при промахе кэша разметки дней.
+    rooms_qs = Room.objects.select_related("area")
 
     area_id_int = None
     if area_id:
@@ -599,8 +527,6 @@ def get_calendar_grid(request):
         if area_id_int is not None:
             rooms_qs = rooms_qs.filter(area_id=area_id_int)
 
-    rooms = list(rooms_qs)
-
     bookings_qs = Reservation.objects.filter(
         Q(datetimestart__lte=end_dt) & Q(datetimeend__gte=start_dt)
     ).exclude(status_id__in=[4, 1082])
@@ -608,28 +534,31 @@ def get_calendar_grid(request):
     if area_id_int is not None:
         bookings_qs = bookings_qs.filter(room__area_id=area_id_int)
 
-    bookings_in_range = add_blocks_datetime_range_and_room_name(bookings_qs, 15)
-
-    html = render_to_string(
-        "booking/user/_calendar_grid.html",
-        {
-            "days_of_month": days_of_month,
-            "time_blocks": time_blocks,
-            "rooms": rooms,
-            "time_cells": time_cells,
-        },
-        request=request,
+    fragments = DayFragments(
+        request, rooms_qs, time_cells, time_blocks, area_id=area_id_int
     )
+    header = {
+        "success": True,
+        "cursor": cursor,
+        "time_blocks": time_blocks,
+        "time_cells": time_cells,
+        "date_from": date_from_str,
+        "date_to": date_to_str,
+    }
+
+    if request.GET.get("stream") == "1":
+        return StreamingHttpResponse(
+            _calendar_grid_lines(
+                request, header, fragments, days_of_month, bookings_qs, start_date
+            ),
+            content_type="application/x-ndjson; charset=utf-8",
+        )
 
     return JsonResponse(
         {
-            "success": True,
-            "html": html,
-            "bookings_in_range": bookings_in_range,
-            "time_blocks": time_blocks,
-            "time_cells": time_cells,
-            "date_from": date_from_str,
-            "date_to": date_to_str,
+            **header,
+            "html": fragments.render_grid(days_of_month),
+            **_bookings_payload(request, bookings_qs, start_date),
         }
     )
 
@@ -703,6 +632,91 @@ def get_room_bookings_for_date(request):
     )
 
 
+@login_required(login_url="login")
+@compressed
+def get_room_occupancy(request):
+    """Занятость помещений по 15-минутным слотам для сетки календаря.
+
+    Ожидает параметры GET:
+      - date_from (YYYY-MM-DD)
+      - date_to   (YYYY-MM-DD, не дальше 62 дней от date_from)
+      - area_id   (опционально)
+
+    `occupancy` — {ID помещения: {дата: маска}}, маска — 96 бит в виде
+    24 шестнадцатеричных цифр, младший бит — слот 00:00–00:15. Даты без
+    броней не передаются (помещение свободно весь день).
+    """
+    date_from_str = request.GET.get("date_from")
+    date_to_str = request.GET.get("date_to")
+
+    if not date_from_str or not date_to_str:
+        return JsonResponse(
+            {
+                "success": False,
+                "error": "Параметры date_from и date_to обязательны",
+            },
+            status=400,
+        )
+
+    try:
+        start_date = timezone.datetime.strptime(date_from_str, "%Y-%m-%d").date()
+        end_date = timezone.datetime.strptime(date_to_str, "%Y-%m-%d").date()
+    except ValueError:
+        return JsonResponse(
+            {
+                "success": False,
+                "error": "Некорректный формат даты, ожидается YYYY-MM-DD",
+            },
+            status=400,
+        )
+
+    if start_date > end_date:
+        return JsonResponse(
+            {
+                "success": False,
+                "error": "date_from не может быть больше date_to",
+            },
+            status=400,
+        )
+
+    if (end_date - start_date).days > 62:
+        return JsonResponse(
+            {
+                "success": False,
+                "error": "Слишком большой диапазон дат",
+            },
+            status=400,
+        )
+
+    rooms = Room.objects.all()
+    area_id = request.GET.get("area_id")
+    if area_id:
+        try:
+            rooms = rooms.filter(area_id=int(area_id))
+        except (TypeError, ValueError):
+            pass
+
+    grid = room_occupancy.grid(
+        list(rooms.values_list("id", flat=True)), start_date, end_date
+    )
+    width = room_occupancy.SLOTS_PER_DAY // 4
+    return JsonResponse(
+        {
+            "success": True,
+            "slot_minutes": room_occupancy.SLOT_MINUTES,
+            "occupancy": {
+                str(room_id): {
+                    day.isoformat(): format(mask, f"0{width}x")
+                    for day, mask in sorted(days.items())
+                }
+                for room_id, days in grid.items()
+            },
+            "date_from": date_from_str,
+            "date_to": date_to_str,
+        }
+    )
+
+
 @login_required(login_url="login")
 def get_busy_specialists_for_date(request):
     """Возвращает список занятых специалистов на указанную дату с их временными интервалами.
@@ -755,48 +769,24 @@ def get_busy_specialists_for_date(request):
         .select_related("specialist")
     )
 
+    specialist_names = {}
     # Специалист может быть занят в это время как клиент (например, берёт урок у другого).
     # Для фронта это тоже считается "busy".
     client_to_specialist_ids = {}
-    for spec_id, client_id in Specialist.objects.filter(
-        active=True,
-        client_id__isnull=False,
-    ).values_list("id", "client_id"):
-        client_to_specialist_ids.setdefault(int(client_id), []).append(int(spec_id))
+    for spec_id, name, client_id in Specialist.objects.filter(active=True).values_list(
+        "id", "name", "client_id"
+    ):
+        specialist_names[spec_id] = name
+        if client_id is not None:
+            client_to_specialist_ids.setdefault(int(client_id), []).append(int(spec_id))
 
     client_bookings_qs = Reservation.objects.none()
-    client_busy_specialist_ids = set()
     if client_to_specialist_ids:
         client_bookings_qs = Reservation.objects.filter(
             Q(datetimestart__lte=end_dt) & Q(datetimeend__gte=start_dt),
             client_id__in=list(client_to_specialist_ids.keys()),
         ).exclude(status_id__in=[4, 1082])
 
-        busy_client_ids = set(client_bookings_qs.values_list("client_id", flat=True))
-        for cid in busy_client_ids:
-            for sid in client_to_specialist_ids.get(int(cid), []):
-                client_busy_specialist_ids.add(int(sid))
-
-    def _time_to_minutes(t):
-        # Минуты от полуночи для компактной передачи на фронт.
-        return t.hour * 60 + t.minute
-
-    def _merge_work_intervals(work_intervals_minutes):
-        # Объединяем пересекающиеся/прилегающие интервалы рабочего времени.
-        merged = []
-        for s, e in sorted(work_intervals_minutes, key=lambda x: x[0]):
-            if s < 0:
-                s = 0
-            if e > 24 * 60:
-                e = 24 * 60
-            if s >= e:
-                continue
-            if not merged or s > merged[-1][1]:
-                merged.append([s, e])
-            else:
-                merged[-1][1] = max(merged[-1][1], e)
-        return merged
-
     # --- Определяем scenario_id для фильтрации расписания ---
     scenario_id_int = None
     if scenario_id_str:
@@ -805,77 +795,25 @@ def get_busy_specialists_for_date(request):
         except (ValueError, TypeError):
             pass
 
-    # --- Overrides: сценарий-aware ---
-    overrides_qs_filter = Q(date=target_date, specialist__active=True)
-    if scenario_id_int is not None:
-        overrides_qs_filter &= Q(scenario_id=scenario_id_int) | Q(scenario__isnull=True)
-    overrides_qs = SpecialistScheduleOverride.objects.filter(
-        overrides_qs_filter
-    ).prefetch_related("intervals")
-    # Ключ: (spec_id, scenario_id|None) → override
-    overrides_raw = {}
-    for o in overrides_qs:
-        overrides_raw[(int(o.specialist_id), o.scenario_id)] = o
-
-    def _get_override(specialist_id):
-        if scenario_id_int is not None:
-            specific = overrides_raw.get((specialist_id, scenario_id_int))
-            if specific is not None:
-                return specific
-        return overrides_raw.get((specialist_id, None))
-
-    # --- Weekly-интервалы: сценарий-aware ---
-    weekly_qs = SpecialistWeeklyInterval.objects.filter(specialist__active=True)
-    if scenario_id_int is not None:
-        weekly_qs = weekly_qs.filter(
-            Q(scenario_id=scenario_id_int) | Q(scenario__isnull=True)
-        )
-    specialists_with_any_weekly = set(
-        weekly_qs.values_list("specialist_id", flat=True).distinct()
+    # Расписания всех активных специалистов на дату (weekly + overrides с
+    # приоритетом сценария) загружаются фиксированным числом запросов.
+    schedules = SpecialistSchedules(
+        specialist_names, [target_date], [scenario_id_int]
     )
-    weekday = int(target_date.weekday())
-    # Ключ: (spec_id, scenario_id|None) → list of (start_min, end_min)
-    weekly_work_raw = {}
-    for spec_id, start_t, end_t, sc_id in weekly_qs.filter(
-        weekday=weekday,
-        specialist_id__in=specialists_with_any_weekly,
-    ).values_list("specialist_id", "start_time", "end_time", "scenario_id"):
-        weekly_work_raw.setdefault((int(spec_id), sc_id), []).append(
-            (_time_to_minutes(start_t), _time_to_minutes(end_t))
-        )
-
-    def _get_weekly_work(specialist_id):
-        if scenario_id_int is not None:
-            specific = weekly_work_raw.get((specialist_id, scenario_id_int))
-            if specific:
-                return specific
-        fallback = weekly_work_raw.get((specialist_id, None))
-        if fallback:
-            return fallback
-        return []
 
     def _get_unavailability_intervals_for_specialist(specialist_id: int):
         # Возвращаем интервалы НЕДОСТУПНОСТИ (gaps), то есть всё, что вне рабочего
         # времени специалиста на эту дату. Эти интервалы отдаем фронту как "busy",
         # чтобы повторно использовать существующую проверку isSpecialistBusy.
-        override = _get_override(specialist_id)
-        if override is not None:
-            if override.is_day_off:
-                return [(0, 24 * 60)]
-            work = [
-                (_time_to_minutes(i.start_time), _time_to_minutes(i.end_time))
-                for i in getattr(override, "intervals", []).all()
-            ]
-        else:
-            if specialist_id not in specialists_with_any_weekly:
-                # Нет weekly-расписания вообще — значит не ограничиваем доступность.
-                return []
-            work = _get_weekly_work(specialist_id)
-
-        work_merged = _merge_work_intervals(work)
+        work_merged = schedules.work_minutes(
+            specialist_id, target_date, scenario_id_int
+        )
+        if work_merged is None:
+            # Нет weekly-расписания вообще — значит не ограничиваем доступность.
+            return []
         if not work_merged:
             # Есть расписание (weekly/override), но на дату нет рабочих интервалов.
-            return [(0, 24 * 60)]
+            return [(0, DAY_MINUTES)]
 
         gaps = []
         prev_end = 0
@@ -883,29 +821,14 @@ def get_busy_specialists_for_date(request):
             if prev_end < s:
                 gaps.append((prev_end, s))
             prev_end = max(prev_end, e)
-        if prev_end < 24 * 60:
-            gaps.append((prev_end, 24 * 60))
+        if prev_end < DAY_MINUTES:
+            gaps.append((prev_end, DAY_MINUTES))
         return gaps
 
-    relevant_specialist_ids = (
-        set(bookings_qs.values_list("specialist_id", flat=True))
-        | {spec_id for spec_id, _ in overrides_raw.keys()}
-        | set(specialists_with_any_weekly)
-        | set(client_busy_specialist_ids)
-    )
-
-    specialist_names = {
-        s.id: s.name
-        for s in Specialist.objects.filter(
-            id__in=relevant_specialist_ids,
-            active=True,
-        ).only("id", "name")
-    }
-
     # Собираем данные о занятости специалистов
     busy_specialists = {}
 
-    for spec_id in relevant_specialist_ids:
+    for spec_id in specialist_names:
         # Сначала добавляем "занятость" из расписания (вне рабочего времени).
         unavail = _get_unavailability_intervals_for_specialist(int(spec_id))
         if not unavail:
@@ -1084,124 +1007,29 @@ def get_specialists_work_intervals(request):
         except (ValueError, TypeError):
             pass
 
-    # --- Weekly-интервалы: берём для конкретного сценария + fallback (scenario=NULL) ---
-    weekly_qs = SpecialistWeeklyInterval.objects.filter(
-        specialist_id__in=specialist_ids
-    )
-    if scenario_id_int is not None:
-        weekly_qs = weekly_qs.filter(
-            Q(scenario_id=scenario_id_int) | Q(scenario__isnull=True)
-        )
-
-    specialists_with_any_weekly = set(
-        weekly_qs.values_list("specialist_id", flat=True).distinct()
-    )
-
-    # Ключ: (spec_id, weekday, scenario_id|None) → list of (start, end)
-    weekly_work_raw = {}
-    for spec_id, weekday, start_t, end_t, sc_id in weekly_qs.values_list(
-        "specialist_id", "weekday", "start_time", "end_time", "scenario_id"
-    ):
-        weekly_work_raw.setdefault((int(spec_id), int(weekday), sc_id), []).append(
-            (start_t, end_t)
-        )
-
-    def _get_weekly_intervals(spec_id, weekday):
-        """Возвращает weekly-интервалы с приоритетом: конкретный сценарий > fallback (NULL)."""
-        if scenario_id_int is not None:
-            specific = weekly_work_raw.get((spec_id, weekday, scenario_id_int))
-            if specific:
-                return specific
-        fallback = weekly_work_raw.get((spec_id, weekday, None))
-        if fallback:
-            return fallback
-        return []
-
-    # --- Overrides: берём для конкретного сценария + fallback (scenario=NULL) ---
-    overrides_qs_filter = Q(
-        date__gte=start_date,
-        date__lte=end_date,
-        specialist_id__in=specialist_ids,
-        specialist__active=True,
-    )
-    if scenario_id_int is not None:
-        overrides_qs_filter &= Q(scenario_id=scenario_id_int) | Q(scenario__isnull=True)
-
-    overrides_qs = (
-        SpecialistScheduleOverride.objects.filter(overrides_qs_filter)
-        .prefetch_related("intervals")
-        .select_related("specialist")
-    )
-    # Ключ: (spec_id, date, scenario_id|None) → override
-    overrides_raw = {}
-    for o in overrides_qs:
-        overrides_raw[(int(o.specialist_id), o.date, o.scenario_id)] = o
-
-    def _get_override(spec_id, cur_date):
-        """Возвращает override с приоритетом: конкретный сценарий > fallback (NULL)."""
-        if scenario_id_int is not None:
-            specific = overrides_raw.get((spec_id, cur_date, scenario_id_int))
-            if specific is not None:
-                return specific
-        return overrides_raw.get((spec_id, cur_date, None))
-
-    def _time_to_minutes(t):
-        return int(t.hour) * 60 + int(t.minute)
-
-    def _merge_intervals_minutes(intervals):
-        merged = []
-        for s, e in sorted(intervals, key=lambda x: x[0]):
-            if s < 0:
-                s = 0
-            if e > 24 * 60:
-                e = 24 * 60
-            if s >= e:
-                continue
-            if not merged or s > merged[-1][1]:
-                merged.append([s, e])
-            else:
-                merged[-1][1] = max(merged[-1][1], e)
-        return merged
+    dates = [
+        start_date + timedelta(days=offset)
+        for offset in range((end_date - start_date).days + 1)
+    ]
+    # Weekly-интервалы и overrides всех специалистов на весь диапазон дат
+    # (приоритет: конкретный сценарий > fallback scenario=NULL).
+    schedules = SpecialistSchedules(specialist_ids, dates, [scenario_id_int])
 
     work_intervals_by_date = {}
-    cur = start_date
-    while cur <= end_date:
-        date_key = cur.isoformat()
-        weekday = int(cur.weekday())
+    for cur in dates:
         by_spec = {}
         for spec_id in specialist_ids:
-            override = _get_override(int(spec_id), cur)
-            intervals_minutes = []
-
-            if override is not None:
-                if override.is_day_off:
-                    intervals_minutes = []
-                else:
-                    intervals_minutes = [
-                        (_time_to_minutes(i.start_time), _time_to_minutes(i.end_time))
-                        for i in getattr(override, "intervals", []).all()
-                        if i.start_time is not None and i.end_time is not None
-                    ]
-            else:
-                if int(spec_id) in specialists_with_any_weekly:
-                    raw = _get_weekly_intervals(int(spec_id), weekday)
-                    intervals_minutes = [
-                        (_time_to_minutes(s), _time_to_minutes(e))
-                        for s, e in raw
-                        if s is not None and e is not None
-                    ]
-                else:
-                    intervals_minutes = [(0, 24 * 60)]
-
-            merged = _merge_intervals_minutes(intervals_minutes)
+            merged = schedules.work_minutes(int(spec_id), cur, scenario_id_int)
+            if merged is None:
+                # Нет weekly-расписания вообще — работает весь день.
+                merged = [[0, DAY_MINUTES]]
             # Не включаем специалиста, если у него нет рабочих интервалов в этот день
             if merged:
                 by_spec[str(int(spec_id))] = [
                     {"startMinutes": s, "endMinutes": e} for s, e in merged
                 ]
 
-        work_intervals_by_date[date_key] = by_spec
-        cur += timedelta(days=1)
+        work_intervals_by_date[cur.isoformat()] = by_spec
 
     return JsonResponse(
         {
@@ -133,6 +133,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Тестовая БД — файл, а не общая in-memory: иначе параллельные соединения
+        # получают "database table is locked" вместо ожидания блокировки.
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 